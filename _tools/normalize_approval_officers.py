@@ -14,6 +14,7 @@ if ROOT_DIR not in sys.path:
 
 from src.backend.utils.db import get_db
 from src.backend.utils.approval_helpers import normalize_officers
+from src.backend.utils.approval_inbox import sync_approval_inbox
 
 
 def _is_oid(value) -> bool:
@@ -113,6 +114,7 @@ def _process_flows(db, apply: bool):
                     {"_id": ObjectId(flow_id)},
                     {"$set": update_data}
                 )
+                sync_approval_inbox(db, flow_id)
 
         issues.extend(flow_issues)
 
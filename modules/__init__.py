@@ -66,6 +66,40 @@ def register_modules(app: FastAPI):
             traceback.print_exc()
 
 
+def get_module_indexes() -> List[tuple]:
+    """
+    Get index declarations from all enabled modules
+
+    Each module may ship an indexes.py with INDEXES and QUERY_PROBES lists.
+
+    Returns:
+        List of (module_name, indexes, query_probes) tuples
+    """
+    enabled_modules = get_enabled_modules()
+    declarations = []
+
+    for module_name in enabled_modules:
+        indexes_path = os.path.join(os.path.dirname(__file__), module_name, 'indexes.py')
+        if not os.path.exists(indexes_path):
+            continue
+        try:
+            spec = importlib.util.spec_from_file_location(
+                f"modules.{module_name}.indexes",
+                indexes_path
+            )
+            indexes_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(indexes_module)
+            declarations.append((
+                module_name,
+                getattr(indexes_module, 'INDEXES', []),
+                getattr(indexes_module, 'QUERY_PROBES', [])
+            ))
+        except Exception as e:
+            print(f"Failed to load index declarations from {module_name}: {str(e)}")
+
+    return declarations
+
+
 def get_module_menu_items() -> List[Dict[str, Any]]:
     """Get menu items from all enabled modules"""
     enabled_modules = get_enabled_modules()
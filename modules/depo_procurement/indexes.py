@@ -0,0 +1,47 @@
+"""
+DEPO Procurement module index declarations
+Picked up by src/backend/utils/indexes.py (see there for the spec format)
+"""
+from bson import ObjectId
+
+
+INDEXES = [
+    {'collection': 'depo_purchase_orders', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'state_created_at', 'keys': [('state_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'reference', 'keys': [('reference', 1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'supplier_id', 'keys': [('supplier_id', 1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'items_part_id', 'keys': [('items.part_id', 1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'updated_at', 'keys': [('updated_at', -1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'depo_purchase_orders', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+    {'collection': 'depo_purchase_order_attachments', 'name': 'order_created_at', 'keys': [('order_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_procurement_qc', 'name': 'order_created_at', 'keys': [('order_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_stocks', 'name': 'purchase_order_received', 'keys': [('purchase_order_id', 1), ('received_date', -1)]},
+]
+
+
+QUERY_PROBES = [
+    {
+        'name': 'purchase_orders_list',
+        'collection': 'depo_purchase_orders',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'purchase_orders_by_state',
+        'collection': 'depo_purchase_orders',
+        'filter': {'state_id': ObjectId()},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'purchase_orders_search',
+        'collection': 'depo_purchase_orders',
+        'filter': {'search_grams': {'$all': ['bol', 'olt']}}
+    },
+    {
+        'name': 'received_stock_by_order',
+        'collection': 'depo_stocks',
+        'filter': {'purchase_order_id': ObjectId()},
+        'sort': [('received_date', -1)]
+    },
+]
@@ -8,6 +8,9 @@ from bson import ObjectId
 
 # Import from core
 from src.backend.utils.db import get_db
+from modules.inventory.stock_availability import refresh_batch_availability
+from src.backend.utils.audit import flush_audit_queue
+from src.backend.utils.search import refresh_search_fields, touches_search_fields
 from src.backend.utils.sections_permissions import (
     require_section,
     get_section_permissions,
@@ -57,6 +60,8 @@ async def get_purchase_orders(
     date_to: Optional[str] = Query(None),
     skip: Optional[int] = Query(None, ge=0),
     limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query("exact"),
     current_user: dict = Depends(require_section("procurement"))
 ):
     """Get list of purchase orders from MongoDB with filters"""
@@ -65,7 +70,10 @@ async def get_purchase_orders(
     base_query = {}
     perms = get_section_permissions(db, current_user, "procurement")
     base_query = apply_scope_to_query(db, current_user, perms, base_query, created_by_field="created_by")
-    return await get_purchase_orders_list(search, state_id, date_from, date_to, skip, limit, base_query=base_query)
+    return await get_purchase_orders_list(
+        search, state_id, date_from, date_to, skip, limit, base_query=base_query,
+        cursor=cursor, total_mode=total_mode
+    )
 
 
 @router.get("/purchase-orders/{order_id}")
@@ -124,6 +132,9 @@ async def update_purchase_order(
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Purchase order not found")
         
+        if touches_search_fields('depo_purchase_orders', body):
+            refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
+        
         # Return updated order
         updated_order = db['depo_purchase_orders'].find_one({'_id': ObjectId(order_id)})
         return serialize_doc(updated_order)
@@ -323,6 +334,7 @@ async def delete_stock_item(
         
         # Delete stock item
         db.depo_stocks.delete_one({'_id': ObjectId(stock_id)})
+        refresh_batch_availability(db, stock.get('part_id'), stock.get('batch_code'))
         
         return {"message": "Stock item deleted successfully"}
     except HTTPException:
@@ -623,7 +635,7 @@ async def remove_received_stock_signature_endpoint(
 # ==================== JOURNAL ENDPOINT ====================
 
 @router.get("/purchase-orders/{order_id}/journal")
-async def get_order_journal(
+def get_order_journal(
     request: Request,
     order_id: str,
     current_user: dict = Depends(require_section("procurement"))
@@ -634,6 +646,7 @@ async def get_order_journal(
     _ensure_procurement_scope(db, current_user, order)
     
     # Get logs for this order
+    flush_audit_queue()
     logs = list(db.logs.find({
         'collection': 'depo_purchase_orders',
         'object_id': order_id
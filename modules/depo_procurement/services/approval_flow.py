@@ -6,6 +6,9 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from modules.inventory.stock_availability import refresh_batch_availability
+from src.backend.utils.audit import log_journal
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_approval_completion, check_user_can_sign
 from src.backend.utils.sections_permissions import get_section_permissions, is_action_allowed
@@ -98,6 +101,7 @@ async def create_order_approval_flow(order_id: str):
     }
     
     result = db.approval_flows.insert_one(flow_data)
+    sync_approval_inbox(db, result.inserted_id)
     flow_data["_id"] = str(result.inserted_id)
     
     return serialize_doc(flow_data)
@@ -165,6 +169,7 @@ async def sign_purchase_order(order_id: str, action: str, current_user: dict, re
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     updated_flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
     required_officers = updated_flow.get("required_officers", [])
@@ -219,9 +224,10 @@ async def sign_purchase_order(order_id: str, action: str, current_user: dict, re
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
     
     # Log the signature
-    db.logs.insert_one({
+    log_journal({
         'collection': 'depo_purchase_orders',
         'object_id': order_id,
         'action': 'order_signed',
@@ -264,6 +270,7 @@ async def remove_order_signature(order_id: str, user_id: str, current_user: dict
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -275,6 +282,7 @@ async def remove_order_signature(order_id: str, user_id: str, current_user: dict
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Reset order state to Pending (6943a4a6451609dd8a618ce0)
         pending_state = db['depo_purchase_orders_states'].find_one({'_id': ObjectId('6943a4a6451609dd8a618ce0')})
@@ -304,6 +312,8 @@ async def remove_order_signature(order_id: str, user_id: str, current_user: dict
         if stocks_to_delete:
             # Delete the stocks
             stocks_collection.delete_many({'purchase_order_id': ObjectId(order_id)})
+            for part_id, batch_code in {(s.get('part_id'), s.get('batch_code') or '') for s in stocks_to_delete}:
+                refresh_batch_availability(db, part_id, batch_code)
             
             # Reset received quantities in order items
             order = db['depo_purchase_orders'].find_one({'_id': ObjectId(order_id)})
@@ -327,7 +337,7 @@ async def remove_order_signature(order_id: str, user_id: str, current_user: dict
     removed_user = db.users.find_one({'_id': ObjectId(user_id)})
     removed_username = removed_user.get('username') if removed_user else user_id
     
-    db.logs.insert_one({
+    log_journal({
         'collection': 'depo_purchase_orders',
         'object_id': order_id,
         'action': 'signature_removed',
@@ -9,6 +9,8 @@ import hashlib
 
 from src.backend.utils.db import get_db
 from ..utils import serialize_doc
+from modules.inventory.part_summary import refresh_document_summaries
+from src.backend.utils.search import refresh_search_fields
 
 
 async def get_order_items(order_id: str):
@@ -124,6 +126,8 @@ async def add_order_item(order_id: str, item_data):
                 }
             }
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id)
+        refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
         
         return serialize_doc(item)
     except HTTPException:
@@ -168,6 +172,8 @@ async def update_order_item(order_id: str, item_index: int, item_data):
                 }
             }
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id)
+        refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
         
         return serialize_doc(items[item_index])
     except HTTPException:
@@ -220,6 +226,8 @@ async def update_order_item_by_id(order_id: str, item_id: str, item_data):
                 }
             }
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id)
+        refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
         
         return serialize_doc(items[item_index])
     except HTTPException:
@@ -244,7 +252,7 @@ async def delete_order_item(order_id: str, item_index: int):
             raise HTTPException(status_code=404, detail="Item not found")
         
         # Remove item
-        items.pop(item_index)
+        removed = items.pop(item_index)
         
         collection.update_one(
             {'_id': ObjectId(order_id)},
@@ -256,6 +264,8 @@ async def delete_order_item(order_id: str, item_index: int):
                 }
             }
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id, {'items': [removed]})
+        refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
         
         return {"success": True}
     except HTTPException:
@@ -288,7 +298,7 @@ async def delete_order_item_by_id(order_id: str, item_id: str):
             raise HTTPException(status_code=404, detail="Item not found")
         
         # Remove item
-        items.pop(item_index)
+        removed = items.pop(item_index)
         
         collection.update_one(
             {'_id': ObjectId(order_id)},
@@ -300,6 +310,8 @@ async def delete_order_item_by_id(order_id: str, item_id: str):
                 }
             }
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id, {'items': [removed]})
+        refresh_search_fields(db, 'depo_purchase_orders', ObjectId(order_id))
         
         return {"success": True}
     except HTTPException:
@@ -8,6 +8,7 @@ import os
 import hashlib
 
 from src.backend.utils.db import get_db
+from modules.inventory.part_summary import refresh_document_summaries
 from ..utils import serialize_doc
 
 
@@ -56,6 +57,7 @@ async def change_order_state(order_id: str, new_state_name: str, current_user, r
             {'_id': ObjectId(order_id)},
             {'$set': update_data}
         )
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id)
         
         # Get updated order
         updated_order = po_collection.find_one({'_id': ObjectId(order_id)})
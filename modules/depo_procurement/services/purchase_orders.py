@@ -9,11 +9,21 @@ import os
 import hashlib
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.relation_loader import RelationLoader
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, matching_ids, refresh_search_fields, search_filter
+from src.backend.utils.pagination import clamp_page_size, count_total, cursor_response, keyset_page
 from ..utils import serialize_doc
 
 
-async def get_purchase_orders_list(search=None, state_id=None, date_from=None, date_to=None, skip=None, limit=None, base_query: Optional[dict] = None):
-    """Get list of purchase orders with supplier and state details"""
+async def get_purchase_orders_list(search=None, state_id=None, date_from=None, date_to=None, skip=None, limit=None, base_query: Optional[dict] = None,
+                                   cursor: Optional[str] = None, total_mode: str = "exact"):
+    """
+    Get list of purchase orders with supplier and state details
+
+    cursor: '' or a previous next_cursor for keyset pagination (always returns a paged dict)
+    """
     db = get_db()
     collection = db['depo_purchase_orders']
     
@@ -26,38 +36,16 @@ async def get_purchase_orders_list(search=None, state_id=None, date_from=None, d
             search = None
         
     if search:
-        or_clauses = [
-            {'reference': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}},
-            {'supplier_reference': {'$regex': search, '$options': 'i'}},
-            {'items.part_detail.name': {'$regex': search, '$options': 'i'}},
-            {'items.part_detail.ipn': {'$regex': search, '$options': 'i'}},
-            {'items.reference': {'$regex': search, '$options': 'i'}},
-        ]
+        or_clauses = list(search_filter('depo_purchase_orders', search)['$or'])
 
         # Supplier name search -> map to supplier_id
-        supplier_ids = []
-        suppliers = db['depo_companies'].find(
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'_id': 1}
-        )
-        supplier_ids = [s['_id'] for s in suppliers]
+        supplier_ids = matching_ids(db, 'depo_companies', search)
         if supplier_ids:
             supplier_id_variants = supplier_ids + [str(sid) for sid in supplier_ids]
             or_clauses.append({'supplier_id': {'$in': supplier_id_variants}})
 
         # Part name / IPN search -> map to part_id in items
-        part_ids = []
-        parts = db['depo_parts'].find(
-            {
-                '$or': [
-                    {'name': {'$regex': search, '$options': 'i'}},
-                    {'ipn': {'$regex': search, '$options': 'i'}}
-                ]
-            },
-            {'_id': 1}
-        )
-        part_ids = [p['_id'] for p in parts]
+        part_ids = matching_ids(db, 'depo_parts', search)
         if part_ids:
             part_id_variants = part_ids + [str(pid) for pid in part_ids]
             or_clauses.append({'items.part_id': {'$in': part_id_variants}})
@@ -77,25 +65,29 @@ async def get_purchase_orders_list(search=None, state_id=None, date_from=None, d
             query['issue_date']['$lte'] = date_to
     
     try:
-        cursor = collection.find(query).sort('created_at', -1)
-        total = collection.count_documents(query)
-        if limit is not None:
-            cursor = cursor.skip(skip or 0).limit(limit)
-        elif skip:
-            cursor = cursor.skip(skip)
-        orders = list(cursor)
+        page = None
+        if cursor is not None:
+            page = keyset_page(collection, query, cursor, limit, total_mode=total_mode, projection=WITHOUT_SEARCH_FIELDS)
+            orders = page['docs']
+        else:
+            total = count_total(collection, query, total_mode)['total']
+            find_cursor = collection.find(query, WITHOUT_SEARCH_FIELDS).sort('created_at', -1).skip(skip or 0).limit(clamp_page_size(limit))
+            orders = list(find_cursor)
+
+        loader = RelationLoader(db)
+        loader.add('depo_companies', [order.get('supplier_id') for order in orders])
         
         # Enrich with supplier and state details
         for order in orders:
             # Supplier details
             if order.get('supplier_id'):
-                supplier = db['depo_companies'].find_one({'_id': ObjectId(order['supplier_id'])})
+                supplier = loader.get('depo_companies', order['supplier_id'])
                 if supplier:
                     order['supplier_detail'] = serialize_doc(supplier)
             
             # State details
             if order.get('state_id'):
-                state = db['depo_purchase_orders_states'].find_one({'_id': order['state_id']})
+                state = get_reference(db, 'depo_purchase_orders_states', order['state_id'])
                 if state:
                     order['state_detail'] = {
                         'name': state.get('name'),
@@ -111,6 +103,8 @@ async def get_purchase_orders_list(search=None, state_id=None, date_from=None, d
                 }
         
         results = serialize_doc(orders)
+        if page is not None:
+            return cursor_response(results, page)
         if limit is not None or skip:
             return {
                 'results': results,
@@ -119,6 +113,8 @@ async def get_purchase_orders_list(search=None, state_id=None, date_from=None, d
                 'limit': limit or len(results)
             }
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch purchase orders: {str(e)}")
 
@@ -142,7 +138,7 @@ async def get_purchase_order_by_id(order_id: str):
         
         # ✅ FIX: Get state_detail from state_id (depo_purchase_orders_states)
         if order.get('state_id'):
-            state = db['depo_purchase_orders_states'].find_one({'_id': order['state_id']})
+            state = get_reference(db, 'depo_purchase_orders_states', order['state_id'])
             if state:
                 order['state_detail'] = {
                     'name': state.get('name'),
@@ -223,6 +219,7 @@ async def create_new_purchase_order(order_data, current_user):
         result = collection.insert_one(doc)
         doc['_id'] = result.inserted_id
         order_id = str(result.inserted_id)
+        refresh_search_fields(db, 'depo_purchase_orders', result.inserted_id)
         
         # Auto-create approval flow based on approval_templates
         try:
@@ -275,6 +272,7 @@ async def create_new_purchase_order(order_data, current_user):
                 }
                 
                 db['approval_flows'].insert_one(flow_data)
+                sync_approval_inbox(db, flow_data["_id"])
                 print(f"[PROCUREMENT] Auto-created approval flow for order {order_id} using template: {approval_template.get('name')}")
         except Exception as e:
             print(f"[PROCUREMENT] Warning: Failed to auto-create approval flow: {e}")
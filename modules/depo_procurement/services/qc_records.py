@@ -6,6 +6,7 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from modules.inventory.stock_availability import refresh_batch_availability
 from ..utils import serialize_doc
 
 
@@ -133,3 +134,4 @@ def _update_stock_status_to_ok(db, order_id: str, part_id, batch_code: str):
                 }
             }
         )
+        refresh_batch_availability(db, part_id, batch_code)
@@ -7,6 +7,7 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_approval_completion, check_user_can_sign
 from src.backend.utils.sections_permissions import get_section_permissions, is_action_allowed
@@ -100,6 +101,7 @@ async def create_received_stock_approval_flow(order_id: str):
     }
     
     result = db.approval_flows.insert_one(flow_data)
+    sync_approval_inbox(db, result.inserted_id)
     flow_data["_id"] = str(result.inserted_id)
     
     return serialize_doc(flow_data)
@@ -187,6 +189,7 @@ async def sign_received_stock(order_id: str, target_state_id: str, current_user:
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Update purchase order state
     db['depo_purchase_orders'].update_one(
@@ -224,6 +227,7 @@ async def sign_received_stock(order_id: str, target_state_id: str, current_user:
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
     
     flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
     return serialize_doc(flow)
@@ -256,6 +260,7 @@ async def remove_received_stock_signature(order_id: str, user_id: str, current_u
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -268,6 +273,7 @@ async def remove_received_stock_signature(order_id: str, user_id: str, current_u
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Reset purchase order received signature data
         db['depo_purchase_orders'].update_one(
@@ -8,6 +8,11 @@ import os
 import hashlib
 
 from src.backend.utils.db import get_db
+from src.backend.utils.relation_loader import RelationLoader
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.audit import log_journal
+from modules.inventory.stock_availability import refresh_stock_availability
+from modules.inventory.part_summary import refresh_document_summaries
 from ..utils import serialize_doc
 from .order_state import check_and_auto_finish_order
 
@@ -93,6 +98,7 @@ async def receive_stock_item(order_id: str, stock_data, current_user):
         
         result = stock_collection.insert_one(stock_doc)
         stock_id = result.inserted_id
+        refresh_stock_availability(db, stock_id)
         
         # Initialize stocks array if it doesn't exist
         if 'stocks' not in item:
@@ -128,10 +134,11 @@ async def receive_stock_item(order_id: str, stock_data, current_user):
         
         # Check if all items are received and auto-finish
         await check_and_auto_finish_order(order_id)
+        refresh_document_summaries(db, 'depo_purchase_orders', order_id)
         
         # Log the stock receipt
         part_name = part.get('name', 'Unknown')
-        db.logs.insert_one({
+        log_journal({
             'collection': 'depo_purchase_orders',
             'object_id': order_id,
             'action': 'stock_received',
@@ -164,12 +171,20 @@ async def get_received_stock_items(order_id: str):
     try:
         cursor = collection.find({'purchase_order_id': ObjectId(order_id)}).sort('received_date', -1)
         stocks = list(cursor)
+
+        # Load related parts, UMs and locations in batches (one query per collection)
+        loader = RelationLoader(db)
+        loader.add('depo_parts', [stock.get('part_id') for stock in stocks])
+        loader.add('depo_locations', [stock.get('location_id') for stock in stocks])
+        loader.load()
+        for part in loader.get_many('depo_parts', [stock.get('part_id') for stock in stocks]):
+            loader.add('depo_ums', [part.get('system_um_id'), part.get('manufacturer_um_id')])
         
         # Enrich with part details, status details, and System UM
         for stock in stocks:
             # Get part details
             if stock.get('part_id'):
-                part = db['depo_parts'].find_one({'_id': ObjectId(stock['part_id'])})
+                part = loader.get('depo_parts', stock['part_id'])
                 if part:
                     stock['part_detail'] = {
                         'name': part.get('name'),
@@ -179,7 +194,7 @@ async def get_received_stock_items(order_id: str):
                     
                     # Get System UM details
                     if part.get('system_um_id'):
-                        system_um = db['depo_ums'].find_one({'_id': ObjectId(part['system_um_id'])})
+                        system_um = loader.get('depo_ums', part['system_um_id'])
                         if system_um:
                             stock['system_um_detail'] = {
                                 'name': system_um.get('name'),
@@ -189,7 +204,7 @@ async def get_received_stock_items(order_id: str):
                     
                     # Get Manufacturer UM details
                     if part.get('manufacturer_um_id'):
-                        manufacturer_um = db['depo_ums'].find_one({'_id': ObjectId(part['manufacturer_um_id'])})
+                        manufacturer_um = loader.get('depo_ums', part['manufacturer_um_id'])
                         if manufacturer_um:
                             stock['manufacturer_um_detail'] = {
                                 'name': manufacturer_um.get('name'),
@@ -205,7 +220,7 @@ async def get_received_stock_items(order_id: str):
             
             # Get location details
             if stock.get('location_id'):
-                location = db['depo_locations'].find_one({'_id': ObjectId(stock['location_id'])})
+                location = loader.get('depo_locations', stock['location_id'])
                 if location:
                     stock['location_detail'] = {
                         'name': location.get('name'),
@@ -214,7 +229,7 @@ async def get_received_stock_items(order_id: str):
             
             # Get status details from depo_stocks_states using state_id
             if stock.get('state_id'):
-                state = db['depo_stocks_states'].find_one({'_id': ObjectId(stock['state_id'])})
+                state = get_reference(db, 'depo_stocks_states', stock['state_id'])
                 if state:
                     stock['status'] = state.get('name')
                     stock['status_detail'] = {
@@ -1,35 +1,9 @@
 """
 DEPO Procurement Module - Utility Functions
 """
-from datetime import datetime
-from bson import ObjectId
+from src.backend.utils.serializers import serialize_doc as _serialize_doc
 
 
 def serialize_doc(doc):
-    """Convert MongoDB document to JSON-serializable format"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id' or key.endswith('_id'):
-                result[key] = str(value) if value else None
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = [
-                    serialize_doc(item) if isinstance(item, dict) 
-                    else str(item) if isinstance(item, ObjectId)
-                    else item 
-                    for item in value
-                ]
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            else:
-                result[key] = value
-        return result
-    return doc
+    """Convert MongoDB document to JSON-serializable format (no 'value' field)"""
+    return _serialize_doc(doc, add_value=False)
@@ -0,0 +1,354 @@
+"""
+Stock allocation planner
+Alocare stoc FEFO / FIFO, fără supra-vânzare
+
+plan_allocation() answers "where do I take Q of part P from" over a set of
+locations, line by line: earliest expiry_date first, stocks without an
+expiry date after them, oldest first (FIFO) within the same expiry.
+Quarantined states are skipped. plan_allocations() does the same for all
+the lines of a document. Candidate stocks that still only carry a legacy
+`depo_stocks.quantity` are opened in the ledger first (open_legacy_stocks()),
+so the planner takes from the same quantities the availability projection
+shows.
+
+allocate() / allocate_lines() post a plan through the ledger with guarded decrements
+(post_movements(check_balance=True)): a balance only goes down while it still
+covers the line (`quantity >= n` in the update filter), so concurrent
+allocators can never take the same quantity. An allocator that loses a race
+re-plans from fresh balances, up to `max_attempts` times. Lines a document gives
+back (`returned`, e.g. a sales allocation being changed) go out in the same
+post, so a re-allocation that fails leaves the old one exactly as it was.
+
+Every ledger decrement that picks its own lots goes through here: sales
+allocations (src/backend/routes/sales.py), request transfers
+(modules/requests/transfer_routes.py) and production / build order material
+consumption (modules/requests/production_stock_operations.py).
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from modules.inventory.stock_availability import get_quarantine_state_ids, legacy_quantity
+from modules.inventory.stock_movements import (
+    ALLOCATION_ORDER_STAGES,
+    InsufficientStockError,
+    MovementType,
+    open_legacy_stocks,
+    post_movements,
+    transfer_lines,
+)
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+_LEGACY_FIELDS = {
+    'part_id': 1,
+    'batch_code': 1,
+    'quantity': 1,
+    'initial_quantity': 1,
+    'location_id': 1,
+    'initial_location_id': 1,
+}
+
+
+def _open_legacy_candidates(db, match: Dict[str, Any], location_ids: List[ObjectId]):
+    """Open the legacy stocks a plan over `location_ids` could take from"""
+    query = {
+        **match,
+        '$or': [{'location_id': {'$in': location_ids}}, {'initial_location_id': {'$in': location_ids}}],
+    }
+    candidates = [
+        stock for stock in db.depo_stocks.find(query, _LEGACY_FIELDS)
+        if legacy_quantity(stock)[0] in location_ids
+    ]
+    if candidates:
+        open_legacy_stocks(db, candidates)
+
+
+def _returned_credit(returned: Optional[List[dict]]) -> Dict[tuple, float]:
+    credit: Dict[tuple, float] = {}
+    for line in returned or []:
+        key = (line['stock_id'], line['location_id'])
+        credit[key] = credit.get(key, 0) + line['quantity']
+    return credit
+
+
+def plan_allocations(
+    db,
+    demands: List[dict],
+    location_ids: Iterable[ObjectId],
+    exclude_state_ids: Optional[Iterable[ObjectId]] = None,
+    returned: Optional[List[dict]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Plan several demands at once (one aggregation for all parts)
+
+    Demands are served in order, so a lot shared by two demands is only
+    counted once: later demands see what earlier ones took. Legacy stocks
+    at the locations are opened in the ledger before planning.
+
+    Args:
+        demands: [{'part_id', 'quantity', 'batch_code' (None = any batch,
+            '' = stocks without batch), 'notes' (optional)}]
+        location_ids: Locations to take from
+        exclude_state_ids: States never allocated (default: quarantine states)
+        returned: [{'stock_id', 'location_id', 'quantity', ...}] put back in
+            the same post (see allocate_lines()); counted as available
+
+    Returns:
+        One plan per demand, in order: {'lines': [{stock_id, part_id,
+        batch_code, location_id, expiry_date, quantity, available}],
+        'requested', 'planned', 'shortfall'}
+    """
+    location_ids = list(location_ids)
+    if exclude_state_ids is None:
+        exclude_state_ids = get_quarantine_state_ids(db)
+
+    part_ids = list({demand['part_id'] for demand in demands})
+    match: Dict[str, Any] = {'part_id': {'$in': part_ids}}
+    if exclude_state_ids:
+        match['state_id'] = {'$nin': list(exclude_state_ids)}
+    if part_ids:
+        _open_legacy_candidates(db, match, location_ids)
+    credit = _returned_credit(returned)
+
+    pipeline = [
+        {'$match': match},
+        {'$lookup': {
+            'from': 'depo_stocks_balances',
+            'localField': '_id',
+            'foreignField': 'stock_id',
+            'as': 'ledger_balances'
+        }},
+        {'$unwind': '$ledger_balances'},
+        {'$match': {
+            'ledger_balances.location_id': {'$in': location_ids},
+            '$or': [
+                {'ledger_balances.quantity': {'$gt': 0}},
+                {'_id': {'$in': list({stock_id for stock_id, _ in credit})}},
+            ]
+        }},
+        {'$project': {
+            'part_id': 1,
+            'batch_code': 1,
+            'expiry_date': 1,
+            'created_at': 1,
+            'location_id': '$ledger_balances.location_id',
+            'available': '$ledger_balances.quantity',
+        }},
+        *ALLOCATION_ORDER_STAGES,
+    ]
+    rows = list(db.depo_stocks.aggregate(pipeline)) if part_ids else []
+    left = {
+        (row['_id'], row['location_id']): row['available'] + credit.get((row['_id'], row['location_id']), 0)
+        for row in rows
+    }
+
+    plans = []
+    for demand in demands:
+        batch_code = demand.get('batch_code')
+        quantity = demand['quantity']
+        lines = []
+        remaining = quantity
+        for row in rows:
+            if remaining <= 0:
+                break
+            if row.get('part_id') != demand['part_id']:
+                continue
+            if batch_code is not None and (row.get('batch_code') or '') != batch_code:
+                continue
+            key = (row['_id'], row['location_id'])
+            take = min(remaining, left[key])
+            if take <= 0:
+                continue
+            lines.append({
+                'stock_id': row['_id'],
+                'part_id': row.get('part_id'),
+                'batch_code': row.get('batch_code') or '',
+                'location_id': row['location_id'],
+                'expiry_date': row.get('expiry_date'),
+                'quantity': take,
+                'available': left[key],
+            })
+            left[key] -= take
+            remaining -= take
+
+        plans.append({
+            'lines': lines,
+            'requested': quantity,
+            'planned': quantity - max(remaining, 0),
+            'shortfall': max(remaining, 0),
+        })
+    return plans
+
+
+def plan_allocation(
+    db,
+    part_id: ObjectId,
+    quantity: float,
+    location_ids: Iterable[ObjectId],
+    batch_code: Optional[str] = None,
+    exclude_state_ids: Optional[Iterable[ObjectId]] = None,
+) -> Dict[str, Any]:
+    """
+    Plan which lots cover `quantity` of a part (one aggregation)
+
+    Args:
+        location_ids: Locations to take from
+        batch_code: Restrict to one batch ('' = stocks without batch)
+        exclude_state_ids: States never allocated (default: quarantine states)
+
+    Returns:
+        {'lines': [{stock_id, part_id, batch_code, location_id, expiry_date, quantity, available}],
+         'requested', 'planned', 'shortfall'}
+    """
+    demand = {'part_id': part_id, 'quantity': quantity, 'batch_code': batch_code}
+    return plan_allocations(db, [demand], location_ids, exclude_state_ids)[0]
+
+
+def _movement_lines(plan_lines: List[dict], movement_type: MovementType, to_location_id: Optional[ObjectId], notes: Optional[str]) -> List[dict]:
+    lines = []
+    for line in plan_lines:
+        if to_location_id:
+            lines.extend(transfer_lines(
+                line['stock_id'], line['part_id'], line['batch_code'], line['quantity'],
+                line['location_id'], to_location_id, notes
+            ))
+        else:
+            lines.append({
+                'stock_id': line['stock_id'],
+                'part_id': line['part_id'],
+                'batch_code': line['batch_code'],
+                'movement_type': movement_type,
+                'quantity': -line['quantity'],
+                'from_location_id': line['location_id'],
+                'to_location_id': None,
+                'notes': notes,
+            })
+    return lines
+
+
+def allocate_lines(
+    db,
+    demands: List[dict],
+    location_ids: Iterable[ObjectId],
+    document_type: str,
+    document_id: ObjectId,
+    created_by: str,
+    movement_type: MovementType = MovementType.CONSUMPTION,
+    to_location_id: Optional[ObjectId] = None,
+    allow_partial: bool = False,
+    notes: Optional[str] = None,
+    exclude_state_ids: Optional[Iterable[ObjectId]] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    returned: Optional[List[dict]] = None,
+) -> Dict[str, Any]:
+    """
+    Plan and post the demands of one document in a single ledger post
+    (all lines or none)
+
+    Lines are posted as `movement_type` (CONSUMPTION / SCRAP) from their
+    location, or as transfers when `to_location_id` is given. A demand's own
+    'notes' win over `notes`.
+
+    Args:
+        demands: See plan_allocations()
+        allow_partial: Post what is available instead of failing on a shortfall
+        returned: [{'stock_id', 'part_id', 'batch_code', 'location_id',
+            'quantity'}] to put back as ADJUSTMENT lines in the same post,
+            e.g. the lines of an allocation being replaced. The plan may take
+            them again; on failure nothing is posted, so they stay taken.
+
+    Raises:
+        InsufficientStockError: Not enough stock (or still losing races after
+            `max_attempts` plans)
+
+    Returns:
+        {'plans': plan_allocations() result, 'movement_ids', 'returned_ids',
+         'attempts'}
+    """
+    location_ids = list(location_ids)
+    if exclude_state_ids is None:
+        exclude_state_ids = get_quarantine_state_ids(db)
+
+    returned_lines = [
+        {
+            'stock_id': line['stock_id'],
+            'part_id': line.get('part_id'),
+            'batch_code': line.get('batch_code'),
+            'movement_type': MovementType.ADJUSTMENT,
+            'quantity': line['quantity'],
+            'from_location_id': None,
+            'to_location_id': line['location_id'],
+            'notes': notes,
+        }
+        for line in returned or []
+    ]
+
+    for attempt in range(1, max_attempts + 1):
+        plans = plan_allocations(db, demands, location_ids, exclude_state_ids, returned)
+        if not allow_partial:
+            for demand, plan in zip(demands, plans):
+                if plan['shortfall'] > 0:
+                    raise InsufficientStockError(
+                        f"Insufficient stock for part {demand['part_id']}. "
+                        f"Available: {plan['planned']}, Requested: {plan['requested']}"
+                    )
+
+        lines = []
+        for demand, plan in zip(demands, plans):
+            lines.extend(_movement_lines(plan['lines'], movement_type, to_location_id, demand.get('notes') or notes))
+        if not lines and not returned_lines:
+            return {'plans': plans, 'movement_ids': [], 'returned_ids': [], 'attempts': attempt}
+
+        try:
+            movement_ids = post_movements(
+                db, returned_lines + lines, document_type, document_id, created_by, check_balance=True
+            )
+        except InsufficientStockError:
+            # Another allocator took part of the plan; re-plan from fresh balances
+            if attempt == max_attempts:
+                raise
+            continue
+        return {
+            'plans': plans,
+            'movement_ids': movement_ids[len(returned_lines):],
+            'returned_ids': movement_ids[:len(returned_lines)],
+            'attempts': attempt,
+        }
+
+
+def allocate(
+    db,
+    part_id: ObjectId,
+    quantity: float,
+    location_ids: Iterable[ObjectId],
+    document_type: str,
+    document_id: ObjectId,
+    created_by: str,
+    batch_code: Optional[str] = None,
+    movement_type: MovementType = MovementType.CONSUMPTION,
+    to_location_id: Optional[ObjectId] = None,
+    allow_partial: bool = False,
+    notes: Optional[str] = None,
+    exclude_state_ids: Optional[Iterable[ObjectId]] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    returned: Optional[List[dict]] = None,
+) -> Dict[str, Any]:
+    """
+    Plan and post an allocation of one part (see allocate_lines())
+
+    Returns:
+        plan_allocation() result plus 'movement_ids', 'returned_ids' and 'attempts'
+    """
+    result = allocate_lines(
+        db, [{'part_id': part_id, 'quantity': quantity, 'batch_code': batch_code}], location_ids,
+        document_type, document_id, created_by,
+        movement_type=movement_type, to_location_id=to_location_id, allow_partial=allow_partial,
+        notes=notes, exclude_state_ids=exclude_state_ids, max_attempts=max_attempts, returned=returned,
+    )
+    return {
+        **result['plans'][0],
+        'movement_ids': result['movement_ids'],
+        'returned_ids': result['returned_ids'],
+        'attempts': result['attempts'],
+    }
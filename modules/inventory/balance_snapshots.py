@@ -0,0 +1,394 @@
+"""
+Balance snapshots, incremental balance rebuild and point-in-time stock
+Snapshot-uri periodice ale balances + stoc la o dată
+
+A snapshot stores, per (stock, location), the sum of all movements whose _id
+is below its high-water mark. The mark is an ObjectId built from the snapshot
+time (`as_of`), so "movements after the snapshot" is an _id range scan:
+
+- depo_stocks_snapshots:          one header per snapshot
+                                  (as_of, high_water_id, status, rows)
+- depo_stocks_snapshot_balances:  rows (snapshot_id, stock_id, part_id, location_id, quantity)
+
+A snapshot is built from the previous one plus the movements between the two
+marks, so its cost follows the activity since then, not the whole history.
+`as_of` lags `ledger.snapshot_settle_seconds` (default 300) behind now, so
+movements still being written (ids are assigned before the insert) are not
+cut in half.
+
+rebuild_balances() replays the latest snapshot plus the movements after it
+into a shadow collection and renames it over depo_stocks_balances, so the
+live balances are never empty. get_balances_as_of() answers "stock at date X"
+from the latest snapshot before X plus the movements up to X.
+
+Movements edited or deleted in place (sales allocations) call
+invalidate_snapshots(); snapshots that already counted them are marked stale
+and skipped, the next snapshot is rebuilt from an older one.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from src.backend.utils.config import get_config_value
+from src.backend.utils.indexes import ensure_indexes, get_index_catalog
+from modules.inventory.stock_availability import rebuild_stock_availability
+
+SNAPSHOTS_COLLECTION = 'depo_stocks_snapshots'
+SNAPSHOT_ROWS_COLLECTION = 'depo_stocks_snapshot_balances'
+BALANCES_COLLECTION = 'depo_stocks_balances'
+SHADOW_BALANCES_COLLECTION = 'depo_stocks_balances_rebuild'
+
+DEFAULT_SETTLE_SECONDS = 300
+DEFAULT_KEEP_SNAPSHOTS = 0  # 0 = keep all (month-end valuation reads old ones)
+_INSERT_CHUNK = 1000
+_CATCH_UP_ROUNDS = 5
+
+# Movement types counted on to_location (see stock_movements._balance_location_id)
+_TO_LOCATION_TYPES = ['RECEIPT', 'ADJUSTMENT', 'TRANSFER_IN']
+
+
+def _get_int_setting(key: str, default: int) -> int:
+    try:
+        value = int(get_config_value(f'ledger.{key}', default))
+    except (FileNotFoundError, TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Stored dates are naive UTC"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _id_range(start: Optional[ObjectId] = None, end: Optional[ObjectId] = None) -> dict:
+    bounds = {}
+    if start is not None:
+        bounds['$gte'] = start
+    if end is not None:
+        bounds['$lt'] = end
+    return {'_id': bounds} if bounds else {}
+
+
+def _add_movements(db, totals: Dict[tuple, dict], match: dict) -> int:
+    """Add the movements matching `match` to totals; returns the number of movements"""
+    pipeline = [
+        {'$match': match},
+        {
+            '$group': {
+                '_id': {
+                    'stock_id': '$stock_id',
+                    'location_id': {
+                        '$cond': [
+                            {'$in': ['$movement_type', _TO_LOCATION_TYPES]},
+                            '$to_location_id',
+                            '$from_location_id'
+                        ]
+                    }
+                },
+                'part_id': {'$first': '$part_id'},
+                'quantity': {'$sum': '$quantity'},
+                'count': {'$sum': 1}
+            }
+        }
+    ]
+    movements = 0
+    for group in db.depo_stocks_movements.aggregate(pipeline, allowDiskUse=True):
+        key = (group['_id'].get('stock_id'), group['_id'].get('location_id'))
+        row = totals.setdefault(key, {'part_id': group.get('part_id'), 'quantity': 0})
+        row['quantity'] += group.get('quantity') or 0
+        if row.get('part_id') is None:
+            row['part_id'] = group.get('part_id')
+        movements += group.get('count', 0)
+    return movements
+
+
+def _load_snapshot_rows(db, snapshot: Optional[dict], query: Optional[dict] = None) -> Dict[tuple, dict]:
+    totals: Dict[tuple, dict] = {}
+    if not snapshot:
+        return totals
+    for row in db[SNAPSHOT_ROWS_COLLECTION].find(
+        {'snapshot_id': snapshot['_id'], **(query or {})},
+        {'stock_id': 1, 'location_id': 1, 'part_id': 1, 'quantity': 1}
+    ):
+        totals[(row.get('stock_id'), row.get('location_id'))] = {
+            'part_id': row.get('part_id'),
+            'quantity': row.get('quantity') or 0,
+        }
+    return totals
+
+
+def get_latest_snapshot(db, before: Optional[datetime] = None) -> Optional[dict]:
+    """Latest complete snapshot (taken at or before `before`, if given)"""
+    query: Dict[str, Any] = {'status': 'complete'}
+    if before is not None:
+        query['as_of'] = {'$lte': before}
+    return db[SNAPSHOTS_COLLECTION].find_one(query, sort=[('as_of', -1)])
+
+
+def create_balance_snapshot(db, as_of: Optional[datetime] = None) -> dict:
+    """
+    Snapshot balances at `as_of` (default: now minus the settle delay)
+
+    Built from the latest snapshot before `as_of` plus the movements between
+    the two high-water marks. Returns the snapshot header (an existing one if
+    a complete snapshot already has the same mark).
+    """
+    latest_allowed = datetime.utcnow() - timedelta(seconds=_get_int_setting('snapshot_settle_seconds', DEFAULT_SETTLE_SECONDS))
+    as_of = min(_naive_utc(as_of), latest_allowed) if as_of else latest_allowed
+    high_water_id = ObjectId.from_datetime(as_of)
+    # ObjectIds have second precision: the mark is the start of that second
+    as_of = high_water_id.generation_time.replace(tzinfo=None)
+
+    snapshots = db[SNAPSHOTS_COLLECTION]
+    base = get_latest_snapshot(db, before=as_of)
+    if base and base.get('high_water_id') == high_water_id:
+        return base
+
+    totals = _load_snapshot_rows(db, base)
+    movements = _add_movements(db, totals, _id_range(base.get('high_water_id') if base else None, high_water_id))
+
+    header = {
+        '_id': ObjectId(),
+        'as_of': as_of,
+        'high_water_id': high_water_id,
+        'base_snapshot_id': base['_id'] if base else None,
+        'movements_replayed': movements,
+        'status': 'building',
+        'rows': 0,
+        'created_at': datetime.utcnow(),
+    }
+    snapshots.insert_one(header)
+
+    rows = [
+        {
+            'snapshot_id': header['_id'],
+            'stock_id': stock_id,
+            'location_id': location_id,
+            'part_id': row.get('part_id'),
+            'quantity': row['quantity'],
+        }
+        for (stock_id, location_id), row in totals.items()
+        if row['quantity']
+    ]
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        db[SNAPSHOT_ROWS_COLLECTION].insert_many(rows[start:start + _INSERT_CHUNK], ordered=False)
+
+    header.update(status='complete', rows=len(rows))
+    snapshots.update_one({'_id': header['_id']}, {'$set': {'status': 'complete', 'rows': len(rows)}})
+    prune_snapshots(db)
+    return header
+
+
+def prune_snapshots(db, keep: Optional[int] = None) -> int:
+    """Remove all but the newest `keep` complete snapshots, plus stale / unfinished ones (0 = keep all)"""
+    keep = _get_int_setting('snapshot_keep', DEFAULT_KEEP_SNAPSHOTS) if keep is None else keep
+    snapshots = db[SNAPSHOTS_COLLECTION]
+
+    # Unfinished headers older than an hour are leftovers of a crashed run
+    obsolete = [doc['_id'] for doc in snapshots.find(
+        {'$or': [
+            {'status': 'stale'},
+            {'status': 'building', 'created_at': {'$lt': datetime.utcnow() - timedelta(hours=1)}},
+        ]},
+        {'_id': 1}
+    )]
+    if keep:
+        obsolete.extend(
+            doc['_id'] for doc in snapshots.find({'status': 'complete'}, {'_id': 1}).sort('as_of', -1).skip(keep)
+        )
+    if obsolete:
+        db[SNAPSHOT_ROWS_COLLECTION].delete_many({'snapshot_id': {'$in': obsolete}})
+        snapshots.delete_many({'_id': {'$in': obsolete}})
+    return len(obsolete)
+
+
+def invalidate_snapshots(db, movement_ids: Iterable[Any]) -> int:
+    """
+    Mark snapshots stale after movements were edited or deleted in place
+
+    Call with the ids of the changed movements. Returns the number of
+    snapshots invalidated.
+    """
+    oids = [movement_id for movement_id in movement_ids if isinstance(movement_id, ObjectId)]
+    if not oids:
+        return 0
+    result = db[SNAPSHOTS_COLLECTION].update_many(
+        {'status': 'complete', 'high_water_id': {'$gt': min(oids)}},
+        {'$set': {'status': 'stale', 'invalidated_at': datetime.utcnow()}}
+    )
+    return result.modified_count
+
+
+def _balance_rows(totals: Dict[tuple, dict], timestamp: datetime) -> List[dict]:
+    return [
+        {'stock_id': stock_id, 'location_id': location_id, 'quantity': row['quantity'], 'updated_at': timestamp}
+        for (stock_id, location_id), row in totals.items()
+    ]
+
+
+def _catch_up(db, snapshot: Optional[dict], high_water_id: Optional[ObjectId], since: ObjectId) -> int:
+    """
+    Recompute, on the live balances, every pair with a movement since `since`
+
+    update_balance keeps $inc-ing the live collection meanwhile, so a pair is
+    only overwritten while it still holds the value read after its recount
+    (compare-and-set). Pairs that changed in between, and stocks with
+    movements newer than the recount, are recounted in the next round.
+
+    Returns:
+        Number of pairs written
+    """
+    movements = db.depo_stocks_movements
+    match = _id_range(since)
+    retry_stock_ids: set = set()
+    written = 0
+    for _ in range(_CATCH_UP_ROUNDS):
+        recent: Dict[tuple, dict] = {}
+        _add_movements(db, recent, match)
+        stock_ids = list({stock_id for stock_id, _ in recent} | retry_stock_ids)
+        if not stock_ids:
+            return written
+
+        newest = movements.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+        exact = _load_snapshot_rows(db, snapshot, {'stock_id': {'$in': stock_ids}})
+        _add_movements(db, exact, {**_id_range(high_water_id), 'stock_id': {'$in': stock_ids}})
+        live = {
+            (row['stock_id'], row['location_id']): row.get('quantity')
+            for row in db[BALANCES_COLLECTION].find({'stock_id': {'$in': stock_ids}}, {'stock_id': 1, 'location_id': 1, 'quantity': 1})
+        }
+
+        retry_stock_ids = set()
+        for (stock_id, location_id), row in exact.items():
+            pair = {'stock_id': stock_id, 'location_id': location_id}
+            if (stock_id, location_id) in live:
+                result = db[BALANCES_COLLECTION].update_one(
+                    {**pair, 'quantity': live[(stock_id, location_id)]},
+                    {'$set': {'quantity': row['quantity'], 'updated_at': datetime.utcnow()}}
+                )
+                done = result.matched_count == 1
+            else:
+                result = db[BALANCES_COLLECTION].update_one(
+                    pair,
+                    {'$setOnInsert': {'quantity': row['quantity'], 'updated_at': datetime.utcnow()}},
+                    upsert=True
+                )
+                done = result.upserted_id is not None
+            if done:
+                written += 1
+            else:
+                retry_stock_ids.add(stock_id)
+
+        match = {'_id': {'$gt': newest['_id']}} if newest else match
+
+    print(f"[SNAPSHOTS] Warning: balances still changing after {_CATCH_UP_ROUNDS} catch-up rounds; run the rebuild again when the ledger is quieter")
+    return written
+
+
+def rebuild_balances(db, full: bool = False) -> Dict[str, Any]:
+    """
+    Rebuild depo_stocks_balances without emptying it
+
+    Replays the latest snapshot plus the movements after it (everything when
+    `full` or when there is no snapshot) into a shadow collection, then
+    renames the shadow over the live balances in one step. Pairs touched by
+    movements written during the rebuild are recomputed right after the swap
+    (see _catch_up()).
+
+    Returns:
+        {'rows', 'movements_replayed', 'snapshot_id', 'caught_up'}
+    """
+    snapshot = None if full else get_latest_snapshot(db)
+    high_water_id = snapshot.get('high_water_id') if snapshot else None
+
+    # Movements from here on may land on the old collection during the rebuild
+    settle = _get_int_setting('snapshot_settle_seconds', DEFAULT_SETTLE_SECONDS)
+    catch_up_id = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=settle))
+
+    totals = _load_snapshot_rows(db, snapshot)
+    movements = _add_movements(db, totals, _id_range(high_water_id))
+    timestamp = datetime.utcnow()
+
+    shadow = db[SHADOW_BALANCES_COLLECTION]
+    shadow.drop()
+    rows = _balance_rows(totals, timestamp)
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        shadow.insert_many(rows[start:start + _INSERT_CHUNK], ordered=False)
+    ensure_indexes(db, [
+        dict(spec, collection=SHADOW_BALANCES_COLLECTION)
+        for spec in get_index_catalog() if spec['collection'] == BALANCES_COLLECTION
+    ])
+    if rows:
+        shadow.rename(BALANCES_COLLECTION, dropTarget=True)
+    else:
+        shadow.drop()
+        db[BALANCES_COLLECTION].delete_many({})
+
+    caught_up = _catch_up(db, snapshot, high_water_id, catch_up_id)
+
+    rebuild_stock_availability(db)
+
+    return {
+        'rows': len(rows),
+        'movements_replayed': movements,
+        'snapshot_id': snapshot['_id'] if snapshot else None,
+        'caught_up': caught_up,
+    }
+
+
+def get_balances_as_of(
+    db,
+    as_of: datetime,
+    part_id: Optional[ObjectId] = None,
+    stock_ids: Optional[List[ObjectId]] = None,
+    location_id: Optional[ObjectId] = None,
+) -> Dict[str, Any]:
+    """
+    Balances per (stock, location) at a point in time
+
+    Starts from the latest snapshot taken at or before `as_of` and adds only
+    the movements created between its mark and `as_of`.
+
+    Returns:
+        {'as_of', 'snapshot_id', 'snapshot_as_of', 'balances': [{stock_id, part_id, location_id, quantity}]}
+    """
+    as_of = _naive_utc(as_of)
+    snapshot = get_latest_snapshot(db, before=as_of)
+
+    filters: Dict[str, Any] = {}
+    if part_id:
+        filters['part_id'] = part_id
+    if stock_ids is not None:
+        filters['stock_id'] = {'$in': list(stock_ids)}
+
+    row_query = dict(filters)
+    if location_id:
+        row_query['location_id'] = location_id
+    totals = _load_snapshot_rows(db, snapshot, row_query)
+
+    # _id bounds keep the scan on the _id index; created_at gives sub-second precision
+    match = {
+        **_id_range(
+            snapshot.get('high_water_id') if snapshot else None,
+            ObjectId.from_datetime(as_of + timedelta(seconds=1))
+        ),
+        'created_at': {'$lte': as_of},
+        **filters,
+    }
+    _add_movements(db, totals, match)
+
+    balances = [
+        {'stock_id': stock_id, 'part_id': row.get('part_id'), 'location_id': loc_id, 'quantity': row['quantity']}
+        for (stock_id, loc_id), row in totals.items()
+        if row['quantity'] and (not location_id or loc_id == location_id)
+    ]
+    balances.sort(key=lambda row: (str(row['part_id']), str(row['stock_id']), str(row['location_id'])))
+
+    return {
+        'as_of': as_of,
+        'snapshot_id': snapshot['_id'] if snapshot else None,
+        'snapshot_as_of': snapshot.get('as_of') if snapshot else None,
+        'balances': balances,
+    }
@@ -0,0 +1,136 @@
+"""
+Inventory module index declarations
+Picked up by src/backend/utils/indexes.py (see there for the spec format)
+"""
+from bson import ObjectId
+
+
+INDEXES = [
+    # Stocks
+    {'collection': 'depo_stocks', 'name': 'part_state', 'keys': [('part_id', 1), ('state_id', 1)]},
+    {'collection': 'depo_stocks', 'name': 'part_batch', 'keys': [('part_id', 1), ('batch_code', 1)]},
+    {'collection': 'depo_stocks', 'name': 'batch_code', 'keys': [('batch_code', 1)]},
+    {'collection': 'depo_stocks', 'name': 'location_id', 'keys': [('location_id', 1)]},
+    {'collection': 'depo_stocks', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_stocks', 'name': 'return_order_id', 'keys': [('return_order_id', 1)], 'sparse': True},
+
+    # Ledger
+    {'collection': 'depo_stocks_balances', 'name': 'stock_location', 'keys': [('stock_id', 1), ('location_id', 1)]},
+    {'collection': 'depo_stocks_balances', 'name': 'location_quantity', 'keys': [('location_id', 1), ('quantity', -1)]},
+    {'collection': 'depo_stocks_movements', 'name': 'stock_created_at', 'keys': [('stock_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_stocks_movements', 'name': 'document_id', 'keys': [('document_id', 1)]},
+    {'collection': 'depo_stocks_movements', 'name': 'created_at', 'keys': [('created_at', -1)]},
+    {'collection': 'depo_stocks_movements', 'name': 'date', 'keys': [('date', -1)]},
+    {'collection': 'depo_stocks_movements', 'name': 'transfer_group_id', 'keys': [('transfer_group_id', 1)], 'sparse': True},
+    {'collection': 'depo_stocks_movements', 'name': 'idempotency_key', 'keys': [('idempotency_key', 1)], 'unique': True, 'partial': {'idempotency_key': {'$type': 'string'}}},
+
+    # Balance snapshots (modules/inventory/balance_snapshots.py)
+    {'collection': 'depo_stocks_snapshots', 'name': 'status_as_of', 'keys': [('status', 1), ('as_of', -1)]},
+    {'collection': 'depo_stocks_snapshot_balances', 'name': 'snapshot_stock_location', 'keys': [('snapshot_id', 1), ('stock_id', 1), ('location_id', 1)]},
+    {'collection': 'depo_stocks_snapshot_balances', 'name': 'snapshot_part', 'keys': [('snapshot_id', 1), ('part_id', 1)]},
+
+    # Availability projection (modules/inventory/stock_availability.py)
+    {'collection': 'depo_stocks_availability', 'name': 'part_batch_location_state', 'keys': [('part_id', 1), ('batch_code', 1), ('location_id', 1), ('state_id', 1)], 'unique': True},
+
+    # Background label jobs (modules/inventory/label_rendering.py)
+    {'collection': 'depo_label_jobs', 'name': 'created_at', 'keys': [('created_at', 1)]},
+
+    # Catalog
+    {'collection': 'depo_parts', 'name': 'ipn', 'keys': [('ipn', 1)]},
+    {'collection': 'depo_parts', 'name': 'active_name', 'keys': [('is_active', 1), ('name', 1)]},
+    {'collection': 'depo_parts', 'name': 'category_id', 'keys': [('category_id', 1)]},
+    {'collection': 'depo_parts_suppliers', 'name': 'part_id', 'keys': [('part_id', 1)]},
+    {'collection': 'depo_parts_suppliers', 'name': 'supplier_id', 'keys': [('supplier_id', 1)]},
+    {'collection': 'depo_locations', 'name': 'code', 'keys': [('code', 1)]},
+    {'collection': 'depo_locations', 'name': 'parent_id', 'keys': [('parent_id', 1)]},
+    {'collection': 'depo_categories', 'name': 'parent_id', 'keys': [('parent_id', 1)]},
+    {'collection': 'depo_companies', 'name': 'name', 'keys': [('name', 1)]},
+
+    # Search fields (src/backend/utils/search.py)
+    {'collection': 'depo_parts', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'depo_parts', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+    {'collection': 'depo_locations', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'depo_locations', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+    {'collection': 'depo_companies', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'depo_companies', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+]
+
+
+QUERY_PROBES = [
+    {
+        'name': 'stocks_by_part_state',
+        'collection': 'depo_stocks',
+        'filter': {'part_id': ObjectId(), 'state_id': {'$in': [ObjectId(), ObjectId()]}}
+    },
+    {
+        'name': 'stocks_by_batch',
+        'collection': 'depo_stocks',
+        'filter': {'batch_code': 'BATCH001'}
+    },
+    {
+        'name': 'stocks_list',
+        'collection': 'depo_stocks',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'balances_by_stock',
+        'collection': 'depo_stocks_balances',
+        'filter': {'stock_id': {'$in': [ObjectId(), ObjectId()]}}
+    },
+    {
+        'name': 'balances_at_location',
+        'collection': 'depo_stocks_balances',
+        'filter': {'location_id': ObjectId(), 'quantity': {'$gt': 0}},
+        'sort': [('quantity', -1)]
+    },
+    {
+        'name': 'movements_by_stock',
+        'collection': 'depo_stocks_movements',
+        'filter': {'stock_id': ObjectId()},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'movements_by_document',
+        'collection': 'depo_stocks_movements',
+        'filter': {'document_id': ObjectId()}
+    },
+    {
+        'name': 'movements_list',
+        'collection': 'depo_stocks_movements',
+        'filter': {},
+        'sort': [('date', -1)]
+    },
+    {
+        'name': 'availability_by_part',
+        'collection': 'depo_stocks_availability',
+        'filter': {'part_id': ObjectId(), 'state_id': {'$in': [ObjectId(), ObjectId()]}},
+        'sort': [('batch_code', 1), ('location_id', 1)]
+    },
+    {
+        'name': 'articles_list',
+        'collection': 'depo_parts',
+        'filter': {'is_active': True},
+        'sort': [('name', 1)]
+    },
+    {
+        'name': 'articles_search',
+        'collection': 'depo_parts',
+        'filter': {'search_terms': {'$regex': '^bolt'}}
+    },
+    {
+        'name': 'articles_search_substring',
+        'collection': 'depo_parts',
+        'filter': {'search_grams': {'$all': ['bol', 'olt']}}
+    },
+    {
+        'name': 'locations_search',
+        'collection': 'depo_locations',
+        'filter': {'search_grams': {'$all': ['rac', 'ack']}}
+    },
+    {
+        'name': 'companies_search',
+        'collection': 'depo_companies',
+        'filter': {'search_grams': {'$all': ['ste', 'tee', 'eel']}}
+    },
+]
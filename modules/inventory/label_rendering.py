@@ -0,0 +1,365 @@
+"""
+Label rendering pipeline (DataFlows Docu)
+Randare etichete: deduplicare, joburi Docu în paralel, mod asincron pentru tiraje mari
+
+render_labels() renders a print run of label payloads:
+- identical payloads are rendered once; their pages are repeated in the
+  merged PDF (merge_label_pdfs)
+- distinct payloads go to Docu concurrently, at most
+  `labels.docu_concurrency` jobs in flight
+- job status is polled with asyncio.sleep and exponential backoff
+  (`labels.poll_initial_seconds` doubling up to `labels.poll_max_seconds`,
+  giving up after `labels.max_wait_seconds`), so the event loop is never blocked
+
+Copies of one item are numbered (crt_no 1..quant) unless
+`labels.number_copies` is false; numbered copies differ, so only unnumbered
+copies (or the same item selected twice) are deduplicated.
+
+Each template renders with one backend (LABEL_BACKENDS, chosen by
+label_backend()): 'local' for the templates declared in
+`labels.local_templates` (local_labels.py, PIL, in-process), 'docu' for the
+rest. render_print_run() returns the final PDF with either backend.
+
+With a db, Docu renders go through the render cache
+(src/backend/utils/render_cache.py): each distinct payload is looked up by
+(template, template version, payload) first and stored after rendering, so
+reprinting a label does not create a Docu job.
+
+Large print runs can run as a job (start_label_job): the state is kept in
+depo_label_jobs, the merged PDF is written under `labels.jobs_path`, and jobs
+older than `labels.job_retention_hours` are removed when a new one starts.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from src.backend.utils.async_db import run_in_db_thread
+from src.backend.utils.config import get_config_value
+from src.backend.utils.dataflows_docu import AsyncDataFlowsDocuClient, get_async_docu_client
+from src.backend.utils.render_cache import get_rendered, render_cache_enabled, render_key, store_rendered, template_version
+from modules.inventory.local_labels import local_template, render_local_pdf
+
+LABEL_JOBS_COLLECTION = 'depo_label_jobs'
+
+DEFAULT_SETTINGS = {
+    'docu_concurrency': 4,
+    'poll_initial_seconds': 0.25,
+    'poll_max_seconds': 2.0,
+    'max_wait_seconds': 60.0,
+    'number_copies': True,
+    'jobs_path': 'media/labels',
+    'job_retention_hours': 24,
+}
+
+# Background job tasks, kept referenced until they finish
+_running_jobs = set()
+
+
+class LabelRenderError(RuntimeError):
+    """A label could not be rendered or merged; status_code is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def label_settings() -> Dict[str, Any]:
+    """`labels.*` settings from config.yaml, with defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    for key, default in DEFAULT_SETTINGS.items():
+        try:
+            value = get_config_value(f'labels.{key}', default)
+            settings[key] = type(default)(value) if not isinstance(default, bool) else bool(value)
+        except (FileNotFoundError, TypeError, ValueError):
+            pass
+    settings['docu_concurrency'] = max(1, settings['docu_concurrency'])
+    return settings
+
+
+def payload_key(label_data: dict) -> str:
+    """Hash of the canonical JSON of a label payload"""
+    canonical = json.dumps(label_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def dedupe_labels(label_items: List[dict]) -> Tuple[List[dict], List[int]]:
+    """
+    Split a print run into distinct payloads and the page order
+
+    Returns:
+        (distinct payloads, order) where order[i] is the index in the distinct
+        list of the i-th label
+    """
+    distinct = []
+    positions = {}
+    order = []
+    for label_data in label_items:
+        key = payload_key(label_data)
+        if key not in positions:
+            positions[key] = len(distinct)
+            distinct.append(label_data)
+        order.append(positions[key])
+    return distinct, order
+
+
+async def render_label(
+    client: AsyncDataFlowsDocuClient,
+    template_code: str,
+    label_data: dict,
+    filename: str,
+    settings: Dict[str, Any]
+) -> Optional[bytes]:
+    """Render one label PDF via Docu /jobs, polling its status with backoff"""
+    job_response = await client.create_job(
+        template_code=template_code,
+        data={'data': label_data},
+        format='pdf',
+        filename=filename,
+        options={}
+    )
+    if not job_response or 'id' not in job_response:
+        return None
+
+    job_id = job_response['id']
+    deadline = time.monotonic() + settings['max_wait_seconds']
+    delay = settings['poll_initial_seconds']
+    while True:
+        status = await client.get_job_status(job_id)
+        if status:
+            job_status = status.get('status')
+            if job_status in ['done', 'completed']:
+                return await client.download_document(job_id)
+            if job_status == 'failed':
+                return None
+        if time.monotonic() + delay > deadline:
+            return None
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, settings['poll_max_seconds'])
+
+
+async def render_labels(
+    template_code: str,
+    label_items: List[dict],
+    filename_base: str,
+    client: Optional[AsyncDataFlowsDocuClient] = None,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    settings: Optional[Dict[str, Any]] = None,
+    db=None
+) -> Tuple[List[bytes], List[int]]:
+    """
+    Render a print run: each distinct payload once, up to docu_concurrency at a time
+
+    With a db, payloads found in the render cache are not sent to Docu and new
+    renders are stored in it.
+
+    Returns:
+        (pdfs of the distinct payloads, page order) for merge_label_pdfs()
+
+    Raises:
+        LabelRenderError: a label failed; the remaining jobs are cancelled
+    """
+    settings = settings or label_settings()
+    client = client or get_async_docu_client()
+    distinct, order = dedupe_labels(label_items)
+    semaphore = asyncio.Semaphore(settings['docu_concurrency'])
+    rendered = 0
+    cached = db is not None and render_cache_enabled()
+    version = await run_in_db_thread(template_version, db, template_code) if cached else None
+
+    async def render(index: int, label_data: dict) -> bytes:
+        nonlocal rendered
+        key = render_key(template_code, version, {'data': label_data}) if cached else None
+        pdf = await run_in_db_thread(get_rendered, db, key) if cached else None
+        if not pdf:
+            async with semaphore:
+                pdf = await render_label(client, template_code, label_data, f"{filename_base}-{index + 1}", settings)
+            if not pdf:
+                raise LabelRenderError("DataFlows Docu failed to generate the label PDF")
+            if cached:
+                await run_in_db_thread(store_rendered, db, key, template_code, version, pdf)
+        rendered += 1
+        if on_progress:
+            await on_progress(rendered, len(distinct))
+        return pdf
+
+    tasks = [asyncio.ensure_future(render(index, label_data)) for index, label_data in enumerate(distinct)]
+    try:
+        pdfs = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return list(pdfs), order
+
+
+def merge_label_pdfs(pdfs: List[bytes], order: List[int]) -> bytes:
+    """One PDF with the pages of pdfs[i] for each i in order (each PDF parsed once)"""
+    if len(order) == 1:
+        return pdfs[order[0]]
+
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except Exception as e:
+        raise LabelRenderError("PDF merge requires pypdf to be installed", status_code=500) from e
+
+    readers = [PdfReader(io.BytesIO(pdf)) for pdf in pdfs]
+    writer = PdfWriter()
+    for index in order:
+        for page in readers[index].pages:
+            writer.add_page(page)
+
+    merged = io.BytesIO()
+    writer.write(merged)
+    return merged.getvalue()
+
+
+async def _render_with_docu(template_code, label_items, filename_base, client, on_progress, settings, db) -> bytes:
+    pdfs, order = await render_labels(template_code, label_items, filename_base, client=client, on_progress=on_progress,
+                                      settings=settings, db=db)
+    return await asyncio.to_thread(merge_label_pdfs, pdfs, order)
+
+
+async def _render_locally(template_code, label_items, filename_base, client, on_progress, settings, db) -> bytes:
+    distinct, order = dedupe_labels(label_items)
+    try:
+        pdf = await asyncio.to_thread(render_local_pdf, local_template(template_code), distinct, order)
+    except Exception as e:
+        raise LabelRenderError(f"Local label rendering failed for template {template_code}: {e}", status_code=500) from e
+    if on_progress:
+        await on_progress(len(distinct), len(distinct))
+    return pdf
+
+
+LABEL_BACKENDS = {
+    'docu': _render_with_docu,
+    'local': _render_locally,
+}
+
+
+def label_backend(template_code: str) -> str:
+    """'local' for templates declared in labels.local_templates, 'docu' otherwise"""
+    return 'local' if local_template(template_code) else 'docu'
+
+
+async def render_print_run(
+    template_code: str,
+    label_items: List[dict],
+    filename_base: str,
+    client: Optional[AsyncDataFlowsDocuClient] = None,
+    on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    settings: Optional[Dict[str, Any]] = None,
+    db=None
+) -> bytes:
+    """
+    Render a print run into one PDF with the backend of its template
+
+    Raises:
+        LabelRenderError
+    """
+    backend = LABEL_BACKENDS[label_backend(template_code)]
+    return await backend(template_code, label_items, filename_base, client, on_progress, settings, db)
+
+
+def label_jobs_dir() -> str:
+    """Directory of the async job PDFs (created if missing)"""
+    path = label_settings()['jobs_path']
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), '..', '..', path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def label_job_pdf_path(job_id: Any) -> str:
+    return os.path.join(label_jobs_dir(), f"{job_id}.pdf")
+
+
+def prune_label_jobs(db) -> int:
+    """Remove jobs (and their PDFs) older than labels.job_retention_hours"""
+    cutoff = datetime.utcnow() - timedelta(hours=label_settings()['job_retention_hours'])
+    old_ids = [job['_id'] for job in db[LABEL_JOBS_COLLECTION].find({'created_at': {'$lt': cutoff}}, {'_id': 1})]
+    for job_id in old_ids:
+        try:
+            os.remove(label_job_pdf_path(job_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[LABELS] Warning: Failed to remove label job file {job_id}: {e}")
+    if old_ids:
+        db[LABEL_JOBS_COLLECTION].delete_many({'_id': {'$in': old_ids}})
+    return len(old_ids)
+
+
+def create_label_job(db, table: str, label_items: List[dict], created_by: str) -> dict:
+    """Insert a queued job for a print run"""
+    try:
+        prune_label_jobs(db)
+    except Exception as e:
+        print(f"[LABELS] Warning: Failed to prune label jobs: {e}")
+
+    distinct, _ = dedupe_labels(label_items)
+    now = datetime.utcnow()
+    job = {
+        '_id': ObjectId(),
+        'table': table,
+        'status': 'queued',
+        'labels': len(label_items),
+        'distinct': len(distinct),
+        'rendered': 0,
+        'error': None,
+        'created_by': created_by,
+        'created_at': now,
+        'updated_at': now,
+        'finished_at': None,
+    }
+    db[LABEL_JOBS_COLLECTION].insert_one(job)
+    return job
+
+
+async def run_label_job(db, job_id: ObjectId, template_code: str, label_items: List[dict], filename_base: str,
+                        client: Optional[AsyncDataFlowsDocuClient] = None) -> None:
+    """Render a queued job, keeping its status and progress up to date (never raises)"""
+    jobs = db[LABEL_JOBS_COLLECTION]
+
+    async def progress(rendered: int, total: int):
+        await run_in_db_thread(jobs.update_one, {'_id': job_id}, {'$set': {'rendered': rendered, 'updated_at': datetime.utcnow()}})
+
+    try:
+        await run_in_db_thread(jobs.update_one, {'_id': job_id}, {'$set': {'status': 'running', 'updated_at': datetime.utcnow()}})
+        merged = await render_print_run(template_code, label_items, filename_base, client=client, on_progress=progress, db=db)
+        path = label_job_pdf_path(job_id)
+        await asyncio.to_thread(_write_file, path, merged)
+        now = datetime.utcnow()
+        await run_in_db_thread(jobs.update_one, {'_id': job_id}, {'$set': {
+            'status': 'done', 'size': len(merged), 'updated_at': now, 'finished_at': now,
+        }})
+    except Exception as e:
+        print(f"[LABELS] Label job {job_id} failed: {e}")
+        now = datetime.utcnow()
+        try:
+            await run_in_db_thread(jobs.update_one, {'_id': job_id}, {'$set': {
+                'status': 'failed', 'error': str(e), 'updated_at': now, 'finished_at': now,
+            }})
+        except Exception as update_error:
+            print(f"[LABELS] Warning: Failed to mark label job {job_id} as failed: {update_error}")
+
+
+def start_label_job(db, job_id: ObjectId, template_code: str, label_items: List[dict], filename_base: str) -> asyncio.Task:
+    """Run a job in the background of the current event loop"""
+    task = asyncio.get_running_loop().create_task(run_label_job(db, job_id, template_code, label_items, filename_base))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return task
+
+
+def _write_file(path: str, content: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
@@ -0,0 +1,178 @@
+"""
+Local label renderer (PIL + qrcode), without DataFlows Docu
+Etichete simple randate local: QR, IPN, lot, cantitate, într-un PDF multi-pagină
+
+Templates rendered locally are declared in config.yaml under
+`labels.local_templates.<template code>`; every other template code stays on
+Docu. A layout is a fixed label size plus a QR code and text lines, all in mm:
+
+    labels:
+      local_templates:
+        Z4ZW2CN0A0VY:            # depo_stocks
+          backend: local         # 'docu' keeps the layout but renders via Docu
+          width_mm: 50
+          height_mm: 30
+          dpi: 203
+          qr: {field: barcode, x: 1, y: 1, size: 22}
+          lines:
+            - {text: "{part_ipn}", x: 24, y: 1.5, size: 9, bold: true}
+            - {text: "Lot: {batch_code}", x: 24, y: 7, size: 7, max_width: 25}
+
+`text` is formatted with the label payload (missing fields print empty, a
+format spec that does not fit the value prints the raw value) and cut with
+an ellipsis at max_width mm; size is in points. Fonts come from
+`labels.font` / `labels.font_bold` (TrueType), falling back to PIL's default.
+
+render_local_pdf() draws each distinct payload once and writes all pages
+(one per label, duplicates repeated) into one PDF with PIL.
+"""
+import io
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_DPI = 203
+DEFAULT_FONT = 'DejaVuSans.ttf'
+DEFAULT_FONT_BOLD = 'DejaVuSans-Bold.ttf'
+MM_PER_INCH = 25.4
+
+
+class _BlankMissing(dict):
+    def __missing__(self, key):
+        return ''
+
+
+def _format_text(text: str, values: Dict[str, Any]) -> str:
+    """
+    Format a layout line; a field whose spec does not apply to its value
+    (e.g. {quantity:.2f} on an empty field) prints the raw value instead
+    """
+    try:
+        return text.format_map(values)
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        pass
+    try:
+        parts = list(string.Formatter().parse(text))
+    except ValueError:
+        return text
+    out = []
+    for literal, field, spec, conversion in parts:
+        out.append(literal)
+        if field is None:
+            continue
+        try:
+            out.append(('{' + field + ('!' + conversion if conversion else '') + ':' + spec + '}').format_map(values))
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+            out.append(str(values.get(field, '')))
+    return ''.join(out)
+
+
+def local_templates() -> Dict[str, dict]:
+    """`labels.local_templates` from config.yaml ({} if not configured)"""
+    try:
+        templates = get_config_value('labels.local_templates', {}) or {}
+    except FileNotFoundError:
+        templates = {}
+    return templates if isinstance(templates, dict) else {}
+
+
+def local_template(template_code: str) -> Optional[dict]:
+    """Layout of a template rendered locally, or None if it renders via Docu"""
+    layout = local_templates().get(template_code)
+    if not isinstance(layout, dict) or layout.get('backend', 'local') != 'local':
+        return None
+    return layout
+
+
+def _setting(key: str, default: str) -> str:
+    try:
+        return get_config_value(f'labels.{key}', default) or default
+    except FileNotFoundError:
+        return default
+
+
+@lru_cache(maxsize=64)
+def _font(path: str, size_px: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.truetype(path, size_px)
+    except OSError:
+        return ImageFont.load_default(size=size_px)
+
+
+def _px(mm: float, dpi: int) -> int:
+    return int(round(float(mm) * dpi / MM_PER_INCH))
+
+
+def _fit(draw: ImageDraw.ImageDraw, text: str, font, max_px: Optional[int]) -> str:
+    if not max_px or draw.textlength(text, font=font) <= max_px:
+        return text
+    # Longest prefix that fits with the ellipsis (binary search on its length)
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if draw.textlength(text[:middle] + '…', font=font) <= max_px:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + '…'
+
+
+@lru_cache(maxsize=256)
+def _qr_image(content: str, size_px: int) -> Image.Image:
+    """QR code scaled to size_px (cached: numbered copies share the barcode; paste() does not modify it)"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=1, border=0)
+    qr.add_data(content)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").get_image().convert('1')
+    return img.resize((size_px, size_px), Image.NEAREST)
+
+
+def _font_paths() -> tuple:
+    return _setting('font', DEFAULT_FONT), _setting('font_bold', DEFAULT_FONT_BOLD)
+
+
+def render_label_image(layout: dict, label_data: dict, font_paths: Optional[tuple] = None) -> Image.Image:
+    """Draw one label (bilevel image at the layout dpi)"""
+    dpi = int(layout.get('dpi', DEFAULT_DPI))
+    image = Image.new('1', (_px(layout['width_mm'], dpi), _px(layout['height_mm'], dpi)), 1)
+    draw = ImageDraw.Draw(image)
+    values = _BlankMissing({key: '' if value is None else value for key, value in label_data.items()})
+
+    qr = layout.get('qr')
+    if qr and values.get(qr.get('field', 'barcode')):
+        size = _px(qr.get('size', 20), dpi)
+        image.paste(_qr_image(str(values[qr.get('field', 'barcode')]), size), (_px(qr.get('x', 0), dpi), _px(qr.get('y', 0), dpi)))
+
+    regular, bold = font_paths or _font_paths()
+    for line in layout.get('lines') or []:
+        size_px = max(1, int(round(float(line.get('size', 8)) * dpi / 72)))
+        font = _font(bold if line.get('bold') else regular, size_px)
+        text = _format_text(str(line.get('text', '')), values)
+        max_px = _px(line['max_width'], dpi) if line.get('max_width') else None
+        draw.text((_px(line.get('x', 0), dpi), _px(line.get('y', 0), dpi)), _fit(draw, text, font, max_px), font=font, fill=0)
+
+    return image
+
+
+def render_local_pdf(layout: dict, distinct: List[dict], order: List[int]) -> bytes:
+    """
+    PDF with one page per label
+
+    Args:
+        distinct: distinct label payloads (each drawn once)
+        order: index in `distinct` of each page, as from dedupe_labels()
+    """
+    font_paths = _font_paths()
+    images = [render_label_image(layout, label_data, font_paths) for label_data in distinct]
+    pages = [images[index] for index in order]
+    buffer = io.BytesIO()
+    pages[0].save(
+        buffer, format='PDF', save_all=True, append_images=pages[1:],
+        resolution=float(layout.get('dpi', DEFAULT_DPI))
+    )
+    return buffer.getvalue()
@@ -0,0 +1,308 @@
+"""
+Per-part demand / supply summary
+Sumar per articol: stoc, alocat la vânzări, de primit, necesar producție
+
+`depo_parts_summary` holds one document per part (_id = part_id):
+
+- on_hand:                 physical quantity (sum of the availability projection)
+- quarantined:             part of on_hand in a quarantine state
+- allocated_to_sales:      open quantity (quantity - shipped) on open sales orders
+- incoming_from_purchase:  open quantity (quantity - received) on open purchase orders
+- required_by_production:  quantity on open requests (materials asked for production)
+- available:               on_hand - quarantined - allocated_to_sales
+- allocations:             the open order / request lines behind the demand
+                           figures (what the article allocations view lists)
+
+A document, order or request is open unless its state (or legacy `status`)
+name contains one of `part_summary.closed_state_tokens`.
+
+The stock side follows the availability projection: _refresh_groups() in
+stock_availability.py calls refresh_part_stock() for the parts it touched.
+The demand side is refreshed by the routes that change order / request items
+or states (refresh_document_summaries), by refresh_changed_summaries() for
+documents updated in a recent window (states changed by approval flows), and
+rebuilt whole by rebuild_part_summaries()
+(`invoke db-rebuild-part-summaries` or src/scripts/refresh_part_summaries.py).
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from src.backend.utils.config import get_config_value
+from src.backend.utils.reference_cache import list_references
+from modules.inventory.stock_availability import AVAILABILITY_COLLECTION
+
+SUMMARY_COLLECTION = 'depo_parts_summary'
+
+DEFAULT_CLOSED_STATE_TOKENS = ['cancel', 'complet', 'finish', 'refus', 'reject', 'closed', 'shipped']
+_CHUNK = 500
+
+# collection -> (states collection, item part field, order type, counterpart field, open quantity)
+SOURCES = {
+    'depo_sales_ordes': ('depo_sales_ordes_states', 'part_id', 'sales', 'customer', 'shipped'),
+    'depo_sales_orders': ('depo_sales_ordes_states', 'part_id', 'sales', 'customer', 'shipped'),
+    'depo_purchase_orders': ('depo_purchase_orders_states', 'part_id', 'purchase', 'supplier', 'received'),
+    'depo_requests': ('depo_requests_states', 'part', 'production', None, None),
+}
+
+_TOTAL_FIELDS = {
+    'sales': 'allocated_to_sales',
+    'purchase': 'incoming_from_purchase',
+    'production': 'required_by_production',
+}
+
+# Recomputed in the same update as the fields it depends on
+_AVAILABLE_STAGE = {'$set': {'available': {'$subtract': [
+    {'$ifNull': ['$on_hand', 0]},
+    {'$add': [{'$ifNull': ['$quarantined', 0]}, {'$ifNull': ['$allocated_to_sales', 0]}]}
+]}}}
+
+
+def get_closed_state_tokens() -> List[str]:
+    try:
+        tokens = get_config_value('part_summary.closed_state_tokens', DEFAULT_CLOSED_STATE_TOKENS)
+    except FileNotFoundError:
+        return DEFAULT_CLOSED_STATE_TOKENS
+    if not isinstance(tokens, (list, tuple)) or not tokens:
+        return DEFAULT_CLOSED_STATE_TOKENS
+    return [str(token).lower() for token in tokens]
+
+
+def _to_oid(value: Any) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return None
+
+
+def _part_oids(part_ids: Iterable[Any]) -> set:
+    return {oid for oid in (_to_oid(part_id) for part_id in part_ids) if oid}
+
+
+def _id_forms(part_oids: Iterable[ObjectId]) -> list:
+    """Items store part ids as strings (API) or ObjectIds (imports)"""
+    forms = []
+    for oid in part_oids:
+        forms.extend([oid, str(oid)])
+    return forms
+
+
+def _state_label(doc: dict, states: Dict[ObjectId, dict]) -> str:
+    """State name of a document, falling back to its legacy `status` string"""
+    state = states.get(_to_oid(doc.get('state_id')))
+    if state:
+        return state.get('name', '')
+    status = doc.get('status')
+    return status if isinstance(status, str) else ''
+
+
+def _is_open(doc: dict, states: Dict[ObjectId, dict], tokens: List[str]) -> bool:
+    state = states.get(_to_oid(doc.get('state_id')))
+    label = f"{state.get('name', '')} {state.get('slug', '')}" if state else _state_label(doc, states)
+    label = label.lower()
+    return not any(token in label for token in tokens)
+
+
+def _item_part(item: dict, part_field: str) -> Optional[ObjectId]:
+    return _to_oid(item.get(part_field) or item.get('part_id') or item.get('part'))
+
+
+def _demand_lines(db, part_oids: set) -> Dict[ObjectId, List[dict]]:
+    """Open order / request lines of the given parts (one indexed query per source)"""
+    lines: Dict[ObjectId, List[dict]] = {oid: [] for oid in part_oids}
+    forms = _id_forms(part_oids)
+    tokens = get_closed_state_tokens()
+
+    for collection_name, (states_collection, part_field, order_type, counterpart, done_field) in SOURCES.items():
+        states = {state['_id']: state for state in list_references(db, states_collection)}
+        projection = {
+            'items': 1, 'state_id': 1, 'status': 1, 'reference': 1,
+            'created_at': 1, 'customer_name': 1, 'supplier_name': 1,
+        }
+        for doc in db[collection_name].find({f'items.{part_field}': {'$in': forms}}, projection):
+            if not _is_open(doc, states, tokens):
+                continue
+            status = _state_label(doc, states)
+            for item in doc.get('items') or []:
+                part_oid = _item_part(item, part_field)
+                if part_oid not in lines:
+                    continue
+                quantity = item.get('quantity') or 0
+                open_quantity = quantity
+                if done_field:
+                    open_quantity = max(quantity - (item.get(done_field) or 0), 0)
+                line = {
+                    '_id': str(doc['_id']),
+                    'type': order_type,
+                    'order_ref': doc.get('reference', ''),
+                    'quantity': quantity,
+                    'open_quantity': open_quantity,
+                    'status': status,
+                    'date': doc.get('created_at', ''),
+                    'notes': item.get('notes', ''),
+                }
+                if counterpart:
+                    line[counterpart] = doc.get(f'{counterpart}_name', '')
+                lines[part_oid].append(line)
+    return lines
+
+
+def _stock_totals(db, part_oids: set) -> Dict[ObjectId, dict]:
+    totals = {oid: {'on_hand': 0, 'quarantined': 0} for oid in part_oids}
+    pipeline = [
+        {'$match': {'part_id': {'$in': list(part_oids)}}},
+        {'$group': {'_id': '$part_id', 'on_hand': {'$sum': '$quantity'}, 'quarantined': {'$sum': '$quarantined'}}},
+    ]
+    for row in db[AVAILABILITY_COLLECTION].aggregate(pipeline):
+        totals[row['_id']] = {'on_hand': row['on_hand'], 'quarantined': row['quarantined']}
+    return totals
+
+
+def refresh_part_stock(db, part_ids: Iterable[Any]) -> int:
+    """Recompute on_hand / quarantined / available of the given parts"""
+    part_oids = _part_oids(part_ids)
+    if not part_oids:
+        return 0
+    timestamp = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {'_id': part_oid},
+            [{'$set': {**totals, 'part_id': part_oid, 'stock_updated_at': timestamp, 'updated_at': timestamp}}, _AVAILABLE_STAGE],
+            upsert=True
+        )
+        for part_oid, totals in _stock_totals(db, part_oids).items()
+    ]
+    db[SUMMARY_COLLECTION].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def refresh_part_summaries(db, part_ids: Iterable[Any], token: Optional[ObjectId] = None) -> int:
+    """
+    Recompute the whole summary (stock and demand) of the given parts
+
+    Returns:
+        Number of summaries written
+    """
+    part_oids = _part_oids(part_ids)
+    if not part_oids:
+        return 0
+    timestamp = datetime.utcnow()
+    stock = _stock_totals(db, part_oids)
+    ops = []
+    for part_oid, lines in _demand_lines(db, part_oids).items():
+        fields = {**stock[part_oid], 'part_id': part_oid, 'updated_at': timestamp,
+                  'stock_updated_at': timestamp, 'demand_updated_at': timestamp}
+        for order_type, field in _TOTAL_FIELDS.items():
+            fields[field] = sum(line['open_quantity'] for line in lines if line['type'] == order_type)
+        lines.sort(key=lambda line: str(line.get('date', '')), reverse=True)
+        fields['allocations'] = {'$literal': lines}
+        if token is not None:
+            fields['refresh_token'] = token
+        ops.append(UpdateOne({'_id': part_oid}, [{'$set': fields}, _AVAILABLE_STAGE], upsert=True))
+    db[SUMMARY_COLLECTION].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def document_part_ids(*docs: Optional[dict]) -> set:
+    """Part ids on the items of order / request documents"""
+    part_ids = set()
+    for doc in docs:
+        for item in (doc or {}).get('items') or []:
+            part_oid = _to_oid(item.get('part_id') or item.get('part'))
+            if part_oid:
+                part_ids.add(part_oid)
+    return part_ids
+
+
+def refresh_document_summaries(db, collection_name: str, document_id: Any, previous: Optional[dict] = None) -> int:
+    """
+    Refresh the parts of an order / request after its items or state changed
+
+    `previous` is the document as it was before the write, so parts removed
+    from it are refreshed too. Never raises: the summary is derived data and
+    refresh_changed_summaries() / the rebuild catch up on a failure.
+    """
+    try:
+        current = db[collection_name].find_one({'_id': _to_oid(document_id) or document_id}, {'items': 1})
+        return refresh_part_summaries(db, document_part_ids(current, previous))
+    except Exception as e:
+        print(f"[PART_SUMMARY] Warning: failed to refresh parts of {collection_name} {document_id}: {e}")
+        return 0
+
+
+def refresh_changed_summaries(db, since: datetime) -> Dict[str, int]:
+    """
+    Refresh the parts of every order / request updated since `since`
+
+    Catches state changes made by code paths that do not call
+    refresh_document_summaries (approval flows, receptions).
+    """
+    part_ids = set()
+    documents = 0
+    for collection_name in SOURCES:
+        for doc in db[collection_name].find({'updated_at': {'$gte': since}}, {'items.part_id': 1, 'items.part': 1}):
+            documents += 1
+            part_ids |= document_part_ids(doc)
+    part_ids = list(part_ids)
+    parts = 0
+    for start in range(0, len(part_ids), _CHUNK):
+        parts += refresh_part_summaries(db, part_ids[start:start + _CHUNK])
+    return {'documents': documents, 'parts': parts}
+
+
+def rebuild_part_summaries(db, batch_size: int = _CHUNK) -> Dict[str, int]:
+    """
+    Recompute every part summary; summaries of parts that no longer exist are removed
+
+    Returns:
+        {'parts': summaries written, 'removed': stale summaries deleted}
+    """
+    token = ObjectId()
+    report = {'parts': 0, 'removed': 0}
+    chunk: List[ObjectId] = []
+    for part in db.depo_parts.find({}, {'_id': 1}).sort('_id', 1):
+        chunk.append(part['_id'])
+        if len(chunk) >= batch_size:
+            report['parts'] += refresh_part_summaries(db, chunk, token)
+            chunk = []
+    if chunk:
+        report['parts'] += refresh_part_summaries(db, chunk, token)
+    report['removed'] = db[SUMMARY_COLLECTION].delete_many({'refresh_token': {'$ne': token}}).deleted_count
+    return report
+
+
+def get_stock_totals(db, part_ids: Iterable[Any]) -> Dict[ObjectId, float]:
+    """
+    on_hand per part for a page of parts (one indexed read)
+
+    Parts without a summary yet get their stock figures computed and stored.
+    """
+    part_oids = _part_oids(part_ids)
+    if not part_oids:
+        return {}
+    collection = db[SUMMARY_COLLECTION]
+    totals = {
+        doc['_id']: doc.get('on_hand', 0)
+        for doc in collection.find({'_id': {'$in': list(part_oids)}, 'on_hand': {'$exists': True}}, {'on_hand': 1})
+    }
+    missing = part_oids - set(totals)
+    if missing:
+        refresh_part_stock(db, missing)
+        for doc in collection.find({'_id': {'$in': list(missing)}}, {'on_hand': 1}):
+            totals[doc['_id']] = doc.get('on_hand', 0)
+    return totals
+
+
+def get_part_summary(db, part_id: Any) -> dict:
+    """Summary of one part (one read; computed and stored on first use)"""
+    part_oid = _to_oid(part_id)
+    if part_oid is None:
+        raise ValueError(f"Invalid part id: {part_id}")
+    summary = db[SUMMARY_COLLECTION].find_one({'_id': part_oid})
+    if summary is None or 'demand_updated_at' not in summary:
+        refresh_part_summaries(db, [part_oid])
+        summary = db[SUMMARY_COLLECTION].find_one({'_id': part_oid})
+    return summary
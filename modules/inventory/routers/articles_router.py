@@ -15,6 +15,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 from src.backend.utils.db import get_db
 from src.backend.utils.sections_permissions import require_section
 from modules.inventory.services.common import serialize_doc
+from modules.inventory.services.analytics import calculate_article_stock, get_article_allocations_data
 
 router = APIRouter(prefix="/articles", tags=["articles"])
 
@@ -396,53 +397,9 @@ async def get_article_stock_calculations(
 ):
     """Calculate stock metrics for an article"""
     try:
-        part_oid = ObjectId(article_id)
-        
-        # Total Stock
-        total_stock_result = list(db['depo_stocks'].aggregate([
-            {'$match': {'part_id': part_oid}},
-            {'$group': {'_id': None, 'total': {'$sum': '$quantity'}}}
-        ]))
-        total_stock = total_stock_result[0]['total'] if total_stock_result else 0
-        
-        # Quarantined Stock
-        quarantine_state_ids = [
-            ObjectId('694322758728e4d75ae7278f'),
-            ObjectId('694322878728e4d75ae72790')
-        ]
-        quarantine_result = list(db['depo_stocks'].aggregate([
-            {'$match': {'part_id': part_oid, 'state_id': {'$in': quarantine_state_ids}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$quantity'}}}
-        ]))
-        quarantined_stock = quarantine_result[0]['total'] if quarantine_result else 0
-        
-        # Sales Stock
-        sales_stock = 0
-        sales_orders = list(db['depo_sales_orders'].find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-        for order in sales_orders:
-            for item in order.get('items', []):
-                if item.get('part_id') == part_oid:
-                    sales_stock += item.get('quantity', 0)
-        
-        # Future Stock
-        future_stock = 0
-        purchase_orders = list(db['depo_purchase_orders'].find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-        for order in purchase_orders:
-            for item in order.get('items', []):
-                if item.get('part_id') == part_oid:
-                    future_stock += item.get('quantity', 0)
-        
-        available_stock = total_stock - sales_stock - quarantined_stock
-        
-        return {
-            'total_stock': total_stock,
-            'sales_stock': sales_stock,
-            'future_stock': future_stock,
-            'quarantined_stock': quarantined_stock,
-            'available_stock': available_stock
-        }
+        return calculate_article_stock(article_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to calculate stock: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{article_id}/allocations")
@@ -455,45 +412,9 @@ async def get_article_allocations(
 ):
     """Get allocations for an article from sales and purchase orders"""
     try:
-        part_oid = ObjectId(article_id)
-        allocations = []
-        
-        if order_type is None or order_type == 'sales':
-            sales_orders = list(db['depo_sales_orders'].find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-            for order in sales_orders:
-                for item in order.get('items', []):
-                    if item.get('part_id') == part_oid:
-                        allocations.append({
-                            '_id': str(order['_id']),
-                            'type': 'sales',
-                            'order_ref': order.get('reference', ''),
-                            'customer': order.get('customer_name', ''),
-                            'quantity': item.get('quantity', 0),
-                            'status': order.get('status', ''),
-                            'date': order.get('created_at', ''),
-                            'notes': item.get('notes', '')
-                        })
-        
-        if order_type is None or order_type == 'purchase':
-            purchase_orders = list(db['depo_purchase_orders'].find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-            for order in purchase_orders:
-                for item in order.get('items', []):
-                    if item.get('part_id') == part_oid:
-                        allocations.append({
-                            '_id': str(order['_id']),
-                            'type': 'purchase',
-                            'order_ref': order.get('reference', ''),
-                            'supplier': order.get('supplier_name', ''),
-                            'quantity': item.get('quantity', 0),
-                            'status': order.get('status', ''),
-                            'date': order.get('created_at', ''),
-                            'notes': item.get('notes', '')
-                        })
-        
-        allocations.sort(key=lambda x: x.get('date', ''), reverse=True)
-        return serialize_doc(allocations)
+        return serialize_doc(get_article_allocations_data(article_id, order_type))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch allocations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{article_id}/suppliers")
@@ -9,6 +9,9 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.reference_cache import invalidate_reference_data
+from src.backend.utils.relation_loader import RelationLoader
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, refresh_search_fields, search_fields, search_filter, touches_search_fields
 from src.backend.utils.sections_permissions import require_section
 
 import sys
@@ -39,21 +42,18 @@ async def get_locations(
     db = Depends(get_db)
 ):
     """Get list of locations from MongoDB with parent details populated"""
-    query = {}
-    if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
+    query = search_filter('depo_locations', search)
     
     try:
-        cursor = db['depo_locations'].find(query).sort('name', 1)
+        cursor = db['depo_locations'].find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1)
         locations = list(cursor)
         
         # Populate parent details
+        loader = RelationLoader(db)
+        loader.add('depo_locations', [location.get('parent_id') for location in locations])
         for location in locations:
             if location.get('parent_id'):
-                parent = db['depo_locations'].find_one({'_id': location['parent_id']})
+                parent = loader.get('depo_locations', location['parent_id'])
                 if parent:
                     location['parent_detail'] = {'name': parent.get('name', '')}
         
@@ -86,8 +86,11 @@ async def create_location(
             raise HTTPException(status_code=404, detail="Parent location not found")
         doc['parent_id'] = ObjectId(location_data.parent_id)
     
+    doc.update(search_fields('depo_locations', doc))
+    
     try:
         result = db['depo_locations'].insert_one(doc)
+        invalidate_reference_data('depo_locations')
         doc['_id'] = result.inserted_id
         
         # Populate parent detail if exists
@@ -161,12 +164,15 @@ async def update_location(
             {'_id': ObjectId(location_id)},
             {'$set': update_doc}
         )
+        invalidate_reference_data('depo_locations')
+        if touches_search_fields('depo_locations', update_doc):
+            refresh_search_fields(db, 'depo_locations', ObjectId(location_id))
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
         
         # Return updated document with parent detail
-        updated_location = db['depo_locations'].find_one({'_id': ObjectId(location_id)})
+        updated_location = db['depo_locations'].find_one({'_id': ObjectId(location_id)}, WITHOUT_SEARCH_FIELDS)
         if updated_location and updated_location.get('parent_id'):
             parent = db['depo_locations'].find_one({'_id': updated_location['parent_id']})
             if parent:
@@ -206,6 +212,7 @@ async def delete_location(
         
         # Delete location
         result = db['depo_locations'].delete_one({'_id': ObjectId(location_id)})
+        invalidate_reference_data('depo_locations')
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
@@ -7,7 +7,10 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.relation_loader import RelationLoader
 from src.backend.routes.auth import verify_token
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, search_fields, search_filter, touches_search_fields
+from modules.inventory.part_summary import SUMMARY_COLLECTION, get_stock_totals
 from .utils import (
     serialize_doc,
     ArticleCreateRequest,
@@ -20,7 +23,7 @@ router = APIRouter()
 
 
 @router.get("/parts")
-async def get_parts(
+def get_parts(
     request: Request,
     search: Optional[str] = Query(None),
     supplier_id: Optional[str] = Query(None),
@@ -36,11 +39,7 @@ async def get_parts(
     
     query = {'is_active': True}
     if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'ipn': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
+        query.update(search_filter('depo_parts', search))
     
     if supplier_id:
         try:
@@ -60,7 +59,7 @@ async def get_parts(
     
     try:
         total = collection.count_documents(query)
-        cursor = collection.find(query).sort(sort).skip(skip).limit(limit)
+        cursor = collection.find(query, WITHOUT_SEARCH_FIELDS).sort(sort).skip(skip).limit(limit)
         parts = list(cursor)
         
         return {
@@ -74,7 +73,7 @@ async def get_parts(
 
 
 @router.get("/articles")
-async def get_articles(
+def get_articles(
     request: Request,
     search: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
@@ -84,18 +83,21 @@ async def get_articles(
     sort_order: Optional[str] = Query("asc"),
     current_user: dict = Depends(verify_token)
 ):
-    """Get list of articles with optimized aggregation"""
+    """
+    Get list of articles
+
+    The page is selected first (match, sort, skip, limit on depo_parts);
+    UMs, manufacturer and category are then loaded for the page only, and
+    total_stock comes from the per-part summaries (part_summary.py), so the
+    cost follows the page size, not the number of parts or stock rows.
+    """
     db = get_db()
     collection = db['depo_parts']
     
     # Build match stage
     match_stage = {}
     if search:
-        match_stage['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'ipn': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
+        match_stage.update(search_filter('depo_parts', search))
     
     if category:
         match_stage['category_id'] = ObjectId(category)
@@ -104,109 +106,53 @@ async def get_articles(
     
     try:
         # Count total documents
-        total = collection.count_documents(match_stage) if match_stage else collection.count_documents({})
-        
-        # Build aggregation pipeline
-        pipeline = []
+        total = collection.count_documents(match_stage)
         
-        if match_stage:
-            pipeline.append({'$match': match_stage})
+        if sort_by == 'total_stock':
+            # Sorting on stock needs the total of every matching part: join
+            # the summaries (one _id lookup per part) before paging
+            articles = list(collection.aggregate([
+                {'$match': match_stage},
+                {'$lookup': {
+                    'from': SUMMARY_COLLECTION,
+                    'localField': '_id',
+                    'foreignField': '_id',
+                    'as': 'summary'
+                }},
+                {'$addFields': {'total_stock': {'$ifNull': [{'$arrayElemAt': ['$summary.on_hand', 0]}, 0]}}},
+                {'$project': {'summary': 0, **WITHOUT_SEARCH_FIELDS}},
+                {'$sort': {'total_stock': sort_direction, '_id': sort_direction}},
+                {'$skip': skip},
+                {'$limit': limit}
+            ]))
+        else:
+            articles = list(
+                collection.find(match_stage, WITHOUT_SEARCH_FIELDS)
+                .sort([(sort_by, sort_direction), ('_id', sort_direction)])
+                .skip(skip)
+                .limit(limit)
+            )
+            stock_totals = get_stock_totals(db, [article['_id'] for article in articles])
+            for article in articles:
+                article['total_stock'] = stock_totals.get(article['_id'], 0)
         
-        # Lookup System UM
-        pipeline.append({
-            '$lookup': {
-                'from': 'depo_ums',
-                'localField': 'system_um_id',
-                'foreignField': '_id',
-                'as': 'system_um_detail'
-            }
-        })
-        pipeline.append({
-            '$unwind': {
-                'path': '$system_um_detail',
-                'preserveNullAndEmptyArrays': True
-            }
-        })
-        
-        # Lookup Manufacturer UM
-        pipeline.append({
-            '$lookup': {
-                'from': 'depo_ums',
-                'localField': 'manufacturer_um_id',
-                'foreignField': '_id',
-                'as': 'manufacturer_um_detail'
-            }
-        })
-        pipeline.append({
-            '$unwind': {
-                'path': '$manufacturer_um_detail',
-                'preserveNullAndEmptyArrays': True
-            }
-        })
-        
-        # Lookup Manufacturer
-        pipeline.append({
-            '$lookup': {
-                'from': 'depo_companies',
-                'localField': 'manufacturer_id',
-                'foreignField': '_id',
-                'as': 'manufacturer_detail'
-            }
-        })
-        pipeline.append({
-            '$unwind': {
-                'path': '$manufacturer_detail',
-                'preserveNullAndEmptyArrays': True
-            }
-        })
-        
-        # Lookup Category
-        pipeline.append({
-            '$lookup': {
-                'from': 'depo_categories',
-                'localField': 'category_id',
-                'foreignField': '_id',
-                'as': 'category_detail'
-            }
-        })
-        pipeline.append({
-            '$unwind': {
-                'path': '$category_detail',
-                'preserveNullAndEmptyArrays': True
-            }
-        })
-        
-        # Lookup Total Stock
-        pipeline.append({
-            '$lookup': {
-                'from': 'depo_stocks',
-                'localField': '_id',
-                'foreignField': 'part_id',
-                'as': 'stocks'
-            }
-        })
-        pipeline.append({
-            '$addFields': {
-                'total_stock': {'$sum': '$stocks.quantity'}
-            }
-        })
-        
-        # Remove stocks array (keep only total_stock)
-        pipeline.append({
-            '$project': {
-                'stocks': 0
-            }
-        })
-        
-        # Sort
-        pipeline.append({'$sort': {sort_by: sort_direction}})
-        
-        # Pagination
-        pipeline.append({'$skip': skip})
-        pipeline.append({'$limit': limit})
-        
-        # Execute aggregation
-        articles = list(collection.aggregate(pipeline))
+        # Related documents for the page only
+        loader = RelationLoader(db)
+        loader.add('depo_ums', [a.get('system_um_id') for a in articles] + [a.get('manufacturer_um_id') for a in articles])
+        loader.add('depo_companies', [a.get('manufacturer_id') for a in articles])
+        loader.add('depo_categories', [a.get('category_id') for a in articles])
+        loader.load()
+        details = {
+            'system_um_detail': ('depo_ums', 'system_um_id'),
+            'manufacturer_um_detail': ('depo_ums', 'manufacturer_um_id'),
+            'manufacturer_detail': ('depo_companies', 'manufacturer_id'),
+            'category_detail': ('depo_categories', 'category_id'),
+        }
+        for article in articles:
+            for detail_field, (collection_name, key_field) in details.items():
+                related = loader.get(collection_name, article.get(key_field))
+                if related:
+                    article[detail_field] = related
         
         return {
             'results': serialize_doc(articles),
@@ -219,7 +165,7 @@ async def get_articles(
 
 
 @router.get("/articles/{article_id}")
-async def get_article(
+def get_article(
     request: Request,
     article_id: str,
     current_user: dict = Depends(verify_token)
@@ -239,7 +185,7 @@ async def get_article(
 
 
 @router.post("/articles")
-async def create_article(
+def create_article(
     request: Request,
     article_data: ArticleCreateRequest,
     current_user: dict = Depends(verify_token)
@@ -282,6 +228,8 @@ async def create_article(
         except Exception:
             doc['production_step_id'] = article_data.production_step_id
     
+    doc.update(search_fields('depo_parts', doc))
+    
     try:
         result = collection.insert_one(doc)
         doc['_id'] = result.inserted_id
@@ -291,7 +239,7 @@ async def create_article(
 
 
 @router.put("/articles/{article_id}")
-async def update_article(
+def update_article(
     request: Request,
     article_id: str,
     article_data: ArticleUpdateRequest,
@@ -332,6 +280,10 @@ async def update_article(
             raise HTTPException(status_code=404, detail="Article not found")
         
         updated_article = collection.find_one({'_id': ObjectId(article_id)})
+        if touches_search_fields('depo_parts', update_doc):
+            fields = search_fields('depo_parts', updated_article)
+            collection.update_one({'_id': updated_article['_id']}, {'$set': fields})
+            updated_article.update(fields)
         return serialize_doc(updated_article)
     except HTTPException:
         raise
@@ -340,7 +292,7 @@ async def update_article(
 
 
 @router.delete("/articles/{article_id}")
-async def delete_article(
+def delete_article(
     request: Request,
     article_id: str,
     current_user: dict = Depends(verify_token)
@@ -365,7 +317,7 @@ async def delete_article(
 # Article-related endpoints (recipes, stock calculations, allocations, suppliers)
 
 @router.get("/articles/{article_id}/recipes")
-async def get_article_recipes(
+def get_article_recipes(
     request: Request,
     article_id: str,
     current_user: dict = Depends(verify_token)
@@ -400,7 +352,7 @@ async def get_article_recipes(
 from modules.inventory.services.analytics import calculate_article_stock, get_article_allocations_data
 
 @router.get("/articles/{article_id}/stock-calculations")
-async def get_article_stock_calculations(
+def get_article_stock_calculations(
     request: Request,
     article_id: str,
     current_user: dict = Depends(verify_token)
@@ -413,7 +365,7 @@ async def get_article_stock_calculations(
 
 
 @router.get("/articles/{article_id}/allocations")
-async def get_article_allocations(
+def get_article_allocations(
     request: Request,
     article_id: str,
     order_type: Optional[str] = Query(None),
@@ -428,7 +380,7 @@ async def get_article_allocations(
 
 
 @router.get("/articles/{article_id}/suppliers")
-async def get_article_suppliers(
+def get_article_suppliers(
     request: Request,
     article_id: str,
     current_user: dict = Depends(verify_token)
@@ -436,14 +388,16 @@ async def get_article_suppliers(
     """Get all suppliers for an article"""
     db = get_db()
     collection = db['depo_parts_suppliers']
-    companies_collection = db['depo_companies']
     
     try:
         suppliers = list(collection.find({'part_id': ObjectId(article_id)}))
+
+        loader = RelationLoader(db)
+        loader.add('depo_companies', [supplier.get('supplier_id') for supplier in suppliers])
         
         for supplier in suppliers:
             if supplier.get('supplier_id'):
-                company = companies_collection.find_one({'_id': supplier['supplier_id']})
+                company = loader.get('depo_companies', supplier['supplier_id'])
                 if company:
                     supplier['supplier_detail'] = {'name': company.get('name', '')}
         
@@ -453,7 +407,7 @@ async def get_article_suppliers(
 
 
 @router.post("/articles/{article_id}/suppliers")
-async def add_article_supplier(
+def add_article_supplier(
     request: Request,
     article_id: str,
     supplier_data: ArticleSupplierRequest,
@@ -498,7 +452,7 @@ async def add_article_supplier(
 
 
 @router.put("/articles/{article_id}/suppliers/{supplier_relation_id}")
-async def update_article_supplier(
+def update_article_supplier(
     request: Request,
     article_id: str,
     supplier_relation_id: str,
@@ -547,7 +501,7 @@ async def update_article_supplier(
 
 
 @router.delete("/articles/{article_id}/suppliers/{supplier_relation_id}")
-async def remove_article_supplier(
+def remove_article_supplier(
     request: Request,
     article_id: str,
     supplier_relation_id: str,
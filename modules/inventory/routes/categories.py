@@ -14,7 +14,7 @@ router = APIRouter()
 
 
 @router.get("/categories")
-async def get_categories(
+def get_categories(
     request: Request,
     search: Optional[str] = Query(None),
     current_user: dict = Depends(verify_token)
@@ -46,7 +46,7 @@ async def get_categories(
 
 
 @router.post("/categories")
-async def create_category(
+def create_category(
     request: Request,
     category_data: CategoryCreateRequest,
     current_user: dict = Depends(verify_token)
@@ -85,7 +85,7 @@ async def create_category(
 
 
 @router.put("/categories/{category_id}")
-async def update_category(
+def update_category(
     request: Request,
     category_id: str,
     category_data: CategoryUpdateRequest,
@@ -155,7 +155,7 @@ async def update_category(
 
 
 @router.delete("/categories/{category_id}")
-async def delete_category(
+def delete_category(
     request: Request,
     category_id: str,
     current_user: dict = Depends(verify_token)
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from typing import Optional
 
 from src.backend.routes.auth import verify_token
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, search_filter
 from .utils import (
     SupplierCreateRequest,
     SupplierUpdateRequest,
@@ -259,14 +260,12 @@ async def get_companies(
     db = get_db()
     collection = db['depo_companies']
     
-    query = {}
-    if search:
-        query['name'] = {'$regex': search, '$options': 'i'}
+    query = search_filter('depo_companies', search)
     if is_supplier is not None:
         query['is_supplier'] = is_supplier
     
     try:
-        cursor = collection.find(query).sort('name', 1)
+        cursor = collection.find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1)
         companies = list(cursor)
         return serialize_doc(companies)
     except Exception as e:
@@ -2,19 +2,30 @@
 Labels Generator Routes
 """
 from fastapi import APIRouter, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
-from typing import List, Optional
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List
 from pydantic import BaseModel
 import io
+import os
 import base64
 import qrcode
 from datetime import datetime
-import time
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.reference_cache import get_reference
 from src.backend.routes.auth import verify_token
-from src.backend.utils.dataflows_docu import DataFlowsDocuClient
+from src.backend.utils.async_db import run_in_db_thread
+from modules.inventory.label_rendering import (
+    LABEL_JOBS_COLLECTION,
+    LabelRenderError,
+    create_label_job,
+    label_backend,
+    label_job_pdf_path,
+    label_settings,
+    render_print_run,
+    start_label_job,
+)
 from .utils import serialize_doc
 
 router = APIRouter()
@@ -26,6 +37,7 @@ class LabelItem(BaseModel):
 class GenerateLabelsDocuRequest(BaseModel):
     table: str          # 'depo_parts' | 'depo_stocks' | 'depo_locations'
     items: List[LabelItem]
+    async_job: bool = False  # render in the background, then poll /generate-labels-docu/jobs/{job_id}
 
 
 # DataFlows Docu template codes per table
@@ -71,79 +83,24 @@ def _resolve_production_step_label(db, production_step_id) -> str:
     """Resolve production step label from depo_production_steps."""
     if not production_step_id:
         return ''
-    try:
-        step_oid = ObjectId(production_step_id) if isinstance(production_step_id, str) else production_step_id
-    except Exception:
-        return str(production_step_id)
-    step = db.depo_production_steps.find_one({'_id': step_oid})
+    step = get_reference(db, 'depo_production_steps', production_step_id)
     if not step:
         return str(production_step_id)
     return step.get('name') or step.get('label') or step.get('code') or str(step.get('_id'))
 
 
-def _render_label_pdf(
-    client: DataFlowsDocuClient,
-    template_code: str,
-    label_data: dict,
-    filename: str,
-    max_wait_seconds: int = 60,
-    poll_interval_seconds: int = 2
-) -> Optional[bytes]:
-    """Render a single label PDF via DataFlows Docu using /jobs + polling."""
-    docu_payload = {
-        'data': label_data
-    }
-
-    job_response = client.create_job(
-        template_code=template_code,
-        data=docu_payload,
-        format='pdf',
-        filename=filename,
-        options={}
-    )
-    if not job_response or 'id' not in job_response:
-        return None
+def _build_label_items(db, body: GenerateLabelsDocuRequest, current_user: dict, qr_images: bool = True) -> List[dict]:
+    """
+    Label payloads of a print run, one per copy (database reads; runs in the db worker pool)
 
-    job_id = job_response['id']
-    max_attempts = max(1, int(max_wait_seconds / poll_interval_seconds))
-    for _ in range(max_attempts):
-        status = client.get_job_status(job_id)
-        if status:
-            job_status = status.get('status')
-            if job_status in ['done', 'completed']:
-                return client.download_document(job_id)
-            if job_status == 'failed':
-                return None
-        time.sleep(poll_interval_seconds)
+    qr_images: add barcode_str (QR as a base64 PNG) for Docu templates; the
+    local renderer draws the QR from barcode itself.
+    """
+    qr = _generate_qr_base64 if qr_images else (lambda content: '')
+    table_name = body.table
+    number_copies = label_settings()['number_copies']
+    label_items = []
 
-    return None
-
-
-@router.post("/generate-labels-docu")
-async def generate_labels_docu(
-    request: Request,
-    body: GenerateLabelsDocuRequest,
-    current_user: dict = Depends(verify_token),
-    db = Depends(get_db)
-):
-    """
-    Generate labels via DataFlows Docu template engine.
-    
-    Builds data payload with barcode (text) and barcode_str (base64 PNG QR),
-    then sends to DataFlows Docu for PDF rendering using the specified template.
-    
-    QR code formats:
-        - depo_stocks:  P{IPN}L{BATCH_CODE}     (e.g. P300135603LSDSA)
-        - depo_parts:   P{IPN}                   (e.g. P300135603)
-        - depo_locations: LOC{CODE}              (e.g. LOCCASATE)
-    """
-    table_name = body.table
-    template_code = DOCU_TEMPLATE_CODES.get(table_name)
-    if not template_code:
-        raise HTTPException(status_code=400, detail=f"Unsupported table: {table_name}")
-    
-    label_items = []
-    
     for item in body.items:
         try:
             item_oid = ObjectId(item.id)
@@ -163,7 +120,7 @@ async def generate_labels_docu(
             
             label_data = {
                 'barcode': barcode,
-                'barcode_str': _generate_qr_base64(barcode),
+                'barcode_str': qr(barcode),
                 'part_name': data.get('name', ''),
                 'part_ipn': ipn,
                 'part_description': data.get('description', ''),
@@ -189,14 +146,14 @@ async def generate_labels_docu(
             # Get location info
             location_name = ''
             if data.get('location_id'):
-                location = db.depo_locations.find_one({'_id': data['location_id']})
+                location = get_reference(db, 'depo_locations', data['location_id'])
                 if location:
                     location_name = location.get('name', '')
             
             # Get state info
             state_name = ''
             if data.get('state_id'):
-                state = db.depo_stocks_states.find_one({'_id': data['state_id']})
+                state = get_reference(db, 'depo_stocks_states', data['state_id'])
                 if state:
                     state_name = state.get('label', state.get('name', ''))
 
@@ -209,7 +166,7 @@ async def generate_labels_docu(
             
             label_data = {
                 'barcode': barcode,
-                'barcode_str': _generate_qr_base64(barcode),
+                'barcode_str': qr(barcode),
                 'part_name': part_name,
                 'part_ipn': part_ipn,
                 'batch_code': batch_code,
@@ -235,7 +192,7 @@ async def generate_labels_docu(
             
             label_data = {
                 'barcode': barcode,
-                'barcode_str': _generate_qr_base64(barcode),
+                'barcode_str': qr(barcode),
                 'location_name': data.get('name', ''),
                 'location_code': loc_code,
                 'location_description': data.get('description', ''),
@@ -246,66 +203,69 @@ async def generate_labels_docu(
             # Repeat for quantity, add quant (total per item) and crt_no (1..quant)
             total = item.quantity
             for i in range(total):
-                label_items.append({
-                    **label_data,
-                    'quant': total,
-                    'crt_no': i + 1
-                })
+                copy = {**label_data, 'quant': total}
+                if number_copies:
+                    copy['crt_no'] = i + 1
+                label_items.append(copy)
+
+    return label_items
+
+
+@router.post("/generate-labels-docu")
+async def generate_labels_docu(
+    request: Request,
+    body: GenerateLabelsDocuRequest,
+    current_user: dict = Depends(verify_token),
+    db = Depends(get_db)
+):
+    """
+    Generate labels via DataFlows Docu template engine.
     
+    Builds data payload with barcode (text) and barcode_str (base64 PNG QR),
+    then sends to DataFlows Docu for PDF rendering using the specified template.
+    
+    QR code formats:
+        - depo_stocks:  P{IPN}L{BATCH_CODE}     (e.g. P300135603LSDSA)
+        - depo_parts:   P{IPN}                   (e.g. P300135603)
+        - depo_locations: LOC{CODE}              (e.g. LOCCASATE)
+
+    Templates declared in labels.local_templates render in-process
+    (local_labels.py); the others via Docu. Identical labels are rendered
+    once, distinct Docu labels in parallel (label_rendering.py). With async_job the print run is
+    rendered in the background: the response is the job, polled at
+    GET /generate-labels-docu/jobs/{job_id}, PDF at .../jobs/{job_id}/pdf.
+    """
+    table_name = body.table
+    template_code = DOCU_TEMPLATE_CODES.get(table_name)
+    if not template_code:
+        raise HTTPException(status_code=400, detail=f"Unsupported table: {table_name}")
+
+    backend = label_backend(template_code)
+    label_items = await run_in_db_thread(_build_label_items, db, body, current_user, backend == 'docu')
     if not label_items:
         raise HTTPException(status_code=400, detail="No valid items found to generate labels")
-    
+
     now = datetime.utcnow()
     filename_base = f"labels-{table_name}-{len(label_items)}pcs-{now.strftime('%Y%m%d-%H%M%S')}"
-    
-    # Send to DataFlows Docu for rendering
+
+    # Large print runs: render in the background, the client polls the job
+    if body.async_job:
+        job = await run_in_db_thread(
+            create_label_job, db, table_name, label_items, current_user.get('username', 'system')
+        )
+        start_label_job(db, job['_id'], template_code, label_items, filename_base)
+        return _serialize_label_job(job)
+
+    # Render with the template's backend (local renderer or Docu; distinct labels once)
     try:
-        client = DataFlowsDocuClient()
-        pdf_blobs = []
-        for index, label_data in enumerate(label_items, start=1):
-            label_filename = f"{filename_base}-{index}"
-            pdf_bytes = _render_label_pdf(
-                client=client,
-                template_code=template_code,
-                label_data=label_data,
-                filename=label_filename
-            )
-            if not pdf_bytes:
-                raise HTTPException(
-                    status_code=502,
-                    detail="DataFlows Docu failed to generate the label PDF"
-                )
-            pdf_blobs.append(pdf_bytes)
-
-        if len(pdf_blobs) == 1:
-            return StreamingResponse(
-                io.BytesIO(pdf_blobs[0]),
-                media_type="application/pdf",
-                headers={"Content-Disposition": "inline; filename=labels.pdf"}
-            )
-
-        try:
-            from pypdf import PdfReader, PdfWriter
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail="PDF merge requires pypdf to be installed"
-            ) from e
-        writer = PdfWriter()
-        for pdf_blob in pdf_blobs:
-            reader = PdfReader(io.BytesIO(pdf_blob))
-            for page in reader.pages:
-                writer.add_page(page)
-
-        merged = io.BytesIO()
-        writer.write(merged)
-        merged.seek(0)
-
+        merged = await render_print_run(template_code, label_items, filename_base, db=db)
         return StreamingResponse(
-            merged,
+            io.BytesIO(merged),
             media_type="application/pdf",
             headers={"Content-Disposition": "inline; filename=labels.pdf"}
         )
+    except LabelRenderError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -315,6 +275,67 @@ async def generate_labels_docu(
             detail=f"Failed to generate labels via DataFlows Docu: {str(e)}"
         )
 
+
+def _serialize_label_job(job: dict) -> dict:
+    job_id = str(job['_id'])
+    return {
+        'job_id': job_id,
+        'status': job.get('status'),
+        'table': job.get('table'),
+        'labels': job.get('labels', 0),
+        'distinct': job.get('distinct', 0),
+        'rendered': job.get('rendered', 0),
+        'error': job.get('error'),
+        'created_at': job.get('created_at'),
+        'finished_at': job.get('finished_at'),
+        'download_url': f"/modules/inventory/api/generate-labels-docu/jobs/{job_id}/pdf" if job.get('status') == 'done' else None,
+    }
+
+
+async def _get_own_label_job(db, job_id: str, current_user: dict) -> dict:
+    """Label job started by the current user (404 for other users' jobs)"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await run_in_db_thread(
+        db[LABEL_JOBS_COLLECTION].find_one,
+        {'_id': ObjectId(job_id), 'created_by': current_user.get('username', 'system')}
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Label job not found")
+    return job
+
+
+@router.get("/generate-labels-docu/jobs/{job_id}")
+async def get_label_job(
+    job_id: str,
+    current_user: dict = Depends(verify_token),
+    db = Depends(get_db)
+):
+    """Status and progress of a background label job"""
+    job = await _get_own_label_job(db, job_id, current_user)
+    return _serialize_label_job(job)
+
+
+@router.get("/generate-labels-docu/jobs/{job_id}/pdf")
+async def download_label_job(
+    job_id: str,
+    current_user: dict = Depends(verify_token),
+    db = Depends(get_db)
+):
+    """Merged PDF of a finished background label job"""
+    job = await _get_own_label_job(db, job_id, current_user)
+    if job.get('status') != 'done':
+        raise HTTPException(status_code=409, detail=f"Label job is {job.get('status')}")
+    path = label_job_pdf_path(job['_id'])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Label job PDF expired")
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"Content-Disposition": "inline; filename=labels.pdf"}
+    )
+
+
 @router.get("/read-label")
 async def read_label(
     request: Request,
@@ -413,7 +434,7 @@ async def read_label(
             if key == 'part_id':
                 related_doc = db.depo_parts.find_one({'_id': value})
             elif key == 'location_id':
-                related_doc = db.depo_locations.find_one({'_id': value})
+                related_doc = get_reference(db, 'depo_locations', value)
             elif key == 'supplier_id':
                 # Try companies
                 related_doc = db.depo_suppliers.find_one({'_id': value}) # or companies? assuming depo_suppliers for now or check config
@@ -422,11 +443,11 @@ async def read_label(
             elif key == 'state_id':
                 # Determine state collection based on main table
                 if table_name == 'depo_stocks':
-                    related_doc = db.depo_stocks_states.find_one({'_id': value})
+                    related_doc = get_reference(db, 'depo_stocks_states', value)
                 elif table_name == 'depo_purchase_orders':
-                    related_doc = db.depo_purchase_orders_states.find_one({'_id': value})
+                    related_doc = get_reference(db, 'depo_purchase_orders_states', value)
             elif key == 'system_um_id' or key == 'manufacturer_um_id':
-                related_doc = db.depo_ums.find_one({'_id': value})
+                related_doc = get_reference(db, 'depo_ums', value)
                 
             if related_doc:
                 serialized_item[field_name] = serialize_doc(related_doc)
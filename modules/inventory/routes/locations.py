@@ -7,6 +7,9 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.reference_cache import invalidate_reference_data
+from src.backend.utils.relation_loader import RelationLoader
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, refresh_search_fields, search_fields, search_filter, touches_search_fields
 from src.backend.routes.auth import verify_token
 from .utils import serialize_doc, LocationCreateRequest, LocationUpdateRequest
 
@@ -14,7 +17,7 @@ router = APIRouter()
 
 
 @router.get("/locations")
-async def get_locations(
+def get_locations(
     request: Request,
     search: Optional[str] = Query(None),
     type_filter: Optional[str] = Query(None, alias="type"),
@@ -24,25 +27,22 @@ async def get_locations(
     db = get_db()
     collection = db['depo_locations']
     
-    query = {}
-    if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
+    query = search_filter('depo_locations', search)
     
     # Filter by type if specified (e.g., "Depozit" for procurement)
     if type_filter:
         query['type'] = type_filter
     
     try:
-        cursor = collection.find(query).sort('name', 1)
+        cursor = collection.find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1)
         locations = list(cursor)
         
         # Populate parent details
+        loader = RelationLoader(db)
+        loader.add('depo_locations', [location.get('parent_id') for location in locations])
         for location in locations:
             if location.get('parent_id'):
-                parent = collection.find_one({'_id': location['parent_id']})
+                parent = loader.get('depo_locations', location['parent_id'])
                 if parent:
                     location['parent_detail'] = {'name': parent.get('name', '')}
         
@@ -52,7 +52,7 @@ async def get_locations(
 
 
 @router.get("/locations/{location_id}")
-async def get_location(
+def get_location(
     request: Request,
     location_id: str,
     current_user: dict = Depends(verify_token)
@@ -79,7 +79,7 @@ async def get_location(
 
 
 @router.post("/locations")
-async def create_location(
+def create_location(
     request: Request,
     location_data: LocationCreateRequest,
     current_user: dict = Depends(verify_token)
@@ -110,8 +110,11 @@ async def create_location(
             raise HTTPException(status_code=404, detail="Parent location not found")
         doc['parent_id'] = ObjectId(location_data.parent_id)
     
+    doc.update(search_fields('depo_locations', doc))
+    
     try:
         result = collection.insert_one(doc)
+        invalidate_reference_data('depo_locations')
         doc['_id'] = result.inserted_id
         
         if doc.get('parent_id'):
@@ -125,7 +128,7 @@ async def create_location(
 
 
 @router.put("/locations/{location_id}")
-async def update_location(
+def update_location(
     request: Request,
     location_id: str,
     location_data: LocationUpdateRequest,
@@ -189,6 +192,9 @@ async def update_location(
     
     try:
         result = collection.update_one({'_id': ObjectId(location_id)}, {'$set': update_doc})
+        invalidate_reference_data('depo_locations')
+        if touches_search_fields('depo_locations', update_doc):
+            refresh_search_fields(db, 'depo_locations', ObjectId(location_id))
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
@@ -207,7 +213,7 @@ async def update_location(
 
 
 @router.delete("/locations/{location_id}")
-async def delete_location(
+def delete_location(
     request: Request,
     location_id: str,
     current_user: dict = Depends(verify_token)
@@ -233,6 +239,7 @@ async def delete_location(
             )
         
         result = locations_collection.delete_one({'_id': ObjectId(location_id)})
+        invalidate_reference_data('depo_locations')
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Location not found")
@@ -1,11 +1,12 @@
 """
 Stock Movements routes
 """
-from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Header
 from typing import Optional
 from datetime import datetime
 from bson import ObjectId
 from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
 
 from src.backend.utils.db import get_db
 from src.backend.routes.auth import verify_token
@@ -25,7 +26,7 @@ class StockMovementCreate(BaseModel):
 
 
 @router.get("/stock-movements")
-async def get_stock_movements(
+def get_stock_movements(
     request: Request,
     stock_id: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -134,15 +135,21 @@ async def get_stock_movements(
 
 
 @router.post("/stock-movements")
-async def create_stock_movement(
+def create_stock_movement(
     request: Request,
     movement_data: StockMovementCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: dict = Depends(verify_token),
     db = Depends(get_db)
 ):
-    """Create a new stock movement"""
+    """Create a new stock movement
+
+    Send an `Idempotency-Key` header to make retries safe: a repeated
+    prelevation with the same key returns the movements of the first call.
+    """
     stocks_collection = db['depo_stocks']
-    from modules.inventory.stock_movements import create_transfer, create_movement, MovementType, get_stock_balance
+    from modules.inventory.stock_movements import create_transfer, create_movement, MovementType, get_stock_balance, is_transfer_posted
+    from modules.inventory.stock_availability import refresh_stock_availability
     from modules.inventory.services.common import validate_object_id
 
     QC_LOCATION_ID = ObjectId('6941cbcb8728e4d75ae7273e')
@@ -177,10 +184,10 @@ async def create_stock_movement(
 
         to_location_oid = validate_object_id(str(movement_data.to_location_id), "to_location_id") if movement_data.to_location_id else QC_LOCATION_ID
 
-        # Check balance if we can
+        # Check balance if we can (a replay of a posted transfer skips it)
         try:
             balance = get_stock_balance(db, stock['_id'], from_location_oid)
-            if balance.get('quantity', 0) < movement_data.quantity:
+            if balance.get('quantity', 0) < movement_data.quantity and not is_transfer_posted(db, idempotency_key):
                 raise HTTPException(
                     status_code=400,
                     detail=f"Insufficient stock quantity. Available: {balance.get('quantity', 0)}, Requested: {movement_data.quantity}"
@@ -203,7 +210,8 @@ async def create_stock_movement(
                 document_type="PRELEVATION",
                 document_id=stock['_id'],
                 created_by=username,
-                notes=movement_data.notes or 'Quality Control Prelevation'
+                notes=movement_data.notes or 'Quality Control Prelevation',
+                idempotency_key=idempotency_key
             )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -235,10 +243,19 @@ async def create_stock_movement(
         'source_id': ObjectId(movement_data.from_location_id) if movement_data.from_location_id else None,
         'destination_id': ObjectId(movement_data.to_location_id) if movement_data.to_location_id else None,
     }
+    if idempotency_key:
+        doc['idempotency_key'] = idempotency_key
 
     try:
-        result = db['depo_stocks_movements'].insert_one(doc)
+        try:
+            result = db['depo_stocks_movements'].insert_one(doc)
+        except DuplicateKeyError:
+            existing = db['depo_stocks_movements'].find_one({'idempotency_key': idempotency_key}) if idempotency_key else None
+            if not existing:
+                raise
+            return serialize_doc(existing)
         doc['_id'] = result.inserted_id
+        refresh_stock_availability(db, stock['_id'])
         return serialize_doc(doc)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create movement: {str(e)}")
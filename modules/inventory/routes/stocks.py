@@ -27,10 +27,12 @@ async def get_stocks(
     has_expiry: Optional[bool] = Query(None),  # Filter by expiry date existence
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query("exact"),
     current_user: dict = Depends(require_section("inventory/stocks")),
     db = Depends(get_db)
 ):
-    """Get list of stocks with enriched data"""
+    """Get list of stocks with enriched data (pass `cursor` for keyset pagination)"""
     from modules.inventory.services import get_stocks_list
     return await get_stocks_list(
         search=search,
@@ -43,10 +45,38 @@ async def get_stocks(
         end_date=end_date,
         qc_verified=qc_verified,
         has_batch=has_batch,
-        has_expiry=has_expiry
+        has_expiry=has_expiry,
+        cursor=cursor,
+        total_mode=total_mode
     )
 
 
+@router.get("/stocks/balances/as-of")
+async def get_stock_balances_as_of(
+    date: datetime = Query(..., description="Point in time (ISO 8601, UTC)"),
+    part_id: Optional[str] = Query(None),
+    stock_id: Optional[str] = Query(None),
+    location_id: Optional[str] = Query(None),
+    current_user: dict = Depends(require_section("inventory/stocks"))
+):
+    """Ledger balances per stock/location at a date (month-end valuation), from the latest snapshot before it"""
+    from src.backend.utils.async_db import run_in_db_thread
+    from modules.inventory.balance_snapshots import get_balances_as_of
+
+    try:
+        part_oid = ObjectId(part_id) if part_id else None
+        stock_oids = [ObjectId(stock_id)] if stock_id else None
+        location_oid = ObjectId(location_id) if location_id else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    result = await run_in_db_thread(
+        get_balances_as_of, get_db(), date,
+        part_id=part_oid, stock_ids=stock_oids, location_id=location_oid
+    )
+    return serialize_doc(result)
+
+
 @router.get("/stocks/{stock_id}")
 async def get_stock(
     request: Request,
@@ -27,10 +27,23 @@ from fastapi import HTTPException
 from datetime import datetime
 from bson import ObjectId
 from src.backend.utils.db import get_db
+from src.backend.utils.pagination import (
+    apply_keyset,
+    clamp_page_size,
+    count_pipeline_total,
+    count_total,
+    cursor_response,
+    split_page,
+)
+
 
+async def get_stocks_list(search=None, skip=0, limit=100, part_id=None, location_id=None, state_id=None, start_date=None, end_date=None, qc_verified=None, has_batch=None, has_expiry=None,
+                          cursor=None, total_mode="exact"):
+    """
+    Get list of stocks with enriched data using aggregation pipeline
 
-async def get_stocks_list(search=None, skip=0, limit=100, part_id=None, location_id=None, state_id=None, start_date=None, end_date=None, qc_verified=None, has_batch=None, has_expiry=None):
-    """Get list of stocks with enriched data using aggregation pipeline"""
+    cursor: '' or a previous next_cursor for keyset pagination on (created_at, _id)
+    """
     db = get_db()
     
     # Build match stage
@@ -190,12 +203,34 @@ async def get_stocks_list(search=None, skip=0, limit=100, part_id=None, location
         }
     })
     
-    # Count total
-    count_pipeline = pipeline.copy()
-    count_pipeline.append({'$count': 'total'})
-    count_result = list(db['depo_stocks'].aggregate(count_pipeline))
-    total = count_result[0]['total'] if count_result else 0
-    
+    # Count total (without search the lookups don't change the count)
+    if search:
+        counts = count_pipeline_total(db['depo_stocks'], pipeline, total_mode)
+    else:
+        counts = count_total(db['depo_stocks'], match_stage, total_mode)
+    total = counts['total']
+    limit = clamp_page_size(limit)
+
+    from modules.inventory.routes.utils import serialize_doc
+
+    if cursor is not None:
+        # Seek on base fields right after the filters
+        first_stage = 1 if match_stage else 0
+        seek = apply_keyset({}, cursor)
+        page_stages = [{'$sort': {'created_at': -1, '_id': -1}}, {'$limit': limit + 1}]
+        if search:
+            # Search matches joined fields: page after the lookups
+            pipeline.extend(page_stages)
+        else:
+            # Only one page goes through the lookups
+            pipeline[first_stage:first_stage] = page_stages
+        if seek:
+            pipeline.insert(first_stage, {'$match': seek})
+
+        stocks, next_cursor = split_page(list(db['depo_stocks'].aggregate(pipeline)), limit)
+        page = {**counts, 'limit': limit, 'next_cursor': next_cursor, 'has_more': next_cursor is not None}
+        return cursor_response(serialize_doc(stocks), page)
+
     # Sort and paginate
     pipeline.append({'$sort': {'created_at': -1}})
     pipeline.append({'$skip': skip})
@@ -204,7 +239,6 @@ async def get_stocks_list(search=None, skip=0, limit=100, part_id=None, location
     # Execute
     stocks = list(db['depo_stocks'].aggregate(pipeline))
     
-    from modules.inventory.routes.utils import serialize_doc
     return {
         'results': serialize_doc(stocks),
         'total': total,
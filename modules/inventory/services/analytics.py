@@ -4,63 +4,24 @@ Analytics services for Articles
 from typing import List, Dict, Any, Optional
 from bson import ObjectId
 from src.backend.utils.db import get_db
+from modules.inventory.part_summary import get_part_summary
 
 def calculate_article_stock(article_id: str) -> Dict[str, float]:
     """
-    Calculate stock metrics for an article
+    Calculate stock metrics for an article (read from the per-part summary)
     """
     db = get_db()
-    stocks_collection = db['depo_stocks']
-    sales_orders_collection = db['depo_sales_orders']
-    purchase_orders_collection = db['depo_purchase_orders']
     
     try:
-        part_oid = ObjectId(article_id)
-        
-        # Total Stock
-        total_stock_pipeline = [
-            {'$match': {'part_id': part_oid}},
-            {'$group': {'_id': None, 'total': {'$sum': '$quantity'}}}
-        ]
-        total_stock_result = list(stocks_collection.aggregate(total_stock_pipeline))
-        total_stock = total_stock_result[0]['total'] if total_stock_result else 0
-        
-        # Quarantined Stock
-        quarantine_state_ids = [
-            ObjectId('694322758728e4d75ae7278f'),
-            ObjectId('694322878728e4d75ae72790')
-        ]
-        quarantine_pipeline = [
-            {'$match': {'part_id': part_oid, 'state_id': {'$in': quarantine_state_ids}}},
-            {'$group': {'_id': None, 'total': {'$sum': '$quantity'}}}
-        ]
-        quarantine_result = list(stocks_collection.aggregate(quarantine_pipeline))
-        quarantined_stock = quarantine_result[0]['total'] if quarantine_result else 0
-        
-        # Sales Stock
-        sales_stock = 0
-        sales_orders = list(sales_orders_collection.find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-        for order in sales_orders:
-            for item in order.get('items', []):
-                if item.get('part_id') == part_oid:
-                    sales_stock += item.get('quantity', 0)
-        
-        # Future Stock
-        future_stock = 0
-        purchase_orders = list(purchase_orders_collection.find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-        for order in purchase_orders:
-            for item in order.get('items', []):
-                if item.get('part_id') == part_oid:
-                    future_stock += item.get('quantity', 0)
-        
-        available_stock = total_stock - sales_stock - quarantined_stock
+        summary = get_part_summary(db, ObjectId(article_id))
         
         return {
-            'total_stock': total_stock,
-            'sales_stock': sales_stock,
-            'future_stock': future_stock,
-            'quarantined_stock': quarantined_stock,
-            'available_stock': available_stock
+            'total_stock': summary.get('on_hand', 0),
+            'sales_stock': summary.get('allocated_to_sales', 0),
+            'future_stock': summary.get('incoming_from_purchase', 0),
+            'quarantined_stock': summary.get('quarantined', 0),
+            'production_stock': summary.get('required_by_production', 0),
+            'available_stock': summary.get('available', 0)
         }
     except Exception as e:
         raise Exception(f"Failed to calculate stock: {str(e)}")
@@ -68,48 +29,17 @@ def calculate_article_stock(article_id: str) -> Dict[str, float]:
 def get_article_allocations_data(article_id: str, order_type: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Get allocations for an article from sales and purchase orders
+    (order_type=production lists the open requests)
     """
     db = get_db()
-    sales_orders_collection = db['depo_sales_orders']
-    purchase_orders_collection = db['depo_purchase_orders']
     
     try:
-        part_oid = ObjectId(article_id)
-        allocations = []
-        
-        if order_type is None or order_type == 'sales':
-            sales_orders = list(sales_orders_collection.find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-            for order in sales_orders:
-                for item in order.get('items', []):
-                    if item.get('part_id') == part_oid:
-                        allocations.append({
-                            '_id': str(order['_id']),
-                            'type': 'sales',
-                            'order_ref': order.get('reference', ''),
-                            'customer': order.get('customer_name', ''),
-                            'quantity': item.get('quantity', 0),
-                            'status': order.get('status', ''),
-                            'date': order.get('created_at', ''),
-                            'notes': item.get('notes', '')
-                        })
-        
-        if order_type is None or order_type == 'purchase':
-            purchase_orders = list(purchase_orders_collection.find({'status': {'$nin': ['Cancelled', 'Completed']}}))
-            for order in purchase_orders:
-                for item in order.get('items', []):
-                    if item.get('part_id') == part_oid:
-                        allocations.append({
-                            '_id': str(order['_id']),
-                            'type': 'purchase',
-                            'order_ref': order.get('reference', ''),
-                            'supplier': order.get('supplier_name', ''),
-                            'quantity': item.get('quantity', 0),
-                            'status': order.get('status', ''),
-                            'date': order.get('created_at', ''),
-                            'notes': item.get('notes', '')
-                        })
+        summary = get_part_summary(db, ObjectId(article_id))
         
-        allocations.sort(key=lambda x: x.get('date', ''), reverse=True)
-        return allocations
+        if order_type is None:
+            types = ('sales', 'purchase')
+        else:
+            types = (order_type,)
+        return [line for line in summary.get('allocations', []) if line.get('type') in types]
     except Exception as e:
         raise Exception(f"Failed to fetch allocations: {str(e)}")
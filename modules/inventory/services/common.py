@@ -3,7 +3,7 @@ Common utility functions for inventory services
 """
 from typing import Any, Dict, List
 from bson import ObjectId
-from datetime import datetime
+from src.backend.utils.serializers import serialize_doc as _serialize_doc
 
 
 def serialize_doc(doc: Any) -> Any:
@@ -11,32 +11,7 @@ def serialize_doc(doc: Any) -> Any:
     Convert MongoDB document to JSON-serializable format
     Automatically adds 'value' field for Select components (value = _id)
     """
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id' or key.endswith('_id'):
-                result[key] = str(value) if value else None
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = [serialize_doc(item) if isinstance(item, (dict, list)) else item for item in value]
-            else:
-                result[key] = value
-        
-        # Add 'value' field for Select components (value = _id)
-        if '_id' in result and result['_id']:
-            result['value'] = result['_id']
-        
-        return result
-    return doc
+    return _serialize_doc(doc)
 
 
 def validate_object_id(id_str: str, field_name: str = "id") -> ObjectId:
@@ -6,6 +6,7 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, refresh_search_fields, search_fields, search_filter, touches_search_fields
 
 
 def generate_company_pk():
@@ -104,19 +105,11 @@ async def get_suppliers_list(search=None, skip=0, limit=100):
     db = get_db()
     companies_collection = db['depo_companies']
     
-    query = {'is_supplier': True}
-    if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'code': {'$regex': search, '$options': 'i'}},
-            {'vatno': {'$regex': search, '$options': 'i'}},
-            {'regno': {'$regex': search, '$options': 'i'}}
-        ]
-        query['is_supplier'] = True
+    query = {'is_supplier': True, **search_filter('depo_companies', search)}
     
     try:
         total = companies_collection.count_documents(query)
-        cursor = companies_collection.find(query).sort('name', 1).skip(skip).limit(limit)
+        cursor = companies_collection.find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1).skip(skip).limit(limit)
         suppliers = list(cursor)
         
         return {
@@ -240,6 +233,8 @@ async def create_supplier(supplier_data, current_user):
         'updated_by': current_user.get('username')
     }
     
+    doc.update(search_fields('depo_companies', doc))
+    
     try:
         result = companies_collection.insert_one(doc)
         doc['_id'] = result.inserted_id
@@ -283,8 +278,10 @@ async def update_supplier(supplier_id: str, supplier_data, current_user):
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Supplier not found")
+        if touches_search_fields('depo_companies', update_doc):
+            refresh_search_fields(db, 'depo_companies', ObjectId(supplier_id))
         
-        updated_supplier = companies_collection.find_one({'_id': ObjectId(supplier_id)})
+        updated_supplier = companies_collection.find_one({'_id': ObjectId(supplier_id)}, WITHOUT_SEARCH_FIELDS)
         return serialize_company_doc(updated_supplier)
     except HTTPException:
         raise
@@ -444,19 +441,11 @@ async def get_manufacturers_list(search=None, skip=0, limit=100):
     db = get_db()
     companies_collection = db['depo_companies']
     
-    query = {'is_manufacturer': True}
-    if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'code': {'$regex': search, '$options': 'i'}},
-            {'vatno': {'$regex': search, '$options': 'i'}},
-            {'regno': {'$regex': search, '$options': 'i'}}
-        ]
-        query['is_manufacturer'] = True
+    query = {'is_manufacturer': True, **search_filter('depo_companies', search)}
     
     try:
         total = companies_collection.count_documents(query)
-        cursor = companies_collection.find(query).sort('name', 1).skip(skip).limit(limit)
+        cursor = companies_collection.find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1).skip(skip).limit(limit)
         manufacturers = list(cursor)
         
         return {
@@ -474,19 +463,11 @@ async def get_clients_list(search=None, skip=0, limit=100):
     db = get_db()
     companies_collection = db['depo_companies']
     
-    query = {'is_client': True}
-    if search:
-        query['$or'] = [
-            {'name': {'$regex': search, '$options': 'i'}},
-            {'code': {'$regex': search, '$options': 'i'}},
-            {'vatno': {'$regex': search, '$options': 'i'}},
-            {'regno': {'$regex': search, '$options': 'i'}}
-        ]
-        query['is_client'] = True
+    query = {'is_client': True, **search_filter('depo_companies', search)}
     
     try:
         total = companies_collection.count_documents(query)
-        cursor = companies_collection.find(query).sort('name', 1).skip(skip).limit(limit)
+        cursor = companies_collection.find(query, WITHOUT_SEARCH_FIELDS).sort('name', 1).skip(skip).limit(limit)
         clients = list(cursor)
         
         return {
@@ -7,10 +7,12 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_approval_completion, check_user_can_sign
 from src.backend.utils.sections_permissions import get_section_permissions, is_action_allowed
 from ..routes.utils import serialize_doc
+from ..stock_availability import refresh_stock_availability
 
 
 async def get_stock_approval_flow(stock_id: str):
@@ -100,6 +102,7 @@ async def create_stock_approval_flow(stock_id: str):
     }
     
     result = db.approval_flows.insert_one(flow_data)
+    sync_approval_inbox(db, result.inserted_id)
     flow_data["_id"] = str(result.inserted_id)
     
     return serialize_doc(flow_data)
@@ -183,6 +186,7 @@ async def sign_stock_qc(stock_id: str, qc_data: dict, current_user: dict, reques
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Update stock with QC data
     update_doc = {
@@ -221,6 +225,7 @@ async def sign_stock_qc(stock_id: str, qc_data: dict, current_user: dict, reques
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
     
     flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
     return serialize_doc(flow)
@@ -262,6 +267,7 @@ async def remove_stock_signature(stock_id: str, user_id: str, current_user: dict
             "$set": {"updated_at": datetime.utcnow()}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -274,6 +280,7 @@ async def remove_stock_signature(stock_id: str, user_id: str, current_user: dict
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Reset stock QC data
         db.depo_stocks.update_one(
@@ -342,6 +349,7 @@ async def update_stock_transactionable(stock_id: str, transactionable: bool, cur
         {'_id': ObjectId(stock_id)},
         {'$set': update_doc}
     )
+    refresh_stock_availability(db, ObjectId(stock_id))
     
     updated_stock = db.depo_stocks.find_one({'_id': ObjectId(stock_id)})
     return serialize_doc(updated_stock)
@@ -419,6 +427,7 @@ async def sign_stock_qa(stock_id: str, qa_data: dict, current_user: dict, reques
         {'_id': stock_oid},
         {'$set': update_doc}
     )
+    refresh_stock_availability(db, stock_oid)
     
     # Log to journal (using stock notes or separate journal collection? Stock currently has `notes`. 
     # Let's append to a journal if exists, or just rely on the movement and fields)
@@ -517,5 +526,6 @@ async def remove_stock_qa_signature(stock_id: str, current_user: dict):
             '$set': update_set
         }
     )
+    refresh_stock_availability(db, stock_oid)
     
     return {"message": "QA Signature removed successfully"}
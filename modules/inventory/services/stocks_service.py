@@ -12,17 +12,22 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
+from src.backend.utils.async_db import db_offload
+from src.backend.utils.reference_cache import get_reference
 from modules.inventory.services.common import serialize_doc, validate_object_id, build_search_query, paginate_results
 from modules.inventory.stock_movements import (
     MovementType,
     create_movement,
     create_transfer,
     get_stock_balance,
-    get_stock_movements
+    get_stock_movements,
+    post_movements
 )
+from modules.inventory.stock_availability import refresh_stock_availability
 
 
-async def get_stocks_list(
+@db_offload
+def get_stocks_list(
     db,
     search: Optional[str] = None,
     location_id: Optional[str] = None,
@@ -74,7 +79,8 @@ async def get_stocks_list(
     return result
 
 
-async def get_stock_by_id(db, stock_id: str) -> Dict[str, Any]:
+@db_offload
+def get_stock_by_id(db, stock_id: str) -> Dict[str, Any]:
     """
     Get stock by ID cu balances și movements
     """
@@ -95,14 +101,15 @@ async def get_stock_by_id(db, stock_id: str) -> Dict[str, Any]:
 
     # Enrich supplier UM name
     if 'supplier_um_id' in stock and stock['supplier_um_id']:
-        um = db.depo_ums.find_one({'_id': stock['supplier_um_id']})
+        um = get_reference(db, 'depo_ums', stock['supplier_um_id'])
         if um:
             stock_data['supplier_um_name'] = um.get('name')
     
     return stock_data
 
 
-async def create_stock(
+@db_offload
+def create_stock(
     db,
     part_id: str,
     batch_code: str,
@@ -174,10 +181,11 @@ async def create_stock(
     )
     
     # 3. Return created stock with balance
-    return await get_stock_by_id(db, str(stock_id))
+    return get_stock_by_id.sync(db, str(stock_id))
 
 
-async def update_stock(
+@db_offload
+def update_stock(
     db,
     stock_id: str,
     expiry_date: Optional[str] = None,
@@ -213,11 +221,13 @@ async def update_stock(
         {'_id': stock_oid},
         {'$set': update_data}
     )
+    refresh_stock_availability(db, stock_oid)
     
-    return await get_stock_by_id(db, stock_id)
+    return get_stock_by_id.sync(db, stock_id)
 
 
-async def transfer_stock(
+@db_offload
+def transfer_stock(
     db,
     stock_id: str,
     from_location_id: str,
@@ -266,10 +276,11 @@ async def transfer_stock(
         notes=notes
     )
     
-    return await get_stock_by_id(db, stock_id)
+    return get_stock_by_id.sync(db, stock_id)
 
 
-async def adjust_stock(
+@db_offload
+def adjust_stock(
     db,
     stock_id: str,
     location_id: str,
@@ -308,10 +319,11 @@ async def adjust_stock(
         notes=notes or f"Inventory adjustment: {quantity:+.2f}"
     )
     
-    return await get_stock_by_id(db, stock_id)
+    return get_stock_by_id.sync(db, stock_id)
 
 
-async def consume_stock(
+@db_offload
+def consume_stock(
     db,
     stock_id: str,
     location_id: str,
@@ -357,4 +369,33 @@ async def consume_stock(
         notes=notes
     )
     
-    return await get_stock_by_id(db, stock_id)
+    return get_stock_by_id.sync(db, stock_id)
+
+
+@db_offload
+def post_document_movements(
+    db,
+    lines: List[Dict[str, Any]],
+    created_by: str,
+    document_type: str,
+    document_id: str,
+    idempotency_key: Optional[str] = None,
+    check_balance: bool = True
+) -> Dict[str, Any]:
+    """
+    Postare toate mișcările unui document (all-or-nothing)
+
+    Lines follow stock_movements.post_movements; the whole document is written
+    with a constant number of round trips, whatever the number of lines.
+    """
+    doc_oid = validate_object_id(document_id, "document_id")
+
+    try:
+        movement_ids = post_movements(
+            db, lines, document_type, doc_oid, created_by,
+            idempotency_key=idempotency_key, check_balance=check_balance
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {'movement_ids': [str(movement_id) for movement_id in movement_ids], 'count': len(movement_ids)}
@@ -0,0 +1,324 @@
+"""
+Stock availability projection
+Disponibil per (part, batch_code, location, state), menținut din ledger
+
+`depo_stocks_availability` holds one row per (part_id, batch_code,
+location_id, state_id) with the quantity that is physically there, split in:
+
+- available:   quantity - reserved - quarantined
+- reserved:    held for open documents (0 today: sales allocations already
+               post CONSUMPTION movements, so there is nothing to hold back)
+- quarantined: quantity in a quarantine state (state name contains "quarantin")
+
+Quantities follow the same reconciliation the request endpoints used to run
+on every call: ledger balances per location, plus the legacy
+`depo_stocks.quantity` (or initial_quantity) at the stock's own location for
+stocks that have no RECEIPT movement yet. Only rows with a positive quantity
+are kept.
+
+The projection is refreshed per (part_id, batch_code) group:
+- ledger writes (create_movement, create_transfer, post_movements,
+  update_balance) refresh the groups of the stocks they touched, once per call
+- code that writes depo_stocks directly (state changes, legacy quantity
+  updates, deletes) calls refresh_stock_availability / refresh_batch_availability
+- rebuild_stock_availability() recomputes everything
+  (`invoke db-rebuild-stock-availability` or src/scripts/rebuild_stock_availability.py);
+  ensure_stock_availability() runs it at startup while the projection is empty
+
+Every group refresh also updates the stock figures of the per-part summaries
+(modules/inventory/part_summary.py).
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import DeleteMany, UpdateOne
+
+from src.backend.utils.reference_cache import list_references
+
+AVAILABILITY_COLLECTION = 'depo_stocks_availability'
+
+_STOCK_FIELDS = {
+    'part_id': 1,
+    'batch_code': 1,
+    'state_id': 1,
+    'quantity': 1,
+    'initial_quantity': 1,
+    'location_id': 1,
+    'initial_location_id': 1,
+    'supplier_batch_code': 1,
+    'expiry_date': 1,
+    'batch_date': 1,
+}
+
+_RECEIPT_FILTER = {'$regex': '^receipt$', '$options': 'i'}
+
+
+def _batch_key(batch_code: Any) -> str:
+    return batch_code or ''
+
+
+def _batch_filter(batch_code: Any) -> Any:
+    """depo_stocks filter for a batch group (missing, None and '' are one group)"""
+    if not batch_code:
+        return {'$in': [None, '']}
+    return batch_code
+
+
+def get_quarantine_state_ids(db) -> set:
+    """Stock states counted as quarantined"""
+    return {
+        state['_id'] for state in list_references(db, 'depo_stocks_states')
+        if 'quarantin' in str(state.get('name', '')).lower()
+    }
+
+
+def legacy_quantity(stock: dict) -> tuple:
+    """(base location, quantity) a stock holds outside the ledger until its first RECEIPT"""
+    base_qty = stock.get('quantity')
+    if base_qty is None:
+        base_qty = stock.get('initial_quantity', 0)
+    return stock.get('location_id') or stock.get('initial_location_id'), base_qty or 0
+
+
+def _reconcile_stock(stock: dict, balances: Dict[Any, float], has_receipt: bool) -> Dict[Any, float]:
+    """
+    Quantity per location for one stock
+
+    Ledger balances, plus the legacy stock quantity at its base location when
+    the stock was never received through the ledger.
+    """
+    base_location, base_qty = legacy_quantity(stock)
+
+    quantities = dict(balances)
+    if not has_receipt and base_location and base_qty > 0:
+        quantities[base_location] = quantities.get(base_location, 0) + base_qty
+    return {loc_id: qty for loc_id, qty in quantities.items() if qty > 0}
+
+
+def _load_ledger(db, stock_ids: List[ObjectId]):
+    """Balances per stock/location and the set of stocks with a RECEIPT movement"""
+    balances: Dict[ObjectId, Dict[Any, float]] = {}
+    if not stock_ids:
+        return balances, set()
+
+    for bal in db.depo_stocks_balances.find(
+        {'stock_id': {'$in': stock_ids}},
+        {'stock_id': 1, 'location_id': 1, 'quantity': 1}
+    ):
+        stock_id = bal.get('stock_id')
+        loc_id = bal.get('location_id')
+        if not stock_id or not loc_id:
+            continue
+        per_stock = balances.setdefault(stock_id, {})
+        per_stock[loc_id] = per_stock.get(loc_id, 0) + (bal.get('quantity') or 0)
+
+    return balances, received_stock_ids(db, stock_ids)
+
+
+def received_stock_ids(db, stock_ids: List[ObjectId]) -> set:
+    """Stocks with a RECEIPT movement (their legacy quantity no longer counts)"""
+    if not stock_ids:
+        return set()
+    return {
+        mov.get('stock_id') for mov in db.depo_stocks_movements.find(
+            {'stock_id': {'$in': stock_ids}, 'movement_type': _RECEIPT_FILTER},
+            {'stock_id': 1}
+        )
+    }
+
+
+def compute_availability_rows(
+    stocks: Iterable[dict],
+    balances: Dict[ObjectId, Dict[Any, float]],
+    receipt_stock_ids: set,
+    quarantine_state_ids: set,
+) -> List[dict]:
+    """Aggregate stocks into projection rows keyed by (part, batch, location, state)"""
+    rows: Dict[tuple, dict] = {}
+    for stock in stocks:
+        stock_id = stock.get('_id')
+        per_location = _reconcile_stock(stock, balances.get(stock_id, {}), stock_id in receipt_stock_ids)
+        for loc_id, qty in per_location.items():
+            key = (stock.get('part_id'), _batch_key(stock.get('batch_code')), loc_id, stock.get('state_id'))
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = {
+                    'part_id': key[0],
+                    'batch_code': key[1],
+                    'location_id': loc_id,
+                    'state_id': key[3],
+                    'quantity': 0,
+                    'reserved': 0,
+                    'quarantined': 0,
+                    'supplier_batch_code': stock.get('supplier_batch_code', ''),
+                    'expiry_date': stock.get('expiry_date', ''),
+                    'batch_date': stock.get('batch_date', ''),
+                    'stock_ids': [],
+                }
+            row['quantity'] += qty
+            row['stock_ids'].append(stock_id)
+
+    for row in rows.values():
+        if row['state_id'] in quarantine_state_ids:
+            row['quarantined'] = row['quantity']
+        row['available'] = row['quantity'] - row['reserved'] - row['quarantined']
+    return list(rows.values())
+
+
+def _upsert_ops(rows: List[dict], token: ObjectId, timestamp: datetime) -> list:
+    ops = []
+    for row in rows:
+        key = {
+            'part_id': row['part_id'],
+            'batch_code': row['batch_code'],
+            'location_id': row['location_id'],
+            'state_id': row['state_id'],
+        }
+        ops.append(UpdateOne(
+            key,
+            {'$set': {**row, 'refresh_token': token, 'updated_at': timestamp}},
+            upsert=True
+        ))
+    return ops
+
+
+def _refresh_groups(db, groups: Iterable[tuple]) -> int:
+    """Recompute the rows of several (part_id, batch_code) groups in a fixed number of queries"""
+    groups = {(part_id, _batch_key(batch_code)) for part_id, batch_code in groups if part_id}
+    if not groups:
+        return 0
+
+    stocks = list(db.depo_stocks.find(
+        {'$or': [{'part_id': part_id, 'batch_code': _batch_filter(batch_code)} for part_id, batch_code in groups]},
+        _STOCK_FIELDS
+    ))
+    balances, receipt_stock_ids = _load_ledger(db, [s['_id'] for s in stocks])
+    rows = compute_availability_rows(stocks, balances, receipt_stock_ids, get_quarantine_state_ids(db))
+
+    # Upsert first, then drop rows of the groups this refresh did not write,
+    # so readers never see a group empty
+    token = ObjectId()
+    ops = _upsert_ops(rows, token, datetime.utcnow())
+    ops.extend(
+        DeleteMany({'part_id': part_id, 'batch_code': batch_code, 'refresh_token': {'$ne': token}})
+        for part_id, batch_code in groups
+    )
+    db[AVAILABILITY_COLLECTION].bulk_write(ops, ordered=True)
+    _refresh_part_stock(db, {part_id for part_id, _ in groups})
+    return len(rows)
+
+
+def _refresh_part_stock(db, part_ids: set):
+    """Keep the per-part summaries (part_summary.py) in step with the projection"""
+    from modules.inventory.part_summary import refresh_part_stock
+
+    try:
+        refresh_part_stock(db, part_ids)
+    except Exception as e:
+        print(f"[STOCK_AVAILABILITY] Warning: failed to refresh part summaries: {e}")
+
+
+def refresh_batch_availability(db, part_id: ObjectId, batch_code: Optional[str]) -> int:
+    """
+    Recompute the projection rows of one (part_id, batch_code) group
+
+    Returns:
+        Number of rows written
+    """
+    return _refresh_groups(db, [(part_id, batch_code)])
+
+
+def refresh_stock_availability(db, stock_ids: Any) -> int:
+    """
+    Refresh the groups of one or more stocks (ObjectId, string or list)
+
+    Call after writing depo_stocks directly. For deleted stocks use
+    refresh_batch_availability with the part_id / batch_code they had.
+    """
+    if not isinstance(stock_ids, (list, tuple, set)):
+        stock_ids = [stock_ids]
+    oids = []
+    for stock_id in stock_ids:
+        if isinstance(stock_id, str) and ObjectId.is_valid(stock_id):
+            stock_id = ObjectId(stock_id)
+        if isinstance(stock_id, ObjectId):
+            oids.append(stock_id)
+    if not oids:
+        return 0
+
+    groups = [
+        (stock.get('part_id'), stock.get('batch_code'))
+        for stock in db.depo_stocks.find({'_id': {'$in': oids}}, {'part_id': 1, 'batch_code': 1})
+    ]
+    return _refresh_groups(db, groups)
+
+
+def rebuild_stock_availability(db, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Recompute the whole projection from depo_stocks and the ledger
+
+    Stocks are streamed in chunks of `batch_size`; rows not written by this
+    run are removed at the end. The stock figures of the per-part summaries
+    are refreshed chunk by chunk, and for the parts whose rows were removed.
+
+    Returns:
+        {'stocks': stocks read, 'rows': rows written, 'removed': stale rows deleted}
+    """
+    token = ObjectId()
+    timestamp = datetime.utcnow()
+    quarantine_state_ids = get_quarantine_state_ids(db)
+    collection = db[AVAILABILITY_COLLECTION]
+    report = {'stocks': 0, 'rows': 0, 'removed': 0}
+
+    def flush(chunk: List[dict]):
+        balances, receipt_stock_ids = _load_ledger(db, [s['_id'] for s in chunk])
+        rows = compute_availability_rows(chunk, balances, receipt_stock_ids, quarantine_state_ids)
+        if rows:
+            collection.bulk_write(_upsert_ops(rows, token, timestamp), ordered=False)
+        _refresh_part_stock(db, {s['part_id'] for s in chunk if s.get('part_id')})
+        report['stocks'] += len(chunk)
+        report['rows'] += len(rows)
+
+    # Sorted by group so a (part, batch) group is never split across chunks
+    chunk: List[dict] = []
+    last_group = None
+    for stock in db.depo_stocks.find({}, _STOCK_FIELDS).sort([('part_id', 1), ('batch_code', 1)]):
+        group = (stock.get('part_id'), _batch_key(stock.get('batch_code')))
+        if len(chunk) >= batch_size and group != last_group:
+            flush(chunk)
+            chunk = []
+        chunk.append(stock)
+        last_group = group
+    if chunk:
+        flush(chunk)
+
+    stale_part_ids = set(collection.distinct('part_id', {'refresh_token': {'$ne': token}}))
+    report['removed'] = collection.delete_many({'refresh_token': {'$ne': token}}).deleted_count
+    if stale_part_ids:
+        _refresh_part_stock(db, stale_part_ids)
+    return report
+
+
+def ensure_stock_availability(db) -> Optional[Dict[str, int]]:
+    """Build the projection once on a database that has stocks but no projection yet"""
+    if db[AVAILABILITY_COLLECTION].find_one({}, {'_id': 1}):
+        return None
+    if not db.depo_stocks.find_one({}, {'_id': 1}):
+        return None
+    return rebuild_stock_availability(db)
+
+
+def get_part_availability(
+    db,
+    part_id: ObjectId,
+    state_ids: Optional[List[ObjectId]] = None,
+    location_id: Optional[ObjectId] = None,
+) -> List[dict]:
+    """Projection rows of a part (one indexed read), optionally by states / location"""
+    query: Dict[str, Any] = {'part_id': part_id}
+    if state_ids is not None:
+        query['state_id'] = {'$in': list(state_ids)}
+    if location_id:
+        query['location_id'] = location_id
+    return list(db[AVAILABILITY_COLLECTION].find(query).sort([('batch_code', 1), ('location_id', 1)]))
@@ -1,12 +1,24 @@
 """
 Stock Movements - Ledger-based Inventory System
 Double-entry bookkeeping pentru gestionare stocuri
+
+A movement and its balance change are written together: in a multi-document
+transaction when MongoDB runs as a replica set, otherwise with compensating
+writes (see write_ledger_entries). Callers can pass an idempotency_key so a
+retried request does not post the same movement twice. post_movements()
+writes all lines of a document with a fixed number of round trips.
 """
 from datetime import datetime
 from bson import ObjectId
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, Iterable, List, Any
 from enum import Enum
 
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+from src.backend.utils.config import get_config_value
+from modules.inventory.stock_availability import legacy_quantity, received_stock_ids, refresh_stock_availability
+
 
 class MovementType(str, Enum):
     """Tipuri de mișcări stoc"""
@@ -73,6 +85,9 @@ MOVEMENT_TYPES_CONFIG = {
     }
 }
 
+# id(MongoClient) -> multi-document transactions available
+_transaction_support: Dict[int, bool] = {}
+
 
 def validate_movement(
     movement_type: MovementType,
@@ -115,6 +130,282 @@ def validate_movement(
     return True, None
 
 
+def _ledger_transactions_mode() -> str:
+    try:
+        return str(get_config_value('ledger.transactions', 'auto')).lower()
+    except FileNotFoundError:
+        return 'auto'
+
+
+def supports_transactions(db) -> bool:
+    """
+    True when ledger writes can use multi-document transactions
+
+    Needs a replica set (a single-node one is enough) or a sharded cluster;
+    `ledger.transactions: off` in config.yaml forces compensating writes.
+    """
+    if _ledger_transactions_mode() == 'off':
+        return False
+    client = getattr(db, 'client', None)
+    if client is None:
+        return False
+
+    key = id(client)
+    if key not in _transaction_support:
+        try:
+            hello = client.admin.command('hello')
+            _transaction_support[key] = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+        except PyMongoError:
+            return False
+    return _transaction_support[key]
+
+
+def _balance_location_id(movement_type: MovementType, from_location_id, to_location_id):
+    """Location whose balance a movement changes"""
+    if movement_type in [MovementType.RECEIPT, MovementType.ADJUSTMENT, MovementType.TRANSFER_IN]:
+        # Adaugă/scade în to_location
+        return to_location_id
+    # CONSUMPTION, SCRAP, TRANSFER_OUT: scade din from_location
+    return from_location_id
+
+
+def _balance_deltas(entries: List[tuple]) -> List[tuple]:
+    """Net quantity per (stock, location): N lines on the same balance cost one $inc"""
+    deltas: Dict[tuple, float] = {}
+    for movement_doc, location_id in entries:
+        key = (movement_doc['stock_id'], location_id)
+        deltas[key] = deltas.get(key, 0) + movement_doc['quantity']
+    return list(deltas.items())
+
+
+class InsufficientStockError(ValueError):
+    """A guarded decrement found less stock than it needed"""
+
+
+def _balance_ops(deltas: List[tuple], timestamp: datetime, sign: int = 1, guard: bool = False) -> List[UpdateOne]:
+    """
+    Balance $inc ops; with `guard`, decrements only apply while the balance
+    still covers them (`quantity >= n` in the filter, no upsert)
+    """
+    ops = []
+    for (stock_id, location_id), delta in deltas:
+        delta = sign * delta
+        query = {'stock_id': stock_id, 'location_id': location_id}
+        guarded = guard and delta < 0
+        if guarded:
+            query['quantity'] = {'$gte': -delta}
+        ops.append(UpdateOne(
+            query,
+            {'$inc': {'quantity': delta}, '$set': {'updated_at': timestamp}},
+            upsert=not guarded
+        ))
+    return ops
+
+
+def _insert_movements(db, movement_docs: List[dict], session=None):
+    try:
+        db.depo_stocks_movements.insert_many(movement_docs, ordered=True, session=session)
+    except BulkWriteError as error:
+        write_errors = error.details.get('writeErrors') or []
+        if write_errors and write_errors[0].get('code') == 11000:
+            raise DuplicateKeyError(write_errors[0].get('errmsg', 'duplicate key'), 11000) from error
+        raise
+
+
+def _write_balances(db, ops: List[UpdateOne], session=None) -> int:
+    """Run balance ops; returns how many matched or upserted (guarded ops may match nothing)"""
+    if not ops:
+        return 0
+    result = db.depo_stocks_balances.bulk_write(ops, ordered=True, session=session)
+    return result.matched_count + result.upserted_count
+
+
+def _write_in_transaction(db, movement_docs: List[dict], ops: List[UpdateOne]):
+    def callback(session):
+        _insert_movements(db, movement_docs, session=session)
+        if _write_balances(db, ops, session=session) < len(ops):
+            # Aborts the transaction: nothing of this post is kept
+            raise InsufficientStockError("Insufficient stock: balance changed while posting")
+
+    with db.client.start_session() as session:
+        # with_transaction retries transient errors and unknown commit results
+        session.with_transaction(callback)
+
+
+def _write_with_compensation(db, movement_docs: List[dict], deltas: List[tuple], guard: bool, timestamp: datetime):
+    movement_ids = [doc['_id'] for doc in movement_docs]
+    try:
+        _insert_movements(db, movement_docs)
+    except Exception:
+        # An ordered insert_many may have written a prefix
+        db.depo_stocks_movements.delete_many({'_id': {'$in': movement_ids}})
+        raise
+
+    # Guarded decrements go one by one (a bulk result does not say which
+    # filter missed), before the rest, so a conflict is found early
+    guarded = [delta for delta in deltas if guard and delta[1] < 0]
+    plain = [delta for delta in deltas if not (guard and delta[1] < 0)]
+    applied: List[tuple] = []
+    try:
+        for delta in guarded:
+            if _write_balances(db, _balance_ops([delta], timestamp, guard=True)) < 1:
+                (stock_id, location_id), quantity = delta
+                raise InsufficientStockError(
+                    f"Insufficient stock {stock_id} at location {location_id}. Requested: {-quantity}"
+                )
+            applied.append(delta)
+        try:
+            _write_balances(db, _balance_ops(plain, timestamp))
+        except BulkWriteError as error:
+            # Ordered bulk: the ops before the first write error were applied
+            write_errors = error.details.get('writeErrors') or [{}]
+            applied.extend(plain[:write_errors[0].get('index', 0)])
+            raise
+        applied.extend(plain)
+    except Exception:
+        try:
+            _write_balances(db, _balance_ops(applied, datetime.utcnow(), sign=-1))
+            db.depo_stocks_movements.delete_many({'_id': {'$in': movement_ids}})
+        except Exception as undo_error:
+            print(f"[LEDGER] Compensation failed for movements {movement_ids}: {undo_error}")
+        raise
+
+
+def write_ledger_entries(db, entries: List[tuple], guard: bool = False):
+    """
+    Write movements and their balance changes as one unit
+
+    Args:
+        entries: [(movement_doc with _id, balance location_id), ...]
+        guard: Decrements only apply while the balance covers them; otherwise
+            the whole post fails with InsufficientStockError (never oversells,
+            even with concurrent posts)
+
+    Two round trips whatever the number of entries: one insert_many for the
+    movements and one bulk_write of net $inc per (stock, location). Inside a
+    multi-document transaction when supported; otherwise the movements are
+    removed (and applied balance ops reversed) if a write fails, and guarded
+    decrements cost one round trip each. A process crash between the writes
+    on a standalone server can still leave balances behind the movements;
+    regenerate_balances() repairs that.
+    """
+    if not entries:
+        return
+    movement_docs = [movement_doc for movement_doc, _ in entries]
+    deltas = _balance_deltas(entries)
+    timestamp = movement_docs[0]['created_at']
+
+    if supports_transactions(db):
+        _write_in_transaction(db, movement_docs, _balance_ops(deltas, timestamp, guard=guard))
+    else:
+        _write_with_compensation(db, movement_docs, deltas, guard, timestamp)
+
+
+_REPLAY_FIELDS = {'idempotency_key': 1, 'stock_id': 1, 'movement_type': 1, 'quantity': 1, 'transfer_group_id': 1}
+
+
+def _find_by_idempotency_keys(db, keys: List[str]) -> Dict[str, dict]:
+    if not keys:
+        return {}
+    return {
+        doc['idempotency_key']: doc
+        for doc in db.depo_stocks_movements.find({'idempotency_key': {'$in': keys}}, _REPLAY_FIELDS)
+    }
+
+
+def is_transfer_posted(db, idempotency_key: Optional[str]) -> bool:
+    """True if create_transfer already wrote both legs for this key"""
+    if not idempotency_key:
+        return False
+    return len(_find_by_idempotency_keys(db, [f"{idempotency_key}:out", f"{idempotency_key}:in"])) == 2
+
+
+def _check_replay(existing: dict, movement_doc: dict):
+    """A reused idempotency key must describe the same movement"""
+    if (existing.get('stock_id') != movement_doc['stock_id']
+            or existing.get('movement_type') != movement_doc['movement_type']
+            or existing.get('quantity') != movement_doc['quantity']):
+        raise ValueError(f"Idempotency key {existing.get('idempotency_key')} already used for a different movement")
+
+
+def _refresh_availability(db, stock_ids):
+    """
+    Refresh the availability projection after a committed ledger write
+
+    Never raises: the write went through, so failing the caller would invite
+    a retry that posts it again. A stale row is fixed by the next refresh of
+    its group or by `invoke db-rebuild-stock-availability`.
+    """
+    try:
+        refresh_stock_availability(db, stock_ids)
+    except Exception as e:
+        print(f"[LEDGER] Warning: failed to refresh stock availability for {stock_ids}: {e}")
+
+
+def _post_entries(db, entries: List[tuple], guard: bool = False) -> List[ObjectId]:
+    """
+    Write entries, skipping those whose idempotency key was already posted
+
+    Returns the movement ids in entry order (existing ids for replays).
+    """
+    keys = [doc['idempotency_key'] for doc, _ in entries if doc.get('idempotency_key')]
+    existing = _find_by_idempotency_keys(db, keys)
+
+    pending = []
+    for movement_doc, location_id in entries:
+        found = existing.get(movement_doc.get('idempotency_key'))
+        if found:
+            _check_replay(found, movement_doc)
+        else:
+            pending.append((movement_doc, location_id))
+
+    if pending:
+        try:
+            write_ledger_entries(db, pending, guard=guard)
+        except DuplicateKeyError:
+            # Concurrent retry with the same keys won the race
+            existing = _find_by_idempotency_keys(db, keys)
+            if not keys or any(doc.get('idempotency_key') not in existing for doc, _ in entries):
+                raise
+            for movement_doc, _ in entries:
+                _check_replay(existing[movement_doc['idempotency_key']], movement_doc)
+        else:
+            _refresh_availability(db, list({doc['stock_id'] for doc, _ in pending}))
+
+    return [
+        existing[doc['idempotency_key']]['_id'] if doc.get('idempotency_key') in existing else doc['_id']
+        for doc, _ in entries
+    ]
+
+
+def _build_movement_doc(
+    stock_id, part_id, batch_code, movement_type: MovementType, quantity, from_location_id, to_location_id,
+    document_type, document_id, created_by, transfer_group_id, notes, timestamp, idempotency_key=None
+) -> dict:
+    movement_doc = {
+        '_id': ObjectId(),
+        'stock_id': stock_id,
+        'part_id': part_id,
+        'batch_code': batch_code,
+        'movement_type': movement_type.value,
+        'quantity': quantity,
+        'from_location_id': from_location_id,
+        'to_location_id': to_location_id,
+        'source_id': from_location_id,
+        'destination_id': to_location_id,
+        'document_type': document_type,
+        'document_id': document_id,
+        'transfer_group_id': transfer_group_id,
+        'date': timestamp,
+        'created_at': timestamp,
+        'created_by': created_by,
+        'notes': notes
+    }
+    if idempotency_key:
+        movement_doc['idempotency_key'] = idempotency_key
+    return movement_doc
+
+
 def create_movement(
     db,
     stock_id: ObjectId,
@@ -128,11 +419,16 @@ def create_movement(
     document_id: ObjectId,
     created_by: str,
     transfer_group_id: Optional[str] = None,
-    notes: Optional[str] = None
+    notes: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> ObjectId:
     """
-    Creare mișcare de stoc + update balance
-    
+    Creare mișcare de stoc + update balance (atomic)
+
+    Args:
+        idempotency_key: Optional caller key; a retry with the same key returns
+            the movement created by the first call instead of posting it twice
+
     Returns:
         movement_id
     """
@@ -147,74 +443,272 @@ def create_movement(
     
     if not is_valid:
         raise ValueError(error)
-    
-    timestamp = datetime.utcnow()
-    
-    # Creare mișcare
-    movement_doc = {
+
+    movement_doc = _build_movement_doc(
+        stock_id, part_id, batch_code, movement_type, quantity, from_location_id, to_location_id,
+        document_type, document_id, created_by, transfer_group_id, notes, datetime.utcnow(), idempotency_key
+    )
+    location_id = _balance_location_id(movement_type, from_location_id, to_location_id)
+    return _post_entries(db, [(movement_doc, location_id)])[0]
+
+
+def update_balance(
+    db,
+    stock_id: ObjectId,
+    location_id: ObjectId,
+    quantity: float,
+    timestamp: datetime
+):
+    """
+    Update balance pentru un stock în locație
+    (și proiecția de disponibil a lotului)
+    """
+    _write_balances(db, _balance_ops([((stock_id, location_id), quantity)], timestamp))
+    _refresh_availability(db, stock_id)
+
+
+def transfer_lines(
+    stock_id: ObjectId,
+    part_id: ObjectId,
+    batch_code: str,
+    quantity: float,
+    from_location_id: ObjectId,
+    to_location_id: ObjectId,
+    notes: Optional[str] = None,
+    transfer_group_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """TRANSFER_OUT / TRANSFER_IN line pair for post_movements (own transfer group unless given)"""
+    # Unique per pair: a document posts several pairs within the same second
+    transfer_group_id = transfer_group_id or f"TRF-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{ObjectId()}"
+    base = {
         'stock_id': stock_id,
         'part_id': part_id,
         'batch_code': batch_code,
-        'movement_type': movement_type.value,
-        'quantity': quantity,
         'from_location_id': from_location_id,
         'to_location_id': to_location_id,
-        'source_id': from_location_id,
-        'destination_id': to_location_id,
-        'document_type': document_type,
-        'document_id': document_id,
         'transfer_group_id': transfer_group_id,
-        'date': timestamp,
-        'created_at': timestamp,
-        'created_by': created_by,
-        'notes': notes
+        'notes': notes,
     }
-    
-    result = db.depo_stocks_movements.insert_one(movement_doc)
-    movement_id = result.inserted_id
-    
-    # Update balance
-    # Pentru mișcări care afectează o locație
-    if movement_type in [MovementType.RECEIPT, MovementType.ADJUSTMENT]:
-        # Adaugă/scade în to_location
-        update_balance(db, stock_id, to_location_id, quantity, timestamp)
-    
-    elif movement_type in [MovementType.CONSUMPTION, MovementType.SCRAP]:
-        # Scade din from_location
-        update_balance(db, stock_id, from_location_id, quantity, timestamp)
-    
-    elif movement_type == MovementType.TRANSFER_OUT:
-        # Scade din from_location
-        update_balance(db, stock_id, from_location_id, quantity, timestamp)
-    
-    elif movement_type == MovementType.TRANSFER_IN:
-        # Adaugă în to_location
-        update_balance(db, stock_id, to_location_id, quantity, timestamp)
-    
-    return movement_id
+    return [
+        dict(base, movement_type=MovementType.TRANSFER_OUT, quantity=-quantity),
+        dict(base, movement_type=MovementType.TRANSFER_IN, quantity=quantity),
+    ]
 
 
-def update_balance(
+def get_balances(db, pairs: Iterable[tuple]) -> Dict[tuple, float]:
+    """Ledger balance per (stock_id, location_id), one query for all pairs"""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    balances = {pair: 0 for pair in pairs}
+    for bal in db.depo_stocks_balances.find(
+        {'stock_id': {'$in': list({stock_id for stock_id, _ in pairs})}},
+        {'stock_id': 1, 'location_id': 1, 'quantity': 1}
+    ):
+        key = (bal.get('stock_id'), bal.get('location_id'))
+        if key in balances:
+            balances[key] += bal.get('quantity') or 0
+    return balances
+
+
+# Allocation order for stock rows: earliest expiry first (no expiry date
+# last), then oldest (FIFO)
+ALLOCATION_ORDER_STAGES = [
+    {'$addFields': {'no_expiry': {'$cond': [{'$eq': [{'$type': '$expiry_date'}, 'date']}, 0, 1]}}},
+    {'$sort': {'no_expiry': 1, 'expiry_date': 1, 'created_at': 1, '_id': 1}},
+    {'$project': {'no_expiry': 0}},
+]
+
+
+def find_stock_rows(
     db,
-    stock_id: ObjectId,
     location_id: ObjectId,
-    quantity: float,
-    timestamp: datetime
-):
+    parts_batches: Iterable[tuple],
+    min_quantity: float = 0
+) -> Dict[tuple, List[dict]]:
     """
-    Update balance pentru un stock în locație
+    Stock rows holding (part, batch) at a location, one aggregation for all pairs
+
+    Starts from depo_stocks (part_batch index) and joins the ledger balances
+    by stock_id (stock_location index), so the cost follows the lots of the
+    requested parts, not everything stored at the location.
+
+    Args:
+        parts_batches: [(part_id, batch_code)]; an empty batch matches stocks
+            without batch
+        min_quantity: Keep rows with at least this balance (default: > 0)
+
+    Returns:
+        {(part_id, batch_code or ''): [stock + 'location_quantity']} in
+        allocation order: earliest expiry first (no expiry last), then oldest
     """
-    db.depo_stocks_balances.update_one(
-        {
-            'stock_id': stock_id,
-            'location_id': location_id
-        },
-        {
-            '$inc': {'quantity': quantity},
-            '$set': {'updated_at': timestamp}
-        },
-        upsert=True
-    )
+    keys = {(part_id, batch_code or '') for part_id, batch_code in parts_batches if part_id}
+    if not keys:
+        return {}
+
+    pipeline = [
+        {'$match': {'$or': [
+            {'part_id': part_id, 'batch_code': batch_code if batch_code else {'$in': [None, '']}}
+            for part_id, batch_code in keys
+        ]}},
+        {'$lookup': {
+            'from': 'depo_stocks_balances',
+            'localField': '_id',
+            'foreignField': 'stock_id',
+            'as': 'ledger_balances'
+        }},
+        {'$addFields': {
+            'location_quantity': {'$sum': {'$map': {
+                'input': {'$filter': {
+                    'input': '$ledger_balances',
+                    'as': 'bal',
+                    'cond': {'$eq': ['$$bal.location_id', location_id]}
+                }},
+                'as': 'bal',
+                'in': '$$bal.quantity'
+            }}},
+        }},
+        {'$match': {'location_quantity': {'$gte': min_quantity} if min_quantity > 0 else {'$gt': 0}}},
+        {'$project': {'ledger_balances': 0}},
+        *ALLOCATION_ORDER_STAGES,
+    ]
+
+    rows: Dict[tuple, List[dict]] = {}
+    for stock in db.depo_stocks.aggregate(pipeline):
+        rows.setdefault((stock.get('part_id'), stock.get('batch_code') or ''), []).append(stock)
+    return rows
+
+
+def post_movements(
+    db,
+    lines: List[Dict[str, Any]],
+    document_type: str,
+    document_id: ObjectId,
+    created_by: str,
+    idempotency_key: Optional[str] = None,
+    check_balance: bool = False
+) -> List[ObjectId]:
+    """
+    Post all movements of one document (all-or-nothing)
+
+    Every line is validated before anything is written; the movements then go
+    out with one insert_many and one bulk_write of net balance changes, so the
+    number of round trips does not depend on the number of lines.
+
+    Args:
+        lines: dicts with stock_id, part_id, batch_code, movement_type
+            (MovementType or its value), quantity (signed, as for
+            create_movement), from_location_id, to_location_id and optional
+            notes / transfer_group_id. Use transfer_lines() for transfers.
+        idempotency_key: Optional key for the whole document; line i is stored
+            under `<key>:<i>`, so a retried post returns the first post's ids
+        check_balance: Reject the post if a (stock, location) balance would
+            go below zero; checked up front for the error message and again
+            atomically by the balance decrements (concurrent posts cannot
+            both take the same quantity)
+
+    Raises:
+        ValueError: listing every invalid line
+        InsufficientStockError: (a ValueError) not enough balance, found up
+            front or by a guarded decrement that lost a race
+
+    Returns:
+        Movement ids, in line order
+    """
+    timestamp = datetime.utcnow()
+    errors = []
+    entries = []
+    for index, line in enumerate(lines):
+        try:
+            movement_type = MovementType(line.get('movement_type'))
+        except ValueError:
+            errors.append(f"Line {index + 1}: invalid movement type {line.get('movement_type')}")
+            continue
+        quantity = line.get('quantity') or 0
+        from_location_id = line.get('from_location_id')
+        to_location_id = line.get('to_location_id')
+        transfer_group_id = line.get('transfer_group_id')
+
+        is_valid, error = validate_movement(movement_type, quantity, from_location_id, to_location_id, transfer_group_id)
+        if not line.get('stock_id'):
+            is_valid, error = False, "stock_id is required"
+        if not is_valid:
+            errors.append(f"Line {index + 1}: {error}")
+            continue
+
+        movement_doc = _build_movement_doc(
+            line['stock_id'], line.get('part_id'), line.get('batch_code'), movement_type, quantity,
+            from_location_id, to_location_id, document_type, document_id, created_by,
+            transfer_group_id, line.get('notes'), timestamp,
+            f"{idempotency_key}:{index}" if idempotency_key else None
+        )
+        entries.append((movement_doc, _balance_location_id(movement_type, from_location_id, to_location_id)))
+
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    if check_balance:
+        deltas = dict(_balance_deltas(entries))
+        balances = get_balances(db, [key for key, delta in deltas.items() if delta < 0])
+        for (stock_id, location_id), available in balances.items():
+            requested = -deltas[(stock_id, location_id)]
+            if available < requested:
+                errors.append(
+                    f"Insufficient stock {stock_id} at location {location_id}. "
+                    f"Available: {available}, Requested: {requested}"
+                )
+        if errors:
+            raise InsufficientStockError("; ".join(errors))
+    return _post_entries(db, entries, guard=check_balance)
+
+
+LEGACY_OPENING_DOCUMENT = 'LEGACY_OPENING'
+
+
+def open_legacy_stocks(db, stocks: Iterable[dict], created_by: str = 'system') -> List[ObjectId]:
+    """
+    Carry the legacy quantity of stocks never received through the ledger
+    into depo_stocks_balances
+
+    Until its first RECEIPT a stock counts `depo_stocks.quantity` (or
+    initial_quantity) at its own location (see stock_availability.legacy_quantity).
+    Posting that quantity as a RECEIPT leaves the reconciled quantity
+    unchanged and gives guarded decrements a balance to take from. Each
+    stock's receipt is keyed `LEGACY_OPENING:<stock_id>`, so concurrent
+    callers open a stock once.
+
+    Args:
+        stocks: depo_stocks documents (_id, part_id, batch_code, quantity,
+            initial_quantity, location_id, initial_location_id)
+
+    Returns:
+        Ids of the opening receipts (new or already posted)
+    """
+    stocks = [stock for stock in stocks if stock.get('_id')]
+    received = received_stock_ids(db, [stock['_id'] for stock in stocks])
+    timestamp = datetime.utcnow()
+    entries = []
+    for stock in stocks:
+        location_id, quantity = legacy_quantity(stock)
+        if stock['_id'] in received or not location_id or quantity <= 0:
+            continue
+        movement_doc = _build_movement_doc(
+            stock['_id'], stock.get('part_id'), stock.get('batch_code'), MovementType.RECEIPT, quantity,
+            None, location_id, LEGACY_OPENING_DOCUMENT, stock['_id'], created_by, None,
+            'Opening balance from legacy stock quantity', timestamp,
+            f"{LEGACY_OPENING_DOCUMENT}:{stock['_id']}"
+        )
+        entries.append((movement_doc, location_id))
+
+    if not entries:
+        return []
+    try:
+        return _post_entries(db, entries)
+    except (DuplicateKeyError, ValueError) as e:
+        # Another caller opened some of these stocks meanwhile (or with a
+        # different legacy quantity); the next call opens the rest
+        print(f"[LEDGER] Warning: failed to open legacy stock balances: {e}")
+        return []
 
 
 def create_transfer(
@@ -228,54 +722,47 @@ def create_transfer(
     document_type: str,
     document_id: ObjectId,
     created_by: str,
-    notes: Optional[str] = None
+    notes: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> tuple[ObjectId, ObjectId]:
     """
-    Creare transfer (2 mișcări corelate)
-    
+    Creare transfer (2 mișcări corelate, scrise atomic)
+
+    Args:
+        idempotency_key: Optional caller key; the two movements are stored
+            under `<key>:out` and `<key>:in`
+
     Returns:
         (movement_out_id, movement_in_id)
     """
     if quantity <= 0:
         raise ValueError("Transfer quantity must be positive")
-    
-    # Generate transfer group ID
-    transfer_group_id = f"TRF-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
-    
-    # TRANSFER_OUT
-    movement_out_id = create_movement(
-        db=db,
-        stock_id=stock_id,
-        part_id=part_id,
-        batch_code=batch_code,
-        movement_type=MovementType.TRANSFER_OUT,
-        quantity=-quantity,  # Negativ
-        from_location_id=from_location_id,
-        to_location_id=to_location_id,
-        document_type=document_type,
-        document_id=document_id,
-        created_by=created_by,
-        transfer_group_id=transfer_group_id,
-        notes=notes
-    )
-    
-    # TRANSFER_IN
-    movement_in_id = create_movement(
-        db=db,
-        stock_id=stock_id,
-        part_id=part_id,
-        batch_code=batch_code,
-        movement_type=MovementType.TRANSFER_IN,
-        quantity=quantity,  # Pozitiv
-        from_location_id=from_location_id,
-        to_location_id=to_location_id,
-        document_type=document_type,
-        document_id=document_id,
-        created_by=created_by,
-        transfer_group_id=transfer_group_id,
-        notes=notes
-    )
-    
+
+    leg_keys = [f"{idempotency_key}:out", f"{idempotency_key}:in"] if idempotency_key else [None, None]
+    transfer_group_id = None
+    if idempotency_key:
+        # A half-posted transfer (crash on a standalone server) keeps its group
+        for doc in _find_by_idempotency_keys(db, leg_keys).values():
+            transfer_group_id = doc.get('transfer_group_id') or transfer_group_id
+
+    timestamp = datetime.utcnow()
+    entries = []
+    for line, leg_key in zip(
+        transfer_lines(stock_id, part_id, batch_code, quantity, from_location_id, to_location_id, notes, transfer_group_id),
+        leg_keys
+    ):
+        is_valid, error = validate_movement(
+            line['movement_type'], line['quantity'], from_location_id, to_location_id, line['transfer_group_id']
+        )
+        if not is_valid:
+            raise ValueError(error)
+        movement_doc = _build_movement_doc(
+            stock_id, part_id, batch_code, line['movement_type'], line['quantity'], from_location_id, to_location_id,
+            document_type, document_id, created_by, line['transfer_group_id'], notes, timestamp, leg_key
+        )
+        entries.append((movement_doc, _balance_location_id(line['movement_type'], from_location_id, to_location_id)))
+
+    movement_out_id, movement_in_id = _post_entries(db, entries)
     return movement_out_id, movement_in_id
 
 
@@ -363,48 +850,20 @@ def get_stock_movements(
     return movements
 
 
-def regenerate_balances(db):
+def regenerate_balances(db, full: bool = False):
     """
     Regenerează toate balances din ledger
-    ATENȚIE: Operațiune costisitoare!
+
+    Replays the latest balance snapshot plus the movements after it into a
+    shadow collection and swaps it in (see balance_snapshots.rebuild_balances);
+    `full` replays the whole history. Balances stay readable throughout.
+
+    Returns:
+        Number of balance rows written
     """
-    # Șterge toate balances
-    db.depo_stocks_balances.delete_many({})
-    
-    # Agregare din movements
-    pipeline = [
-        {
-            '$group': {
-                '_id': {
-                    'stock_id': '$stock_id',
-                    'location_id': {
-                        '$cond': [
-                            {'$in': ['$movement_type', ['RECEIPT', 'ADJUSTMENT', 'TRANSFER_IN']]},
-                            '$to_location_id',
-                            '$from_location_id'
-                        ]
-                    }
-                },
-                'quantity': {'$sum': '$quantity'}
-            }
-        },
-        {
-            '$project': {
-                '_id': 0,
-                'stock_id': '$_id.stock_id',
-                'location_id': '$_id.location_id',
-                'quantity': 1,
-                'updated_at': datetime.utcnow()
-            }
-        }
-    ]
-    
-    results = list(db.depo_stocks_movements.aggregate(pipeline))
-    
-    if results:
-        db.depo_stocks_balances.insert_many(results)
-    
-    return len(results)
+    from modules.inventory.balance_snapshots import rebuild_balances
+
+    return rebuild_balances(db, full=full)['rows']
 
 
 def verify_transfer_integrity(db, transfer_group_id: str) -> Dict[str, Any]:
@@ -0,0 +1,61 @@
+"""
+Fixtures for inventory integration tests (real MongoDB, see test_ledger_writes.py)
+and for the DataFlows Docu client (local mock server, see mock_docu.py)
+"""
+import os
+
+import pytest
+from bson import ObjectId
+
+from modules.inventory import stock_movements
+from modules.inventory.tests.mock_docu import MockDocu
+
+MONGO_URI = os.environ.get('LEDGER_TEST_MONGO_URI')
+
+
+@pytest.fixture
+def db():
+    from pymongo import MongoClient
+
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
+    name = f"ledger_test_{ObjectId()}"
+    database = client[name]
+    database.depo_stocks_movements.create_index(
+        'idempotency_key', name='idempotency_key', unique=True,
+        partialFilterExpression={'idempotency_key': {'$type': 'string'}}
+    )
+    database.depo_stocks_balances.create_index([('stock_id', 1), ('location_id', 1)])
+    yield database
+    client.drop_database(name)
+    client.close()
+
+
+@pytest.fixture
+def stock(db):
+    doc = {
+        '_id': ObjectId(),
+        'part_id': ObjectId(),
+        'batch_code': 'B001',
+        'state_id': ObjectId(),
+        'location_id': ObjectId(),
+    }
+    db.depo_stocks.insert_one(doc)
+    return doc
+
+
+@pytest.fixture(params=['transaction', 'compensation'])
+def write_mode(request, db, monkeypatch):
+    """Run each test through both ledger write paths"""
+    if request.param == 'transaction':
+        if not stock_movements.supports_transactions(db):
+            pytest.skip("server is not a replica set")
+    else:
+        monkeypatch.setattr(stock_movements, 'supports_transactions', lambda _db: False)
+    return request.param
+
+
+@pytest.fixture
+def docu():
+    server = MockDocu().start()
+    yield server
+    server.stop()
@@ -0,0 +1,129 @@
+"""
+Local mock of the DataFlows Docu API (tests and scripts/benchmarks/label_rendering.py)
+
+Serves /health, /templates/<code>, POST /jobs, /jobs/<id> and /download/<id>.
+A job reports 'processing' for `render_seconds` after it was created, then
+'done'; its download is a one-page PDF.
+"""
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _one_page_pdf() -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (100, 50), 'white').save(buffer, format='PDF')
+    return buffer.getvalue()
+
+
+class MockDocu(ThreadingHTTPServer):
+    """
+    Mock Docu server on 127.0.0.1 (random port)
+
+    failing: answer every request with 503
+    hits / connections: request paths / client addresses seen
+    jobs: created job payloads; max_in_flight: most jobs rendering at once
+    """
+    daemon_threads = True
+
+    def __init__(self, render_seconds: float = 0.0):
+        super().__init__(('127.0.0.1', 0), MockDocuHandler)
+        self.render_seconds = render_seconds
+        self.failing = False
+        self.hits = []
+        self.connections = set()
+        self.jobs = {}
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._pdf = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def pdf(self) -> bytes:
+        if self._pdf is None:
+            self._pdf = _one_page_pdf()
+        return self._pdf
+
+    def start(self) -> 'MockDocu':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def create_job(self, payload: dict) -> str:
+        with self.lock:
+            job_id = f"job{len(self.jobs) + 1}"
+            now = time.monotonic()
+            self.jobs[job_id] = {'payload': payload, 'ready_at': now + self.render_seconds, 'fetched': False}
+            in_flight = sum(1 for job in self.jobs.values() if not job['fetched'])
+            self.max_in_flight = max(self.max_in_flight, in_flight)
+        return job_id
+
+
+class MockDocuHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _send(self, status: int, body=None, content: bytes = None, content_type: str = 'application/json'):
+        payload = content if content is not None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _record(self) -> bool:
+        self.server.hits.append(self.path)
+        self.server.connections.add(self.client_address)
+        if self.server.failing:
+            self._send(503, {'error': 'down'})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._record():
+            return
+        server = self.server
+        if self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif self.path.startswith('/templates/'):
+            self._send(200, {'code': self.path.rsplit('/', 1)[-1]})
+        elif self.path.startswith('/jobs/'):
+            job = server.jobs.get(self.path.rsplit('/', 1)[-1])
+            if not job:
+                self._send(404, {'error': 'not found'})
+            else:
+                status = 'done' if time.monotonic() >= job['ready_at'] else 'processing'
+                self._send(200, {'status': status})
+        elif self.path.startswith('/download/'):
+            job = server.jobs.get(self.path.rsplit('/', 1)[-1])
+            if not job:
+                self._send(404, {'error': 'not found'})
+            else:
+                job['fetched'] = True
+                self._send(200, content=server.pdf, content_type='application/pdf')
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not self._record():
+            return
+        if self.path == '/jobs':
+            self._send(202, {'id': self.server.create_job(payload), 'status': 'queued'})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def log_message(self, *args):
+        pass
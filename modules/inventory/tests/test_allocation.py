@@ -0,0 +1,173 @@
+"""
+FEFO/FIFO allocation planner and concurrent allocators
+
+Same setup as test_ledger_writes.py (LEDGER_TEST_MONGO_URI, skipped otherwise).
+The concurrency test runs several allocator threads against the same lots
+and prints their throughput:
+
+    LEDGER_TEST_MONGO_URI=... pytest -s -m integration modules/inventory/tests/test_allocation.py
+"""
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from modules.inventory.allocation import allocate, allocate_lines, plan_allocation, plan_allocations
+from modules.inventory.stock_movements import InsufficientStockError, MovementType, create_movement
+from modules.inventory.tests.conftest import MONGO_URI
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set"),
+]
+
+
+@pytest.fixture
+def location():
+    return ObjectId()
+
+
+@pytest.fixture
+def lots(db, location):
+    """Three lots of one part, 100 each: no expiry, expires later, expires first"""
+    part_id = ObjectId()
+    expiries = [None, datetime(2026, 6, 1), datetime(2026, 1, 1)]
+    lots = []
+    for index, expiry_date in enumerate(expiries):
+        stock = {
+            '_id': ObjectId(),
+            'part_id': part_id,
+            'batch_code': f"L{index}",
+            'expiry_date': expiry_date,
+            'created_at': datetime(2025, 1, index + 1),
+        }
+        db.depo_stocks.insert_one(stock)
+        create_movement(
+            db, stock['_id'], part_id, stock['batch_code'], MovementType.RECEIPT, 100,
+            None, location, 'TEST', ObjectId(), 'test'
+        )
+        lots.append(stock)
+    return lots
+
+
+def balance(db, stock_id, location_id):
+    doc = db.depo_stocks_balances.find_one({'stock_id': stock_id, 'location_id': location_id})
+    return doc.get('quantity', 0) if doc else 0
+
+
+class TestAllocationPlanner:
+
+    def test_should_plan_earliest_expiry_first(self, db, lots, location):
+        plan = plan_allocation(db, lots[0]['part_id'], 250, [location])
+
+        assert [line['batch_code'] for line in plan['lines']] == ['L2', 'L1', 'L0']
+        assert [line['quantity'] for line in plan['lines']] == [100, 100, 50]
+        assert plan['shortfall'] == 0
+
+    def test_should_report_shortfall(self, db, lots, location):
+        plan = plan_allocation(db, lots[0]['part_id'], 400, [location])
+
+        assert plan['planned'] == 300
+        assert plan['shortfall'] == 100
+
+    def test_should_not_post_when_short(self, db, lots, location, write_mode):
+        with pytest.raises(InsufficientStockError):
+            allocate(db, lots[0]['part_id'], 400, [location], 'TEST', ObjectId(), 'test')
+
+        assert sum(balance(db, lot['_id'], location) for lot in lots) == 300
+
+    def test_should_not_plan_a_lot_twice_across_demands(self, db, lots, location):
+        part_id = lots[0]['part_id']
+        plans = plan_allocations(db, [
+            {'part_id': part_id, 'quantity': 150, 'batch_code': None},
+            {'part_id': part_id, 'quantity': 100, 'batch_code': 'L1'},
+        ], [location])
+
+        assert [(line['batch_code'], line['quantity']) for line in plans[0]['lines']] == [('L2', 100), ('L1', 50)]
+        assert [(line['batch_code'], line['quantity']) for line in plans[1]['lines']] == [('L1', 50)]
+        assert plans[1]['shortfall'] == 50
+
+    def test_should_post_partial_document(self, db, lots, location, write_mode):
+        part_id = lots[0]['part_id']
+        result = allocate_lines(db, [
+            {'part_id': part_id, 'quantity': 120, 'batch_code': None},
+            {'part_id': part_id, 'quantity': 250, 'batch_code': None},
+        ], [location], 'TEST', ObjectId(), 'test', allow_partial=True)
+
+        assert [plan['planned'] for plan in result['plans']] == [120, 180]
+        assert len(result['movement_ids']) == 4
+        assert sum(balance(db, lot['_id'], location) for lot in lots) == 0
+
+    def test_should_transfer_to_destination(self, db, lots, location, write_mode):
+        destination = ObjectId()
+        allocate(db, lots[0]['part_id'], 150, [location], 'TEST', ObjectId(), 'test', to_location_id=destination)
+
+        assert balance(db, lots[2]['_id'], destination) == 100
+        assert balance(db, lots[1]['_id'], destination) == 50
+        assert balance(db, lots[1]['_id'], location) == 50
+
+    def test_should_take_legacy_stock_the_projection_counts(self, db, lots, location, write_mode):
+        part_id = lots[0]['part_id']
+        legacy = {'_id': ObjectId(), 'part_id': part_id, 'batch_code': 'OLD', 'quantity': 40, 'location_id': location,
+                  'created_at': datetime(2025, 2, 1)}
+        db.depo_stocks.insert_one(legacy)
+
+        result = allocate(db, part_id, 320, [location], 'TEST', ObjectId(), 'test')
+
+        assert result['planned'] == 320
+        assert balance(db, legacy['_id'], location) == 20
+        assert db.depo_stocks_availability.find_one({'part_id': part_id, 'batch_code': 'OLD'})['quantity'] == 20
+        assert allocate(db, part_id, 20, [location], 'TEST', ObjectId(), 'test')['planned'] == 20
+        assert db.depo_stocks_movements.count_documents({'stock_id': legacy['_id'], 'movement_type': 'RECEIPT'}) == 1
+
+    def test_should_retake_returned_lines_in_one_post(self, db, lots, location, write_mode):
+        part_id = lots[0]['part_id']
+        first = allocate(db, part_id, 80, [location], 'TEST', ObjectId(), 'test', batch_code='L2')
+        returned = first['lines']
+
+        with pytest.raises(InsufficientStockError):
+            allocate(db, part_id, 101, [location], 'TEST', ObjectId(), 'test', batch_code='L2', returned=returned)
+        assert balance(db, lots[2]['_id'], location) == 20
+
+        result = allocate(db, part_id, 100, [location], 'TEST', ObjectId(), 'test', batch_code='L2', returned=returned)
+        assert result['planned'] == 100
+        assert len(result['returned_ids']) == 1
+        assert balance(db, lots[2]['_id'], location) == 0
+
+
+class TestConcurrentAllocators:
+
+    @pytest.mark.slow
+    def test_should_never_oversell(self, db, lots, location, write_mode):
+        part_id = lots[0]['part_id']
+        allocated = []
+        errors = []
+
+        def allocator():
+            while True:
+                try:
+                    result = allocate(db, part_id, 7, [location], 'TEST', ObjectId(), 'test', max_attempts=10)
+                except InsufficientStockError:
+                    return
+                except Exception as error:
+                    errors.append(error)
+                    return
+                allocated.append(result['planned'])
+
+        threads = [threading.Thread(target=allocator) for _ in range(8)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        print(f"\n[{write_mode}] {len(allocated)} allocations in {elapsed:.2f}s ({len(allocated) / elapsed:.0f}/s)")
+        assert not errors
+        # 300 / 7 = 42 full allocations; the last 6 units stay
+        assert sum(allocated) == 42 * 7
+        balances = [balance(db, lot['_id'], location) for lot in lots]
+        assert min(balances) >= 0
+        assert sum(balances) == 300 - 42 * 7
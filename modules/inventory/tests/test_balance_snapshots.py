@@ -0,0 +1,114 @@
+"""
+Balance snapshots, incremental rebuild and as-of-date balances
+
+Same setup as test_ledger_writes.py (LEDGER_TEST_MONGO_URI, skipped otherwise).
+Movements are inserted back-dated, with _id and created_at at the given day.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from modules.inventory import balance_snapshots
+from modules.inventory.balance_snapshots import (
+    create_balance_snapshot,
+    get_balances_as_of,
+    get_latest_snapshot,
+    invalidate_snapshots,
+    rebuild_balances,
+)
+from modules.inventory.tests.conftest import MONGO_URI
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set"),
+]
+
+
+def movement_at(db, stock, day: datetime, quantity: float) -> ObjectId:
+    movement_id = ObjectId.from_datetime(day)
+    db.depo_stocks_movements.insert_one({
+        '_id': movement_id,
+        'stock_id': stock['_id'],
+        'part_id': stock['part_id'],
+        'batch_code': stock['batch_code'],
+        'movement_type': 'RECEIPT' if quantity > 0 else 'CONSUMPTION',
+        'quantity': quantity,
+        'from_location_id': None if quantity > 0 else stock['location_id'],
+        'to_location_id': stock['location_id'] if quantity > 0 else None,
+        'created_at': day,
+    })
+    return movement_id
+
+
+@pytest.fixture
+def history(db, stock):
+    return [
+        movement_at(db, stock, datetime(2024, 1, 10), 100),
+        movement_at(db, stock, datetime(2024, 2, 10), -30),
+        movement_at(db, stock, datetime(2024, 3, 10), -20),
+    ]
+
+
+def quantity_as_of(db, day):
+    return sum(row['quantity'] for row in get_balances_as_of(db, day)['balances'])
+
+
+class TestBalanceSnapshots:
+
+    def test_should_chain_snapshots(self, db, stock, history):
+        first = create_balance_snapshot(db, as_of=datetime(2024, 2, 1))
+        second = create_balance_snapshot(db, as_of=datetime(2024, 3, 1))
+
+        assert first['movements_replayed'] == 1
+        assert second['base_snapshot_id'] == first['_id']
+        assert second['movements_replayed'] == 1
+        row = db.depo_stocks_snapshot_balances.find_one({'snapshot_id': second['_id']})
+        assert row['quantity'] == 70
+
+    def test_should_answer_as_of_from_snapshot(self, db, stock, history):
+        snapshot = create_balance_snapshot(db, as_of=datetime(2024, 2, 1))
+
+        assert get_balances_as_of(db, datetime(2024, 2, 28))['snapshot_id'] == snapshot['_id']
+        assert quantity_as_of(db, datetime(2024, 1, 5)) == 0
+        assert quantity_as_of(db, datetime(2024, 2, 28)) == 70
+        assert quantity_as_of(db, datetime(2024, 3, 31)) == 50
+
+    def test_should_rebuild_from_snapshot_into_live_balances(self, db, stock, history):
+        create_balance_snapshot(db, as_of=datetime(2024, 2, 1))
+        db.depo_stocks_balances.insert_one({'stock_id': stock['_id'], 'location_id': stock['location_id'], 'quantity': 999})
+
+        report = rebuild_balances(db)
+
+        assert report['movements_replayed'] == 2
+        balances = list(db.depo_stocks_balances.find({'stock_id': stock['_id']}))
+        assert [b['quantity'] for b in balances] == [50]
+
+    def test_should_keep_balance_writes_made_during_catch_up(self, db, stock, history, monkeypatch):
+        movement_at(db, stock, datetime.utcnow() - timedelta(seconds=2), 5)
+        original = balance_snapshots._add_movements
+        concurrent = []
+
+        def add_movements(db_, totals, match):
+            count = original(db_, totals, match)
+            if 'stock_id' in match and not concurrent:
+                # A ledger write lands after the recount read the movements
+                concurrent.append(movement_at(db, stock, datetime.utcnow(), 7))
+                db.depo_stocks_balances.update_one(
+                    {'stock_id': stock['_id'], 'location_id': stock['location_id']}, {'$inc': {'quantity': 7}}
+                )
+            return count
+
+        monkeypatch.setattr(balance_snapshots, '_add_movements', add_movements)
+        rebuild_balances(db)
+
+        balances = list(db.depo_stocks_balances.find({'stock_id': stock['_id']}))
+        assert [b['quantity'] for b in balances] == [62]
+
+    def test_should_skip_snapshot_after_movement_edit(self, db, stock, history):
+        create_balance_snapshot(db, as_of=datetime(2024, 3, 1))
+        db.depo_stocks_movements.update_one({'_id': history[1]}, {'$set': {'quantity': -10}})
+
+        assert invalidate_snapshots(db, [history[1]]) == 1
+        assert get_latest_snapshot(db) is None
+        assert quantity_as_of(db, datetime(2024, 3, 31)) == 70
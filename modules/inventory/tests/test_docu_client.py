@@ -0,0 +1,65 @@
+"""
+DataFlows Docu client (src/backend/utils/dataflows_docu.py) against a local
+mock Docu server (mock_docu.py): pooled keep-alive connections, cached health, circuit breaker
+"""
+import asyncio
+import time
+
+import pytest
+
+from src.backend.utils.dataflows_docu import AsyncDataFlowsDocuClient, DataFlowsDocuClient
+
+
+@pytest.fixture
+def client(docu):
+    client = DataFlowsDocuClient(
+        base_url=docu.url, token='test', pool_size=4,
+        health_interval=0, failure_threshold=3, reset_seconds=0.2,
+    )
+    yield client
+    client.close()
+
+
+@pytest.mark.unit
+class TestDocuClient:
+
+    def test_should_reuse_one_keep_alive_connection(self, docu, client):
+        codes = [client.get_template(f"TPL{i}")['code'] for i in range(10)]
+
+        assert codes == [f"TPL{i}" for i in range(10)]
+        assert len(docu.connections) == 1
+
+    def test_should_serve_cached_health(self, docu, client):
+        assert all(client.health_check() for _ in range(20))
+        assert docu.hits == ['/health']
+
+    def test_should_fail_fast_while_the_breaker_is_open(self, docu, client):
+        docu.failing = True
+        for _ in range(3):
+            assert client.get_template('TPL') is None
+
+        start = time.perf_counter()
+        assert client.get_template('TPL') is None
+        assert time.perf_counter() - start < 0.05
+        assert len(docu.hits) == 3
+        assert client.breaker.state == 'open'
+        assert client.health_check() is False
+
+        docu.failing = False
+        time.sleep(0.25)
+        assert client.get_template('TPL') == {'code': 'TPL'}
+        assert client.breaker.state == 'closed'
+
+    def test_should_run_async_calls_concurrently(self, docu, client):
+        async_client = AsyncDataFlowsDocuClient(client, workers=4)
+
+        async def fetch():
+            return await asyncio.gather(*(async_client.get_template(f"TPL{i}") for i in range(8)))
+
+        try:
+            results = asyncio.run(fetch())
+        finally:
+            async_client.close()
+
+        assert [r['code'] for r in results] == [f"TPL{i}" for i in range(8)]
+        assert len(docu.connections) <= 4
@@ -0,0 +1,74 @@
+"""
+Label rendering pipeline (modules/inventory/label_rendering.py) against the
+mock Docu server: dedupe, bounded parallel jobs, page order of the merged PDF
+"""
+import asyncio
+import io
+
+import pytest
+
+from modules.inventory.label_rendering import (
+    DEFAULT_SETTINGS,
+    LabelRenderError,
+    dedupe_labels,
+    merge_label_pdfs,
+    render_labels,
+)
+from src.backend.utils.dataflows_docu import AsyncDataFlowsDocuClient, DataFlowsDocuClient
+
+
+@pytest.fixture
+def settings():
+    return {
+        **DEFAULT_SETTINGS,
+        'docu_concurrency': 3,
+        'poll_initial_seconds': 0.02,
+        'poll_max_seconds': 0.05,
+        'max_wait_seconds': 5.0,
+    }
+
+
+@pytest.fixture
+def async_client(docu):
+    client = DataFlowsDocuClient(base_url=docu.url, token='test', health_interval=0)
+    async_client = AsyncDataFlowsDocuClient(client, workers=8)
+    yield async_client
+    async_client.close()
+    client.close()
+
+
+def _labels(count: int, copies: int = 1) -> list:
+    return [{'barcode': f"P{i}", 'quant': copies} for i in range(count) for _ in range(copies)]
+
+
+@pytest.mark.unit
+class TestLabelRendering:
+
+    def test_should_render_identical_payloads_once(self):
+        distinct, order = dedupe_labels([{'a': 1, 'b': 2}, {'b': 2, 'a': 1}, {'a': 2}, {'a': 1, 'b': 2}])
+
+        assert distinct == [{'a': 1, 'b': 2}, {'a': 2}]
+        assert order == [0, 0, 1, 0]
+
+    def test_should_render_distinct_labels_in_parallel(self, docu, async_client, settings):
+        docu.render_seconds = 0.1
+
+        pdfs, order = asyncio.run(render_labels('TPL', _labels(6, copies=3), 'labels', client=async_client, settings=settings))
+
+        assert len(pdfs) == 6
+        assert order == [i for i in range(6) for _ in range(3)]
+        assert len(docu.jobs) == 6
+        assert 1 < docu.max_in_flight <= settings['docu_concurrency']
+
+    def test_should_fail_the_print_run_when_a_label_fails(self, docu, async_client, settings):
+        docu.failing = True
+
+        with pytest.raises(LabelRenderError):
+            asyncio.run(render_labels('TPL', _labels(2), 'labels', client=async_client, settings=settings))
+
+    def test_should_repeat_pages_in_label_order(self, docu):
+        pypdf = pytest.importorskip('pypdf')
+
+        merged = merge_label_pdfs([docu.pdf, docu.pdf], [0, 0, 1, 0])
+
+        assert len(pypdf.PdfReader(io.BytesIO(merged)).pages) == 4
@@ -0,0 +1,241 @@
+"""
+Failure-injection tests for atomic, idempotent ledger writes
+and multi-line document posting
+
+Run against a local single-node replica set (skipped otherwise):
+
+    docker run -d --name mongo-rs -p 27017:27017 mongo:7 --replSet rs0
+    docker exec mongo-rs mongosh --quiet --eval "rs.initiate()"
+    LEDGER_TEST_MONGO_URI="mongodb://localhost:27017/?directConnection=true" pytest -m integration modules/inventory/tests
+
+Each test uses a throwaway database. Failures are injected by replacing the
+balance write so it raises after a given number of calls, i.e. between the
+movement insert and the balance updates of the same post.
+Both write paths are covered: transactions and compensating writes.
+"""
+import pytest
+from bson import ObjectId
+
+from modules.inventory import stock_movements
+from modules.inventory.stock_movements import (
+    MovementType, create_movement, create_transfer, post_movements, transfer_lines, verify_transfer_integrity
+)
+from modules.inventory.tests.conftest import MONGO_URI
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set"),
+]
+
+
+class InjectedFailure(Exception):
+    pass
+
+
+def fail_balance_after(monkeypatch, successful_calls: int):
+    """Make the next balance write fail once `successful_calls` writes went through"""
+    original = stock_movements._write_balances
+    calls = {'count': 0}
+
+    def failing(*args, **kwargs):
+        calls['count'] += 1
+        if calls['count'] == successful_calls + 1:
+            raise InjectedFailure("injected failure between ledger writes")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(stock_movements, '_write_balances', failing)
+    return lambda: monkeypatch.setattr(stock_movements, '_write_balances', original)
+
+
+def balance(db, stock_id, location_id):
+    doc = db.depo_stocks_balances.find_one({'stock_id': stock_id, 'location_id': location_id})
+    return doc.get('quantity', 0) if doc else 0
+
+
+def receipt(db, stock, quantity=100, **kwargs):
+    return create_movement(
+        db=db,
+        stock_id=stock['_id'],
+        part_id=stock['part_id'],
+        batch_code=stock['batch_code'],
+        movement_type=MovementType.RECEIPT,
+        quantity=quantity,
+        from_location_id=None,
+        to_location_id=stock['location_id'],
+        document_type='TEST',
+        document_id=ObjectId(),
+        created_by='test',
+        **kwargs
+    )
+
+
+def transfer(db, stock, to_location_id, quantity=40, **kwargs):
+    return create_transfer(
+        db=db,
+        stock_id=stock['_id'],
+        part_id=stock['part_id'],
+        batch_code=stock['batch_code'],
+        quantity=quantity,
+        from_location_id=stock['location_id'],
+        to_location_id=to_location_id,
+        document_type='TEST',
+        document_id=ObjectId(),
+        created_by='test',
+        **kwargs
+    )
+
+
+class TestAtomicLedgerWrites:
+    """A failure between writes leaves neither movements nor balance changes"""
+
+    def test_should_not_keep_movement_when_balance_write_fails(self, db, stock, write_mode, monkeypatch):
+        fail_balance_after(monkeypatch, 0)
+
+        with pytest.raises(InjectedFailure):
+            receipt(db, stock)
+
+        assert db.depo_stocks_movements.count_documents({}) == 0
+        assert balance(db, stock['_id'], stock['location_id']) == 0
+
+    def test_should_roll_back_both_transfer_legs(self, db, stock, write_mode, monkeypatch):
+        receipt(db, stock, 100)
+        destination = ObjectId()
+        fail_balance_after(monkeypatch, 0)
+
+        with pytest.raises(InjectedFailure):
+            transfer(db, stock, destination)
+
+        assert db.depo_stocks_movements.count_documents({'movement_type': {'$in': ['TRANSFER_OUT', 'TRANSFER_IN']}}) == 0
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+        assert balance(db, stock['_id'], destination) == 0
+
+
+class TestIdempotentLedgerWrites:
+    """Retries with the same idempotency key post once"""
+
+    def test_should_return_same_movement_on_retry(self, db, stock, write_mode):
+        first = receipt(db, stock, 100, idempotency_key='receipt-1')
+        second = receipt(db, stock, 100, idempotency_key='receipt-1')
+
+        assert first == second
+        assert db.depo_stocks_movements.count_documents({}) == 1
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+
+    def test_should_post_once_when_retrying_after_failure(self, db, stock, write_mode, monkeypatch):
+        restore = fail_balance_after(monkeypatch, 0)
+        with pytest.raises(InjectedFailure):
+            receipt(db, stock, 100, idempotency_key='receipt-2')
+        restore()
+
+        receipt(db, stock, 100, idempotency_key='receipt-2')
+        receipt(db, stock, 100, idempotency_key='receipt-2')
+
+        assert db.depo_stocks_movements.count_documents({}) == 1
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+
+    def test_should_replay_transfer(self, db, stock, write_mode):
+        receipt(db, stock, 100)
+        destination = ObjectId()
+
+        first = transfer(db, stock, destination, idempotency_key='transfer-1')
+        second = transfer(db, stock, destination, idempotency_key='transfer-1')
+
+        assert first == second
+        assert balance(db, stock['_id'], stock['location_id']) == 60
+        assert balance(db, stock['_id'], destination) == 40
+
+    def test_should_reject_key_reused_for_other_movement(self, db, stock, write_mode):
+        receipt(db, stock, 100, idempotency_key='receipt-3')
+
+        with pytest.raises(ValueError):
+            receipt(db, stock, 50, idempotency_key='receipt-3')
+
+
+def consumption_line(stock, quantity):
+    return {
+        'stock_id': stock['_id'],
+        'part_id': stock['part_id'],
+        'batch_code': stock['batch_code'],
+        'movement_type': MovementType.CONSUMPTION,
+        'quantity': -quantity,
+        'from_location_id': stock['location_id'],
+        'to_location_id': None,
+    }
+
+
+def post(db, lines, **kwargs):
+    return post_movements(db, lines, document_type='TEST', document_id=ObjectId(), created_by='test', **kwargs)
+
+
+class TestPostMovements:
+    """All lines of a document are posted together, or none"""
+
+    def test_should_post_all_lines_with_one_balance_write(self, db, stock, write_mode, monkeypatch):
+        receipt(db, stock, 100)
+        destination = ObjectId()
+        original = stock_movements._write_balances
+        calls = []
+        monkeypatch.setattr(stock_movements, '_write_balances', lambda *a, **kw: calls.append(1) or original(*a, **kw))
+
+        ids = post(db, [
+            consumption_line(stock, 10),
+            consumption_line(stock, 5),
+            *transfer_lines(stock['_id'], stock['part_id'], stock['batch_code'], 20, stock['location_id'], destination),
+        ])
+
+        assert len(ids) == 4
+        assert len(calls) == 1
+        assert balance(db, stock['_id'], stock['location_id']) == 65
+        assert balance(db, stock['_id'], destination) == 20
+
+    def test_should_keep_each_transfer_pair_in_its_own_group(self, db, stock, write_mode):
+        receipt(db, stock, 100)
+        destinations = [ObjectId(), ObjectId()]
+
+        post(db, [
+            line
+            for destination in destinations
+            for line in transfer_lines(stock['_id'], stock['part_id'], stock['batch_code'], 10, stock['location_id'], destination)
+        ])
+
+        groups = db.depo_stocks_movements.distinct('transfer_group_id', {'transfer_group_id': {'$ne': None}})
+        assert len(groups) == 2
+        assert all(verify_transfer_integrity(db, group)['valid'] for group in groups)
+
+    def test_should_reject_document_with_invalid_line(self, db, stock, write_mode):
+        receipt(db, stock, 100)
+
+        with pytest.raises(ValueError) as error:
+            post(db, [consumption_line(stock, 10), dict(consumption_line(stock, 5), quantity=5)])
+
+        assert 'Line 2' in str(error.value)
+        assert db.depo_stocks_movements.count_documents({}) == 1
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+
+    def test_should_reject_document_over_balance(self, db, stock, write_mode):
+        receipt(db, stock, 100)
+
+        with pytest.raises(ValueError):
+            post(db, [consumption_line(stock, 60), consumption_line(stock, 60)], check_balance=True)
+
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+
+    def test_should_roll_back_document_when_balance_write_fails(self, db, stock, write_mode, monkeypatch):
+        receipt(db, stock, 100)
+        fail_balance_after(monkeypatch, 0)
+
+        with pytest.raises(InjectedFailure):
+            post(db, [consumption_line(stock, 10), consumption_line(stock, 5)])
+
+        assert db.depo_stocks_movements.count_documents({}) == 1
+        assert balance(db, stock['_id'], stock['location_id']) == 100
+
+    def test_should_replay_document(self, db, stock, write_mode):
+        receipt(db, stock, 100)
+        lines = [consumption_line(stock, 10), consumption_line(stock, 5)]
+
+        first = post(db, lines, idempotency_key='doc-1')
+        second = post(db, lines, idempotency_key='doc-1')
+
+        assert first == second
+        assert balance(db, stock['_id'], stock['location_id']) == 85
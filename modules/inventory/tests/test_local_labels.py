@@ -0,0 +1,71 @@
+"""
+Local label renderer (modules/inventory/local_labels.py) and backend choice
+"""
+import asyncio
+import re
+
+import pytest
+
+from modules.inventory import label_rendering, local_labels
+from modules.inventory.label_rendering import label_backend, render_print_run
+
+LAYOUT = {
+    'width_mm': 40,
+    'height_mm': 20,
+    'dpi': 203,
+    'qr': {'field': 'barcode', 'x': 1, 'y': 1, 'size': 16},
+    'lines': [
+        {'text': '{part_ipn}', 'x': 19, 'y': 1, 'size': 8, 'bold': True},
+        {'text': 'Lot: {batch_code} {missing}', 'x': 19, 'y': 6, 'size': 6, 'max_width': 20},
+        {'text': '{crt_no}/{quant}', 'x': 19, 'y': 14, 'size': 6},
+    ],
+}
+
+
+def _pages(pdf: bytes) -> int:
+    return len(re.findall(rb'/Type\s*/Page\b(?!s)', pdf))
+
+
+@pytest.fixture
+def templates(monkeypatch):
+    templates = {'LOCAL': LAYOUT, 'SWITCHED': {**LAYOUT, 'backend': 'docu'}}
+    monkeypatch.setattr(local_labels, 'local_templates', lambda: templates)
+    return templates
+
+
+@pytest.mark.unit
+class TestLocalLabels:
+
+    def test_should_draw_label_at_layout_size(self):
+        image = local_labels.render_label_image(LAYOUT, {'barcode': 'P1LB1', 'part_ipn': '1', 'batch_code': 'B1' * 40})
+
+        assert image.size == (320, 160)
+        assert image.getextrema() == (0, 255)
+
+    def test_should_print_raw_value_when_format_spec_does_not_fit(self):
+        values = local_labels._BlankMissing({'quantity': '', 'um': 'kg'})
+
+        assert local_labels._format_text('{quantity:.2f} {um}', values) == ' kg'
+        assert local_labels._format_text('{quantity:.2f} {um}', {**values, 'quantity': 2}) == '2.00 kg'
+        assert local_labels._format_text('{quantity:.2f} {um', values) == '{quantity:.2f} {um'
+
+    def test_should_write_one_page_per_label(self):
+        labels = [{'barcode': 'P1', 'crt_no': 1}, {'barcode': 'P2', 'crt_no': 1}]
+
+        pdf = local_labels.render_local_pdf(LAYOUT, labels, [0, 0, 1, 0])
+
+        assert pdf.startswith(b'%PDF')
+        assert _pages(pdf) == 4
+
+    def test_should_pick_backend_per_template(self, templates):
+        assert label_backend('LOCAL') == 'local'
+        assert label_backend('SWITCHED') == 'docu'
+        assert label_backend('OTHER') == 'docu'
+
+    def test_should_render_local_templates_without_docu(self, templates, monkeypatch):
+        monkeypatch.setattr(label_rendering, 'get_async_docu_client', pytest.fail)
+        labels = [{'barcode': 'P1', 'part_ipn': '1', 'crt_no': i, 'quant': 3} for i in range(1, 4)]
+
+        pdf = asyncio.run(render_print_run('LOCAL', labels, 'labels'))
+
+        assert _pages(pdf) == 3
@@ -0,0 +1,100 @@
+"""
+Per-part demand / supply summary
+
+Same setup as test_ledger_writes.py (LEDGER_TEST_MONGO_URI, skipped otherwise).
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from modules.inventory.part_summary import (
+    SUMMARY_COLLECTION,
+    get_part_summary,
+    get_stock_totals,
+    rebuild_part_summaries,
+    refresh_document_summaries,
+)
+from modules.inventory.stock_availability import AVAILABILITY_COLLECTION, rebuild_stock_availability
+from modules.inventory.stock_movements import MovementType, create_movement
+from modules.inventory.tests.conftest import MONGO_URI
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set"),
+]
+
+
+@pytest.fixture
+def part(db):
+    doc = {'_id': ObjectId(), 'name': 'Part', 'ipn': 'P-1'}
+    db.depo_parts.insert_one(doc)
+    return doc
+
+
+@pytest.fixture
+def orders(db, part):
+    """Open and cancelled sales orders, an open purchase order and a request"""
+    part_id = str(part['_id'])
+    cancelled = {'_id': ObjectId(), 'name': 'Cancelled'}
+    db.depo_sales_ordes_states.insert_one(cancelled)
+    db.depo_sales_ordes.insert_many([
+        {'_id': ObjectId(), 'reference': 'SO-1', 'created_at': datetime(2025, 1, 1),
+         'items': [{'part_id': part_id, 'quantity': 10, 'shipped': 4}]},
+        {'_id': ObjectId(), 'reference': 'SO-2', 'state_id': cancelled['_id'], 'created_at': datetime(2025, 1, 2),
+         'items': [{'part_id': part_id, 'quantity': 50}]},
+    ])
+    purchase_order = {'_id': ObjectId(), 'reference': 'PO-1', 'status': 'Issued', 'created_at': datetime(2025, 1, 3),
+                      'items': [{'part_id': part_id, 'quantity': 20, 'received': 5}]}
+    db.depo_purchase_orders.insert_one(purchase_order)
+    db.depo_requests.insert_one({'_id': ObjectId(), 'reference': 'REQ-1', 'items': [{'part': part_id, 'quantity': 3}]})
+    return purchase_order
+
+
+class TestPartSummary:
+
+    def test_should_sum_open_lines_and_stock(self, db, part, orders, stock):
+        db.depo_stocks.update_one({'_id': stock['_id']}, {'$set': {'part_id': part['_id'], 'batch_code': ''}})
+        create_movement(db, stock['_id'], part['_id'], '', MovementType.RECEIPT, 30, None, ObjectId(), 'TEST', ObjectId(), 'test')
+
+        summary = get_part_summary(db, part['_id'])
+
+        assert summary['on_hand'] == 30
+        assert summary['allocated_to_sales'] == 6
+        assert summary['incoming_from_purchase'] == 15
+        assert summary['required_by_production'] == 3
+        assert summary['available'] == 24
+        assert [line['order_ref'] for line in summary['allocations']] == ['PO-1', 'SO-1', 'REQ-1']
+
+    def test_should_follow_ledger_and_item_changes(self, db, part, orders, stock):
+        get_part_summary(db, part['_id'])
+        db.depo_stocks.update_one({'_id': stock['_id']}, {'$set': {'part_id': part['_id'], 'batch_code': ''}})
+        create_movement(db, stock['_id'], part['_id'], '', MovementType.RECEIPT, 8, None, ObjectId(), 'TEST', ObjectId(), 'test')
+
+        db.depo_purchase_orders.update_one({'_id': orders['_id']}, {'$set': {'items': []}})
+        refresh_document_summaries(db, 'depo_purchase_orders', orders['_id'], orders)
+
+        summary = db[SUMMARY_COLLECTION].find_one({'_id': part['_id']})
+        assert summary['on_hand'] == 8
+        assert summary['available'] == 2
+        assert summary['incoming_from_purchase'] == 0
+
+    def test_rebuild_should_drop_removed_parts(self, db, part, orders):
+        db[SUMMARY_COLLECTION].insert_one({'_id': ObjectId(), 'on_hand': 1})
+
+        report = rebuild_part_summaries(db)
+
+        assert report == {'parts': 1, 'removed': 1}
+        assert db[SUMMARY_COLLECTION].count_documents({}) == 1
+
+    def test_availability_rebuild_should_correct_stock_figures(self, db, part, stock):
+        db.depo_stocks.update_one({'_id': stock['_id']}, {'$set': {'part_id': part['_id'], 'batch_code': ''}})
+        create_movement(db, stock['_id'], part['_id'], '', MovementType.RECEIPT, 12, None, ObjectId(), 'TEST', ObjectId(), 'test')
+        # Summary first computed before the projection was built
+        db[AVAILABILITY_COLLECTION].delete_many({})
+        db[SUMMARY_COLLECTION].delete_many({})
+        assert get_stock_totals(db, [part['_id']]) == {part['_id']: 0}
+
+        rebuild_stock_availability(db)
+
+        assert get_stock_totals(db, [part['_id']]) == {part['_id']: 12}
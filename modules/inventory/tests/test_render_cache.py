@@ -0,0 +1,126 @@
+"""
+Render cache (src/backend/utils/render_cache.py) and cached label renders
+
+Same setup as test_ledger_writes.py (LEDGER_TEST_MONGO_URI, skipped otherwise).
+"""
+import asyncio
+import time
+
+import pytest
+
+from modules.inventory.label_rendering import DEFAULT_SETTINGS, render_labels
+from modules.inventory.tests.conftest import MONGO_URI
+from src.backend.utils import render_cache
+from src.backend.utils.dataflows_docu import AsyncDataFlowsDocuClient, DataFlowsDocuClient
+from src.backend.utils.render_cache import (
+    get_render_cache_stats,
+    get_rendered,
+    invalidate_template,
+    note_template_bundle,
+    render_key,
+    store_rendered,
+    strip_volatile,
+    template_version,
+)
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set"),
+]
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Empty memory tier; sizes in bytes instead of MB"""
+    render_cache._forget()
+    monkeypatch.setattr(render_cache, '_MB', 1)
+    settings = {'enabled': True, 'max_size_mb': 10 ** 6, 'max_entry_mb': 10 ** 6, 'memory_mb': 10 ** 6}
+    monkeypatch.setattr(render_cache, '_setting', lambda key, default: settings[key])
+    yield settings
+    render_cache._forget()
+
+
+class TestRenderCache:
+
+    def test_should_key_on_template_version_and_payload(self):
+        key = render_key('TPL', '0', {'a': 1, 'b': [1, 2]})
+
+        assert key == render_key('TPL', '0', {'b': [1, 2], 'a': 1})
+        assert key == render_key('TPL', '0', strip_volatile({'a': 1, 'b': [1, 2], 'generated_at': 'now'}))
+        assert key != render_key('TPL', '0', {'a': 1, 'b': [1, 2], 'generated_at': 'now'})
+        assert key != render_key('TPL', '1', {'a': 1, 'b': [1, 2]})
+        assert key != render_key('OTHER', '0', {'a': 1, 'b': [1, 2]})
+        assert key != render_key('TPL', '0', {'a': 2, 'b': [1, 2]})
+
+    def test_should_serve_stored_renders_from_mongodb(self, db):
+        key = render_key('TPL', '0', {'a': 1})
+        assert get_rendered(db, key) is None
+
+        store_rendered(db, key, 'TPL', '0', b'%PDF-1')
+        render_cache._forget()
+
+        assert get_rendered(db, key) == b'%PDF-1'
+        assert db.render_cache.find_one({'_id': key})['hits'] == 1
+
+    def test_should_drop_template_renders_on_invalidation(self, db):
+        store_rendered(db, render_key('TPL', '0', {'a': 1}), 'TPL', '0', b'%PDF-1')
+        store_rendered(db, render_key('OTHER', '0', {'a': 1}), 'OTHER', '0', b'%PDF-2')
+
+        assert invalidate_template(db, 'TPL')['removed'] == 1
+        assert template_version(db, 'TPL') == '1'
+        assert get_rendered(db, render_key('TPL', '0', {'a': 1})) is None
+        assert get_rendered(db, render_key('OTHER', '0', {'a': 1})) == b'%PDF-2'
+
+    def test_should_invalidate_when_template_bundle_changes(self, db):
+        assert not note_template_bundle(db, 'TPL', {'parts': [{'name': 'v1'}]})
+        assert not note_template_bundle(db, 'TPL', {'parts': [{'name': 'v1'}]})
+        assert note_template_bundle(db, 'TPL', {'parts': [{'name': 'v2'}]})
+        assert template_version(db, 'TPL') == '1'
+
+    def test_should_evict_least_recently_used(self, db, cache):
+        cache['max_size_mb'] = 25
+        keys = [render_key('TPL', '0', {'n': n}) for n in range(3)]
+        for index, key in enumerate(keys[:2]):
+            store_rendered(db, key, 'TPL', '0', str(index).encode() * 10)
+            time.sleep(0.01)
+        get_rendered(db, keys[0])
+        time.sleep(0.01)
+
+        store_rendered(db, keys[2], 'TPL', '0', b'2' * 10)
+
+        assert db.render_cache.count_documents({}) == 2
+        assert get_rendered(db, keys[1]) is None
+
+    def test_should_keep_running_totals(self, db, cache, monkeypatch):
+        cache['max_size_mb'] = 25
+        store_rendered(db, render_key('TPL', '0', {'n': 0}), 'TPL', '0', b'x' * 10)
+        # Seeded once; stores, evictions and stats no longer scan the collection
+        monkeypatch.setattr(type(db.render_cache), 'aggregate', lambda *args, **kwargs: pytest.fail("aggregate"))
+        for n in range(1, 3):
+            time.sleep(0.01)
+            store_rendered(db, render_key('TPL', '0', {'n': n}), 'TPL', '0', b'x' * 10)
+        store_rendered(db, render_key('TPL', '0', {'n': 2}), 'TPL', '0', b'x' * 10)
+        store_rendered(db, render_key('OTHER', '0', {'n': 0}), 'OTHER', '0', b'y' * 5)
+
+        assert db.render_cache.count_documents({}) == 3
+        assert get_render_cache_stats(db)['stored_bytes'] == 25
+        invalidate_template(db, 'TPL')
+        stats = get_render_cache_stats(db)
+        assert (stats['entries'], stats['stored_bytes']) == (1, 5)
+
+    def test_should_not_send_cached_labels_to_docu(self, db, docu):
+        settings = {**DEFAULT_SETTINGS, 'poll_initial_seconds': 0.02, 'poll_max_seconds': 0.05}
+        labels = [{'barcode': f"P{i}"} for i in range(3)]
+        client = DataFlowsDocuClient(base_url=docu.url, token='test', health_interval=0)
+        async_client = AsyncDataFlowsDocuClient(client, workers=4)
+        try:
+            asyncio.run(render_labels('TPL', labels, 'labels', client=async_client, settings=settings, db=db))
+            pdfs, order = asyncio.run(render_labels('TPL', labels + labels[:1], 'labels', client=async_client,
+                                                    settings=settings, db=db))
+        finally:
+            async_client.close()
+            client.close()
+
+        assert len(docu.jobs) == 3
+        assert pdfs == [docu.pdf] * 3
+        assert order == [0, 1, 2, 0]
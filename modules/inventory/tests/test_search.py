@@ -0,0 +1,71 @@
+"""
+Indexed text search (search_terms / search_grams)
+
+Matching against MongoDB uses the same setup as test_ledger_writes.py
+(LEDGER_TEST_MONGO_URI, skipped otherwise).
+"""
+import pytest
+from bson import ObjectId
+
+from src.backend.utils.search import (
+    autocomplete,
+    backfill_search_fields,
+    search_fields,
+    search_filter,
+    tokenize,
+    touches_search_fields,
+)
+from modules.inventory.tests.conftest import MONGO_URI
+
+
+class TestSearchFields:
+
+    def test_should_split_lowercase_and_dedupe(self):
+        assert tokenize('Hex Bolt M8', 'HB-M8', None) == ['hex', 'bolt', 'm8', 'hb']
+
+    def test_should_build_terms_and_trigrams_from_the_spec_fields(self):
+        doc = {'name': 'Șurub', 'ipn': 'S_01', 'description': 'oțel', 'notes': 'ignored'}
+
+        assert search_fields('depo_parts', doc) == {
+            'search_terms': ['șurub', 's', '01', 'oțel'],
+            'search_grams': ['șur', 'uru', 'rub', 'oțe', 'țel'],
+        }
+
+    def test_should_read_fields_inside_item_arrays(self):
+        doc = {'reference': 'REQ-7', 'items': [{'batch_code': 'L100'}, {'batch_code': 'L200'}]}
+
+        assert search_fields('depo_requests', doc)['search_terms'] == ['req', '7', 'l100', 'l200']
+
+    def test_should_return_empty_filter_for_blank_search(self):
+        assert search_filter('depo_parts', '  -- ') == {}
+
+    def test_should_detect_updates_of_searched_fields(self):
+        assert touches_search_fields('depo_requests', ['items', 'updated_at'])
+        assert not touches_search_fields('depo_requests', ['state_id', 'updated_at'])
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not MONGO_URI, reason="LEDGER_TEST_MONGO_URI not set")
+class TestSearchQueries:
+
+    @pytest.fixture
+    def parts(self, db):
+        db.depo_parts.insert_many([
+            {'_id': ObjectId(), 'name': 'Hex bolt', 'ipn': 'HB-M8'},
+            {'_id': ObjectId(), 'name': 'Hex nut', 'ipn': 'HN-M8'},
+            {'_id': ObjectId(), 'name': 'Bolt cutter', 'ipn': 'BC-1'},
+            {'_id': ObjectId(), 'name': 'Washer', 'ipn': 'W-1', 'description': 'for hex bolts'},
+        ])
+        backfill_search_fields(db, ['depo_parts'])
+        db.depo_parts.insert_one({'_id': ObjectId(), 'name': 'Legacy hex bolt', 'ipn': 'LG-1'})
+        return db
+
+    def test_should_match_word_substrings_and_legacy_parts(self, parts):
+        names = sorted(p['name'] for p in parts.depo_parts.find(search_filter('depo_parts', 'hex olt')))
+
+        assert names == ['Hex bolt', 'Legacy hex bolt', 'Washer']
+
+    def test_should_rank_autocomplete_by_field_and_match_kind(self, parts):
+        names = [p['name'] for p in autocomplete(parts, 'depo_parts', 'bolt', limit=3)]
+
+        assert names == ['Hex bolt', 'Bolt cutter', 'Legacy hex bolt']
@@ -4,11 +4,12 @@ Helper functions for approval flows
 from datetime import datetime
 from bson import ObjectId
 from fastapi import HTTPException
+from src.backend.utils.reference_cache import find_reference
 
 
 def get_state_by_slug(db, slug: str):
     """Get state from depo_requests_states by slug"""
-    state = db.depo_requests_states.find_one({'slug': slug})
+    state = find_reference(db, 'depo_requests_states', 'slug', slug)
     if not state:
         raise HTTPException(status_code=500, detail=f"State '{slug}' not found in database")
     return state
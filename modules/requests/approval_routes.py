@@ -6,6 +6,8 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.audit import log_journal
 from src.backend.utils.sections_permissions import require_section
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_user_can_sign
@@ -26,7 +28,7 @@ router.include_router(production_router)
 # ==================== APPROVAL FLOW ====================
 
 @router.get("/{request_id}/approval-flow")
-async def get_request_approval_flow(
+def get_request_approval_flow(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -54,7 +56,7 @@ async def get_request_approval_flow(
 
 
 @router.post("/{request_id}/approval-flow")
-async def create_request_approval_flow(
+def create_request_approval_flow(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -122,6 +124,7 @@ async def create_request_approval_flow(
     }
     
     result = db.approval_flows.insert_one(flow_data)
+    sync_approval_inbox(db, result.inserted_id)
     
     flow_data["_id"] = str(result.inserted_id)
     
@@ -129,7 +132,7 @@ async def create_request_approval_flow(
 
 
 @router.post("/{request_id}/sign")
-async def sign_request(
+def sign_request(
     request_id: str,
     request: Request,
     current_user: dict = Depends(require_section("requests"))
@@ -200,6 +203,7 @@ async def sign_request(
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Check if approval conditions are met
     updated_flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
@@ -236,6 +240,7 @@ async def sign_request(
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Update request state to "Approved"
         try:
@@ -315,6 +320,7 @@ async def sign_request(
                             }
                             
                             db.approval_flows.insert_one(ops_flow_data)
+                            sync_approval_inbox(db, ops_flow_data["_id"])
                             print(f"[REQUESTS] Auto-created operations flow for request {request_id}")
             except Exception as e:
                 print(f"[REQUESTS] Warning: Failed to auto-create operations flow: {e}")
@@ -327,7 +333,7 @@ async def sign_request(
 
 
 @router.delete("/{request_id}/signatures/{user_id}")
-async def remove_request_signature(
+def remove_request_signature(
     request_id: str,
     user_id: str,
     current_user: dict = Depends(require_section("requests"))
@@ -353,6 +359,7 @@ async def remove_request_signature(
             "$set": {"updated_at": datetime.utcnow(), "status": "in_progress"}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -364,6 +371,7 @@ async def remove_request_signature(
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
     else:
         pass
     
@@ -373,7 +381,7 @@ async def remove_request_signature(
 # ==================== OPERATIONS FLOW ====================
 
 @router.get("/{request_id}/operations-flow")
-async def get_request_operations_flow(
+def get_request_operations_flow(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -479,6 +487,7 @@ async def sign_operations(
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Check if approval conditions are met
     updated_flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
@@ -515,6 +524,7 @@ async def sign_operations(
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Update request state_id to "Warehouse signed"
         try:
@@ -530,7 +540,7 @@ async def sign_operations(
             )
             
             # Log the state change
-            db.logs.insert_one({
+            log_journal({
                 'collection': 'depo_requests',
                 'object_id': request_id,
                 'action': 'operations_signed',
@@ -584,6 +594,7 @@ async def sign_operations(
                         }
                         
                         result = db.approval_flows.insert_one(reception_flow_data)
+                        sync_approval_inbox(db, result.inserted_id)
                         print(f"[REQUESTS] ✓ Auto-created reception flow for request {request_id} from template {template_id}")
                     else:
                         print(f"[REQUESTS] ERROR: Template {template_id} not found in approval_templates")
@@ -602,7 +613,7 @@ async def sign_operations(
 
 
 @router.delete("/{request_id}/operations-signatures/{user_id}")
-async def remove_operations_signature(
+def remove_operations_signature(
     request_id: str,
     user_id: str,
     current_user: dict = Depends(require_section("requests"))
@@ -627,6 +638,7 @@ async def remove_operations_signature(
             "$set": {"updated_at": datetime.utcnow(), "status": "in_progress"}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -638,6 +650,7 @@ async def remove_operations_signature(
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
     
     return {"message": "Signature removed successfully"}
 
@@ -706,7 +719,7 @@ async def update_operations_status(
         
         # Log to audit logs
         is_rejected = 'reject' in state.get('slug', '').lower()
-        db.logs.insert_one({
+        log_journal({
             'collection': 'depo_requests',
             'object_id': request_id,
             'action': 'operations_decision',
@@ -21,6 +21,74 @@ def normalize_batch_code(value: Any) -> Tuple[str, int | None, str]:
     return text, numeric, prefix
 
 
+def batch_code_fields(batch_codes: Any) -> dict:
+    """
+    Materialized batch code fields, stored next to `batch_codes`
+    (depo_requests) or the build order group (depo_build_orders).
+
+    Returns {'batch_codes_text': [...], 'batch_prefixes': [...]}, unique values
+    in input order. Both fields are indexed, so related documents are found
+    with one `$in` query instead of normalizing every code in Python.
+    """
+    if isinstance(batch_codes, (str, int)):
+        batch_codes = [batch_codes]
+
+    texts: List[str] = []
+    prefixes: List[str] = []
+    for code in batch_codes or []:
+        if code is None:
+            continue
+        text, _, prefix = normalize_batch_code(code)
+        if not text:
+            continue
+        if text not in texts:
+            texts.append(text)
+        if prefix and prefix not in prefixes:
+            prefixes.append(prefix)
+    return {"batch_codes_text": texts, "batch_prefixes": prefixes}
+
+
+def backfill_batch_prefixes(db, batch_size: int = 500, force: bool = False) -> dict:
+    """
+    Write batch_codes_text / batch_prefixes on documents created before they
+    were materialized (idempotent).
+
+    Args:
+        db: Database
+        batch_size: Documents per bulk_write
+        force: Recompute every document, not only the ones missing the fields
+
+    Returns:
+        {'depo_requests': updated, 'depo_build_orders': updated}
+    """
+    from pymongo import UpdateOne
+
+    sources = {
+        "depo_requests": lambda doc: doc.get("batch_codes") or [],
+        "depo_build_orders": lambda doc: (doc.get("grup") or {}).get("batch_codes")
+        or [doc.get("batch_code_text") or doc.get("batch_code")],
+    }
+    projections = {
+        "depo_requests": {"batch_codes": 1},
+        "depo_build_orders": {"grup": 1, "batch_code_text": 1, "batch_code": 1},
+    }
+
+    report = {}
+    for collection_name, get_codes in sources.items():
+        query = {} if force else {"batch_prefixes": {"$exists": False}}
+        updated = 0
+        ops = []
+        for doc in db[collection_name].find(query, projections[collection_name]):
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": batch_code_fields(get_codes(doc))}))
+            if len(ops) >= batch_size:
+                updated += db[collection_name].bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += db[collection_name].bulk_write(ops, ordered=False).modified_count
+        report[collection_name] = updated
+    return report
+
+
 def _to_object_id(value: Any) -> Any:
     if not value:
         return value
@@ -58,6 +126,11 @@ def ensure_build_orders_for_request(
     if not batch_codes_text:
         return []
 
+    # Keep the request's materialized prefixes in sync (related-request lookups use them)
+    request_id = _to_object_id(request_doc.get("_id"))
+    if request_id:
+        db["depo_requests"].update_one({"_id": request_id}, {"$set": batch_code_fields(batch_codes_text)})
+
     build_orders_collection = db["depo_build_orders"]
     created_or_updated = []
 
@@ -71,6 +144,7 @@ def ensure_build_orders_for_request(
             "batch_code_text": text,
             "batch_prefix": prefix,
             "grup": {"batch_codes": batch_codes_text},
+            **batch_code_fields(batch_codes_text),
             "state_id": _to_object_id(BUILD_STATE_ID),
             "product_id": product_id,
             "location_id": location_id,
@@ -82,6 +156,7 @@ def ensure_build_orders_for_request(
             existing_group = existing.get("grup", {}).get("batch_codes") or []
             merged_group = list({*(str(x).strip() for x in existing_group if str(x).strip()), *batch_codes_text})
             build_data["grup"] = {"batch_codes": merged_group}
+            build_data.update(batch_code_fields(merged_group))
 
             build_orders_collection.update_one(
                 {"_id": existing["_id"]},
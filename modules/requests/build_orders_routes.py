@@ -3,20 +3,37 @@ Build Orders routes
 """
 from fastapi import APIRouter, HTTPException, Depends, Request
 from datetime import datetime
+import re
 from bson import ObjectId
+from src.backend.utils.reference_cache import get_reference, list_references
+from src.backend.utils.relation_loader import RelationLoader, id_variants
 from typing import Optional, Any
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.audit import log_journal
+from modules.inventory.stock_availability import refresh_batch_availability
+from modules.inventory.stock_movements import MovementType, create_movement, open_legacy_stocks
+from src.backend.utils.serializers import serialize_values
+from src.backend.utils.pagination import clamp_page_size, count_total, cursor_response, keyset_page
+from src.backend.utils.search import matching_ids
 from src.backend.utils.sections_permissions import (
     require_section,
     get_section_permissions,
     apply_scope_to_query,
     is_doc_in_scope
 )
-from src.backend.utils.approval_helpers import check_user_can_sign, normalize_officers
+from src.backend.utils.approval_helpers import (
+    check_approval_completion,
+    check_user_can_sign,
+    load_signature_context,
+    normalize_officers,
+    signature_matches_officer,
+)
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 
 from .build_orders_helpers import normalize_batch_code
+from .production_stock_operations import consume_materials
 from .utils import generate_request_reference
 
 
@@ -56,21 +73,7 @@ def _is_failed_state(state: Optional[dict]) -> bool:
 def _get_request_state(db, state_id):
     if not state_id:
         return None
-    try:
-        state_oid = ObjectId(state_id) if isinstance(state_id, str) else state_id
-        return db.depo_requests_states.find_one({'_id': state_oid})
-    except Exception:
-        return None
-
-
-def _fix_oid(value: Any):
-    if isinstance(value, ObjectId):
-        return str(value)
-    if isinstance(value, list):
-        return [_fix_oid(v) for v in value]
-    if isinstance(value, dict):
-        return {k: _fix_oid(v) for k, v in value.items()}
-    return value
+    return get_reference(db, 'depo_requests_states', state_id)
 
 
 def _ensure_build_order_scope(db, current_user: dict, build_order: dict) -> None:
@@ -108,35 +111,6 @@ def _apply_series_defaults(series: list, default_step_id: Optional[str]):
     return series
 
 
-def _signature_matches_officer(db, signature: dict, officer: dict) -> bool:
-    if officer.get("type") == "person":
-        return signature.get("user_id") == officer.get("reference")
-    if officer.get("type") != "role":
-        return False
-
-    role_reference = officer.get("reference")
-    role_id = None
-    if isinstance(role_reference, str) and ObjectId.is_valid(role_reference):
-        role_id = str(role_reference)
-    else:
-        role = db.roles.find_one({"slug": role_reference})
-        if role:
-            role_id = str(role.get("_id"))
-    if not role_id:
-        return False
-
-    try:
-        user = db.users.find_one({"_id": ObjectId(signature.get("user_id"))})
-    except Exception:
-        user = None
-    if not user:
-        return False
-    user_role = user.get("role")
-    if not user_role:
-        return False
-    return str(user_role) == role_id
-
-
 def _is_serie_completed(db, flow: dict, signatures: list) -> bool:
     if not flow:
         return False
@@ -146,12 +120,12 @@ def _is_serie_completed(db, flow: dict, signatures: list) -> bool:
     if not can_sign:
         min_signatures = 0
 
-    from src.backend.utils.approval_helpers import check_approval_completion
-    required_ok, _, _ = check_approval_completion(db, must_sign, signatures)
+    context = load_signature_context(db, must_sign + can_sign, signatures)
+    required_ok, _, _ = check_approval_completion(db, must_sign, signatures, context)
 
     optional_count = 0
     for signature in signatures:
-        if any(_signature_matches_officer(db, signature, officer) for officer in can_sign):
+        if any(signature_matches_officer(signature, officer, context) for officer in can_sign):
             optional_count += 1
     has_min = optional_count >= min_signatures
 
@@ -178,21 +152,15 @@ def _build_officers_from_template(db, template: dict) -> tuple[list, list]:
     return can_sign_officers, must_sign_officers
 
 
-def _match_prefix(batch_codes: list, prefix: str) -> bool:
-    if not prefix:
-        return False
-    for code in batch_codes or []:
-        _, _, code_prefix = normalize_batch_code(code)
-        if code_prefix and code_prefix == prefix:
-            return True
-    return False
-
-
 def _get_related_requests(db, prefix: str, open_only: bool = False):
+    # batch_prefixes is materialized on write (see build_orders_helpers.batch_code_fields)
     if not prefix:
         return []
-    requests_cursor = db.depo_requests.find(
-        {"batch_codes": {"$exists": True, "$ne": []}},
+    query = {"batch_prefixes": prefix}
+    if open_only:
+        query["open"] = True
+    return list(db.depo_requests.find(
+        query,
         {
             "reference": 1,
             "batch_codes": 1,
@@ -205,24 +173,53 @@ def _get_related_requests(db, prefix: str, open_only: bool = False):
             "recipe_part_id": 1,
             "destination": 1
         }
-    )
-    results = []
-    for req in requests_cursor:
-        if open_only and not req.get("open"):
-            continue
-        if _match_prefix(req.get("batch_codes", []), prefix):
-            results.append(req)
-    return results
+    ))
+
+
+def _build_orders_search_clause(db, search: Optional[str]) -> dict:
+    """
+    Mongo filter for the build orders search box
+
+    Matches batch code and location code (case-insensitive substring, like
+    the old post-join filter) and product name/IPN (indexed part search,
+    src/backend/utils/search.py). Parts and locations are resolved to ids
+    first, so depo_build_orders is filtered with `$in`.
+    """
+    term = (search or "").strip()
+    if not term:
+        return {}
+
+    pattern = {"$regex": re.escape(term), "$options": "i"}
+    or_clauses = [
+        {"batch_code_text": pattern},
+        {"batch_code": pattern},
+    ]
+
+    part_ids = matching_ids(db, "depo_parts", term)
+    if part_ids:
+        or_clauses.append({"product_id": {"$in": id_variants([str(pid) for pid in part_ids])}})
+
+    term_lower = term.lower()
+    location_ids = [
+        str(loc["_id"])
+        for loc in list_references(db, "depo_locations")
+        if term_lower in str(loc.get("code", loc["_id"])).lower()
+    ]
+    if location_ids:
+        or_clauses.append({"location_id": {"$in": id_variants(location_ids)}})
+
+    return {"$or": or_clauses}
 
 
 def _build_requests_by_prefix(db, prefixes: set[str]):
     if not prefixes:
         return {}
     requests_cursor = db.depo_requests.find(
-        {"batch_codes": {"$exists": True, "$ne": []}},
+        {"batch_prefixes": {"$in": list(prefixes)}},
         {
             "reference": 1,
             "batch_codes": 1,
+            "batch_prefixes": 1,
             "state_id": 1,
             "issue_date": 1,
             "created_at": 1,
@@ -231,15 +228,14 @@ def _build_requests_by_prefix(db, prefixes: set[str]):
     )
     result_map: dict[str, list] = {prefix: [] for prefix in prefixes}
     for req in requests_cursor:
-        for code in req.get("batch_codes", []) or []:
-            _, _, code_prefix = normalize_batch_code(code)
+        for code_prefix in req.get("batch_prefixes") or []:
             if code_prefix in result_map:
                 result_map[code_prefix].append(req)
     return result_map
 
 
 @router.get("/states")
-async def get_build_states(
+def get_build_states(
     current_user: dict = Depends(require_section("build-orders"))
 ):
     db = get_db()
@@ -251,13 +247,15 @@ async def get_build_states(
 
 @router.get("")
 @router.get("/")
-async def list_build_orders(
+def list_build_orders(
     search: Optional[str] = None,
     state_id: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: str = "exact",
     current_user: dict = Depends(require_section("build-orders"))
 ):
     db = get_db()
@@ -286,53 +284,39 @@ async def list_build_orders(
     if date_query:
         query["created_at"] = date_query
 
+    # Search filter: batch code, product name/IPN, location code (resolved before paginating)
+    search_clause = _build_orders_search_clause(db, search)
+    if search_clause:
+        query.update(search_clause)
+
     perms = get_section_permissions(db, current_user, "build-orders")
     query = apply_scope_to_query(db, current_user, perms, query, created_by_field="created_by")
 
-    build_orders = list(
-        build_orders_collection
-        .find(query)
-        .sort("created_at", -1)
-        .skip(skip)
-        .limit(limit)
-    )
-
-    # Prefetch related entities
-    part_ids = set()
-    location_ids = set()
-    state_ids = set()
-    for bo in build_orders:
-        if bo.get("product_id"):
-            part_ids.add(bo["product_id"])
-        if bo.get("location_id"):
-            location_ids.add(bo["location_id"])
-        if bo.get("state_id"):
-            state_ids.add(bo["state_id"])
-
-    parts_map = {}
-    if part_ids:
-        parts = list(db.depo_parts.find({'_id': {'$in': list(part_ids)}}))
-        for part in parts:
-            parts_map[str(part["_id"])] = {
-                "name": part.get("name", ""),
-                "ipn": part.get("ipn", "")
-            }
-
-    locations_map = {}
-    if location_ids:
-        locations = list(db.depo_locations.find({'_id': {'$in': list(location_ids)}}))
-        for loc in locations:
-            locations_map[str(loc["_id"])] = loc.get("code", str(loc["_id"]))
+    page = None
+    if cursor is not None:
+        page = keyset_page(build_orders_collection, query, cursor, limit, total_mode=total_mode)
+        build_orders = page["docs"]
+    else:
+        limit = clamp_page_size(limit)
+        counts = count_total(build_orders_collection, query, total_mode)
+        build_orders = list(
+            build_orders_collection
+            .find(query)
+            .sort("created_at", -1)
+            .skip(skip)
+            .limit(limit)
+        )
 
-    states_map = {}
-    if state_ids:
-        states = list(db.depo_build_states.find({'_id': {'$in': list(state_ids)}}))
-        for st in states:
-            states_map[str(st["_id"])] = st
+    # Prefetch related entities (locations and states come from the reference cache)
+    loader = RelationLoader(db)
+    loader.add("depo_parts", [bo.get("product_id") for bo in build_orders], projection={"name": 1, "ipn": 1})
+    loader.add("depo_locations", [bo.get("location_id") for bo in build_orders])
+    loader.add("depo_build_states", [bo.get("state_id") for bo in build_orders])
+    loader.load()
 
     # Build request states map
     request_state_map = {}
-    for st in db.depo_requests_states.find({}, {"name": 1}):
+    for st in list_references(db, "depo_requests_states"):
         request_state_map[str(st["_id"])] = st.get("name", "Unknown")
 
     prefixes = set()
@@ -345,7 +329,7 @@ async def list_build_orders(
 
     results = []
     for bo in build_orders:
-        bo = _fix_oid(bo)
+        bo = serialize_values(bo)
         prefix = bo.get("batch_prefix") or normalize_batch_code(bo.get("batch_code_text") or bo.get("batch_code"))[2]
         related_requests = requests_by_prefix.get(prefix, [])
 
@@ -364,15 +348,17 @@ async def list_build_orders(
 
         group_codes = bo.get("grup", {}).get("batch_codes") or []
         campaign = len(group_codes) > 1
-        product_detail = parts_map.get(str(bo.get("product_id")), {})
-        state_detail = states_map.get(str(bo.get("state_id")), {})
+        product = loader.get("depo_parts", bo.get("product_id"))
+        product_detail = {"name": product.get("name", ""), "ipn": product.get("ipn", "")} if product else {}
+        location = loader.get("depo_locations", bo.get("location_id"))
+        state_detail = loader.get("depo_build_states", bo.get("state_id")) or {}
 
         results.append({
             "_id": bo.get("_id"),
             "batch_code": bo.get("batch_code_text") or bo.get("batch_code"),
             "batch_prefix": prefix,
             "location_id": bo.get("location_id"),
-            "location_name": locations_map.get(str(bo.get("location_id"))),
+            "location_name": location.get("code", str(location["_id"])) if location else None,
             "product_id": bo.get("product_id"),
             "product_name": product_detail.get("name"),
             "product_ipn": product_detail.get("ipn"),
@@ -383,28 +369,20 @@ async def list_build_orders(
             "requests": related_requests_out
         })
 
-    # Search filter (post-join)
-    if search:
-        term = search.strip().lower()
-        if term:
-            results = [
-                row for row in results
-                if (str(row.get("batch_code", "")).lower().find(term) >= 0)
-                or (str(row.get("product_name", "")).lower().find(term) >= 0)
-                or (str(row.get("product_ipn", "")).lower().find(term) >= 0)
-                or (str(row.get("location_name", "")).lower().find(term) >= 0)
-            ]
+    if page is not None:
+        return cursor_response(results, page)
 
     return {
         "results": results,
-        "total": len(results),
+        "total": counts["total"],
+        "total_capped": counts["total_capped"],
         "skip": skip,
         "limit": limit
     }
 
 
 @router.get("/{build_order_id}")
-async def get_build_order(
+def get_build_order(
     build_order_id: str,
     current_user: dict = Depends(require_section("build-orders"))
 ):
@@ -428,7 +406,7 @@ async def get_build_order(
 
     _ensure_build_order_scope(db, current_user, build_order)
 
-    build_order = _fix_oid(build_order)
+    build_order = serialize_values(build_order)
 
     if build_order.get("product_id"):
         product = db.depo_parts.find_one({"_id": ObjectId(build_order["product_id"])})
@@ -442,7 +420,7 @@ async def get_build_order(
             }
 
     if build_order.get("location_id"):
-        location = db.depo_locations.find_one({"_id": ObjectId(build_order["location_id"])})
+        location = get_reference(db, "depo_locations", build_order["location_id"])
         if location:
             build_order["location_detail"] = {
                 "_id": str(location["_id"]),
@@ -451,7 +429,7 @@ async def get_build_order(
             }
 
     if build_order.get("state_id"):
-        state = db.depo_build_states.find_one({"_id": ObjectId(build_order["state_id"])})
+        state = get_reference(db, "depo_build_states", build_order["state_id"])
         if state:
             build_order["state_detail"] = {
                 "_id": str(state["_id"]),
@@ -829,12 +807,12 @@ def _collect_group_series(
 
     series = _merge_series_materials(series, base_materials)
     series = _apply_series_defaults(series, default_step_id)
-    series = _fix_oid(series)
+    series = serialize_values(series)
     return series, productions
 
 
 @router.get("/{build_order_id}/production")
-async def get_build_order_production(
+def get_build_order_production(
     build_order_id: str,
     current_user: dict = Depends(require_section("build-orders"))
 ):
@@ -883,14 +861,14 @@ async def get_build_order_production(
 
     series, _ = _collect_group_series(db, batch_codes, owner_by_code, base_materials, default_step_id)
 
-    production_payload = _fix_oid(production)
+    production_payload = serialize_values(production)
     production_payload["series"] = series
     production_payload["group_build_orders"] = group_build_orders
     return production_payload
 
 
 @router.get("/{build_order_id}/production-remaining")
-async def get_build_order_production_remaining(
+def get_build_order_production_remaining(
     build_order_id: str,
     current_user: dict = Depends(require_section("build-orders"))
 ):
@@ -949,67 +927,49 @@ async def _execute_build_order_stock_movements(db, build_order: dict, series: li
 
     stocks_collection = db['depo_stocks']
 
+    active_series = []
     for serie in series:
-        batch_code = serie.get('batch_code')
-        materials = serie.get('materials', [])
-        decision_status = serie.get('decision_status')
-        state = _get_request_state(db, decision_status)
-        is_canceled = _is_canceled_state(state)
-        is_failed = _is_failed_state(state)
-        if is_canceled:
-            continue
-        if not batch_code:
+        state = _get_request_state(db, serie.get('decision_status'))
+        if _is_canceled_state(state) or not serie.get('batch_code'):
             continue
+        active_series.append((serie, _is_failed_state(state)))
 
-        for material in materials:
+    consumption = []
+    for serie, _ in active_series:
+        for material in serie.get('materials', []):
             part_id = material.get('part')
             used_qty = float(material.get('used_qty') or 0)
-            material_batch = material.get('batch', '')
             if not part_id or used_qty <= 0:
                 continue
+            consumption.append({
+                'part_id': ObjectId(part_id) if isinstance(part_id, str) else part_id,
+                'batch_code': material.get('batch', ''),
+                'quantity': used_qty,
+                'produced_batch': serie.get('batch_code')
+            })
 
-            if isinstance(part_id, str):
-                part_id = ObjectId(part_id)
-
-            query = {
-                'part_id': part_id,
-                'location_id': location_id,
-                'quantity': {'$gt': 0}
-            }
-            if material_batch:
-                query['batch_code'] = material_batch
-
-            material_stocks = list(stocks_collection.find(query).sort('created_at', 1))
-            if not material_stocks:
-                continue
-
-            remaining_qty = used_qty
-            for stock in material_stocks:
-                if remaining_qty <= 0:
-                    break
-                available_qty = stock.get('quantity', 0)
-                reduce_qty = min(remaining_qty, available_qty)
-
-                stocks_collection.update_one(
-                    {'_id': stock['_id']},
-                    {'$inc': {'quantity': -reduce_qty}, '$set': {'updated_at': timestamp}}
-                )
-
-                db.logs.insert_one({
-                    'collection': 'depo_stocks',
-                    'action': 'build_order_consumption',
-                    'build_order_id': str(build_order.get('_id')),
-                    'part_id': str(part_id),
-                    'quantity': -reduce_qty,
-                    'location': str(location_id),
-                    'batch_code': material_batch,
-                    'produced_batch': batch_code,
-                    'user': current_user.get('username'),
-                    'timestamp': timestamp
-                })
-
-                remaining_qty -= reduce_qty
+    consumed = consume_materials(
+        db, location_id, consumption, 'BUILD_ORDER', build_order.get('_id'), current_user.get('username', 'system')
+    )
+    for material in consumed:
+        for _, reduce_qty in material['consumed']:
+            log_journal({
+                'collection': 'depo_stocks',
+                'action': 'build_order_consumption',
+                'build_order_id': str(build_order.get('_id')),
+                'part_id': str(material['part_id']),
+                'quantity': -reduce_qty,
+                'location': str(location_id),
+                'batch_code': material['batch_code'],
+                'produced_batch': material['produced_batch'],
+                'user': current_user.get('username'),
+                'timestamp': timestamp
+            })
 
+    for serie, is_failed in active_series:
+        batch_code = serie.get('batch_code')
+        materials = serie.get('materials', [])
+        decision_status = serie.get('decision_status')
         produced_qty = float(serie.get('produced_qty') or 0)
         if produced_qty > 0:
             materials_used = []
@@ -1031,6 +991,9 @@ async def _execute_build_order_stock_movements(db, build_order: dict, series: li
             })
 
             if existing_stock:
+                # Carry its legacy quantity into the ledger before the receipt below
+                open_legacy_stocks(db, [existing_stock], current_user.get('username', 'system'))
+                output_stock_id = existing_stock['_id']
                 stocks_collection.update_one(
                     {'_id': existing_stock['_id']},
                     {
@@ -1080,9 +1043,15 @@ async def _execute_build_order_stock_movements(db, build_order: dict, series: li
                         new_stock['expiry_date'] = datetime.fromisoformat(str(serie.get('expiry_date')).replace('Z', '+00:00'))
                     except Exception:
                         new_stock['expiry_date'] = serie.get('expiry_date')
-                stocks_collection.insert_one(new_stock)
-
-            db.logs.insert_one({
+                output_stock_id = stocks_collection.insert_one(new_stock).inserted_id
+            create_movement(
+                db, output_stock_id, product_id, batch_code, MovementType.RECEIPT, produced_qty,
+                None, location_id, 'BUILD_ORDER', build_order.get('_id'), current_user.get('username', 'system'),
+                notes=f"Produced from build order {build_order.get('batch_code_text') or build_order.get('batch_code')}"
+            )
+            refresh_batch_availability(db, product_id, batch_code)
+
+            log_journal({
                 'collection': 'depo_stocks',
                 'action': 'build_order_output',
                 'build_order_id': str(build_order.get('_id')),
@@ -1179,7 +1148,7 @@ async def save_build_order_production(
 
 
 @router.get("/{build_order_id}/production-flow")
-async def get_build_order_production_flow(
+def get_build_order_production_flow(
     build_order_id: str,
     current_user: dict = Depends(require_section("build-orders"))
 ):
@@ -1232,6 +1201,7 @@ async def get_build_order_production_flow(
                 "updated_at": datetime.utcnow()
             }
             result = db.approval_flows.insert_one(flow_data)
+            sync_approval_inbox(db, result.inserted_id)
             flow = db.approval_flows.find_one({"_id": result.inserted_id})
         elif flow and template:
             has_officers = bool(flow.get("can_sign_officers") or flow.get("must_sign_officers"))
@@ -1247,6 +1217,7 @@ async def get_build_order_production_flow(
                         "config_slug": config_slug
                     }}
                 )
+                sync_approval_inbox(db, flow["_id"])
                 flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
             elif not template and not flow:
                 pass
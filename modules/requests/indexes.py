@@ -0,0 +1,97 @@
+"""
+Requests module index declarations
+Picked up by src/backend/utils/indexes.py (see there for the spec format)
+"""
+from bson import ObjectId
+
+
+INDEXES = [
+    # Requests
+    {'collection': 'depo_requests', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_requests', 'name': 'state_created_at', 'keys': [('state_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_requests', 'name': 'created_by_created_at', 'keys': [('created_by', 1), ('created_at', -1)]},
+    {'collection': 'depo_requests', 'name': 'batch_codes', 'keys': [('batch_codes', 1)]},
+    {'collection': 'depo_requests', 'name': 'batch_prefixes_open', 'keys': [('batch_prefixes', 1), ('open', 1)]},
+    {'collection': 'depo_requests', 'name': 'batch_codes_text', 'keys': [('batch_codes_text', 1)]},
+    {'collection': 'depo_requests', 'name': 'items_part', 'keys': [('items.part', 1)]},
+    {'collection': 'depo_requests', 'name': 'updated_at', 'keys': [('updated_at', -1)]},
+    {'collection': 'depo_requests', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'depo_requests', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+    {'collection': 'depo_requests_states', 'name': 'slug', 'keys': [('slug', 1)]},
+
+    # Production
+    {'collection': 'depo_production', 'name': 'request_id', 'keys': [('request_id', 1)]},
+    {'collection': 'depo_recipes', 'name': 'part_id', 'keys': [('part_id', 1)]},
+
+    # Build orders
+    {'collection': 'depo_build_orders', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_build_orders', 'name': 'state_created_at', 'keys': [('state_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_build_orders', 'name': 'batch_code_text', 'keys': [('batch_code_text', 1)]},
+    {'collection': 'depo_build_orders', 'name': 'batch_code', 'keys': [('batch_code', 1)]},
+    {'collection': 'depo_build_orders', 'name': 'batch_prefix', 'keys': [('batch_prefix', 1)]},
+    {'collection': 'depo_build_orders', 'name': 'batch_prefixes', 'keys': [('batch_prefixes', 1)]},
+    {'collection': 'depo_build_orders', 'name': 'product_id', 'keys': [('product_id', 1)]},
+    {'collection': 'depo_build_orders', 'name': 'location_id', 'keys': [('location_id', 1)]},
+    {'collection': 'depo_build_production', 'name': 'build_order_id', 'keys': [('build_order_id', 1)]},
+    {'collection': 'depo_build_production', 'name': 'series_batch_code', 'keys': [('series.batch_code', 1)]},
+]
+
+
+QUERY_PROBES = [
+    {
+        'name': 'requests_list',
+        'collection': 'depo_requests',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'requests_by_state',
+        'collection': 'depo_requests',
+        'filter': {'state_id': ObjectId()},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'requests_by_batch_codes',
+        'collection': 'depo_requests',
+        'filter': {'batch_codes': {'$in': ['1234']}}
+    },
+    {
+        'name': 'requests_by_batch_prefix',
+        'collection': 'depo_requests',
+        'filter': {'batch_prefixes': {'$in': ['123456']}}
+    },
+    {
+        'name': 'open_requests_by_batch_prefix',
+        'collection': 'depo_requests',
+        'filter': {'batch_prefixes': '123456', 'open': True}
+    },
+    {
+        'name': 'requests_search',
+        'collection': 'depo_requests',
+        'filter': {'search_grams': {'$all': ['bol', 'olt']}}
+    },
+    {
+        'name': 'production_by_request',
+        'collection': 'depo_production',
+        'filter': {'request_id': ObjectId()},
+        'limit': 1
+    },
+    {
+        'name': 'build_orders_list',
+        'collection': 'depo_build_orders',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'build_orders_by_state',
+        'collection': 'depo_build_orders',
+        'filter': {'state_id': ObjectId()},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'build_production_by_order',
+        'collection': 'depo_build_production',
+        'filter': {'build_order_id': ObjectId()},
+        'limit': 1
+    },
+]
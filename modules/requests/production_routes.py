@@ -7,9 +7,15 @@ from bson import ObjectId
 from typing import List, Optional
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.audit import log_journal
+from modules.inventory.stock_availability import refresh_batch_availability
+from modules.inventory.stock_movements import MovementType, create_movement, open_legacy_stocks
 from src.backend.routes.auth import verify_token
 from src.backend.utils.sections_permissions import require_section
 from .utils import generate_request_reference
+from .production_stock_operations import consume_materials
 
 
 router = APIRouter()
@@ -49,10 +55,7 @@ def _is_failed_state(state: Optional[dict]) -> bool:
 def _get_state_by_id(db, state_id: Optional[str]) -> Optional[dict]:
     if not state_id:
         return None
-    try:
-        return db.depo_requests_states.find_one({'_id': ObjectId(state_id)})
-    except Exception:
-        return None
+    return get_reference(db, 'depo_requests_states', state_id)
 
 
 def _build_unused_material_totals(series: list) -> dict:
@@ -124,7 +127,7 @@ def _log_excessive_loss(
         if loss_percent <= threshold:
             continue
 
-        db.logs.insert_one({
+        log_journal({
             'collection': 'depo_requests',
             'object_id': str(request_doc.get('_id')),
             'action': 'production_loss_excess',
@@ -141,7 +144,7 @@ def _log_excessive_loss(
 
 
 @router.get("/{request_id}/production")
-async def get_production_data(
+def get_production_data(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -313,88 +316,65 @@ async def execute_production_stock_movements(db, request_id: str, series: list,
     stocks_collection = db['depo_stocks']
     movements_created = 0
     
-    # Process each series (batch code)
+    active_series = []
     for serie in series:
         batch_code = serie.get('batch_code')
-        materials = serie.get('materials', [])
-        decision_status = serie.get('decision_status')
-        state = _get_state_by_id(db, decision_status)
-        is_canceled = _is_canceled_state(state)
-        is_failed = _is_failed_state(state)
-        if is_canceled:
+        state = _get_state_by_id(db, serie.get('decision_status'))
+        if _is_canceled_state(state):
             print(f"[PRODUCTION] Skipping serie {batch_code} - decision is canceled")
             continue
-        
         if not batch_code:
             continue
-        
-        # 1. Reduce stock for consumed materials
-        for material in materials:
+        active_series.append((serie, _is_failed_state(state)))
+    
+    # 1. Reduce stock for consumed materials (FEFO / FIFO, one ledger post for all series)
+    consumption = []
+    for serie, _ in active_series:
+        for material in serie.get('materials', []):
             part_id = material.get('part')
             used_qty = material.get('used_qty', 0)
-            material_batch = material.get('batch', '')
-            
             if not part_id or used_qty <= 0:
                 continue
-            
-            # Convert part_id to ObjectId if needed
-            if isinstance(part_id, str):
-                part_id = ObjectId(part_id)
-            
-            # Find stock at destination location with matching part and batch
-            query = {
-                'part_id': part_id,
-                'location_id': destination_id,
-                'quantity': {'$gt': 0}
-            }
-            
-            if material_batch:
-                query['batch_code'] = material_batch
-            
-            material_stocks = list(stocks_collection.find(query).sort('created_at', 1))
-            
-            if not material_stocks:
-                print(f"[PRODUCTION] Warning: No stock found for part {part_id}, batch {material_batch}")
-                continue
-            
-            # Reduce stock (FIFO)
-            remaining_qty = used_qty
-            for stock in material_stocks:
-                if remaining_qty <= 0:
-                    break
-                
-                available_qty = stock.get('quantity', 0)
-                reduce_qty = min(remaining_qty, available_qty)
-                
-                # Reduce quantity
-                stocks_collection.update_one(
-                    {'_id': stock['_id']},
-                    {
-                        '$inc': {'quantity': -reduce_qty},
-                        '$set': {'updated_at': timestamp}
-                    }
-                )
-                
-                # Log the consumption
-                db.logs.insert_one({
-                    'collection': 'depo_stocks',
-                    'action': 'production_consumption',
-                    'request_id': request_id,
-                    'request_reference': request.get('reference'),
-                    'part_id': str(part_id),
-                    'quantity': -reduce_qty,
-                    'location': str(destination_id),
-                    'batch_code': material_batch,
-                    'produced_batch': batch_code,
-                    'user': current_user.get('username'),
-                    'timestamp': timestamp
-                })
-                
-                remaining_qty -= reduce_qty
-                movements_created += 1
-            
-            if remaining_qty > 0:
-                print(f"[PRODUCTION] Warning: Could not consume full quantity for part {part_id}. Remaining: {remaining_qty}")
+            consumption.append({
+                'part_id': ObjectId(part_id) if isinstance(part_id, str) else part_id,
+                'batch_code': material.get('batch', ''),
+                'quantity': used_qty,
+                'produced_batch': serie.get('batch_code')
+            })
+    
+    consumed = consume_materials(
+        db, destination_id, consumption, 'PRODUCTION_ORDER', ObjectId(request_id), current_user.get('username', 'system')
+    )
+    for material in consumed:
+        if not material['found']:
+            print(f"[PRODUCTION] Warning: No stock found for part {material['part_id']}, batch {material['batch_code']}")
+            continue
+        
+        for _, reduce_qty in material['consumed']:
+            # Log the consumption
+            log_journal({
+                'collection': 'depo_stocks',
+                'action': 'production_consumption',
+                'request_id': request_id,
+                'request_reference': request.get('reference'),
+                'part_id': str(material['part_id']),
+                'quantity': -reduce_qty,
+                'location': str(destination_id),
+                'batch_code': material['batch_code'],
+                'produced_batch': material['produced_batch'],
+                'user': current_user.get('username'),
+                'timestamp': timestamp
+            })
+            movements_created += 1
+        
+        if material['remaining'] > 0:
+            print(f"[PRODUCTION] Warning: Could not consume full quantity for part {material['part_id']}. Remaining: {material['remaining']}")
+    
+    # Process each series (batch code)
+    for serie, is_failed in active_series:
+        batch_code = serie.get('batch_code')
+        materials = serie.get('materials', [])
+        decision_status = serie.get('decision_status')
         
         # 2. Add stock for produced product with this batch code
         # Use explicit produced quantity from serie
@@ -420,6 +400,9 @@ async def execute_production_stock_movements(db, request_id: str, series: list,
             })
             
             if existing_stock:
+                # Carry its legacy quantity into the ledger before the receipt below
+                open_legacy_stocks(db, [existing_stock], current_user.get('username', 'system'))
+                output_stock_id = existing_stock['_id']
                 # Update existing
                 stocks_collection.update_one(
                     {'_id': existing_stock['_id']},
@@ -474,10 +457,16 @@ async def execute_production_stock_movements(db, request_id: str, series: list,
                         new_stock['expiry_date'] = datetime.fromisoformat(str(serie.get('expiry_date')).replace('Z', '+00:00'))
                     except Exception:
                         new_stock['expiry_date'] = serie.get('expiry_date')
-                stocks_collection.insert_one(new_stock)
+                output_stock_id = stocks_collection.insert_one(new_stock).inserted_id
+            create_movement(
+                db, output_stock_id, product_id, batch_code, MovementType.RECEIPT, produced_qty,
+                None, destination_id, 'PRODUCTION_ORDER', ObjectId(request_id), current_user.get('username', 'system'),
+                notes=f"Produced from request {request.get('reference', request_id)}"
+            )
+            refresh_batch_availability(db, product_id, batch_code)
             
             # Log the production
-            db.logs.insert_one({
+            log_journal({
                 'collection': 'depo_stocks',
                 'action': 'production_output',
                 'request_id': request_id,
@@ -557,7 +546,7 @@ async def update_production_status(
         
         # Log to audit logs
         is_canceled = str(state_id) == '67890abc1234567890abcde9'
-        db.logs.insert_one({
+        log_journal({
             'collection': 'depo_requests',
             'object_id': request_id,
             'action': 'production_decision',
@@ -582,7 +571,7 @@ async def update_production_status(
 
 
 @router.get("/{request_id}/production-flow")
-async def get_production_flow(
+def get_production_flow(
     request_id: str,
     current_user: dict = Depends(verify_token)
 ):
@@ -629,6 +618,7 @@ async def get_production_flow(
                         }
                         
                         result = db.approval_flows.insert_one(production_flow_data)
+                        sync_approval_inbox(db, result.inserted_id)
                         flow = db.approval_flows.find_one({"_id": result.inserted_id})
                         print(f"[PRODUCTION] Auto-created production flow for request {request_id}")
         except Exception as e:
@@ -727,6 +717,7 @@ async def sign_production(
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Check if flow is completed
     from .approval_helpers import check_flow_completion
@@ -745,6 +736,7 @@ async def sign_production(
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Execute stock operations
         try:
@@ -880,7 +872,7 @@ async def sign_production_series(
 
 
 @router.post("/{request_id}/production-return-order")
-async def create_production_return_order(
+def create_production_return_order(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
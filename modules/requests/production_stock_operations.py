@@ -4,7 +4,10 @@ Operațiuni stock pentru producție cu ledger system
 """
 from datetime import datetime
 from bson import ObjectId
-from typing import Dict, Any
+from src.backend.utils.reference_cache import get_reference
+from modules.inventory.allocation import allocate_lines
+from modules.inventory.stock_movements import InsufficientStockError, MovementType
+from typing import Dict, Any, List
 
 
 DESTROYED_STATE_ID = "694322538728e4d75ae7278c"
@@ -21,11 +24,7 @@ FAILED_TOKENS = [
 def _get_request_state(db, state_id):
     if not state_id:
         return None
-    try:
-        state_oid = ObjectId(state_id) if isinstance(state_id, str) else state_id
-        return db.depo_requests_states.find_one({'_id': state_oid})
-    except Exception:
-        return None
+    return get_reference(db, 'depo_requests_states', state_id)
 
 
 def _is_canceled_state(db, state_id) -> bool:
@@ -50,6 +49,53 @@ def _is_failed_state(db, state_id) -> bool:
     return any(token in haystack for token in FAILED_TOKENS) and not _is_canceled_state(db, state_id)
 
 
+def consume_materials(
+    db,
+    location_id: ObjectId,
+    materials: List[dict],
+    document_type: str,
+    document_id: ObjectId,
+    created_by: str
+) -> List[dict]:
+    """
+    Consume used materials at a location, earliest expiry first (then oldest),
+    through the allocation planner (modules/inventory/allocation.py)
+
+    Args:
+        materials: [{'part_id': ObjectId, 'batch_code': str ('' = any batch), 'quantity': float, ...}]
+
+    All materials are posted as one ledger document with guarded decrements;
+    later materials see what earlier ones took. What is not available is left
+    in 'remaining' instead of failing the whole consumption.
+
+    Returns:
+        materials, each with 'consumed' ([(stock_id, quantity)]), 'remaining'
+        and 'found' (some stock was available) added
+    """
+    if not materials:
+        return []
+
+    demands = [{**material, 'batch_code': material.get('batch_code') or None} for material in materials]
+    try:
+        plans = allocate_lines(
+            db, demands, [location_id], document_type, document_id, created_by,
+            movement_type=MovementType.CONSUMPTION, allow_partial=True
+        )['plans']
+    except InsufficientStockError as e:
+        print(f"[PRODUCTION] Warning: stock at location {location_id} kept changing, nothing consumed: {e}")
+        plans = [{'lines': [], 'shortfall': material['quantity']} for material in materials]
+
+    return [
+        {
+            **material,
+            'consumed': [(line['stock_id'], line['quantity']) for line in plan['lines']],
+            'remaining': plan['shortfall'],
+            'found': bool(plan['lines']),
+        }
+        for material, plan in zip(materials, plans)
+    ]
+
+
 async def execute_production_stock_operations(db, request_id: str, current_user: dict):
     """
     Execute stock operations after production approval
@@ -57,7 +103,7 @@ async def execute_production_stock_operations(db, request_id: str, current_user:
     1. Creare stock pentru produse finite (cu informații despre materiale)
     2. Consum materiale folosite (ledger system)
     """
-    from modules.inventory.services.stocks_service import create_stock, consume_stock
+    from modules.inventory.services.stocks_service import create_stock
     
     # Get request
     request = db.depo_requests.find_one({"_id": ObjectId(request_id)})
@@ -158,51 +204,31 @@ async def execute_production_stock_operations(db, request_id: str, current_user:
             print(f"[PRODUCTION] Error creating stock for serie {batch_code}: {e}")
             raise Exception(f"Failed to create stock for serie {batch_code}: {str(e)}")
     
-    # B. Consume materials using ledger system
+    # B. Consume materials using ledger system (one post for all materials)
+    consumption = []
     for serie in series:
         decision_status = serie.get('decision_status')
         if _is_canceled_state(db, decision_status):
             continue
-        materials = serie.get('materials', [])
-        
-        for material in materials:
+        for material in serie.get('materials', []):
             part_id = material.get('part')
-            used_qty = material.get('used_qty', 0)
-            batch_code = material.get('batch', '')
-            
-            if used_qty <= 0:
+            if material.get('used_qty', 0) <= 0 or not part_id:
                 continue
-            
-            # Find stock by part_id and batch_code
-            stock = db.depo_stocks.find_one({
+            consumption.append({
                 'part_id': ObjectId(part_id) if isinstance(part_id, str) else part_id,
-                'batch_code': batch_code
+                'batch_code': material.get('batch', ''),
+                'quantity': material.get('used_qty', 0),
+                'notes': f"Consumed for production serie {serie.get('batch_code')}"
             })
-            
-            if not stock:
-                print(f"[PRODUCTION] Warning: Stock not found for part {part_id}, batch {batch_code}")
-                continue
-            
-            try:
-                # Use ledger system to consume stock
-                await consume_stock(
-                    db=db,
-                    stock_id=str(stock['_id']),
-                    location_id=str(destination_location),
-                    quantity=used_qty,
-                    created_by=username,
-                    document_type='PRODUCTION_ORDER',
-                    document_id=str(request_id),
-                    notes=f"Consumed for production serie {serie.get('batch_code')}"
-                )
-                
-                print(f"[PRODUCTION] Consumed {used_qty} units of part {part_id}, batch {batch_code}")
-                
-            except Exception as e:
-                print(f"[PRODUCTION] Error consuming stock: {e}")
-                # Don't fail the whole operation, just log the error
-                # raise Exception(f"Failed to consume stock: {str(e)}")
-    
+
+    if consumption:
+        location_oid = ObjectId(destination_location) if isinstance(destination_location, str) else destination_location
+        consumed = consume_materials(db, location_oid, consumption, 'PRODUCTION_ORDER', ObjectId(request_id), username)
+        for material in consumed:
+            if material['remaining'] > 0:
+                print(f"[PRODUCTION] Error consuming stock: Insufficient stock for part {material['part_id']}, batch {material['batch_code']}. Missing: {material['remaining']}")
+        print(f"[PRODUCTION] Consumed {sum(len(material['consumed']) for material in consumed)} material lines")
+
     return {
         'created_stocks': len(created_stocks),
         'stocks': created_stocks
@@ -6,12 +6,17 @@ from datetime import datetime
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.audit import log_journal
+from modules.inventory.stock_availability import refresh_batch_availability
 from src.backend.utils.sections_permissions import require_section
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_user_can_sign
 
 from .approval_helpers import check_flow_completion, enrich_flow_with_user_details
 from .utils import generate_request_reference
+from .build_orders_helpers import batch_code_fields
 
 
 router = APIRouter()
@@ -33,11 +38,7 @@ def _is_rejected_state(state: dict) -> bool:
 def _get_location_detail(db, location_id):
     if not location_id:
         return None
-    try:
-        loc_oid = ObjectId(location_id) if isinstance(location_id, str) else location_id
-    except Exception:
-        return None
-    loc = db.depo_locations.find_one({"_id": loc_oid})
+    loc = get_reference(db, "depo_locations", location_id)
     if not loc:
         return None
     return {
@@ -49,7 +50,7 @@ def _get_location_detail(db, location_id):
 
 
 @router.get("/{request_id}/reception-flow")
-async def get_request_reception_flow(
+def get_request_reception_flow(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -71,7 +72,7 @@ async def get_request_reception_flow(
 
 
 @router.post("/{request_id}/reception-sign")
-async def sign_reception(
+def sign_reception(
     request_id: str,
     request: Request,
     current_user: dict = Depends(require_section("requests"))
@@ -141,6 +142,7 @@ async def sign_reception(
             }
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     # Check if approval conditions are met
     updated_flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
@@ -156,6 +158,7 @@ async def sign_reception(
                 }
             }
         )
+        sync_approval_inbox(db, flow["_id"])
         print(f"[REQUESTS] Reception flow approved for request {request_id}")
         
         # Update request state_id to Stock received&signed (694df205297c9dde6d70664d)
@@ -191,7 +194,7 @@ async def sign_reception(
             )
             
             # Log the state change
-            db.logs.insert_one({
+            log_journal({
                 'collection': 'depo_requests',
                 'object_id': request_id,
                 'action': 'reception_signed',
@@ -246,6 +249,7 @@ async def sign_reception(
                     }
                     
                     db.approval_flows.insert_one(production_flow_data)
+                    sync_approval_inbox(db, production_flow_data["_id"])
                     print(f"[REQUESTS] Auto-created production flow for request {request_id}")
                 else:
                     print(f"[REQUESTS] Warning: Production template {production_template_id} not found in approval_templates")
@@ -260,7 +264,7 @@ async def sign_reception(
 
 
 @router.delete("/{request_id}/reception-signatures/{user_id}")
-async def remove_reception_signature(
+def remove_reception_signature(
     request_id: str,
     user_id: str,
     current_user: dict = Depends(require_section("requests"))
@@ -284,6 +288,7 @@ async def remove_reception_signature(
             "$set": {"updated_at": datetime.utcnow(), "status": "in_progress"}
         }
     )
+    sync_approval_inbox(db, flow["_id"])
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
@@ -295,6 +300,7 @@ async def remove_reception_signature(
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
         
         # Update request state_id back to Warehouse Approved
         try:
@@ -325,6 +331,7 @@ async def remove_reception_signature(
             })
             if production_flow:
                 db.approval_flows.delete_one({"_id": production_flow["_id"]})
+                sync_approval_inbox(db, production_flow["_id"])
                 print(f"[REQUESTS] Deleted production flow for request {request_id}")
                 
                 # Also delete production data
@@ -449,6 +456,7 @@ async def update_reception_status(
                         return_doc['product_quantity'] = request_doc.get('product_quantity')
                     if request_doc.get('batch_codes'):
                         return_doc['batch_codes'] = request_doc.get('batch_codes')
+                        return_doc.update(batch_code_fields(request_doc.get('batch_codes')))
 
                     result = requests_collection.insert_one(return_doc)
                     return_request_id = str(result.inserted_id)
@@ -498,6 +506,7 @@ async def update_reception_status(
                                 }
 
                                 db.approval_flows.insert_one(flow_data)
+                                sync_approval_inbox(db, flow_data["_id"])
                                 print(f"[REQUESTS] Auto-created approval flow for return request {return_request_id}")
                     except Exception as e:
                         print(f"[REQUESTS] Warning: Failed to auto-create approval flow for return request: {e}")
@@ -528,12 +537,12 @@ async def update_reception_status(
             audit_entry['return_to_sender'] = True
             audit_entry['initial_destination_id'] = str(request_doc.get('destination')) if request_doc.get('destination') else None
             audit_entry['source_id'] = str(request_doc.get('source')) if request_doc.get('source') else None
-        db.logs.insert_one(audit_entry)
+        log_journal(audit_entry)
 
         if is_rejected and request_doc:
             initial_dest_detail = _get_location_detail(db, request_doc.get('destination'))
             source_detail = _get_location_detail(db, request_doc.get('source'))
-            db.logs.insert_one({
+            log_journal({
                 'collection': 'depo_requests',
                 'object_id': request_id,
                 'action': 'reception_return_to_sender',
@@ -673,9 +682,10 @@ async def update_reception_status(
                                     'request_reference': request_doc.get('reference')
                                 }
                                 stocks_collection.insert_one(new_stock)
+                            refresh_batch_availability(db, part_id, source_stock.get('batch_code', ''))
 
                             # Log the movement
-                            db.logs.insert_one({
+                            log_journal({
                                 'collection': 'depo_stocks',
                                 'action': 'stock_transfer',
                                 'request_id': request_id,
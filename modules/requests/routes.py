@@ -8,6 +8,11 @@ import requests
 from bson import ObjectId
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, matching_ids, refresh_search_fields, search_filter, touches_search_fields
+from src.backend.utils.serializers import serialize_values
+from src.backend.utils.pagination import clamp_page_size, count_total, cursor_response, keyset_page
 from src.backend.utils.config import load_config
 from src.backend.utils.sections_permissions import (
     require_section,
@@ -15,6 +20,8 @@ from src.backend.utils.sections_permissions import (
     apply_scope_to_query,
     is_doc_in_scope
 )
+
+from modules.inventory.part_summary import refresh_document_summaries
 
 from .models import RequestCreate, RequestUpdate
 from .utils import generate_request_reference
@@ -28,7 +35,7 @@ from .services import (
 )
 from .approval_routes import router as approval_router
 from .build_orders_routes import router as build_orders_router
-from .build_orders_helpers import ensure_build_orders_for_request
+from .build_orders_helpers import batch_code_fields, ensure_build_orders_for_request
 
 
 router = APIRouter(prefix="/modules/requests/api", tags=["requests"])
@@ -82,7 +89,7 @@ router.include_router(transfer_router)
 # ==================== STOCK LOCATIONS ====================
 
 @router.get("/states")
-async def get_request_states(
+def get_request_states(
     current_user: dict = Depends(require_section("requests"))
 ):
     """Get list of request states from MongoDB depo_requests_states"""
@@ -99,7 +106,7 @@ async def get_request_states(
 
 
 @router.get("/production-steps")
-async def get_production_steps(
+def get_production_steps(
     current_user: dict = Depends(require_section("requests")),
     db = Depends(get_db)
 ):
@@ -188,7 +195,7 @@ async def get_part_recipe(
 # ==================== REQUESTS CRUD ====================
 
 @router.get("/")
-async def list_requests(
+def list_requests(
     has_batch_codes: Optional[bool] = None,
     has_production: Optional[bool] = None,
     search: Optional[str] = None,
@@ -198,9 +205,15 @@ async def list_requests(
     extra: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    total_mode: str = "exact",
     current_user: dict = Depends(require_section("requests"))
 ):
-    """List all requests with location names from depo_locations"""
+    """
+    List all requests with location names from depo_locations
+
+    Pass `cursor` (empty for the first page, then `next_cursor`) for keyset pagination.
+    """
     db = get_db()
     requests_collection = db['depo_requests']
     locations_collection = db['depo_locations']
@@ -283,34 +296,18 @@ async def list_requests(
     if search:
         search = search.strip()
         if search:
-            or_clauses = [
-                {'reference': {'$regex': search, '$options': 'i'}},
-                {'notes': {'$regex': search, '$options': 'i'}},
-                {'items.batch_code': {'$regex': search, '$options': 'i'}},
-            ]
+            or_clauses = list(search_filter('depo_requests', search)['$or'])
 
             # Match locations by name/code
-            locs = list(locations_collection.find({
-                '$or': [
-                    {'name': {'$regex': search, '$options': 'i'}},
-                    {'code': {'$regex': search, '$options': 'i'}}
-                ]
-            }, {'_id': 1}))
-            if locs:
-                loc_ids = [l['_id'] for l in locs]
+            loc_ids = matching_ids(db, 'depo_locations', search)
+            if loc_ids:
                 loc_variants = loc_ids + [str(x) for x in loc_ids]
                 or_clauses.append({'source': {'$in': loc_variants}})
                 or_clauses.append({'destination': {'$in': loc_variants}})
 
             # Match parts by name or IPN
-            parts = list(parts_collection.find({
-                '$or': [
-                    {'name': {'$regex': search, '$options': 'i'}},
-                    {'ipn': {'$regex': search, '$options': 'i'}}
-                ]
-            }, {'_id': 1}))
-            if parts:
-                part_ids = [p['_id'] for p in parts]
+            part_ids = matching_ids(db, 'depo_parts', search)
+            if part_ids:
                 part_variants = part_ids + [str(x) for x in part_ids]
                 or_clauses.append({'items.part': {'$in': part_variants}})
 
@@ -319,14 +316,20 @@ async def list_requests(
     perms = get_section_permissions(db, current_user, "requests")
     query = apply_scope_to_query(db, current_user, perms, query, created_by_field="created_by")
 
-    total = requests_collection.count_documents(query)
-    requests_list = list(
-        requests_collection
-        .find(query)
-        .sort('created_at', -1)
-        .skip(skip)
-        .limit(limit)
-    )
+    page = None
+    if cursor is not None:
+        page = keyset_page(requests_collection, query, cursor, limit, total_mode=total_mode, projection=WITHOUT_SEARCH_FIELDS)
+        requests_list = page['docs']
+    else:
+        limit = clamp_page_size(limit)
+        total = count_total(requests_collection, query, total_mode)['total']
+        requests_list = list(
+            requests_collection
+            .find(query, WITHOUT_SEARCH_FIELDS)
+            .sort('created_at', -1)
+            .skip(skip)
+            .limit(limit)
+        )
     
     # Get all unique location ObjectIds
     location_oids = set()
@@ -353,16 +356,6 @@ async def list_requests(
         except Exception as e:
             print(f"Warning: Failed to fetch locations: {e}")
     
-    # Helper to recursively convert ObjectId to string
-    def fix_oid(obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, list):
-            return [fix_oid(x) for x in obj]
-        if isinstance(obj, dict):
-            return {k: fix_oid(v) for k, v in obj.items()}
-        return obj
-
     # Get all unique part ObjectIds from items and product_id
     part_oids = set()
     for req in requests_list:
@@ -401,7 +394,7 @@ async def list_requests(
     
     for req in requests_list:
         # Apply recursive conversion first
-        req = fix_oid(req)
+        req = serialize_values(req)
         
         # Helper to safely get value (now strings)
         def get_val(doc, key):
@@ -433,13 +426,10 @@ async def list_requests(
                 req['product_detail'] = part_map[product_id]
         
         # Get state info from state_id and set status
-        # Note: fix_oid already converted state_id to string if it was ObjectId
+        # Note: serialize_values already converted state_id to string if it was ObjectId
         if req.get('state_id'):
-            states_collection = db['depo_requests_states']
             try:
-                # We need ObjectId for lookup
-                state_id_obj = ObjectId(req['state_id'])
-                state = states_collection.find_one({'_id': state_id_obj})
+                state = get_reference(db, 'depo_requests_states', req['state_id'])
                 if state:
                     # Set status from state name
                     req['status'] = state.get('name', 'Unknown')
@@ -448,21 +438,13 @@ async def list_requests(
         if not req.get('status'):
             req['status'] = 'Pending'
         
-        # Handle dates that might be datetime objects (fix_oid doesn't touch datetime unless we add it)
-        # But fix_oid above didn't handle datetime.
-        # Let's verify if pymongo returns datetime or strings. It returns datetime.
-        # We should handle datetime in fix_oid or separately.
-        
-        # Let's perform manual datetime conversion as before to be safe/consistent
-        if 'created_at' in req and isinstance(req['created_at'], datetime):
-            req['created_at'] = req['created_at'].isoformat()
-        if 'updated_at' in req and isinstance(req['updated_at'], datetime):
-            req['updated_at'] = req['updated_at'].isoformat()
-        if 'issue_date' in req and isinstance(req['issue_date'], datetime):
-            req['issue_date'] = req['issue_date'].isoformat()
+        # Datetimes are encoded by the response class (MongoJSONResponse)
             
         processed_list.append(req)
     
+    if page is not None:
+        return cursor_response(processed_list, page)
+
     return {
         "results": processed_list,
         "total": total,
@@ -472,7 +454,7 @@ async def list_requests(
 
 
 @router.get("/{request_id}")
-async def get_request(
+def get_request(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -678,7 +660,7 @@ async def get_request(
 
 
 @router.get("/{request_id}/movements")
-async def get_request_movements(
+def get_request_movements(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -756,7 +738,7 @@ async def get_request_movements(
 
 
 @router.post("/")
-async def create_request(
+def create_request(
     request_data: RequestCreate,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -814,6 +796,8 @@ async def create_request(
     
     result = requests_collection.insert_one(request_doc)
     request_id = str(result.inserted_id)
+    refresh_document_summaries(db, 'depo_requests', result.inserted_id)
+    refresh_search_fields(db, 'depo_requests', result.inserted_id)
     request_doc['_id'] = request_id
     
     # Convert all ObjectIds to strings
@@ -877,6 +861,7 @@ async def create_request(
                 }
                 
                 db.approval_flows.insert_one(flow_data)
+                sync_approval_inbox(db, flow_data["_id"])
                 print(f"[REQUESTS] Auto-created approval flow for request {request_id}")
     except Exception as e:
         print(f"[REQUESTS] Warning: Failed to auto-create approval flow: {e}")
@@ -886,7 +871,7 @@ async def create_request(
 
 
 @router.patch("/{request_id}")
-async def update_request(
+def update_request(
     request_id: str,
     request_data: RequestUpdate,
     current_user: dict = Depends(require_section("requests"))
@@ -943,6 +928,7 @@ async def update_request(
         update_data['labels'] = request_data.labels
     if request_data.batch_codes is not None:
         update_data['batch_codes'] = request_data.batch_codes
+        update_data.update(batch_code_fields(request_data.batch_codes))
         if request_data.batch_codes:
             update_data['open'] = True
         else:
@@ -985,6 +971,10 @@ async def update_request(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=422, detail=f"Failed to update request: {str(e)}")
+    if request_data.items is not None:
+        refresh_document_summaries(db, 'depo_requests', req_obj_id, existing)
+    if touches_search_fields('depo_requests', [*update_data, *unset_data]):
+        refresh_search_fields(db, 'depo_requests', req_obj_id)
     
     # Get updated request
     updated = requests_collection.find_one({'_id': req_obj_id})
@@ -1065,7 +1055,7 @@ async def update_request(
 
 
 @router.delete("/{request_id}")
-async def delete_request(
+def delete_request(
     request_id: str,
     current_user: dict = Depends(require_section("requests"))
 ):
@@ -1087,5 +1077,6 @@ async def delete_request(
 
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Request not found")
+    refresh_document_summaries(db, 'depo_requests', req_obj_id, existing)
     
     return {"success": True, "message": "Request deleted successfully"}
@@ -0,0 +1,49 @@
+"""
+Unit tests for approval completion (src/backend/utils/approval_helpers.py)
+"""
+import pytest
+from bson import ObjectId
+
+from src.backend.utils.approval_helpers import check_approval_completion
+
+ROLE_IDS = [str(ObjectId()) for _ in range(5)]
+
+
+@pytest.fixture
+def signers(mock_db):
+    """20 signers, the first 5 holding ROLE_IDS; role slug 'qa' is ROLE_IDS[0]"""
+    users = [{"_id": ObjectId(), "role": ROLE_IDS[i] if i < len(ROLE_IDS) else None} for i in range(20)]
+    mock_db.users.find.return_value = users
+    mock_db.roles.find.return_value = [{"_id": ObjectId(ROLE_IDS[0]), "slug": "qa"}]
+    return [{"user_id": str(user["_id"])} for user in users]
+
+
+@pytest.mark.unit
+class TestCheckApprovalCompletion:
+
+    def test_should_load_signers_and_roles_once_per_flow(self, mock_db, signers):
+        officers = [{"type": "role", "reference": role_id} for role_id in ROLE_IDS * 2]
+        officers.append({"type": "role", "reference": "qa"})
+
+        result = check_approval_completion(mock_db, officers, signers)
+
+        assert result == (True, 11, 11)
+        assert mock_db.users.find.call_count == 1
+        assert mock_db.roles.find.call_count == 1
+        mock_db.users.find_one.assert_not_called()
+        mock_db.roles.find_one.assert_not_called()
+
+    def test_should_require_every_person_and_role(self, mock_db, signers):
+        officers = [
+            {"type": "person", "reference": signers[10]["user_id"]},
+            {"type": "role", "reference": str(ObjectId())},
+            {"type": "role", "reference": "unknown-slug"},
+        ]
+
+        assert check_approval_completion(mock_db, officers, signers) == (False, 1, 3)
+
+    def test_should_not_query_without_role_officers(self, mock_db, signers):
+        officers = [{"type": "person", "reference": signers[0]["user_id"]}]
+
+        assert check_approval_completion(mock_db, officers, signers) == (True, 1, 1)
+        mock_db.users.find.assert_not_called()
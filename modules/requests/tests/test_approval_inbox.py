@@ -0,0 +1,74 @@
+"""
+Unit tests for the approval inbox (src/backend/utils/approval_inbox.py)
+"""
+import pytest
+from datetime import datetime
+from bson import ObjectId
+
+from src.backend.utils.approval_inbox import (
+    INBOX_COLLECTION,
+    inbox_entry,
+    pending_approvals,
+    sync_approval_inbox,
+)
+
+USER_ID = "507f1f77bcf86cd799439011"
+ROLE_ID = "507f1f77bcf86cd799439012"
+
+
+@pytest.fixture
+def open_flow():
+    return {
+        "_id": ObjectId(),
+        "object_type": "custom_object",
+        "object_id": ObjectId(),
+        "status": "in_progress",
+        "created_at": datetime(2025, 1, 1),
+        "must_sign_officers": [{"type": "person", "reference": USER_ID}],
+        "can_sign_officers": [
+            {"type": "role", "reference": ROLE_ID},
+            {"type": "person", "reference": USER_ID},
+            {"type": "unknown", "reference": "x"},
+        ],
+        "signatures": [{"user_id": "507f1f77bcf86cd799439099"}],
+    }
+
+
+@pytest.mark.unit
+class TestInboxEntry:
+
+    def test_should_key_signers_by_user_and_role(self, mock_db, open_flow):
+        entry = inbox_entry(mock_db, open_flow)
+
+        assert entry["signers"] == [f"user:{USER_ID}", f"role:{ROLE_ID}"]
+        assert entry["required_signers"] == [f"user:{USER_ID}"]
+        assert entry["signed_user_ids"] == ["507f1f77bcf86cd799439099"]
+        assert entry["object_id"] == str(open_flow["object_id"])
+
+    def test_should_remove_closed_flows(self, mock_db, open_flow):
+        mock_db.approval_flows.find_one.return_value = {**open_flow, "status": "approved"}
+
+        sync_approval_inbox(mock_db, open_flow["_id"])
+
+        mock_db[INBOX_COLLECTION].delete_one.assert_called_once_with({"_id": open_flow["_id"]})
+
+
+@pytest.mark.unit
+class TestPendingApprovals:
+
+    def test_should_query_signer_keys_and_mark_officer_type(self, mock_db):
+        flow_id = ObjectId()
+        mock_db[INBOX_COLLECTION].find.return_value.sort.return_value = [
+            {"_id": flow_id, "required_signers": [f"role:{ROLE_ID}"], "status": "pending"},
+            {"_id": ObjectId(), "required_signers": ["user:someone-else"], "status": "pending"},
+        ]
+
+        approvals = pending_approvals(mock_db, ObjectId(USER_ID), ROLE_ID)
+
+        query = mock_db[INBOX_COLLECTION].find.call_args[0][0]
+        assert query == {
+            "signers": {"$in": [f"user:{USER_ID}", f"role:{ROLE_ID}"]},
+            "signed_user_ids": {"$ne": USER_ID},
+        }
+        assert [a["officer_type"] for a in approvals] == ["required", "optional"]
+        assert approvals[0]["_id"] == str(flow_id)
@@ -9,7 +9,9 @@ from pydantic import BaseModel
 
 from src.backend.utils.db import get_db
 from src.backend.utils.sections_permissions import require_section
-from modules.inventory.services.stocks_service import transfer_stock
+from src.backend.utils.async_db import run_in_db_thread
+from modules.inventory.allocation import allocate_lines
+from modules.inventory.stock_movements import InsufficientStockError
 
 router = APIRouter()
 
@@ -74,85 +76,50 @@ async def execute_request_transfer(
 
     results = []
     errors = []
+    source_oid = ObjectId(source_id)
+    destination_oid = ObjectId(destination_id)
 
-    # 2. Process Items
+    # 2. Plan and post all items (one aggregation, one ledger post, or none)
+    # A stock_id is one LOT (create_stock inserts a new document every time);
+    # an item is taken from the lots of part + batch at source, earliest
+    # expiry first, split over several lots when one does not cover it.
+    demands = []
     for item in transfer_data.items:
         try:
-            # Find Stock ID at Source Location
-            # We need to find a stock entry for this part + batch at the source location
-            stock_query = {
+            demands.append({
                 'part_id': ObjectId(item.part_id),
-                'batch_code': item.batch_code
-                # We can't query by location directly in depo_stocks easily if it moved, 
-                # BUT stocks_service.transfer_stock checks balance at from_location.
-                # So we just need the stock_id.
-                # Use find_one to get the stock master record.
-            }
-            
-            # Since depo_stocks is the "Master" record (conceptually), but actually it seems to represents a specific batch.
-            # However, `create_stock` seems to create a NEW stock_id for every new entry? 
-            # OR does it reuse? 
-            # Looking at `create_stock`: it inserts a new document every time.
-            # So `stock_id` represents a specific LOT of items.
-            
-            # We need to find the stock record that HAS balance at source_id.
-            # Query balances first?
-            
-            balances = list(db.depo_stocks_balances.find({
-                'location_id': ObjectId(source_id),
-                'quantity': {'$gte': item.quantity} # optimization
-            }))
-            
-            # Filter balances for our part and batch
-            target_stock = None
-            for b in balances:
-                s = db.depo_stocks.find_one({
-                    '_id': b['stock_id'], 
-                    'part_id': ObjectId(item.part_id),
-                    'batch_code': item.batch_code
-                })
-                if s:
-                    target_stock = s
-                    break
-            
-            if not target_stock:
-                # Fallback: Search stocks then check balance
-                candidates = list(db.depo_stocks.find(stock_query))
-                for s in candidates:
-                    bal = db.depo_stocks_balances.find_one({
-                        'stock_id': s['_id'],
-                        'location_id': ObjectId(source_id)
-                    })
-                    if bal and bal.get('quantity', 0) >= item.quantity:
-                        target_stock = s
-                        break
-            
-            if not target_stock:
-                errors.append(f"Stock not found or insufficient balance for Part {item.part_id} Batch {item.batch_code} at Source")
-                continue
+                'batch_code': item.batch_code or '',
+                'quantity': item.quantity,
+                'notes': item.notes or transfer_data.notes
+            })
+        except Exception:
+            errors.append(f"Error transferring Part {item.part_id}: invalid part_id")
 
-            # Execute Transfer
-            await transfer_stock(
-                db=db,
-                stock_id=str(target_stock['_id']),
-                from_location_id=source_id,
-                to_location_id=destination_id,
-                quantity=item.quantity,
-                created_by=current_user.get('username', 'system'),
+    if not errors and demands:
+        try:
+            # Transfers move stock whatever its state (quarantine included)
+            await run_in_db_thread(
+                allocate_lines,
+                db, demands, [source_oid],
                 document_type='REQUEST_TRANSFER',
-                document_id=request_id,
-                notes=item.notes or transfer_data.notes
+                document_id=req_oid,
+                created_by=current_user.get('username', 'system'),
+                to_location_id=destination_oid,
+                exclude_state_ids=[]
             )
-            
-            results.append({
-                "part_id": item.part_id,
-                "batch_code": item.batch_code,
-                "status": "Transferred",
-                "quantity": item.quantity
-            })
-            
+            results = [
+                {
+                    "part_id": item.part_id,
+                    "batch_code": item.batch_code,
+                    "status": "Transferred",
+                    "quantity": item.quantity
+                }
+                for item in transfer_data.items
+            ]
+        except InsufficientStockError as e:
+            errors.append(f"Insufficient balance at Source: {e}")
         except Exception as e:
-            errors.append(f"Error transferring Part {item.part_id}: {str(e)}")
+            errors.append(f"Error transferring request items: {str(e)}")
 
     # 3. Update Request Status if successful
     if not errors and results:
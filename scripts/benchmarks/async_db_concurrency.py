@@ -0,0 +1,135 @@
+"""
+Concurrency benchmark: blocking vs offloaded database calls in async handlers
+
+Simulates N parallel clients hitting an `async def` handler on a single event
+loop (one uvicorn worker) and reports latency percentiles for:
+
+- blocking:  the handler calls pymongo directly (the old behaviour)
+- offloaded: the handler awaits src.backend.utils.async_db.run_in_db_thread
+
+By default the "query" is a fixed sleep (no database needed), with every
+N-th call slowed down to mimic one slow batch-codes lookup. Pass --mongo to
+run a real query against the configured database instead.
+
+Usage:
+    python scripts/benchmarks/async_db_concurrency.py
+    python scripts/benchmarks/async_db_concurrency.py --clients 50 --requests 20 --latency-ms 5 --slow-ms 200
+    python scripts/benchmarks/async_db_concurrency.py --mongo --collection depo_parts
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(ROOT)
+
+from src.backend.utils.async_db import run_in_db_thread, shutdown_db_executor  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_query(args):
+    """Build the blocking call exercised by each request"""
+    if args.mongo:
+        from src.backend.utils.db import get_db
+        collection = get_db()[args.collection]
+
+        def query(i):
+            return list(collection.find({}).limit(args.limit))
+        return query
+
+    def query(i):
+        if args.slow_every and i % args.slow_every == 0:
+            time.sleep(args.slow_ms / 1000.0)
+        else:
+            time.sleep(args.latency_ms / 1000.0)
+    return query
+
+
+def run_mode(mode, query, args):
+    """
+    Run the handler on a single event loop thread (the "server") while client
+    threads submit requests to it; latency is measured from submission to
+    response, so time spent queued behind a blocked loop is included.
+    """
+    loop = asyncio.new_event_loop()
+    server = threading.Thread(target=loop.run_forever, daemon=True)
+    server.start()
+
+    counter = itertools.count(1)
+
+    async def handler():
+        i = next(counter)
+        if mode == 'blocking':
+            return query(i)
+        return await run_in_db_thread(query, i)
+
+    def client():
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            asyncio.run_coroutine_threadsafe(handler(), loop).result()
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(lambda _: client(), range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    loop.call_soon_threadsafe(loop.stop)
+    server.join()
+    loop.close()
+
+    latencies = [value for result in results for value in result]
+    return {
+        'mode': mode,
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies) if latencies else 0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Blocking vs offloaded DB calls under concurrency")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=20, help="Requests per client")
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Simulated query time")
+    parser.add_argument('--slow-ms', type=float, default=200.0, help="Simulated slow query time")
+    parser.add_argument('--slow-every', type=int, default=100, help="Every N-th query is slow (0 = never)")
+    parser.add_argument('--mongo', action='store_true', help="Run a real query against config.yaml database")
+    parser.add_argument('--collection', default='depo_parts')
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    query = make_query(args)
+
+    print(f"{args.clients} clients x {args.requests} requests "
+          f"({'mongo ' + args.collection if args.mongo else f'{args.latency_ms}ms, every {args.slow_every} -> {args.slow_ms}ms'})")
+    print(f"{'mode':<10} {'req':>6} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+
+    for mode in ('blocking', 'offloaded'):
+        stats = run_mode(mode, query, args)
+        print(f"{stats['mode']:<10} {stats['requests']:>6} {stats['rps']:>9.1f} "
+              f"{stats['p50']:>9.1f} {stats['p99']:>9.1f} {stats['max']:>9.1f}")
+
+    shutdown_db_executor()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
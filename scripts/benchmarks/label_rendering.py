@@ -0,0 +1,109 @@
+"""
+Benchmark label rendering against a local mock Docu service
+(modules/inventory/label_rendering.py)
+
+Starts the mock Docu server from modules/inventory/tests/mock_docu.py (each
+job takes --render-ms to finish) and renders the same print run three ways:
+- sequential: one job at a time, polled every --old-poll seconds (the former
+  _render_label_pdf loop)
+- pipeline: render_labels(), with dedupe, --concurrency jobs in flight and
+  backoff polling
+- local: the in-process renderer (modules/inventory/local_labels.py), no Docu
+
+Usage:
+    python scripts/benchmarks/label_rendering.py                   # 20 items x 5 copies
+    python scripts/benchmarks/label_rendering.py --items 50 --copies 1 --concurrency 8
+    python scripts/benchmarks/label_rendering.py --numbered        # copies numbered (crt_no), no dedupe
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(ROOT)
+
+from modules.inventory.label_rendering import DEFAULT_SETTINGS, dedupe_labels, render_labels
+from modules.inventory.local_labels import render_local_pdf
+from modules.inventory.tests.mock_docu import MockDocu
+from src.backend.utils.dataflows_docu import AsyncDataFlowsDocuClient, DataFlowsDocuClient
+
+LOCAL_LAYOUT = {
+    'width_mm': 50, 'height_mm': 30, 'dpi': 203,
+    'qr': {'field': 'barcode', 'x': 1.5, 'y': 1.5, 'size': 20},
+    'lines': [
+        {'text': '{barcode}', 'x': 23, 'y': 1.5, 'size': 9, 'bold': True, 'max_width': 26},
+        {'text': '{part_name}', 'x': 23, 'y': 6, 'size': 6.5, 'max_width': 26},
+        {'text': '{crt_no}/{quant}', 'x': 40, 'y': 25, 'size': 6},
+    ],
+}
+
+
+def _print_run(items: int, copies: int, numbered: bool) -> list:
+    labels = []
+    for i in range(items):
+        for copy in range(copies):
+            label = {'barcode': f"P{100000 + i}", 'part_name': f"Part {i}", 'quant': copies}
+            if numbered:
+                label['crt_no'] = copy + 1
+            labels.append(label)
+    return labels
+
+
+def _sequential(client: DataFlowsDocuClient, labels: list, poll_seconds: float) -> int:
+    rendered = 0
+    for index, label in enumerate(labels, start=1):
+        job = client.create_job('BENCH', {'data': label}, 'pdf', f"bench-{index}", {})
+        while True:
+            status = client.get_job_status(job['id'])
+            if status and status.get('status') in ['done', 'completed']:
+                rendered += bool(client.download_document(job['id']))
+                break
+            time.sleep(poll_seconds)
+    return rendered
+
+
+def benchmark(items: int = 20, copies: int = 5, render_ms: int = 300, concurrency: int = 4,
+              old_poll: float = 2.0, numbered: bool = False):
+    labels = _print_run(items, copies, numbered)
+    distinct, _ = dedupe_labels(labels)
+    settings = {**DEFAULT_SETTINGS, 'docu_concurrency': concurrency}
+    print(f"{len(labels)} labels ({len(distinct)} distinct), mock render time {render_ms} ms\n")
+    print(f"{'mode':<12}{'jobs':>6}{'seconds':>10}{'labels/s':>10}{'max in flight':>15}")
+
+    for mode in ('sequential', 'pipeline'):
+        server = MockDocu(render_seconds=render_ms / 1000).start()
+        client = DataFlowsDocuClient(base_url=server.url, token='bench', health_interval=0)
+        try:
+            start = time.perf_counter()
+            if mode == 'sequential':
+                _sequential(client, labels, old_poll)
+            else:
+                async_client = AsyncDataFlowsDocuClient(client, workers=concurrency)
+                try:
+                    asyncio.run(render_labels('BENCH', labels, 'bench', client=async_client, settings=settings))
+                finally:
+                    async_client.close()
+            seconds = time.perf_counter() - start
+            print(f"{mode:<12}{len(server.jobs):>6}{seconds:>10.2f}{len(labels) / seconds:>10.1f}{server.max_in_flight:>15}")
+        finally:
+            client.close()
+            server.stop()
+
+    start = time.perf_counter()
+    render_local_pdf(LOCAL_LAYOUT, *dedupe_labels(labels))
+    seconds = time.perf_counter() - start
+    print(f"{'local':<12}{0:>6}{seconds:>10.2f}{len(labels) / seconds:>10.1f}{'-':>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--copies', type=int, default=5)
+    parser.add_argument('--render-ms', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_SETTINGS['docu_concurrency'])
+    parser.add_argument('--old-poll', type=float, default=2.0)
+    parser.add_argument('--numbered', action='store_true')
+    args = parser.parse_args()
+    benchmark(args.items, args.copies, args.render_ms, args.concurrency, args.old_poll, args.numbered)
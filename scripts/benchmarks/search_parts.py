@@ -0,0 +1,105 @@
+"""
+Benchmark the indexed part search against the old case-insensitive $regex
+(src/backend/utils/search.py)
+
+Fills a temporary database (<db>_search_benchmark, dropped at the end) on the
+configured server with synthetic parts, creates the catalog indexes and times
+each query, with the keys / documents examined from explain().
+
+Usage:
+    python scripts/benchmarks/search_parts.py                 # 100k parts
+    python scripts/benchmarks/search_parts.py --parts 20000 --runs 10
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(ROOT)
+
+from src.backend.utils.db import get_db
+from src.backend.utils.indexes import ensure_indexes, get_index_catalog
+from src.backend.utils.search import SEARCH_SPECS, autocomplete, backfill_search_fields, search_filter
+
+WORDS = [
+    'hex', 'bolt', 'nut', 'washer', 'screw', 'bracket', 'steel', 'inox', 'brass',
+    'gasket', 'bearing', 'spring', 'valve', 'flange', 'cable', 'relay', 'sensor',
+    'filter', 'hose', 'clamp', 'pump', 'motor', 'seal', 'pin', 'rivet', 'plate',
+]
+QUERIES = ['bolt', 'hex bo', 'inox flange', 'ear', 'M8', 'HX-0042']
+
+
+def _synthetic_parts(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        name = ' '.join(rng.sample(WORDS, 3)).capitalize() + f" M{rng.choice([3, 4, 5, 6, 8, 10, 12])}"
+        yield {
+            'name': name,
+            'ipn': f"{name[:2].upper()}-{i:04d}",
+            'description': ' '.join(rng.sample(WORDS, 5)),
+            'is_active': True,
+        }
+
+
+def _legacy_filter(search: str) -> dict:
+    return {'$or': [{field: {'$regex': search, '$options': 'i'}} for field in SEARCH_SPECS['depo_parts']]}
+
+
+def _time(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def _examined(collection, query: dict) -> str:
+    stats = collection.find(query).explain().get('executionStats', {})
+    return f"keys {stats.get('totalKeysExamined', '?')}, docs {stats.get('totalDocsExamined', '?')}"
+
+
+def benchmark(parts: int = 100_000, runs: int = 5):
+    source = get_db()
+    db = source.client[f"{source.name}_search_benchmark"]
+    source.client.drop_database(db.name)
+    try:
+        print(f"Inserting {parts} synthetic parts into {db.name}...")
+        batch = []
+        for doc in _synthetic_parts(parts):
+            batch.append(doc)
+            if len(batch) >= 5000:
+                db.depo_parts.insert_many(batch)
+                batch = []
+        if batch:
+            db.depo_parts.insert_many(batch)
+
+        backfill_search_fields(db, ['depo_parts'])
+        ensure_indexes(db, [spec for spec in get_index_catalog() if spec['collection'] == 'depo_parts'])
+
+        collection = db.depo_parts
+        print(f"\n{'query':<14}{'regex ms':>10}{'indexed ms':>12}{'autocomplete ms':>17}  plan (regex | indexed)")
+        for search in QUERIES:
+            legacy = _legacy_filter(re.escape(search))
+            indexed = search_filter('depo_parts', search)
+            regex_ms = _time(lambda: list(collection.find(legacy).limit(100)), runs)
+            indexed_ms = _time(lambda: list(collection.find(indexed).limit(100)), runs)
+            autocomplete_ms = _time(lambda: autocomplete(db, 'depo_parts', search), runs)
+            print(
+                f"{search:<14}{regex_ms:>10.1f}{indexed_ms:>12.1f}{autocomplete_ms:>17.1f}"
+                f"  {_examined(collection, legacy)} | {_examined(collection, indexed)}"
+            )
+    finally:
+        source.client.drop_database(db.name)
+        print(f"\nDropped {db.name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--parts', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    benchmark(args.parts, args.runs)
@@ -0,0 +1,180 @@
+"""
+Serialization benchmark: 1,000-document pages of depo_requests and depo_stocks
+
+Compares, per page, the time to turn raw pymongo documents into response bytes:
+
+- legacy: the old per-module serialize_doc copy, then FastAPI's
+          jsonable_encoder, then JSONResponse rendering (json.dumps)
+- fast:   src.backend.utils.serializers.serialize_doc, then
+          MongoJSONResponse rendering (orjson when installed)
+- native: raw documents straight into MongoJSONResponse (ObjectId,
+          datetime and Decimal128 encoded by the default hook)
+
+Documents are synthetic (shaped like the real collections), so no database
+is needed. Pass --mongo to read the first page of each collection from the
+configured database instead.
+
+Usage:
+    python scripts/benchmarks/serializer_pages.py
+    python scripts/benchmarks/serializer_pages.py --docs 1000 --rounds 20
+    python scripts/benchmarks/serializer_pages.py --mongo
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(ROOT)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from src.backend.utils import responses  # noqa: E402
+from src.backend.utils.responses import MongoJSONResponse  # noqa: E402
+from src.backend.utils.serializers import serialize_doc  # noqa: E402
+
+
+def legacy_serialize_doc(doc):
+    """serialize_doc as it was copied across modules before the shared serializer"""
+    if doc is None:
+        return None
+    if isinstance(doc, list):
+        return [legacy_serialize_doc(item) for item in doc]
+    if isinstance(doc, dict):
+        result = {}
+        for key, value in doc.items():
+            if key == '_id' or key.endswith('_id'):
+                result[key] = str(value) if value else None
+            elif isinstance(value, ObjectId):
+                result[key] = str(value)
+            elif isinstance(value, datetime):
+                result[key] = value.isoformat()
+            elif isinstance(value, dict):
+                result[key] = legacy_serialize_doc(value)
+            elif isinstance(value, list):
+                result[key] = [legacy_serialize_doc(item) if isinstance(item, (dict, list)) else item for item in value]
+            else:
+                result[key] = value
+        if '_id' in result and result['_id']:
+            result['value'] = result['_id']
+        return result
+    return doc
+
+
+def make_request(rnd, now):
+    return {
+        '_id': ObjectId(),
+        'reference': f"REQ-{rnd.randint(1, 99999):05d}",
+        'source': ObjectId(),
+        'destination': ObjectId(),
+        'state_id': ObjectId(),
+        'product_id': ObjectId(),
+        'product_quantity': rnd.randint(1, 500),
+        'batch_codes': [f"B{rnd.randint(1000, 9999)}" for _ in range(3)],
+        'items': [
+            {
+                'part': ObjectId(),
+                'quantity': Decimal128(str(round(rnd.uniform(1, 100), 3))),
+                'notes': '',
+                'series': [{'batch_code': f"B{rnd.randint(1000, 9999)}", 'quantity': rnd.randint(1, 20)}],
+            }
+            for _ in range(rnd.randint(2, 8))
+        ],
+        'created_at': now - timedelta(minutes=rnd.randint(0, 100000)),
+        'updated_at': now,
+        'issue_date': now,
+        'created_by': 'operator',
+        'notes': 'Cerere transfer materiale',
+    }
+
+
+def make_stock(rnd, now):
+    return {
+        '_id': ObjectId(),
+        'part_id': ObjectId(),
+        'location_id': ObjectId(),
+        'state_id': ObjectId(),
+        'supplier_id': ObjectId(),
+        'batch_code': f"B{rnd.randint(1000, 9999)}",
+        'quantity': rnd.uniform(0, 1000),
+        'purchase_price': Decimal128(str(round(rnd.uniform(1, 50), 2))),
+        'expiry_date': now + timedelta(days=rnd.randint(1, 700)),
+        'received_date': now - timedelta(days=rnd.randint(1, 100)),
+        'created_at': now,
+        'updated_at': now,
+        'qc': {'passed': True, 'checked_at': now, 'checked_by': 'qc'},
+        'tags': ['depo', 'raw'],
+    }
+
+
+def make_pages(args):
+    if args.mongo:
+        from src.backend.utils.db import get_db
+        db = get_db()
+        return {
+            'depo_requests': list(db.depo_requests.find().limit(args.docs)),
+            'depo_stocks': list(db.depo_stocks.find().limit(args.docs)),
+        }
+    rnd = random.Random(7)
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    return {
+        'depo_requests': [make_request(rnd, now) for _ in range(args.docs)],
+        'depo_stocks': [make_stock(rnd, now) for _ in range(args.docs)],
+    }
+
+
+def legacy(docs):
+    content = {'results': legacy_serialize_doc(docs), 'total': len(docs)}
+    # Decimal128 is not JSON-encodable by jsonable_encoder; the old code paths
+    # stored plain floats, so convert here to keep the comparison fair
+    return JSONResponse(jsonable_encoder(content, custom_encoder={Decimal128: lambda v: float(v.to_decimal())})).body
+
+
+def fast(docs):
+    return MongoJSONResponse({'results': serialize_doc(docs), 'total': len(docs)}).body
+
+
+def native(docs):
+    return MongoJSONResponse({'results': docs, 'total': len(docs)}).body
+
+
+def measure(fn, docs, rounds):
+    fn(docs)  # warm-up
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(docs)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    timings.sort()
+    return timings[len(timings) // 2], timings[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Document page serialization: legacy vs shared serializer + orjson")
+    parser.add_argument('--docs', type=int, default=1000, help="Documents per page")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--mongo', action='store_true', help="Read pages from config.yaml database")
+    args = parser.parse_args()
+
+    pages = make_pages(args)
+    print(f"{args.docs} docs/page, {args.rounds} rounds, encoder: {'orjson' if responses.orjson else 'json'}")
+    print(f"{'collection':<15} {'path':<8} {'median ms':>10} {'min ms':>9} {'KiB':>8}")
+
+    for name, docs in pages.items():
+        baseline = None
+        for label, fn in (('legacy', legacy), ('fast', fast), ('native', native)):
+            median, best = measure(fn, docs, args.rounds)
+            size = len(fn(docs)) / 1024.0
+            baseline = baseline or median
+            print(f"{name:<15} {label:<8} {median:>10.2f} {best:>9.2f} {size:>8.1f}  x{baseline / median:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
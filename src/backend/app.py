@@ -31,8 +31,14 @@ from src.backend.routes import approvals
 from src.backend.routes import recipes
 from src.backend.routes import sales
 from src.backend.routes import returns
-from src.backend.utils.db import close_db
-from src.backend.utils.audit import log_action
+from src.backend.utils.db import close_db, get_db
+from src.backend.utils.async_db import shutdown_db_executor
+from src.backend.utils.dataflows_docu import shutdown_docu_client
+from src.backend.utils.config import get_config_value
+from src.backend.utils.indexes import ensure_indexes
+from src.backend.utils.approval_inbox import ensure_approval_inbox
+from src.backend.utils.audit import log_action, shutdown_audit_writer
+from src.backend.utils.responses import use_mongo_json_responses
 from src.backend.routes.auth import verify_token
 from src.backend.scheduler import get_scheduler
 
@@ -41,6 +47,7 @@ import sys
 # Ensure root is in path to import 'modules'
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 from modules import register_modules
+from modules.inventory.stock_availability import ensure_stock_availability
 
 # Create FastAPI app
 app = FastAPI(
@@ -201,11 +208,47 @@ def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
+# Render plain dict/list responses in one pass (ObjectId/datetime/Decimal128 encoded natively)
+# Must run after every router and module is registered
+print(f"Fast JSON responses enabled for {use_mongo_json_responses(app)} routes")
+
+
 @app.on_event("startup")
 def startup_event():
     """
     Initialize services on startup
     """
+    # Apply missing indexes from the index catalog
+    if get_config_value('mongo.ensure_indexes', True):
+        try:
+            report = ensure_indexes(get_db())
+            print(
+                f"Indexes: {len(report['created'])} created, {len(report['existing'])} existing, "
+                f"{len(report['conflicts'])} conflicts, {len(report['errors'])} errors"
+            )
+            for conflict in report['conflicts']:
+                print(f"Warning: Index conflict on {conflict['index']}: expected {conflict['expected']}, found {conflict['found']}")
+            for error in report['errors']:
+                print(f"Warning: Index error: {error}")
+        except Exception as e:
+            print(f"Warning: Failed to ensure indexes: {e}")
+
+    # Build the approval inbox on first start (then kept in sync on every flow write)
+    try:
+        report = ensure_approval_inbox(get_db())
+        if report:
+            print(f"Approval inbox built: {report['flows']} open flows")
+    except Exception as e:
+        print(f"Warning: Failed to build approval inbox: {e}")
+
+    # Build the stock availability projection on first start (then refreshed on every stock write)
+    try:
+        report = ensure_stock_availability(get_db())
+        if report:
+            print(f"Stock availability built: {report['stocks']} stocks, {report['rows']} rows")
+    except Exception as e:
+        print(f"Warning: Failed to build stock availability: {e}")
+
     # Start job scheduler
     try:
         scheduler = get_scheduler()
@@ -227,6 +270,10 @@ def shutdown_event():
     except:
         pass
     
+    # Write pending audit/journal entries before closing the connection
+    shutdown_audit_writer()
+    shutdown_db_executor()
+    shutdown_docu_client()
     close_db()
 
 
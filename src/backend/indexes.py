@@ -0,0 +1,126 @@
+"""
+Core index declarations
+Indexes needed by the core routes (auth, approvals, audit, sales, returns, documents)
+See src/backend/utils/indexes.py for the spec format
+"""
+from bson import ObjectId
+
+
+INDEXES = [
+    # Auth
+    {'collection': 'users', 'name': 'username', 'keys': [('username', 1)]},
+    {'collection': 'users', 'name': 'role', 'keys': [('role', 1)]},
+    {'collection': 'users', 'name': 'locations', 'keys': [('locations', 1)]},
+    {'collection': 'roles', 'name': 'slug', 'keys': [('slug', 1)]},
+
+    # Approvals
+    {'collection': 'approval_flows', 'name': 'object_type_object_id', 'keys': [('object_type', 1), ('object_id', 1)]},
+    {'collection': 'approval_flows', 'name': 'object_id', 'keys': [('object_id', 1)]},
+    {'collection': 'approval_flows', 'name': 'status_created_at', 'keys': [('status', 1), ('created_at', -1)]},
+    {'collection': 'approval_inbox', 'name': 'signers_created_at', 'keys': [('signers', 1), ('created_at', -1)]},
+    {'collection': 'approval_templates', 'name': 'object_type_source', 'keys': [('object_type', 1), ('object_source', 1)]},
+
+    # Audit log and activity journal
+    {'collection': 'audit_logs', 'name': 'timestamp_id', 'keys': [('timestamp', -1), ('_id', -1)]},
+    {'collection': 'audit_logs', 'name': 'action_timestamp', 'keys': [('action', 1), ('timestamp', -1)]},
+    {'collection': 'audit_logs', 'name': 'username_timestamp', 'keys': [('username', 1), ('timestamp', -1)]},
+    {'collection': 'audit_logs', 'name': 'search_terms', 'keys': [('search_terms', 1)]},
+    {'collection': 'audit_logs', 'name': 'search_grams', 'keys': [('search_grams', 1)]},
+    {'collection': 'logs', 'name': 'collection_object_timestamp', 'keys': [('collection', 1), ('object_id', 1), ('timestamp', -1)]},
+
+    # Sales (collection name is depo_sales_ordes in production data)
+    {'collection': 'depo_sales_ordes', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_sales_ordes', 'name': 'state_created_at', 'keys': [('state_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_sales_ordes', 'name': 'customer_id', 'keys': [('customer_id', 1)]},
+    {'collection': 'depo_sales_ordes', 'name': 'items_part_id', 'keys': [('items.part_id', 1)]},
+    {'collection': 'depo_sales_ordes', 'name': 'updated_at', 'keys': [('updated_at', -1)]},
+    {'collection': 'depo_sales_orders', 'name': 'items_part_id', 'keys': [('items.part_id', 1)]},
+    {'collection': 'depo_sales_order_lines', 'name': 'order_id', 'keys': [('order_id', 1)]},
+    {'collection': 'depo_sales_allocations', 'name': 'order_id', 'keys': [('order_id', 1)]},
+    {'collection': 'depo_sales_shipments', 'name': 'order_id', 'keys': [('order_id', 1)]},
+    {'collection': 'depo_sales_order_attachments', 'name': 'order_id', 'keys': [('order_id', 1)]},
+
+    # Returns
+    {'collection': 'depo_return_orders', 'name': 'created_at_id', 'keys': [('created_at', -1), ('_id', -1)]},
+    {'collection': 'depo_return_orders', 'name': 'state_created_at', 'keys': [('state_id', 1), ('created_at', -1)]},
+    {'collection': 'depo_return_orders', 'name': 'sales_order_id', 'keys': [('sales_order_id', 1)]},
+
+    # Documents
+    {'collection': 'depo_procurement_documents', 'name': 'object_id', 'keys': [('object_id', 1)]},
+    {'collection': 'depo_procurement_documents', 'name': 'job_id', 'keys': [('job_id', 1)]},
+    {'collection': 'depo_stock_request_documents', 'name': 'object_id', 'keys': [('object_id', 1)]},
+    {'collection': 'depo_stock_request_documents', 'name': 'job_id', 'keys': [('job_id', 1)]},
+    {'collection': 'depo_sales_documents', 'name': 'object_id', 'keys': [('object_id', 1)]},
+    {'collection': 'depo_sales_documents', 'name': 'job_id', 'keys': [('job_id', 1)]},
+
+    # Render cache (src/backend/utils/render_cache.py)
+    {'collection': 'render_cache', 'name': 'template_code', 'keys': [('template_code', 1)]},
+    {'collection': 'render_cache', 'name': 'last_used_at', 'keys': [('last_used_at', 1)]},
+]
+
+
+QUERY_PROBES = [
+    {
+        'name': 'approval_flow_by_object',
+        'collection': 'approval_flows',
+        'filter': {'object_type': 'stock_qc', 'object_id': ObjectId()},
+        'limit': 1
+    },
+    {
+        'name': 'pending_approvals',
+        'collection': 'approval_flows',
+        'filter': {'status': {'$in': ['pending', 'in_progress']}}
+    },
+    {
+        'name': 'approval_inbox',
+        'collection': 'approval_inbox',
+        'filter': {'signers': {'$in': ['user:000000000000000000000000', 'role:000000000000000000000000']}, 'signed_user_ids': {'$ne': '000000000000000000000000'}},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'audit_logs_list',
+        'collection': 'audit_logs',
+        'filter': {},
+        'sort': [('timestamp', -1)]
+    },
+    {
+        'name': 'audit_logs_by_action',
+        'collection': 'audit_logs',
+        'filter': {'action': 'create'},
+        'sort': [('timestamp', -1)]
+    },
+    {
+        'name': 'audit_logs_search',
+        'collection': 'audit_logs',
+        'filter': {'search_grams': {'$all': ['log', 'ogi', 'gin']}}
+    },
+    {
+        'name': 'object_journal',
+        'collection': 'logs',
+        'filter': {'collection': 'depo_purchase_orders', 'object_id': str(ObjectId())},
+        'sort': [('timestamp', -1)]
+    },
+    {
+        'name': 'sales_orders_list',
+        'collection': 'depo_sales_ordes',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'sales_orders_by_state',
+        'collection': 'depo_sales_ordes',
+        'filter': {'state_id': ObjectId()},
+        'sort': [('created_at', -1)]
+    },
+    {
+        'name': 'sales_orders_by_part',
+        'collection': 'depo_sales_ordes',
+        'filter': {'items.part_id': {'$in': [str(ObjectId()), ObjectId()]}}
+    },
+    {
+        'name': 'return_orders_list',
+        'collection': 'depo_return_orders',
+        'filter': {},
+        'sort': [('created_at', -1)]
+    },
+]
@@ -6,6 +6,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 from src.backend.utils.db import get_db
+from src.backend.utils.pagination import count_total, cursor_response, keyset_page
+from src.backend.utils.search import WITHOUT_SEARCH_FIELDS, search_filter
 from src.backend.models.audit_log_model import AuditLogModel
 from src.backend.utils.sections_permissions import require_section
 
@@ -21,11 +23,15 @@ def get_audit_logs(
     search: Optional[str] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total_mode: str = "exact",
     user = Depends(require_section("audit"))
 ) -> Dict[str, Any]:
     """
     Get audit logs with pagination and filtering
     Requires administrator access
+
+    Pass `cursor` (empty for the first page, then `next_cursor`) for keyset pagination on timestamp.
     """
     db = get_db()
     audit_collection = db[AuditLogModel.collection_name]
@@ -61,20 +67,22 @@ def get_audit_logs(
     if search:
         search = search.strip()
         if search:
-            filter_query["$or"] = [
-                {"action": {"$regex": search, "$options": "i"}},
-                {"username": {"$regex": search, "$options": "i"}},
-                {"ip_address": {"$regex": search, "$options": "i"}}
-            ]
-    
-    # Get total count
-    total = audit_collection.count_documents(filter_query)
+            filter_query.update(search_filter(AuditLogModel.collection_name, search))
     
-    # Get logs
-    logs = list(audit_collection.find(filter_query)
-                .sort('timestamp', -1)
-                .skip(skip)
-                .limit(limit))
+    page = None
+    if cursor is not None:
+        page = keyset_page(audit_collection, filter_query, cursor, limit, sort_field='timestamp', total_mode=total_mode,
+                           projection=WITHOUT_SEARCH_FIELDS)
+        logs = page['docs']
+    else:
+        # Get total count
+        total = count_total(audit_collection, filter_query, total_mode)['total']
+
+        # Get logs
+        logs = list(audit_collection.find(filter_query, WITHOUT_SEARCH_FIELDS)
+                    .sort('timestamp', -1)
+                    .skip(skip)
+                    .limit(limit))
     
     # Convert ObjectId to string and format dates
     for log in logs:
@@ -84,6 +92,11 @@ def get_audit_logs(
         if 'timestamp' in log:
             log['timestamp'] = log['timestamp'].isoformat()
     
+    if page is not None:
+        response = cursor_response(logs, page)
+        response['logs'] = response.pop('results')
+        return response
+
     return {
         'logs': logs,
         'total': total,
@@ -81,6 +81,7 @@ def _normalize_user_data(user: dict) -> dict:
             normalized['role'] = str(role_field)
         elif isinstance(role_field, dict) and '_id' in role_field:
             normalized['role'] = str(role_field['_id'])
+            normalized['role_slug'] = role_field.get('slug')
         elif isinstance(role_field, str):
             normalized['role'] = role_field
         else:
@@ -107,6 +108,12 @@ def verify_admin(authorization: Optional[str] = Header(None)):
     """
     user = verify_token(authorization)
 
+    # Slug comes with the (cached) principal; fall back to a lookup otherwise
+    if 'role_slug' in user:
+        if user.get('role_slug') == 'admin':
+            return user
+        raise HTTPException(status_code=403, detail="Administrator access required")
+
     role_value = user.get('role')
     if role_value:
         db = get_db()
@@ -141,8 +148,8 @@ def get_current_user(user = Depends(verify_token)):
     """
     db = get_db()
     role_value = user.get('role')
-    role_slug = None
-    if role_value:
+    role_slug = user.get('role_slug')
+    if role_value and not role_slug:
         try:
             role_doc = db['roles'].find_one({'_id': ObjectId(role_value)})
         except Exception:
@@ -10,6 +10,7 @@ from datetime import datetime
 import os
 
 from src.backend.utils.db import get_db
+from src.backend.utils.relation_loader import RelationLoader
 from src.backend.models.data_model import DataModel
 from src.backend.models.form_state_model import FormStateModel
 from src.backend.routes.auth import verify_token
@@ -279,14 +280,15 @@ def get_all_submissions(user = Depends(require_section("forms"))):
     """
     db = get_db()
     data_collection = db[DataModel.collection_name]
-    forms_collection = db['forms']
     
     # Get all submissions sorted by date
     submissions = list(data_collection.find().sort('submitted_at', -1))
     
-    # Enrich with form data
+    # Enrich with form data (one query for all forms)
+    loader = RelationLoader(db)
+    loader.add('forms', [submission.get('form_id') for submission in submissions], projection={'title': 1, 'slug': 1})
     for submission in submissions:
-        form = forms_collection.find_one({'_id': ObjectId(submission['form_id'])})
+        form = loader.get('forms', submission.get('form_id'))
         if form:
             submission['form_title'] = form.get('title', 'Unknown')
             submission['form_slug'] = form.get('slug', '')
@@ -1,6 +1,10 @@
 """
 Global document generation routes - Simple and clean
 Uses only job_id for everything
+
+Generated PDFs are kept in the render cache (src/backend/utils/render_cache.py):
+generating the same data with the same template version again is served from
+it without a Docu job, under a job_id starting with CACHED_JOB_PREFIX.
 """
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
@@ -12,12 +16,24 @@ import io
 import base64
 
 from src.backend.utils.db import get_db
-from src.backend.utils.dataflows_docu import DataFlowsDocuClient
+from src.backend.utils.dataflows_docu import get_docu_client
+from src.backend.utils.render_cache import (
+    get_rendered,
+    note_template_bundle,
+    render_cache_enabled,
+    render_key,
+    store_rendered,
+    strip_volatile,
+    template_version,
+)
 from src.backend.routes.auth import verify_token
 
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
+DOCUMENT_COLLECTIONS = ['depo_procurement_documents', 'depo_stock_request_documents', 'depo_sales_documents']
+CACHED_JOB_PREFIX = 'cache-'
+
 
 class GenerateDocumentRequest(BaseModel):
     object_id: str
@@ -30,7 +46,7 @@ def get_templates(user = Depends(verify_token)):
     """Get all available templates"""
     try:
         db = get_db()
-        client = DataFlowsDocuClient()
+        client = get_docu_client()
         
         if not client.health_check():
             raise HTTPException(status_code=503, detail="Document service unavailable")
@@ -61,6 +77,7 @@ def get_templates(user = Depends(verify_token)):
         for code in all_template_codes:
             template = client.get_template(code)
             if template:
+                note_template_bundle(db, code, template)
                 name = code
                 if template.get('parts') and len(template['parts']) > 0:
                     name = template['parts'][0].get('name', code)
@@ -118,7 +135,7 @@ def download_document(
     db = get_db()
     
     # Search in all document collections by _id first, then by job_id
-    collections = ['depo_procurement_documents', 'depo_stock_request_documents', 'depo_sales_documents']
+    collections = DOCUMENT_COLLECTIONS
     
     doc = None
     coll = None
@@ -168,7 +185,7 @@ def download_document(
     else:
         print(f"[DOCUMENT] No cache, downloading from service...")
 
-        client = DataFlowsDocuClient()
+        client = get_docu_client()
         if doc.get('status') not in ['done', 'completed']:
             job_status = client.get_job_status(job_id)
             if not job_status:
@@ -200,6 +217,7 @@ def download_document(
             raise HTTPException(status_code=500, detail="Failed to download document from service")
         
         print(f"[DOCUMENT] Downloaded {len(document_bytes)} bytes, caching...")
+        _cache_document(db, doc, document_bytes)
         
         coll.update_one(
             {'job_id': job_id},
@@ -225,7 +243,7 @@ def delete_document(
     """Delete document by job_id"""
     db = get_db()
     
-    collections = ['depo_procurement_documents', 'depo_stock_request_documents', 'depo_sales_documents']
+    collections = DOCUMENT_COLLECTIONS
     
     for coll_name in collections:
         result = db[coll_name].delete_one({'job_id': job_id})
@@ -241,7 +259,22 @@ def get_job_status(
     user = Depends(verify_token)
 ):
     """Check job status"""
-    client = DataFlowsDocuClient()
+    if job_id.startswith(CACHED_JOB_PREFIX):
+        # Served from the render cache: there is no Docu job behind it
+        db = get_db()
+        for coll_name in DOCUMENT_COLLECTIONS:
+            doc = db[coll_name].find_one({'job_id': job_id}, {'status': 1, 'created_at': 1, 'updated_at': 1})
+            if doc:
+                return {
+                    'job_id': job_id,
+                    'status': doc.get('status'),
+                    'error': None,
+                    'created_at': doc.get('created_at'),
+                    'updated_at': doc.get('updated_at')
+                }
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    client = get_docu_client()
     job_status = client.get_job_status(job_id)
     
     if not job_status:
@@ -269,7 +302,7 @@ def get_documents_for_object(
     except:
         raise HTTPException(status_code=400, detail="Invalid object ID")
     
-    collections = ['depo_procurement_documents', 'depo_stock_request_documents', 'depo_sales_documents']
+    collections = DOCUMENT_COLLECTIONS
     all_docs = []
     
     for coll_name in collections:
@@ -277,7 +310,7 @@ def get_documents_for_object(
         all_docs.extend(docs)
     
     # Auto-check status and download completed documents
-    client = DataFlowsDocuClient()
+    client = get_docu_client()
     for doc in all_docs:
         if doc.get('document_data') or doc.get('status') == 'failed':
             continue
@@ -300,6 +333,7 @@ def get_documents_for_object(
                             document_bytes = client.download_document(job_id)
                             if document_bytes:
                                 update_data['document_data'] = base64.b64encode(document_bytes).decode('utf-8')
+                                _cache_document(db, doc, document_bytes)
                         
                         for coll_name in collections:
                             if db[coll_name].find_one({'_id': doc['_id']}):
@@ -327,6 +361,81 @@ def get_documents_for_object(
 
 # ==================== INTERNAL HANDLERS ====================
 
+def _start_document_job(db, collection_name, object_type, object_obj_id, request, user, document_data, filename):
+    """
+    Create the Docu job and its document entry; identical renders come from the render cache
+
+    With the render cache on, the payload is rendered without its volatile
+    keys (generated_at), so a cached PDF is identical to a fresh one.
+    """
+    doc_entry = {
+        'object_id': object_obj_id,
+        'object_type': object_type,
+        'template_code': request.template_code,
+        'template_name': request.template_name,
+        'filename': f"{filename}.pdf",
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow(),
+        'created_by': user.get('username'),
+        'document_data': None,
+        'error': None
+    }
+
+    if render_cache_enabled():
+        document_data = strip_volatile(document_data)
+        version = template_version(db, request.template_code)
+        key = render_key(request.template_code, version, document_data)
+        doc_entry.update({'render_key': key, 'render_version': version})
+        cached = get_rendered(db, key)
+        if cached:
+            print(f"[DOCUMENT] Render cache hit for {request.template_code} ({len(cached)} bytes)")
+            job_id = f"{CACHED_JOB_PREFIX}{ObjectId()}"
+            doc_entry.update({
+                'job_id': job_id,
+                'status': 'done',
+                'document_data': base64.b64encode(cached).decode('utf-8'),
+                'from_cache': True
+            })
+            db[collection_name].insert_one(doc_entry)
+            return {
+                'job_id': job_id,
+                'status': 'done',
+                'message': 'Document served from cache',
+                'filename': f"{filename}.pdf"
+            }
+
+    client = get_docu_client()
+    job_response = client.create_job(
+        template_code=request.template_code,
+        data=document_data,
+        format='pdf',
+        filename=filename
+    )
+
+    if not job_response or 'id' not in job_response:
+        raise HTTPException(status_code=500, detail="Failed to create job")
+
+    job_id = job_response['id']
+    doc_entry.update({'job_id': job_id, 'status': job_response.get('status', 'queued')})
+    db[collection_name].insert_one(doc_entry)
+
+    return {
+        'job_id': job_id,
+        'status': job_response.get('status'),
+        'message': 'Document generation started',
+        'filename': f"{filename}.pdf"
+    }
+
+
+def _cache_document(db, doc, document_bytes):
+    """Keep a downloaded document in the render cache under the key computed at generation"""
+    if not doc.get('render_key') or not document_bytes:
+        return
+    # Skip renders of a template version invalidated since the job was created
+    if template_version(db, doc.get('template_code')) == doc.get('render_version', '0'):
+        store_rendered(db, doc['render_key'], doc.get('template_code'), doc.get('render_version', '0'), document_bytes)
+
+
 def _generate_procurement_order_document(db, order_obj_id, request, user):
     """Generate procurement order document"""
     
@@ -490,46 +599,9 @@ def _generate_procurement_order_document(db, order_obj_id, request, user):
         'user_name': resolve_user_name(user)
     }
     
-    # Create job
-    client = DataFlowsDocuClient()
+    # Create job (or serve it from the render cache)
     filename = f"PO-{request.object_id[:8]}-{request.template_code[:6]}"
-    job_response = client.create_job(
-        template_code=request.template_code,
-        data=document_data,
-        format='pdf',
-        filename=filename
-    )
-    
-    if not job_response or 'id' not in job_response:
-        raise HTTPException(status_code=500, detail="Failed to create job")
-    
-    job_id = job_response['id']
-    
-    # Save to MongoDB
-    docs_collection = db['depo_procurement_documents']
-    doc_entry = {
-        'object_id': order_obj_id,
-        'object_type': 'procurement_order',
-        'job_id': job_id,
-        'template_code': request.template_code,
-        'template_name': request.template_name,
-        'status': job_response.get('status', 'queued'),
-        'filename': f"{filename}.pdf",
-        'created_at': datetime.utcnow(),
-        'updated_at': datetime.utcnow(),
-        'created_by': user.get('username'),
-        'document_data': None,
-        'error': None
-    }
-    
-    docs_collection.insert_one(doc_entry)
-    
-    return {
-        'job_id': job_id,
-        'status': job_response.get('status'),
-        'message': 'Document generation started',
-        'filename': f"{filename}.pdf"
-    }
+    return _start_document_job(db, 'depo_procurement_documents', 'procurement_order', order_obj_id, request, user, document_data, filename)
 
 
 def _generate_stock_request_document(db, request_obj_id, request, user):
@@ -626,44 +698,8 @@ def _generate_stock_request_document(db, request_obj_id, request, user):
         'generated_by': user.get('username')
     }
     
-    client = DataFlowsDocuClient()
     filename = f"REQ-{req['reference']}-{request.template_code[:6]}"
-    job_response = client.create_job(
-        template_code=request.template_code,
-        data=document_data,
-        format='pdf',
-        filename=filename
-    )
-    
-    if not job_response or 'id' not in job_response:
-        raise HTTPException(status_code=500, detail="Failed to create job")
-    
-    job_id = job_response['id']
-    
-    docs_collection = db['depo_stock_request_documents']
-    doc_entry = {
-        'object_id': request_obj_id,
-        'object_type': 'stock_request',
-        'job_id': job_id,
-        'template_code': request.template_code,
-        'template_name': request.template_name,
-        'status': job_response.get('status', 'queued'),
-        'filename': f"{filename}.pdf",
-        'created_at': datetime.utcnow(),
-        'updated_at': datetime.utcnow(),
-        'created_by': user.get('username'),
-        'document_data': None,
-        'error': None
-    }
-    
-    docs_collection.insert_one(doc_entry)
-    
-    return {
-        'job_id': job_id,
-        'status': job_response.get('status'),
-        'message': 'Document generation started',
-        'filename': f"{filename}.pdf"
-    }
+    return _start_document_job(db, 'depo_stock_request_documents', 'stock_request', request_obj_id, request, user, document_data, filename)
 
 
 def _generate_sales_order_document(db, order_obj_id, request, user):
@@ -845,42 +881,6 @@ def _generate_sales_order_document(db, order_obj_id, request, user):
         'user_name': resolve_user_name(user)
     }
 
-    # Create job
-    client = DataFlowsDocuClient()
+    # Create job (or serve it from the render cache)
     filename = f"SO-{order.get('reference', request.object_id[:8])}-{request.template_code[:6]}"
-    job_response = client.create_job(
-        template_code=request.template_code,
-        data=document_data,
-        format='pdf',
-        filename=filename
-    )
-
-    if not job_response or 'id' not in job_response:
-        raise HTTPException(status_code=500, detail="Failed to create job")
-
-    job_id = job_response['id']
-
-    docs_collection = db['depo_sales_documents']
-    doc_entry = {
-        'object_id': order_obj_id,
-        'object_type': 'sales_order',
-        'job_id': job_id,
-        'template_code': request.template_code,
-        'template_name': request.template_name,
-        'status': job_response.get('status', 'queued'),
-        'filename': f"{filename}.pdf",
-        'created_at': datetime.utcnow(),
-        'updated_at': datetime.utcnow(),
-        'created_by': user.get('username'),
-        'document_data': None,
-        'error': None
-    }
-
-    docs_collection.insert_one(doc_entry)
-
-    return {
-        'job_id': job_id,
-        'status': job_response.get('status'),
-        'message': 'Document generation started',
-        'filename': f"{filename}.pdf"
-    }
+    return _start_document_job(db, 'depo_sales_documents', 'sales_order', order_obj_id, request, user, document_data, filename)
@@ -8,6 +8,12 @@ from bson import ObjectId
 from pydantic import BaseModel
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.serializers import serialize_doc as _serialize_doc
+from src.backend.utils.pagination import clamp_page_size, count_total, cursor_response, keyset_page
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.relation_loader import RelationLoader
+from src.backend.utils.audit import flush_audit_queue, log_journal
 from src.backend.utils.sections_permissions import (
     require_section,
     get_section_permissions,
@@ -16,6 +22,7 @@ from src.backend.utils.sections_permissions import (
 )
 from src.backend.models.approval_flow_model import ApprovalFlowModel
 from src.backend.utils.approval_helpers import check_approval_completion, check_user_can_sign
+from modules.inventory.stock_availability import refresh_batch_availability, refresh_stock_availability
 
 router = APIRouter(prefix="/api/returns", tags=["returns"])
 
@@ -69,33 +76,8 @@ class ReturnReceiveStockRequest(BaseModel):
 
 
 def serialize_doc(doc: Any) -> Any:
-    """Convert MongoDB document to JSON-serializable format"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id' or key.endswith('_id'):
-                result[key] = str(value) if value else None
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = [
-                    serialize_doc(item) if isinstance(item, dict)
-                    else str(item) if isinstance(item, ObjectId)
-                    else item
-                    for item in value
-                ]
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            else:
-                result[key] = value
-        return result
-    return doc
+    """Convert MongoDB document to JSON-serializable format (no 'value' field)"""
+    return _serialize_doc(doc, add_value=False)
 
 
 def _safe_object_id(value: Any) -> Optional[ObjectId]:
@@ -123,24 +105,35 @@ def _get_state_by_name(collection, names: List[str], fallback_values: Optional[L
     return None
 
 
-def _enrich_return_order(db, order: dict):
+def _prime_return_order_relations(loader: RelationLoader, orders: List[dict]):
+    """Batch-load customers and sales orders for a page of return orders"""
+    loader.add('depo_companies', [order.get('customer_id') for order in orders])
+    loader.add('depo_sales_ordes', [order.get('sales_order_id') for order in orders])
+    loader.load()
+    sales_orders = loader.get_many('depo_sales_ordes', [order.get('sales_order_id') for order in orders])
+    loader.add('depo_companies', [sales_order.get('customer_id') for sales_order in sales_orders])
+
+
+def _enrich_return_order(db, order: dict, loader: Optional[RelationLoader] = None):
     if not order:
         return order
+    if loader is None:
+        loader = RelationLoader(db)
 
     customer_detail = None
     customer_id = order.get('customer_id')
     customer_oid = _safe_object_id(customer_id)
     if customer_oid:
-        customer_detail = db['depo_companies'].find_one({'_id': customer_oid})
+        customer_detail = loader.get('depo_companies', customer_oid)
     if not customer_detail:
         sales_order_id = order.get('sales_order_id')
         sales_oid = _safe_object_id(sales_order_id)
         if sales_oid:
-            sales_order = db['depo_sales_ordes'].find_one({'_id': sales_oid}) or db['depo_sales_orders'].find_one({'_id': sales_oid})
+            sales_order = loader.get('depo_sales_ordes', sales_oid) or loader.get('depo_sales_orders', sales_oid)
             if sales_order and sales_order.get('customer_id'):
                 sales_customer_oid = _safe_object_id(sales_order.get('customer_id'))
                 if sales_customer_oid:
-                    customer_detail = db['depo_companies'].find_one({'_id': sales_customer_oid})
+                    customer_detail = loader.get('depo_companies', sales_customer_oid)
 
     if customer_detail:
         order['customer_detail'] = serialize_doc(customer_detail)
@@ -148,7 +141,7 @@ def _enrich_return_order(db, order: dict):
     state_id = order.get('state_id')
     state_oid = _safe_object_id(state_id) if state_id else None
     if state_oid:
-        state = db['depo_sales_ordes_states'].find_one({'_id': state_oid})
+        state = get_reference(db, 'depo_sales_ordes_states', state_oid)
         if state:
             order['state_detail'] = {
                 'name': state.get('name'),
@@ -174,6 +167,8 @@ async def get_return_orders(
     date_to: Optional[str] = Query(None),
     skip: Optional[int] = Query(None, ge=0),
     limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query("exact"),
     current_user: dict = Depends(require_section("returns"))
 ):
     db = get_db()
@@ -200,16 +195,20 @@ async def get_return_orders(
     perms = get_section_permissions(db, current_user, "returns")
     query = apply_scope_to_query(db, current_user, perms, query, created_by_field="created_by")
 
-    cursor = coll.find(query).sort('created_at', -1)
-    total = coll.count_documents(query)
-    if limit is not None:
-        cursor = cursor.skip(skip or 0).limit(limit)
-    elif skip:
-        cursor = cursor.skip(skip)
-    orders = list(cursor)
+    page = None
+    if cursor is not None:
+        page = keyset_page(coll, query, cursor, limit, total_mode=total_mode)
+        orders = page['docs']
+    else:
+        total = count_total(coll, query, total_mode)['total']
+        find_cursor = coll.find(query).sort('created_at', -1).skip(skip or 0).limit(clamp_page_size(limit))
+        orders = list(find_cursor)
+
+    loader = RelationLoader(db)
+    _prime_return_order_relations(loader, orders)
 
     for order in orders:
-        _enrich_return_order(db, order)
+        _enrich_return_order(db, order, loader)
         items = order.get('items', [])
         if items:
             received_lines = sum(1 for item in items if (item.get('received') or 0) > 0)
@@ -217,6 +216,8 @@ async def get_return_orders(
             order['lines'] = len(items)
 
     results = serialize_doc(orders)
+    if page is not None:
+        return cursor_response(results, page)
     return {
         'results': results,
         'total': total,
@@ -437,6 +438,7 @@ async def receive_return_stock(
 
     result = stocks_collection.insert_one(stock_doc)
     stock_id = result.inserted_id
+    refresh_stock_availability(db, stock_id)
 
     if 'stocks' not in item:
         item['stocks'] = []
@@ -458,7 +460,7 @@ async def receive_return_stock(
     )
 
     part_name = part.get('name', 'Unknown') if part else 'Unknown'
-    db.logs.insert_one({
+    log_journal({
         'collection': 'depo_return_orders',
         'object_id': return_id,
         'action': 'stock_received',
@@ -532,7 +534,7 @@ async def get_received_items(
                 }
 
         if stock.get('state_id'):
-            state = db['depo_stocks_states'].find_one({'_id': ObjectId(stock['state_id'])})
+            state = get_reference(db, 'depo_stocks_states', stock['state_id'])
             if state:
                 stock['status'] = state.get('name')
                 stock['status_detail'] = {
@@ -577,6 +579,7 @@ async def delete_stock_item(
             )
 
     stocks_collection.delete_one({'_id': ObjectId(stock_id)})
+    refresh_batch_availability(db, stock.get('part_id'), stock.get('batch_code'))
     return {"message": "Stock item deleted successfully"}
 
 
@@ -764,6 +767,7 @@ async def create_approval_flow(
     }
 
     result = db.approval_flows.insert_one(flow_data)
+    sync_approval_inbox(db, result.inserted_id)
     flow_data["_id"] = str(result.inserted_id)
     return serialize_doc(flow_data)
 
@@ -835,6 +839,7 @@ async def sign_return_order(
         {"_id": ObjectId(flow["_id"])},
         {"$push": {"signatures": signature}, "$set": {"status": "in_progress", "updated_at": timestamp}}
     )
+    sync_approval_inbox(db, flow["_id"])
 
     updated_flow = db.approval_flows.find_one({"_id": ObjectId(flow["_id"])})
     required_officers = updated_flow.get("required_officers", [])
@@ -867,8 +872,9 @@ async def sign_return_order(
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "approved", "completed_at": timestamp, "updated_at": timestamp}}
         )
+        sync_approval_inbox(db, flow["_id"])
 
-    db.logs.insert_one({
+    log_journal({
         'collection': 'depo_return_orders',
         'object_id': return_id,
         'action': 'order_signed',
@@ -912,6 +918,7 @@ async def remove_signature(
         {"_id": ObjectId(flow["_id"])},
         {"$pull": {"signatures": {"user_id": user_id}}, "$set": {"updated_at": datetime.utcnow()}}
     )
+    sync_approval_inbox(db, flow["_id"])
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Signature not found")
 
@@ -921,6 +928,7 @@ async def remove_signature(
             {"_id": ObjectId(flow["_id"])},
             {"$set": {"status": "pending"}}
         )
+        sync_approval_inbox(db, flow["_id"])
 
         pending_state = _safe_object_id(RETURN_ORDER_INITIAL_STATE_ID)
         if pending_state:
@@ -942,7 +950,7 @@ async def remove_signature(
     removed_user = db.users.find_one({'_id': ObjectId(user_id)})
     removed_username = removed_user.get('username') if removed_user else user_id
 
-    db.logs.insert_one({
+    log_journal({
         'collection': 'depo_return_orders',
         'object_id': return_id,
         'action': 'signature_removed',
@@ -959,13 +967,14 @@ async def remove_signature(
 
 
 @router.get("/{return_id}/journal")
-async def get_return_order_journal(
+def get_return_order_journal(
     return_id: str,
     current_user: dict = Depends(require_section("returns"))
 ):
     db = get_db()
     order = _get_return_order_or_404(db, return_id)
     _ensure_return_scope(db, current_user, order)
+    flush_audit_queue()
     logs = list(db.logs.find({
         'collection': 'depo_return_orders',
         'object_id': return_id
@@ -9,6 +9,7 @@ from datetime import datetime
 from src.backend.utils.db import get_db
 from src.backend.models.user_model import RoleCreate, RoleUpdate
 from src.backend.utils.sections_permissions import require_section
+from src.backend.utils.principal_cache import invalidate_role
 
 router = APIRouter(prefix="/api/roles", tags=["roles"])
 
@@ -141,6 +142,7 @@ def update_role(
         {'_id': role_oid},
         {'$set': update_data}
     )
+    invalidate_role(role_oid)
     
     # Get updated role
     # Note: Calling get_role directly since it's now a sync function
@@ -174,5 +176,7 @@ def delete_role(
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Role not found")
+
+    invalidate_role(role_oid)
     
     return {"success": True, "message": "Role deleted successfully"}
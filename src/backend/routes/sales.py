@@ -8,13 +8,21 @@ from bson import ObjectId
 from pydantic import BaseModel
 
 from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import sync_approval_inbox
+from src.backend.utils.serializers import serialize_doc as _serialize_doc
+from src.backend.utils.pagination import clamp_page_size, count_total, cursor_response, keyset_page
+from src.backend.utils.reference_cache import get_reference
+from src.backend.utils.relation_loader import RelationLoader
 from src.backend.utils.sections_permissions import (
     require_section,
     get_section_permissions,
     apply_scope_to_query,
     is_doc_in_scope
 )
-from modules.inventory.stock_movements import create_movement, MovementType, update_balance
+from modules.inventory.allocation import allocate
+from modules.inventory.stock_movements import InsufficientStockError, update_balance
+from modules.inventory.balance_snapshots import invalidate_snapshots
+from modules.inventory.part_summary import refresh_document_summaries
 
 router = APIRouter(prefix="/api/sales", tags=["sales"])
 
@@ -90,33 +98,8 @@ class AllocationRequest(BaseModel):
 
 # --- Utils ---
 def serialize_doc(doc: Any) -> Any:
-    """Convert MongoDB document to JSON-serializable format"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id' or key.endswith('_id'):
-                result[key] = str(value) if value else None
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = [
-                    serialize_doc(item) if isinstance(item, dict) 
-                    else str(item) if isinstance(item, ObjectId)
-                    else item 
-                    for item in value
-                ]
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            else:
-                result[key] = value
-        return result
-    return doc
+    """Convert MongoDB document to JSON-serializable format (no 'value' field)"""
+    return _serialize_doc(doc, add_value=False)
 
 
 def _load_sales_order_with_items(db, order_id: str):
@@ -191,39 +174,6 @@ def _load_sales_order_with_items(db, order_id: str):
     return order, orders_collection, items
 
 
-def _resolve_allocation_stock(db, part_id: str, batch_code: Optional[str], source_location_id: Optional[str], min_qty: Optional[float] = None):
-    if not part_id or not source_location_id:
-        return None, None
-    try:
-        part_oid = ObjectId(part_id)
-        source_oid = ObjectId(source_location_id)
-    except Exception:
-        return None, None
-
-    qty_filter = {'$gt': 0}
-    if min_qty is not None and min_qty > 0:
-        qty_filter = {'$gte': min_qty}
-
-    balances = list(db.depo_stocks_balances.find({
-        'location_id': source_oid,
-        'quantity': qty_filter
-    }))
-
-    for bal in balances:
-        stock = db.depo_stocks.find_one({
-            '_id': bal.get('stock_id'),
-            'part_id': part_oid,
-            'batch_code': batch_code or ''
-        })
-        if stock:
-            return stock, source_oid
-
-    # Fallback: try stocks directly
-    query = {'part_id': part_oid, 'batch_code': batch_code or ''}
-    stock = db.depo_stocks.find_one(query)
-    return stock, source_oid
-
-
 def _safe_object_id(value):
     try:
         return value if isinstance(value, ObjectId) else ObjectId(value)
@@ -231,173 +181,131 @@ def _safe_object_id(value):
         return None
 
 
-def _create_sales_allocation_movement(db, order: dict, allocation: dict, current_user: dict):
-    part_id = allocation.get('part_id') or allocation.get('part')
-    batch_code = allocation.get('batch_code') or ''
-    source_location_id = allocation.get('source_location_id')
-    quantity = allocation.get('quantity', 0)
+def _create_sales_allocation_movement(db, order: dict, allocation: dict, current_user: dict, returned: Optional[List[dict]] = None):
+    """
+    Take an allocation's quantity from its source location: lots of the part
+    (and batch, '' = without batch) earliest expiry first, guarded ledger
+    decrements (modules.inventory.allocation.allocate)
 
-    if not part_id or not source_location_id or quantity <= 0:
-        return None
+    Args:
+        returned: Lines put back in the same post (see allocate())
+
+    Raises:
+        InsufficientStockError: The source location cannot cover the quantity
 
-    stock, source_oid = _resolve_allocation_stock(db, part_id, batch_code, str(source_location_id), quantity)
-    if not stock or not source_oid:
+    Returns:
+        The allocate() result, None when the allocation takes nothing
+    """
+    part_oid = _safe_object_id(allocation.get('part_id') or allocation.get('part'))
+    source_oid = _safe_object_id(allocation.get('source_location_id'))
+    quantity = float(allocation.get('quantity') or 0)
+
+    if not part_oid or not source_oid or quantity <= 0:
         return None
 
     order_oid = _safe_object_id(order.get('_id')) or order.get('_id')
-
-    movement_id = create_movement(
-        db=db,
-        stock_id=stock['_id'],
-        part_id=stock['part_id'],
-        batch_code=batch_code,
-        movement_type=MovementType.CONSUMPTION,
-        quantity=-float(quantity),
-        from_location_id=source_oid,
-        to_location_id=None,
+    result = allocate(
+        db, part_oid, quantity, [source_oid],
         document_type='SALES_ORDER',
         document_id=order_oid,
         created_by=current_user.get('username', 'system'),
-        notes=allocation.get('notes') or f"Sales order {order.get('reference', '')}"
+        batch_code=allocation.get('batch_code') or '',
+        notes=allocation.get('notes') or f"Sales order {order.get('reference', '')}",
+        returned=returned
     )
 
-    db.depo_stocks_movements.update_one(
-        {'_id': movement_id},
-        {'$set': {
-            'allocation_id': str(allocation.get('_id')),
-            'order_id': order_oid,
-            'order_reference': order.get('reference', ''),
-            'state_id': stock.get('state_id'),
-            'source_id': source_oid,
-            'destination_id': None
-        }}
-    )
+    states = {
+        stock['_id']: stock.get('state_id')
+        for stock in db.depo_stocks.find({'_id': {'$in': [line['stock_id'] for line in result['lines']]}}, {'state_id': 1})
+    }
+    for movement_id, line in zip(result['movement_ids'], result['lines']):
+        db.depo_stocks_movements.update_one(
+            {'_id': movement_id},
+            {'$set': {
+                'allocation_id': str(allocation.get('_id')),
+                'order_id': order_oid,
+                'order_reference': order.get('reference', ''),
+                'state_id': states.get(line['stock_id']),
+                'source_id': source_oid,
+                'destination_id': None
+            }}
+        )
 
-    return movement_id
+    return result
 
 
-def _update_sales_allocation_movement(db, order: dict, allocation_id: str, new_allocation: dict, previous_allocation: dict, current_user: dict):
+def _allocation_movements(db, allocation_id) -> List[dict]:
     alloc_oid = _safe_object_id(allocation_id)
-    movement = db.depo_stocks_movements.find_one({
-        'allocation_id': {'$in': [allocation_id, alloc_oid]} ,
+    return list(db.depo_stocks_movements.find({
+        'allocation_id': {'$in': [str(allocation_id), alloc_oid]},
         'document_type': 'SALES_ORDER'
-    })
-
-    prev_qty = float(previous_allocation.get('quantity') or 0)
-    new_qty = float(new_allocation.get('quantity') or 0)
-    prev_source = previous_allocation.get('source_location_id')
-    new_source = new_allocation.get('source_location_id')
-    prev_batch = previous_allocation.get('batch_code') or ''
-    new_batch = new_allocation.get('batch_code') or ''
-    prev_part = previous_allocation.get('part_id') or previous_allocation.get('part')
-    new_part = new_allocation.get('part_id') or new_allocation.get('part')
-
-    if new_qty <= 0:
-        if movement and movement.get('from_location_id') and movement.get('stock_id'):
-            try:
-                stock_oid = _safe_object_id(movement.get('stock_id'))
-                loc_oid = _safe_object_id(movement.get('from_location_id'))
-                if stock_oid and loc_oid:
-                    update_balance(
-                        db,
-                        stock_oid,
-                        loc_oid,
-                        abs(float(movement.get('quantity') or 0)),
-                        datetime.utcnow()
-                    )
-            except Exception:
-                pass
-            db.depo_stocks_movements.delete_one({'_id': movement['_id']})
-        return
-
-    if not movement:
-        _create_sales_allocation_movement(db, order, new_allocation, current_user)
-        return
-
-    source_changed = str(prev_source) != str(new_source)
-    batch_changed = (prev_batch or '') != (new_batch or '')
-    part_changed = str(prev_part) != str(new_part)
+    }))
 
-    # Reverse old balance if source/batch/part changed
-    if source_changed or batch_changed or part_changed:
-        if movement.get('from_location_id') and movement.get('stock_id'):
-            try:
-                stock_oid = _safe_object_id(movement.get('stock_id'))
-                loc_oid = _safe_object_id(movement.get('from_location_id'))
-                if stock_oid and loc_oid:
-                    update_balance(
-                        db,
-                        stock_oid,
-                        loc_oid,
-                        abs(float(movement.get('quantity') or 0)),
-                        datetime.utcnow()
-                    )
-            except Exception:
-                pass
 
-        stock, source_oid = _resolve_allocation_stock(db, new_part, new_batch, str(new_source), new_qty)
-        if not stock or not source_oid:
-            return
+def _delete_movements(db, movement_ids: List[ObjectId]):
+    if movement_ids:
+        db.depo_stocks_movements.delete_many({'_id': {'$in': movement_ids}})
+        invalidate_snapshots(db, movement_ids)
 
-        db.depo_stocks_movements.update_one(
-            {'_id': movement['_id']},
-            {'$set': {
-                'stock_id': stock['_id'],
-                'part_id': stock['part_id'],
-                'batch_code': new_batch,
-                'quantity': -float(new_qty),
-                'from_location_id': source_oid,
-                'to_location_id': None,
-                'source_id': source_oid,
-                'destination_id': None,
-                'state_id': stock.get('state_id'),
-                'updated_at': datetime.utcnow(),
-                'updated_by': current_user.get('username', 'system')
-            }}
-        )
 
+def _release_sales_allocation_movements(db, allocation_id):
+    """Put back the stock taken by an allocation and remove its movements"""
+    movements = _allocation_movements(db, allocation_id)
+    for movement in movements:
+        stock_oid = _safe_object_id(movement.get('stock_id'))
+        loc_oid = _safe_object_id(movement.get('from_location_id'))
+        if not stock_oid or not loc_oid:
+            continue
         try:
             update_balance(
                 db,
-                stock['_id'],
-                source_oid,
-                -float(new_qty),
+                stock_oid,
+                loc_oid,
+                abs(float(movement.get('quantity') or 0)),
                 datetime.utcnow()
             )
         except Exception:
             pass
-        return
 
-    # Quantity change only
-    if movement.get('from_location_id') and movement.get('stock_id'):
-        delta = new_qty - prev_qty
-        if abs(delta) > 0:
-            try:
-                stock_oid = _safe_object_id(movement.get('stock_id'))
-                loc_oid = _safe_object_id(movement.get('from_location_id'))
-                if stock_oid and loc_oid:
-                    update_balance(
-                        db,
-                        stock_oid,
-                        loc_oid,
-                        -float(delta),
-                        datetime.utcnow()
-                    )
-            except Exception:
-                pass
+    _delete_movements(db, [movement['_id'] for movement in movements])
+
+
+def _update_sales_allocation_movement(db, order: dict, allocation_id: str, new_allocation: dict, current_user: dict):
+    """
+    Re-allocate a changed allocation in one guarded ledger post
+
+    The previous movements are put back in the same post that takes the new
+    allocation, so the new plan can reuse their lots. On success the previous
+    movements and their put-back lines are removed.
+
+    Raises:
+        InsufficientStockError: The new allocation cannot be covered; nothing
+            was posted and the previous movements are kept as they were
+    """
+    previous = _allocation_movements(db, allocation_id)
+    returned = []
+    for movement in previous:
+        stock_oid = _safe_object_id(movement.get('stock_id'))
+        loc_oid = _safe_object_id(movement.get('from_location_id'))
+        quantity = abs(float(movement.get('quantity') or 0))
+        if stock_oid and loc_oid and quantity > 0:
+            returned.append({
+                'stock_id': stock_oid,
+                'part_id': movement.get('part_id'),
+                'batch_code': movement.get('batch_code'),
+                'location_id': loc_oid,
+                'quantity': quantity,
+            })
 
-    db.depo_stocks_movements.update_one(
-        {'_id': movement['_id']},
-        {'$set': {
-            'quantity': -float(new_qty),
-            'updated_at': datetime.utcnow(),
-            'updated_by': current_user.get('username', 'system')
-        }}
-    )
+    result = _create_sales_allocation_movement(db, order, new_allocation, current_user, returned=returned)
+    if result is None:
+        _release_sales_allocation_movements(db, allocation_id)
+        return
+    _delete_movements(db, [movement['_id'] for movement in previous] + result['returned_ids'])
 
 
 @router.get("/sales-orders")
-async def get_sales_orders(
+def get_sales_orders(
     search: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     state_id: Optional[str] = Query(None),
@@ -405,6 +313,8 @@ async def get_sales_orders(
     date_to: Optional[str] = Query(None),
     skip: Optional[int] = Query(None, ge=0),
     limit: Optional[int] = Query(None, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    total_mode: str = Query("exact"),
     current_user: dict = Depends(require_section("sales"))
 ):
     db = get_db()
@@ -446,23 +356,27 @@ async def get_sales_orders(
     query = apply_scope_to_query(db, current_user, perms, query, created_by_field="created_by")
             
     try:
-        cursor = collection.find(query).sort('created_at', -1)
-        total = collection.count_documents(query)
-        if limit is not None:
-            cursor = cursor.skip(skip or 0).limit(limit)
-        elif skip:
-            cursor = cursor.skip(skip)
-        orders = list(cursor)
+        page = None
+        if cursor is not None:
+            page = keyset_page(collection, query, cursor, limit, total_mode=total_mode)
+            orders = page['docs']
+        else:
+            total = count_total(collection, query, total_mode)['total']
+            find_cursor = collection.find(query).sort('created_at', -1).skip(skip or 0).limit(clamp_page_size(limit))
+            orders = list(find_cursor)
+
+        loader = RelationLoader(db)
+        loader.add('depo_companies', [order.get('customer_id') for order in orders])
         
         # Enrich orders
         for order in orders:
             if order.get('customer_id'):
-                customer = db['depo_companies'].find_one({'_id': ObjectId(order['customer_id'])})
+                customer = loader.get('depo_companies', order['customer_id'])
                 if customer:
                     order['customer_detail'] = serialize_doc(customer)
                     
             if order.get('state_id'):
-                state = db['depo_sales_ordes_states'].find_one({'_id': order['state_id']})
+                state = get_reference(db, 'depo_sales_ordes_states', order['state_id'])
                 if state:
                     order['state_detail'] = {
                         'name': state.get('name'),
@@ -477,18 +391,22 @@ async def get_sales_orders(
                 order['status_text'] = 'Draft'
                 
         results = serialize_doc(orders)
+        if page is not None:
+            return cursor_response(results, page)
         return {
             'results': results,
             'total': total,
             'skip': skip or 0,
             'limit': limit or len(results)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/sales-orders")
-async def create_sales_order(
+def create_sales_order(
     order_data: SalesOrderRequest,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -577,6 +495,7 @@ async def create_sales_order(
                     "updated_at": datetime.utcnow()
                 }
                 db['approval_flows'].insert_one(flow_data)
+                sync_approval_inbox(db, flow_data["_id"])
         except Exception as e:
             print(f"Failed to auto-create approval flow: {e}")
             
@@ -586,7 +505,7 @@ async def create_sales_order(
 
 
 @router.get("/sales-orders/{order_id}")
-async def get_sales_order(
+def get_sales_order(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -604,7 +523,7 @@ async def get_sales_order(
                 order['customer_detail'] = serialize_doc(customer)
                 
         if order.get('state_id'):
-            state = db['depo_sales_ordes_states'].find_one({'_id': order['state_id']})
+            state = get_reference(db, 'depo_sales_ordes_states', order['state_id'])
             if state:
                 order['state_detail'] = {
                     'name': state.get('name'),
@@ -625,7 +544,7 @@ async def get_sales_order(
 
 
 @router.get("/sales-orders/{order_id}/items")
-async def get_sales_order_items(
+def get_sales_order_items(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -700,7 +619,7 @@ async def get_sales_order_items(
 
 
 @router.post("/sales-orders/{order_id}/items")
-async def add_sales_order_item(
+def add_sales_order_item(
     order_id: str,
     item: SalesOrderItemRequest,
     current_user: dict = Depends(require_section("sales"))
@@ -756,12 +675,13 @@ async def add_sales_order_item(
             'updated_at': datetime.utcnow()
         }}
     )
+    refresh_document_summaries(db, orders.name, order_id)
 
     return serialize_doc(doc)
 
 
 @router.put("/sales-orders/{order_id}/items/{item_id}")
-async def update_sales_order_item(
+def update_sales_order_item(
     order_id: str,
     item_id: str,
     item: SalesOrderItemRequest,
@@ -786,6 +706,7 @@ async def update_sales_order_item(
         raise HTTPException(status_code=404, detail="Item not found")
 
     existing = items[item_index]
+    previous = {'items': [dict(existing)]}
 
     existing['quantity'] = item.quantity
     existing['sale_price'] = item.sale_price
@@ -811,12 +732,13 @@ async def update_sales_order_item(
         {'_id': ObjectId(order_id)},
         {'$set': {'items': items, 'updated_at': datetime.utcnow()}}
     )
+    refresh_document_summaries(db, orders.name, order_id, previous)
 
     return serialize_doc(existing)
 
 
 @router.delete("/sales-orders/{order_id}/items/{item_id}")
-async def delete_sales_order_item(
+def delete_sales_order_item(
     order_id: str,
     item_id: str,
     current_user: dict = Depends(require_section("sales"))
@@ -844,12 +766,13 @@ async def delete_sales_order_item(
             'updated_at': datetime.utcnow()
         }}
     )
+    refresh_document_summaries(db, orders.name, order_id, order)
 
     return {"success": True}
 
 
 @router.get("/sales-orders/{order_id}/shipments")
-async def get_sales_order_shipments(
+def get_sales_order_shipments(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -860,7 +783,7 @@ async def get_sales_order_shipments(
 
 
 @router.post("/sales-orders/{order_id}/shipments")
-async def create_sales_order_shipment(
+def create_sales_order_shipment(
     order_id: str,
     shipment: ShipmentRequest,
     current_user: dict = Depends(require_section("sales"))
@@ -888,7 +811,7 @@ async def create_sales_order_shipment(
 
 
 @router.put("/sales-orders/{order_id}/shipments/{shipment_id}")
-async def update_sales_order_shipment(
+def update_sales_order_shipment(
     order_id: str,
     shipment_id: str,
     shipment: ShipmentRequest,
@@ -917,7 +840,7 @@ async def update_sales_order_shipment(
 
 
 @router.delete("/sales-orders/{order_id}/shipments/{shipment_id}")
-async def delete_sales_order_shipment(
+def delete_sales_order_shipment(
     order_id: str,
     shipment_id: str,
     current_user: dict = Depends(require_section("sales"))
@@ -932,7 +855,7 @@ async def delete_sales_order_shipment(
 
 
 @router.get("/sales-orders/{order_id}/attachments")
-async def get_sales_order_attachments(
+def get_sales_order_attachments(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -943,7 +866,7 @@ async def get_sales_order_attachments(
 
 
 @router.get("/sales-orders/{order_id}/returns")
-async def get_sales_order_returns(
+def get_sales_order_returns(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -960,7 +883,7 @@ async def get_sales_order_returns(
 
 
 @router.post("/sales-orders/{order_id}/returns")
-async def create_sales_order_return(
+def create_sales_order_return(
     order_id: str,
     payload: ReturnOrderRequest,
     current_user: dict = Depends(require_section("sales"))
@@ -1116,6 +1039,7 @@ async def create_sales_order_return(
                 "updated_at": datetime.utcnow()
             }
             db['approval_flows'].insert_one(flow_data)
+            sync_approval_inbox(db, flow_data["_id"])
     except Exception as e:
         print(f"Failed to auto-create approval flow for return order: {e}")
 
@@ -1123,7 +1047,7 @@ async def create_sales_order_return(
 
 
 @router.get("/sales-orders/{order_id}/allocations")
-async def get_sales_order_allocations(
+def get_sales_order_allocations(
     order_id: str,
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -1143,7 +1067,7 @@ async def get_sales_order_allocations(
 
 
 @router.post("/sales-orders/{order_id}/allocations")
-async def create_sales_order_allocation(
+def create_sales_order_allocation(
     order_id: str,
     allocation: AllocationRequest,
     current_user: dict = Depends(require_section("sales"))
@@ -1172,13 +1096,16 @@ async def create_sales_order_allocation(
         order = db['depo_sales_ordes'].find_one({'_id': ObjectId(order_id)}) or db['depo_sales_orders'].find_one({'_id': ObjectId(order_id)})
         if order:
             _create_sales_allocation_movement(db, order, doc, current_user)
+    except InsufficientStockError as e:
+        db['depo_sales_allocations'].delete_one({'_id': doc['_id']})
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[SALES] Warning: Failed to create sales movement: {e}")
     return serialize_doc(doc)
 
 
 @router.put("/sales-orders/{order_id}/allocations/{allocation_id}")
-async def update_sales_order_allocation(
+def update_sales_order_allocation(
     order_id: str,
     allocation_id: str,
     allocation: AllocationRequest,
@@ -1203,14 +1130,17 @@ async def update_sales_order_allocation(
     try:
         order = db['depo_sales_ordes'].find_one({'_id': ObjectId(order_id)}) or db['depo_sales_orders'].find_one({'_id': ObjectId(order_id)})
         if order and updated:
-            _update_sales_allocation_movement(db, order, allocation_id, updated, existing, current_user)
+            _update_sales_allocation_movement(db, order, allocation_id, updated, current_user)
+    except InsufficientStockError as e:
+        coll.update_one({'_id': ObjectId(allocation_id)}, {'$set': {key: existing.get(key) for key in update_fields}})
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[SALES] Warning: Failed to update sales movement: {e}")
     return serialize_doc(updated)
 
 
 @router.delete("/sales-orders/{order_id}/allocations/{allocation_id}")
-async def delete_sales_order_allocation(
+def delete_sales_order_allocation(
     order_id: str,
     allocation_id: str,
     current_user: dict = Depends(require_section("sales"))
@@ -1223,30 +1153,14 @@ async def delete_sales_order_allocation(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Allocation not found")
     try:
-        alloc_oid = _safe_object_id(allocation_id)
-        movement = db.depo_stocks_movements.find_one({
-            'allocation_id': {'$in': [allocation_id, alloc_oid]},
-            'document_type': 'SALES_ORDER'
-        })
-        if movement and movement.get('from_location_id') and movement.get('stock_id'):
-            try:
-                update_balance(
-                    db,
-                    movement.get('stock_id'),
-                    movement.get('from_location_id'),
-                    abs(float(movement.get('quantity') or 0)),
-                    datetime.utcnow()
-                )
-            except Exception:
-                pass
-            db.depo_stocks_movements.delete_one({'_id': movement['_id']})
+        _release_sales_allocation_movements(db, allocation_id)
     except Exception as e:
         print(f"[SALES] Warning: Failed to remove sales movement: {e}")
     return {"success": True}
 
 
 @router.get("/order-statuses")
-async def get_sales_order_statuses(
+def get_sales_order_statuses(
     current_user: dict = Depends(require_section("sales"))
 ):
     db = get_db()
@@ -1255,7 +1169,7 @@ async def get_sales_order_statuses(
 
 
 @router.get("/returns")
-async def get_return_orders(
+def get_return_orders(
     search: Optional[str] = Query(None),
     state_id: Optional[str] = Query(None),
     date_from: Optional[str] = Query(None),
@@ -1291,7 +1205,7 @@ async def get_return_orders(
         if ret.get('state_id'):
             try:
                 state_oid = ObjectId(ret['state_id']) if isinstance(ret['state_id'], str) else ret['state_id']
-                state = db['depo_sales_ordes_states'].find_one({'_id': state_oid})
+                state = get_reference(db, 'depo_sales_ordes_states', state_oid)
             except Exception:
                 state = None
             if state:
@@ -1334,7 +1248,7 @@ async def get_return_orders(
 
 
 @router.patch("/sales-orders/{order_id}/status")
-async def update_sales_order_status(
+def update_sales_order_status(
     order_id: str,
     update_data: StatusUpdateRequest,
     current_user: dict = Depends(require_section("sales"))
@@ -1355,13 +1269,14 @@ async def update_sales_order_status(
             {'_id': ObjectId(order_id)},
             {'$set': update_fields}
         )
+        refresh_document_summaries(db, collection.name, order_id)
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/customers")
-async def get_sales_customers(
+def get_sales_customers(
     search: Optional[str] = Query(None),
     current_user: dict = Depends(require_section("sales"))
 ):
@@ -8,11 +8,15 @@ import yaml
 import os
 from datetime import datetime
 
-from src.backend.utils.dataflows_docu import DataFlowsDocuClient
+from src.backend.utils.dataflows_docu import get_docu_client
 from src.backend.utils.db import get_db
 from src.backend.models.job_model import JobModel
 from src.backend.scheduler import get_scheduler
 from src.backend.utils.sections_permissions import require_section
+from src.backend.utils.principal_cache import get_principal_cache_stats
+from src.backend.utils.reference_cache import get_reference_cache_stats, invalidate_reference_data, list_references
+from src.backend.utils.render_cache import get_render_cache_stats, invalidate_template
+from src.backend.utils.audit import get_audit_queue_stats
 
 router = APIRouter(prefix="/api", tags=["system"])
 
@@ -44,11 +48,9 @@ def get_currencies():
     Public endpoint - used across multiple modules
     """
     db = get_db()
-    collection = db['currencies']
     
     try:
-        cursor = collection.find().sort('abrev', 1)
-        currencies = list(cursor)
+        currencies = list_references(db, 'currencies', sort_by='abrev')
         
         # Convert ObjectId to string - NO PK FIELD
         for currency in currencies:
@@ -72,17 +74,13 @@ def get_system_status() -> Dict[str, Any]:
     """
     config = load_config()
     
-    # Check if DataFlows Docu is configured
-    docu_config = config.get('dataflows_docu', {})
-    docu_url = docu_config.get('url', '')
-    docu_token = docu_config.get('token', '')
-    
-    docu_configured = bool(docu_url and docu_token and docu_token != 'changeme')
+    # DataFlows Docu: configuration and cached health (refreshed in the background)
+    client = get_docu_client()
+    docu_configured = client.configured
     docu_available = False
     
     if docu_configured:
         try:
-            client = DataFlowsDocuClient()
             docu_available = client.health_check()
         except:
             docu_available = False
@@ -91,7 +89,7 @@ def get_system_status() -> Dict[str, Any]:
         'dataflows_docu': {
             'configured': docu_configured,
             'available': docu_available,
-            'url': docu_url if docu_configured else None
+            'url': client.base_url if docu_configured else None
         },
         'document_generation': {
             'max_revisions': config.get('document_generation', {}).get('max_revisions', 3)
@@ -99,6 +97,52 @@ def get_system_status() -> Dict[str, Any]:
     }
 
 
+@router.get("/system/cache-stats")
+def get_cache_stats(user = Depends(require_section("system"))) -> Dict[str, Any]:
+    """
+    Get in-process cache counters (hits, misses, hit ratio, size)
+    """
+    return {
+        'principal': get_principal_cache_stats(),
+        'reference': get_reference_cache_stats(),
+        'render': get_render_cache_stats(get_db())
+    }
+
+
+@router.post("/system/cache-stats/reference/invalidate")
+def invalidate_reference_cache(collection: str = None, user = Depends(require_section("system"))) -> Dict[str, Any]:
+    """
+    Drop cached reference data (after editing states/UMs/steps directly in the database)
+    """
+    invalidate_reference_data(collection)
+    return {'success': True, 'collection': collection}
+
+
+@router.post("/system/render-cache/invalidate")
+def invalidate_render_cache(template_code: str = None, user = Depends(require_section("system"))) -> Dict[str, Any]:
+    """
+    Drop cached document/label renders after a template was edited (all templates if none given)
+    """
+    result = invalidate_template(get_db(), template_code)
+    return {'success': True, **result}
+
+
+@router.get("/system/docu-client")
+def get_docu_client_stats(user = Depends(require_section("system"))) -> Dict[str, Any]:
+    """
+    Get DataFlows Docu client state (cached health, last probe, circuit breaker)
+    """
+    return get_docu_client().health_stats()
+
+
+@router.get("/system/audit-queue")
+def get_audit_queue(user = Depends(require_section("system"))) -> Dict[str, Any]:
+    """
+    Get audit writer counters (enqueued, written, dropped, failed, queued)
+    """
+    return get_audit_queue_stats()
+
+
 @router.get("/system/notifications")
 def get_system_notifications() -> Dict[str, Any]:
     """
@@ -107,14 +151,11 @@ def get_system_notifications() -> Dict[str, Any]:
     """
     notifications = []
     
-    config = load_config()
-    
-    # Check DataFlows Docu configuration
-    docu_config = config.get('dataflows_docu', {})
-    docu_url = docu_config.get('url', '')
-    docu_token = docu_config.get('token', '')
+    # Check DataFlows Docu configuration (health is the cached state)
+    client = get_docu_client()
+    docu_url = client.base_url
     
-    if not docu_url or not docu_token or docu_token == 'changeme':
+    if not client.configured:
         notifications.append({
             'type': 'warning',
             'title': 'DataFlows Docu Not Configured',
@@ -124,7 +165,6 @@ def get_system_notifications() -> Dict[str, Any]:
     else:
         # Check if service is available
         try:
-            client = DataFlowsDocuClient()
             if not client.health_check():
                 notifications.append({
                     'type': 'error',
@@ -11,6 +11,7 @@ from src.backend.utils.db import get_db
 from src.backend.utils.local_auth import create_user, hash_password, generate_salt
 from src.backend.models.user_model import UserCreate, UserUpdate
 from src.backend.utils.sections_permissions import require_section
+from src.backend.utils.principal_cache import invalidate_user
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -284,6 +285,7 @@ def update_user(
         update_doc['$unset'] = unset_data
 
     users_collection.update_one({'_id': user_oid}, update_doc)
+    invalidate_user(user_oid)
     
     # Get updated user -- MANUAL CALL INSTEAD OF ASYNC AWAIT
     return get_user(user_id, current_user)
@@ -307,5 +309,7 @@ def delete_user(
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+
+    invalidate_user(user_oid)
     
     return {"success": True, "message": "User deleted successfully"}
@@ -3,7 +3,7 @@ Global approval flow helpers
 Reusable functions for approval flow logic across all modules
 """
 from bson import ObjectId
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 def _is_object_id(value: Any) -> bool:
@@ -77,10 +77,79 @@ def normalize_officers(db, officers: List[Dict[str, Any]]) -> List[Dict[str, Any
     return normalized
 
 
+def load_signature_context(
+    db,
+    officers: List[Dict[str, Any]],
+    signatures: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Load what role-based officers are checked against, for a whole flow at once
+
+    One users query for the roles of all signers and one roles query for the
+    slug-referenced (legacy) roles; none at all when no officer is a role.
+
+    Returns:
+        dict: {"user_roles": {user_id: role_id}, "role_ids": {role_slug: role_id}}
+    """
+    context = {"user_roles": {}, "role_ids": {}}
+    role_references = [
+        officer.get("reference") for officer in officers
+        if isinstance(officer, dict) and officer.get("type") == "role"
+    ]
+    if not role_references:
+        return context
+
+    user_oids = list({
+        ObjectId(str(sig["user_id"])) for sig in signatures
+        if sig.get("user_id") is not None and ObjectId.is_valid(str(sig["user_id"]))
+    })
+    if user_oids:
+        for user in db.users.find({"_id": {"$in": user_oids}}, {"role": 1}):
+            if user.get("role") is not None:
+                context["user_roles"][str(user["_id"])] = str(user["role"])
+
+    slugs = list({ref for ref in role_references if isinstance(ref, str) and not _is_object_id(ref)})
+    if slugs:
+        for role in db.roles.find({"slug": {"$in": slugs}}, {"slug": 1}):
+            context["role_ids"][role["slug"]] = str(role["_id"])
+
+    return context
+
+
+def signature_matches_officer(
+    signature: Dict[str, Any],
+    officer: Dict[str, Any],
+    context: Dict[str, Dict[str, str]]
+) -> bool:
+    """
+    Check if a signature satisfies an officer (no queries, see load_signature_context)
+
+    - person: the officer itself signed
+    - role: the signer has that role (role id, or legacy role slug)
+    """
+    officer_type = officer.get("type")
+    if officer_type in {"person", "user"}:
+        return signature.get("user_id") == officer.get("reference")
+    if officer_type != "role":
+        return False
+
+    role_reference = officer.get("reference")
+    if _is_object_id(role_reference):
+        role_id = str(role_reference)
+    elif isinstance(role_reference, str):
+        role_id = context["role_ids"].get(role_reference)
+    else:
+        role_id = None
+    if not role_id:
+        return False
+    return context["user_roles"].get(str(signature.get("user_id"))) == role_id
+
+
 def check_approval_completion(
     db,
     required_officers: List[Dict[str, Any]],
-    signatures: List[Dict[str, Any]]
+    signatures: List[Dict[str, Any]],
+    context: Optional[Dict[str, Dict[str, str]]] = None
 ) -> tuple[bool, int, int]:
     """
     Check if all required officers have signed
@@ -93,52 +162,20 @@ def check_approval_completion(
         db: MongoDB database connection
         required_officers: List of required officers (type, reference, action)
         signatures: List of signatures (user_id, username, signed_at, etc.)
+        context: load_signature_context() result, when the caller already
+            loaded it for the whole flow (otherwise loaded here)
     
     Returns:
         tuple: (is_complete, signed_count, required_count)
     """
-    required_signed = 0
-    required_count = len(required_officers)
-    
-    for officer in required_officers:
-        has_signed = False
-        
-        if officer["type"] in {"person", "user"}:
-            # Check if this specific person has signed
-            if any(s["user_id"] == officer["reference"] for s in signatures):
-                has_signed = True
-        
-        elif officer["type"] == "role":
-            # Check if anyone with this role has signed
-            role_reference = officer["reference"]
+    if context is None:
+        context = load_signature_context(db, required_officers, signatures)
 
-            if _is_object_id(role_reference):
-                # reference is role id (preferred)
-                role_id = str(role_reference)
-                for sig in signatures:
-                    user = db.users.find_one({"_id": ObjectId(sig["user_id"])})
-                    if user:
-                        user_role = user.get("role")
-                        if user_role is not None and str(user_role) == role_id:
-                            has_signed = True
-                            break
-            else:
-                # reference is role slug (legacy)
-                role_slug = role_reference
-                role = db.roles.find_one({"slug": role_slug})
-                if role:
-                    role_id = str(role["_id"])
-                    # Check if any signature is from a user with this role
-                    for sig in signatures:
-                        user = db.users.find_one({"_id": ObjectId(sig["user_id"])})
-                        if user:
-                            user_role = user.get("role")
-                            if user_role is not None and str(user_role) == role_id:
-                                has_signed = True
-                                break
-        
-        if has_signed:
-            required_signed += 1
+    required_count = len(required_officers)
+    required_signed = sum(
+        1 for officer in required_officers
+        if any(signature_matches_officer(sig, officer, context) for sig in signatures)
+    )
     
     is_complete = required_signed == required_count
     return is_complete, required_signed, required_count
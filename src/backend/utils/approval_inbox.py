@@ -0,0 +1,262 @@
+"""
+Approval inbox
+Inbox aprobări: fluxurile deschise, indexate după cine le poate semna
+
+approval_inbox holds one document per open approval flow (_id = flow _id):
+- signers: 'user:<id>' / 'role:<id>' keys of every officer (required or optional)
+- required_signers: the keys of the required officers
+- signed_user_ids: users who already signed
+- object_type / object_source / object_id / status / created_at of the flow
+- object_details: cached {reference, description, supplier} of the object
+
+GET /api/approvals/pending is then one query on the signers index
+(pending_approvals()) instead of reading every open flow.
+
+Every write to approval_flows is followed by sync_approval_inbox(db, flow_id):
+open flows are upserted, approved / rejected / deleted flows removed.
+rebuild_approval_inbox() (`invoke db-rebuild-approval-inbox`, or the
+rebuild_approval_inbox job) rebuilds it from approval_flows and refreshes the
+cached object details.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+INBOX_COLLECTION = 'approval_inbox'
+OPEN_STATUSES = ('pending', 'in_progress')
+
+STOCK_REQUEST_TYPES = {
+    'stock_request', 'stock_request_operations', 'stock_request_reception',
+    'stock_request_production', 'stock_request_production_series',
+}
+BUILD_ORDER_TYPES = {'build_order_production', 'build_order_production_series'}
+
+
+def _safe_object_id(value: Any) -> Optional[ObjectId]:
+    if not value:
+        return None
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(str(value))
+    except Exception:
+        return None
+
+
+def _split_object_id(value: Any) -> tuple:
+    """'<id>:<series batch>' -> (id, batch); plain ids -> (id, None)"""
+    raw = str(value) if value is not None else ''
+    if ':' in raw:
+        base_id, suffix = raw.split(':', 1)
+        return base_id, suffix
+    return raw, None
+
+
+def _format_batch_codes(batch_codes: Any) -> Optional[str]:
+    if not batch_codes:
+        return None
+    if isinstance(batch_codes, str):
+        codes = [batch_codes.strip()]
+    else:
+        codes = [str(code).strip() for code in batch_codes if str(code).strip()]
+    if not codes:
+        return None
+    if len(codes) == 1:
+        return codes[0]
+    return f"{codes[0]} +{len(codes) - 1}"
+
+
+def signer_keys(user_id: Any, role: Any = None) -> List[str]:
+    """Inbox keys a user signs as: the user itself and its role"""
+    keys = [f"user:{user_id}"]
+    if role is not None:
+        keys.append(f"role:{role}")
+    return keys
+
+
+def _officer_keys(officers: List[dict]) -> List[str]:
+    keys = []
+    for officer in officers or []:
+        if not isinstance(officer, dict) or officer.get('reference') is None:
+            continue
+        if officer.get('type') == 'person':
+            keys.append(f"user:{officer['reference']}")
+        elif officer.get('type') == 'role':
+            keys.append(f"role:{officer['reference']}")
+    return keys
+
+
+def object_details(db, flow: dict) -> Dict[str, str]:
+    """Reference / description / supplier shown for the object of a flow"""
+    object_type = flow.get('object_type')
+    object_source = flow.get('object_source')
+    base_object_id, series_batch = _split_object_id(flow.get('object_id'))
+    details = {
+        'reference': f"{object_type} #{flow.get('object_id')}",
+        'description': 'Waiting for approval',
+        'supplier': '-',
+    }
+
+    try:
+        if object_type == 'procurement_order' and object_source == 'depo_procurement':
+            order_oid = _safe_object_id(flow.get('object_id'))
+            order = db.depo_purchase_orders.find_one({'_id': order_oid}) if order_oid else None
+            if order:
+                details['reference'] = order.get('reference', 'Unknown')
+                details['description'] = order.get('description', '')
+                if order.get('supplier_id'):
+                    supplier = db.depo_companies.find_one({'_id': order['supplier_id']}, {'name': 1})
+                    if supplier:
+                        details['supplier'] = supplier.get('name', 'Unknown')
+
+        elif object_type == 'purchase_request' and object_source == 'core':
+            request_oid = _safe_object_id(flow.get('object_id'))
+            request = db.depo_purchase_requests.find_one({'_id': request_oid}) if request_oid else None
+            if request:
+                details['reference'] = request.get('reference', f"Request #{request.get('number', '')}")
+                details['description'] = request.get('notes', '')
+
+        elif object_type in STOCK_REQUEST_TYPES:
+            request_oid = _safe_object_id(base_object_id)
+            request = db.depo_requests.find_one({'_id': request_oid}) if request_oid else None
+            if request:
+                request_reference = request.get('reference') or ''
+                request_notes = request.get('notes') or ''
+                batch_label = series_batch or _format_batch_codes(request.get('batch_codes'))
+                if object_type != 'stock_request' and batch_label:
+                    details['reference'] = batch_label
+                    details['description'] = request_reference or request_notes or details['description']
+                else:
+                    details['reference'] = request_reference or details['reference']
+                    details['description'] = request_notes or details['description']
+
+        elif object_type == 'sales_order' and object_source == 'depo_sales':
+            order_oid = _safe_object_id(flow.get('object_id'))
+            order = None
+            if order_oid:
+                order = db['depo_sales_ordes'].find_one({'_id': order_oid})
+                if not order:
+                    order = db['depo_sales_orders'].find_one({'_id': order_oid})
+            if order:
+                details['reference'] = order.get('reference', 'Unknown')
+                details['description'] = order.get('description', '') or order.get('notes', '')
+
+        elif object_type == 'return_order':
+            order_oid = _safe_object_id(flow.get('object_id'))
+            order = db['depo_return_orders'].find_one({'_id': order_oid}) if order_oid else None
+            if order:
+                details['reference'] = order.get('reference', 'Unknown')
+                details['description'] = order.get('sales_order_reference', '') or order.get('notes', '')
+
+        elif object_type in BUILD_ORDER_TYPES:
+            build_oid = _safe_object_id(base_object_id)
+            build_order = db['depo_build_orders'].find_one({'_id': build_oid}) if build_oid else None
+            if build_order:
+                batch_code = build_order.get('batch_code_text') or build_order.get('batch_code')
+                details['reference'] = batch_code or details['reference']
+                details['description'] = build_order.get('reference', '') or details['description']
+
+        elif object_type == 'stock_qc':
+            stock_oid = _safe_object_id(flow.get('object_id'))
+            stock = db.depo_stocks.find_one({'_id': stock_oid}) if stock_oid else None
+            if stock:
+                batch_code = stock.get('batch_code') or stock.get('supplier_batch_code')
+                details['reference'] = batch_code or details['reference']
+                part_oid = _safe_object_id(stock.get('part_id'))
+                part = db.depo_parts.find_one({'_id': part_oid}, {'name': 1}) if part_oid else None
+                if part and part.get('name'):
+                    details['description'] = part['name']
+    except Exception as e:
+        print(f"[APPROVAL_INBOX] Warning: Failed to fetch {object_type} details: {e}")
+
+    return details
+
+
+def inbox_entry(db, flow: dict) -> dict:
+    """Inbox document of an open flow"""
+    required = _officer_keys(flow.get('must_sign_officers') or flow.get('required_officers') or [])
+    optional = _officer_keys(flow.get('can_sign_officers') or flow.get('optional_officers') or [])
+    return {
+        '_id': flow['_id'],
+        'signers': list(dict.fromkeys(required + optional)),
+        'required_signers': required,
+        'signed_user_ids': [str(s.get('user_id')) for s in flow.get('signatures', []) if s.get('user_id') is not None],
+        'object_type': flow.get('object_type'),
+        'object_source': flow.get('object_source'),
+        'object_id': str(flow['object_id']) if flow.get('object_id') is not None else None,
+        'status': flow.get('status'),
+        'created_at': flow.get('created_at'),
+        'object_details': object_details(db, flow),
+        'synced_at': datetime.utcnow(),
+    }
+
+
+def sync_approval_inbox(db, flow_id: Any) -> None:
+    """
+    Mirror one flow into the inbox after it was created, signed or closed
+
+    Never raises: a failed sync only leaves the inbox stale until the next
+    write or rebuild.
+    """
+    try:
+        flow_oid = _safe_object_id(flow_id)
+        if flow_oid is None:
+            return
+        flow = db.approval_flows.find_one({'_id': flow_oid})
+        if flow and flow.get('status') in OPEN_STATUSES:
+            db[INBOX_COLLECTION].replace_one({'_id': flow_oid}, inbox_entry(db, flow), upsert=True)
+        else:
+            db[INBOX_COLLECTION].delete_one({'_id': flow_oid})
+    except Exception as e:
+        print(f"[APPROVAL_INBOX] Warning: Failed to sync flow {flow_id}: {e}")
+
+
+def rebuild_approval_inbox(db, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Rebuild the inbox from the open flows (also refreshes object details)
+
+    Returns:
+        {'flows': entries written, 'removed': entries of closed flows removed}
+    """
+    inbox = db[INBOX_COLLECTION]
+    open_ids = []
+    ops = []
+    for flow in db.approval_flows.find({'status': {'$in': list(OPEN_STATUSES)}}):
+        open_ids.append(flow['_id'])
+        ops.append(ReplaceOne({'_id': flow['_id']}, inbox_entry(db, flow), upsert=True))
+        if len(ops) >= batch_size:
+            inbox.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        inbox.bulk_write(ops, ordered=False)
+    removed = inbox.delete_many({'_id': {'$nin': open_ids}}).deleted_count
+    return {'flows': len(open_ids), 'removed': removed}
+
+
+def ensure_approval_inbox(db) -> Optional[Dict[str, int]]:
+    """Build the inbox once on a database that has open flows but no inbox yet"""
+    if db[INBOX_COLLECTION].find_one({}, {'_id': 1}):
+        return None
+    if not db.approval_flows.find_one({'status': {'$in': list(OPEN_STATUSES)}}, {'_id': 1}):
+        return None
+    return rebuild_approval_inbox(db)
+
+
+def pending_approvals(db, user_id: Any, role: Any = None) -> List[dict]:
+    """Open flows the user can sign and has not signed yet, newest first"""
+    user_id = str(user_id)
+    keys = signer_keys(user_id, role)
+    entries = db[INBOX_COLLECTION].find(
+        {'signers': {'$in': keys}, 'signed_user_ids': {'$ne': user_id}},
+        {'signers': 0, 'signed_user_ids': 0, 'synced_at': 0},
+    ).sort('created_at', -1)
+
+    approvals = []
+    for entry in entries:
+        required = entry.pop('required_signers', [])
+        entry['_id'] = str(entry['_id'])
+        entry['officer_type'] = 'required' if any(key in required for key in keys) else 'optional'
+        approvals.append(entry)
+    return approvals
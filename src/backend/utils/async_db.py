@@ -0,0 +1,90 @@
+"""
+Non-blocking MongoDB access for async route handlers
+
+pymongo is synchronous, so every query made from an `async def` handler blocks
+the uvicorn event loop. This module runs such calls in a bounded pool of
+worker threads instead, keeping the loop free for other requests.
+
+Usage:
+    from src.backend.utils.async_db import run_in_db_thread, db_offload
+
+    # One-off call
+    doc = await run_in_db_thread(db.depo_parts.find_one, {'_id': part_oid})
+
+    # Whole service function (callers keep using `await service(...)`)
+    @db_offload
+    def get_part_stock_info(db, part_id):
+        ...
+
+    # From another offloaded function, call the sync body directly
+    get_part_stock_info.sync(db, part_id)
+
+Pool size comes from `mongo.async_workers` in config.yaml (default 16). It
+should not exceed the pymongo connection pool (maxPoolSize, default 100).
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_WORKERS = 16
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get (and lazily create) the shared database worker pool"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                try:
+                    workers = max(1, int(get_config_value('mongo.async_workers', DEFAULT_WORKERS)))
+                except (FileNotFoundError, TypeError, ValueError):
+                    workers = DEFAULT_WORKERS
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db-worker')
+
+    return _executor
+
+
+async def run_in_db_thread(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking database call in the worker pool and await its result
+
+    Exceptions (including HTTPException) propagate to the caller unchanged.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    return await loop.run_in_executor(get_db_executor(), call)
+
+
+def db_offload(fn: Callable) -> Callable:
+    """
+    Decorator: turn a synchronous service function into an awaitable one
+
+    The decorated function keeps the call signature of the original, so
+    existing `await service(...)` call sites keep working. The synchronous
+    body stays reachable as `.sync` for use from other offloaded functions
+    (awaiting from inside a worker thread is not possible).
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_thread(fn, *args, **kwargs)
+
+    wrapper.sync = fn
+    return wrapper
+
+
+def shutdown_db_executor(wait: bool = True):
+    """Stop the worker pool (called on application shutdown)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -1,11 +1,248 @@
 """
 Audit logging utilities
+
+Audit entries (audit_logs) and document journal entries (logs) are not
+written inline. They are appended to an in-process queue and a background
+thread writes them with insert_many, either when `audit.batch_size` entries
+are pending or every `audit.flush_interval` seconds. When the queue
+(`audit.queue_size`) is full, callers wait at most `audit.put_timeout`
+seconds, then the entry is dropped and counted.
+
+Readers that need their own writes (journal endpoints) call flush_audit_queue()
+first. The queue is drained on application shutdown and at interpreter exit.
 """
+import atexit
+import queue
+import threading
+import time
 from fastapi import Request
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from ..utils.db import get_db
+from ..utils.search import search_fields
+from ..utils.config import get_config_value
 from ..models.audit_log_model import AuditLogModel
 
+JOURNAL_COLLECTION = "logs"
+
+DEFAULT_SETTINGS = {
+    'batch_size': 100,
+    'flush_interval': 1.0,
+    'queue_size': 10000,
+    'put_timeout': 0.05,
+}
+
+
+def _get_settings() -> Dict[str, float]:
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        configured = get_config_value('audit', {}) or {}
+    except FileNotFoundError:
+        configured = {}
+    for key, default in DEFAULT_SETTINGS.items():
+        try:
+            settings[key] = type(default)(configured.get(key, default))
+        except (TypeError, ValueError):
+            settings[key] = default
+    return settings
+
+
+class AuditWriter:
+    """
+    Background writer for audit/journal entries
+
+    Entries are (collection_name, document) tuples; each batch is grouped
+    per collection and written with one insert_many per collection.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 1.0,
+                 queue_size: int = 10000, put_timeout: float = 0.05):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.put_timeout = max(0.0, float(put_timeout))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flush_requested = threading.Event()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'batches': 0,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, collection_name: str, document: dict) -> bool:
+        """Append an entry without waiting on MongoDB. Returns False if dropped."""
+        if self._stop.is_set():
+            # Writer stopped (shutdown): write through so nothing is lost
+            self._write_batch([(collection_name, document)])
+            return True
+
+        self.start()
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.put_timeout > 0:
+                self._queue.put((collection_name, document), timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait((collection_name, document))
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self.stats['dropped'] += 1
+                self._idle.notify_all()
+            return False
+
+        with self._lock:
+            self.stats['enqueued'] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until all queued entries are written. Returns False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            self._drain()
+            return True
+
+        self._flush_requested.set()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the background thread after writing everything still queued"""
+        self._stop.set()
+        self._flush_requested.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self._drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize()
+        stats['queue_size'] = self._queue.maxsize
+        stats['running'] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+    def _take_batch(self) -> List[tuple]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._write_batch(batch)
+            self._mark_done(len(batch))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self._drain()
+        self._drain()
+
+    def _mark_done(self, count: int):
+        with self._lock:
+            self._pending = max(0, self._pending - count)
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _write_batch(self, batch: List[tuple]):
+        by_collection: Dict[str, List[dict]] = {}
+        for collection_name, document in batch:
+            by_collection.setdefault(collection_name, []).append(document)
+
+        try:
+            db = get_db()
+        except Exception as e:
+            print(f"Failed to write audit batch: {e}")
+            with self._lock:
+                self.stats['failed'] += len(batch)
+            return
+
+        for collection_name, documents in by_collection.items():
+            try:
+                db[collection_name].insert_many(documents, ordered=False)
+                with self._lock:
+                    self.stats['written'] += len(documents)
+                    self.stats['batches'] += 1
+            except Exception as e:
+                # Don't fail the main operation if audit logging fails
+                print(f"Failed to write {len(documents)} entries to {collection_name}: {e}")
+                with self._lock:
+                    self.stats['failed'] += len(documents)
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    """Get (and lazily create) the process-wide audit writer"""
+    global _writer
+
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter(**_get_settings())
+                atexit.register(_writer.shutdown)
+    return _writer
+
+
+def flush_audit_queue(timeout: float = 5.0) -> bool:
+    """Write all pending audit/journal entries now"""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+
+def shutdown_audit_writer():
+    """Drain the queue and stop the writer (called on application shutdown)"""
+    if _writer is not None:
+        _writer.shutdown()
+
+
+def get_audit_queue_stats() -> Dict[str, Any]:
+    """Queue counters: enqueued, written, dropped, failed, batches, queued"""
+    return get_audit_writer().get_stats()
+
+
+def log_journal(entry: dict, collection_name: str = JOURNAL_COLLECTION) -> bool:
+    """
+    Queue a document journal entry (logs collection)
+
+    Args:
+        entry: Journal document ('collection', 'object_id', 'action', 'user', 'timestamp', ...)
+        collection_name: Target collection (default: logs)
+    """
+    return get_audit_writer().enqueue(collection_name, entry)
+
 
 def log_action(
     action: str,
@@ -17,7 +254,7 @@ def log_action(
 ):
     """
     Log an action to the audit log
-    
+
     Args:
         action: Action performed
         username: Username who performed the action
@@ -27,19 +264,16 @@ def log_action(
         details: Additional details
     """
     try:
-        db = get_db()
-        audit_collection = db[AuditLogModel.collection_name]
-        
         ip_address = None
         user_agent = None
-        
+
         if request:
             # Get IP address
             ip_address = request.client.host if request.client else None
-            
+
             # Get user agent
             user_agent = request.headers.get('user-agent')
-        
+
         log_entry = AuditLogModel.create(
             action=action,
             username=username,
@@ -49,8 +283,10 @@ def log_action(
             resource_id=resource_id,
             details=details
         )
-        
-        audit_collection.insert_one(log_entry)
+
+        log_entry.update(search_fields(AuditLogModel.collection_name, log_entry))
+
+        get_audit_writer().enqueue(AuditLogModel.collection_name, log_entry)
     except Exception as e:
         # Don't fail the main operation if audit logging fails
         print(f"Failed to log audit action: {e}")
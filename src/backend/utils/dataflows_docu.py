@@ -1,45 +1,202 @@
 """
 DataFlows Docu (OfficeClerk) API Client
+Client pentru serviciul de generare documente DataFlows Docu
+
+One client per process, from get_docu_client():
+- a requests.Session with a pooled HTTPAdapter, so keep-alive connections are
+  reused across calls instead of a new TCP/TLS handshake per request
+- config.yaml is read once, when the client is created
+- health_check() returns a cached state refreshed by a background thread
+  (dataflows_docu.health_interval), so status endpoints never wait on Docu
+- circuit breaker: after dataflows_docu.failure_threshold consecutive failed
+  calls (connection errors, timeouts, 5xx) calls fail fast for
+  dataflows_docu.reset_seconds, returning the same None / [] as a failed call;
+  then a single trial call is let through and closes the breaker on success
+
+AsyncDataFlowsDocuClient (get_async_docu_client()) exposes the same methods as
+coroutines for `async def` handlers; calls run in a bounded worker pool
+(dataflows_docu.async_workers, default pool_size), as in async_db.py.
+
+Usage:
+    from src.backend.utils.dataflows_docu import get_docu_client, get_async_docu_client
+
+    pdf = get_docu_client().download_document(job_id)
+    status = await get_async_docu_client().get_job_status(job_id)
 """
-import requests
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
-import yaml
-import os
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_HEALTH_INTERVAL = 30
+DEFAULT_HEALTH_TIMEOUT = 3
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 30
+
+UNCONFIGURED_TOKENS = ('', 'changeme')
+
+
+def _docu_setting(key: str, default: Any, cast=int) -> Any:
+    try:
+        return cast(get_config_value(f'dataflows_docu.{key}', default))
+    except (FileNotFoundError, TypeError, ValueError):
+        return default
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after `failure_threshold` failures in a row; open -> one
+    trial call (half-open) once `reset_seconds` have passed; the trial closes
+    the breaker on success or re-opens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_seconds: float = DEFAULT_RESET_SECONDS):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self._trial_running or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
 
-def load_config():
-    """Load configuration from config.yaml"""
-    config_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'config', 'config.yaml')
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
+    def allow(self) -> bool:
+        """True if a call may go out now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failed call; returns True if this failure opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            was_closed = self.opened_at is None
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._trial_running = False
+                return was_closed
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {'state': self.state, 'failures': self.failures}
 
 
 class DataFlowsDocuClient:
     """Client for DataFlows Docu API"""
-    
-    def __init__(self):
-        config = load_config()
-        self.base_url = config['dataflows_docu']['url'].rstrip('/')
-        self.token = config['dataflows_docu']['token']
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        token: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        health_interval: Optional[float] = None,
+        health_timeout: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None,
+    ):
+        if base_url is None:
+            base_url = _docu_setting('url', '', str)
+        if token is None:
+            token = _docu_setting('token', '', str)
+        self.base_url = (base_url or '').rstrip('/')
+        self.token = token or ''
         self.headers = {
             'Authorization': f'Bearer {self.token}',
             'Content-Type': 'application/json'
         }
-    
+
+        self.pool_size = max(1, pool_size or _docu_setting('pool_size', DEFAULT_POOL_SIZE))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.health_interval = health_interval if health_interval is not None else _docu_setting('health_interval', DEFAULT_HEALTH_INTERVAL, float)
+        self.health_timeout = health_timeout if health_timeout is not None else _docu_setting('health_timeout', DEFAULT_HEALTH_TIMEOUT, float)
+        self.breaker = CircuitBreaker(
+            failure_threshold if failure_threshold is not None else _docu_setting('failure_threshold', DEFAULT_FAILURE_THRESHOLD),
+            reset_seconds if reset_seconds is not None else _docu_setting('reset_seconds', DEFAULT_RESET_SECONDS, float),
+        )
+
+        self._healthy: Optional[bool] = None
+        self._health_checked_at: Optional[float] = None
+        self._health_lock = threading.Lock()
+        self._monitor: Optional[threading.Thread] = None
+        self._monitor_stop = threading.Event()
+
+    @property
+    def configured(self) -> bool:
+        """URL and a real token are set in config.yaml"""
+        return bool(self.base_url) and self.token not in UNCONFIGURED_TOKENS
+
+    def _request(self, method: str, path: str, timeout: float, **kwargs) -> Optional[requests.Response]:
+        """
+        Send a request through the pooled session and the circuit breaker
+
+        Returns None (without calling Docu) while the breaker is open.
+        Connection errors and 5xx responses count as failures; connection
+        errors are re-raised so each method keeps its own error message.
+        """
+        if not self.breaker.allow():
+            return None
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", headers=self.headers, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            self._record_failure()
+            raise
+        if response.status_code >= 500:
+            self._record_failure()
+        else:
+            self.breaker.record_success()
+            self._healthy = True
+        return response
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            self._healthy = False
+            print(
+                f"[DOCU] Warning: {self.breaker.failures} failed calls in a row, "
+                f"failing fast for {self.breaker.reset_seconds:g}s"
+            )
+
     def get_templates(self) -> List[Dict[str, Any]]:
         """
         Get list of all available templates
-        
+
         Returns:
             List of template metadata
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/templates",
-                headers=self.headers,
-                timeout=30
-            )
-            
+            response = self._request('GET', '/templates', timeout=30)
+            if response is None:
+                return []
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -48,24 +205,22 @@ class DataFlowsDocuClient:
         except Exception as e:
             print(f"Error getting templates: {e}")
             return []
-    
+
     def get_template(self, template_code: str) -> Optional[Dict[str, Any]]:
         """
         Get template bundle details
-        
+
         Args:
             template_code: Template code (12 characters)
-            
+
         Returns:
             Template bundle data or None
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/templates/{template_code}",
-                headers=self.headers,
-                timeout=10
-            )
-            
+            response = self._request('GET', f"/templates/{template_code}", timeout=10)
+            if response is None:
+                return None
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -74,7 +229,7 @@ class DataFlowsDocuClient:
         except Exception as e:
             print(f"Error getting template {template_code}: {e}")
             return None
-    
+
     def create_job(
         self,
         template_code: str,
@@ -85,13 +240,13 @@ class DataFlowsDocuClient:
     ) -> Optional[Dict[str, Any]]:
         """
         Create a document generation job
-        
+
         Args:
             template_code: Template code to use
             data: Data to populate the template
             format: Output format (pdf, html, text)
             filename: Optional filename (without extension)
-            
+
         Returns:
             Job details including job_id or None
         """
@@ -101,19 +256,16 @@ class DataFlowsDocuClient:
                 'data': data,
                 'format': format
             }
-            
+
             if filename:
                 payload['filename'] = filename
             if options:
                 payload['options'] = options
-            
-            response = requests.post(
-                f"{self.base_url}/jobs",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
+
+            response = self._request('POST', '/jobs', timeout=30, json=payload)
+            if response is None:
+                return None
+
             if response.status_code in [200, 201, 202]:
                 return response.json()
             else:
@@ -122,7 +274,7 @@ class DataFlowsDocuClient:
         except Exception as e:
             print(f"Error creating job: {e}")
             return None
-    
+
     def create_realtime_job(
         self,
         template_code: str,
@@ -133,13 +285,13 @@ class DataFlowsDocuClient:
     ) -> Optional[bytes]:
         """
         Create a document generation job and wait for completion (realtime)
-        
+
         Args:
             template_code: Template code to use
             data: Data to populate the template
             format: Output format (pdf, html, text)
             filename: Optional filename (without extension)
-            
+
         Returns:
             Document bytes or None
         """
@@ -149,19 +301,16 @@ class DataFlowsDocuClient:
                 'data': data,
                 'format': format
             }
-            
+
             if filename:
                 payload['filename'] = filename
             if options:
                 payload['options'] = options
-            
-            response = requests.post(
-                f"{self.base_url}/jobs/realtime",
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
-            
+
+            response = self._request('POST', '/jobs/realtime', timeout=60, json=payload)
+            if response is None:
+                return None
+
             if response.status_code == 200:
                 return response.content
             else:
@@ -170,24 +319,22 @@ class DataFlowsDocuClient:
         except Exception as e:
             print(f"Error creating realtime job: {e}")
             return None
-    
+
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
         Get job status
-        
+
         Args:
             job_id: Job ID
-            
+
         Returns:
             Job status data or None
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/jobs/{job_id}",
-                headers=self.headers,
-                timeout=10
-            )
-            
+            response = self._request('GET', f"/jobs/{job_id}", timeout=10)
+            if response is None:
+                return None
+
             if response.status_code == 200:
                 return response.json()
             else:
@@ -196,30 +343,30 @@ class DataFlowsDocuClient:
         except Exception as e:
             print(f"Error getting job status: {e}")
             return None
-    
+
     def download_document(self, job_id: str, debug: bool = False) -> Optional[bytes]:
         """
         Download generated document
-        
+
         Args:
             job_id: Job ID
             debug: If True, print detailed debug info
-            
+
         Returns:
             Document bytes or None
         """
         try:
-            url = f"{self.base_url}/download/{job_id}"
+            path = f"/download/{job_id}"
             if debug:
-                print(f"[DOCU DEBUG] Downloading from: {url}")
+                print(f"[DOCU DEBUG] Downloading from: {self.base_url}{path}")
                 print(f"[DOCU DEBUG] Headers: {self.headers}")
-            
-            response = requests.get(
-                url,
-                headers=self.headers,
-                timeout=30
-            )
-            
+
+            response = self._request('GET', path, timeout=30)
+            if response is None:
+                if debug:
+                    print("[DOCU DEBUG] Circuit breaker open, download skipped")
+                return None
+
             if response.status_code == 200:
                 if debug:
                     print(f"[DOCU DEBUG] Download successful, {len(response.content)} bytes")
@@ -237,20 +384,166 @@ class DataFlowsDocuClient:
                 import traceback
                 print(f"[DOCU DEBUG] Exception traceback: {traceback.format_exc()}")
             return None
-    
+
+    def probe_health(self) -> bool:
+        """
+        Call /health now (bypasses the breaker) and update the cached state
+
+        A healthy answer also closes an open breaker.
+        """
+        try:
+            response = self.session.get(f"{self.base_url}/health", timeout=self.health_timeout)
+            healthy = response.status_code == 200
+        except Exception as e:
+            if self._healthy is not False:
+                print(f"Health check failed: {e}")
+            healthy = False
+
+        if healthy:
+            self.breaker.record_success()
+        self._healthy = healthy
+        self._health_checked_at = time.monotonic()
+        return healthy
+
     def health_check(self) -> bool:
         """
         Check if DataFlows Docu service is available
-        
+
+        Returns the cached state. Only the first call (before the background
+        monitor has run) probes Docu, at most once across concurrent callers.
+
         Returns:
             True if service is healthy, False otherwise
         """
-        try:
-            response = requests.get(
-                f"{self.base_url}/health",
-                timeout=5
-            )
-            return response.status_code == 200
-        except Exception as e:
-            print(f"Health check failed: {e}")
+        if not self.base_url:
             return False
+        if self.breaker.state == 'open':
+            return False
+        if self._healthy is None:
+            with self._health_lock:
+                if self._healthy is None:
+                    self.probe_health()
+        return bool(self._healthy)
+
+    def health_stats(self) -> Dict[str, Any]:
+        """Cached health, seconds since the last probe and breaker state"""
+        checked_at = self._health_checked_at
+        return {
+            'healthy': self._healthy,
+            'checked_seconds_ago': round(time.monotonic() - checked_at, 1) if checked_at is not None else None,
+            'breaker': self.breaker.stats(),
+        }
+
+    def start_health_monitor(self):
+        """Probe /health every health_interval seconds in a daemon thread"""
+        if self._monitor is not None or not self.base_url or self.health_interval <= 0:
+            return
+        self._monitor_stop.clear()
+
+        def run():
+            while not self._monitor_stop.is_set():
+                self.probe_health()
+                self._monitor_stop.wait(self.health_interval)
+
+        self._monitor = threading.Thread(target=run, name='docu-health', daemon=True)
+        self._monitor.start()
+
+    def close(self):
+        """Stop the health monitor and close pooled connections"""
+        self._monitor_stop.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=self.health_timeout + 1)
+            self._monitor = None
+        self.session.close()
+
+
+class AsyncDataFlowsDocuClient:
+    """
+    Awaitable DataFlowsDocuClient for `async def` handlers
+
+    Each call runs the synchronous client method in a bounded worker pool, so
+    the event loop is never blocked on Docu; the pooled session is shared.
+    """
+
+    def __init__(self, client: Optional[DataFlowsDocuClient] = None, workers: Optional[int] = None):
+        self.client = client or get_docu_client()
+        workers = workers or _docu_setting('async_workers', 0) or self.client.pool_size
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='docu-worker')
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def get_templates(self) -> List[Dict[str, Any]]:
+        return await self._run(self.client.get_templates)
+
+    async def get_template(self, template_code: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.client.get_template, template_code)
+
+    async def create_job(self, template_code: str, data: Dict[str, Any], format: str = "pdf",
+                         filename: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return await self._run(self.client.create_job, template_code, data, format, filename, options)
+
+    async def create_realtime_job(self, template_code: str, data: Dict[str, Any], format: str = "pdf",
+                                  filename: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+        return await self._run(self.client.create_realtime_job, template_code, data, format, filename, options)
+
+    async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self.client.get_job_status, job_id)
+
+    async def download_document(self, job_id: str, debug: bool = False) -> Optional[bytes]:
+        return await self._run(self.client.download_document, job_id, debug)
+
+    async def health_check(self) -> bool:
+        if self.client._healthy is not None:
+            return self.client.health_check()
+        return await self._run(self.client.health_check)
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_client: Optional[DataFlowsDocuClient] = None
+_async_client: Optional[AsyncDataFlowsDocuClient] = None
+_client_lock = threading.Lock()
+
+
+def get_docu_client() -> DataFlowsDocuClient:
+    """Get (and lazily create) the shared client; starts its health monitor"""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = DataFlowsDocuClient()
+                if client.configured:
+                    client.start_health_monitor()
+                _client = client
+
+    return _client
+
+
+def get_async_docu_client() -> AsyncDataFlowsDocuClient:
+    """Get (and lazily create) the shared async client"""
+    global _async_client
+
+    if _async_client is None:
+        client = get_docu_client()
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncDataFlowsDocuClient(client)
+
+    return _async_client
+
+
+def shutdown_docu_client():
+    """Close the shared clients (called on application shutdown)"""
+    global _client, _async_client
+
+    with _client_lock:
+        if _async_client is not None:
+            _async_client.close(wait=False)
+            _async_client = None
+        if _client is not None:
+            _client.close()
+            _client = None
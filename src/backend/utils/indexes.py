@@ -0,0 +1,313 @@
+"""
+MongoDB index catalog
+Central registry for the indexes every module relies on
+
+Each owner (core routes, inventory, requests, depo_procurement) declares its
+indexes as plain dicts:
+
+    {'collection': 'depo_stocks', 'name': 'part_state', 'keys': [('part_id', 1), ('state_id', 1)]}
+
+Optional keys: unique, sparse, partial (partialFilterExpression), expire_after (seconds).
+
+Owners can also declare query probes - representative list queries used by
+check_query_plans() to make sure none of them falls back to a COLLSCAN:
+
+    {'name': 'requests_list', 'collection': 'depo_requests', 'filter': {}, 'sort': [('created_at', -1)]}
+"""
+from typing import Dict, List, Any, Optional
+from pymongo import IndexModel
+
+# owner -> list of index specs / query probes
+_index_registry: Dict[str, List[dict]] = {}
+_probe_registry: Dict[str, List[dict]] = {}
+_catalog_loaded = False
+
+
+def register_indexes(owner: str, indexes: List[dict], probes: Optional[List[dict]] = None):
+    """
+    Register index specs (and optional query probes) for an owner
+
+    Registering the same owner again replaces its previous declarations,
+    so module reloads do not duplicate entries.
+    """
+    _index_registry[owner] = [_normalize_spec(spec, owner) for spec in indexes or []]
+    _probe_registry[owner] = [dict(probe, owner=owner) for probe in probes or []]
+
+
+def load_index_catalog(force_reload: bool = False):
+    """Collect index declarations from core and from all enabled modules"""
+    global _catalog_loaded
+
+    if _catalog_loaded and not force_reload:
+        return
+
+    from src.backend.indexes import INDEXES, QUERY_PROBES
+    register_indexes('core', INDEXES, QUERY_PROBES)
+
+    try:
+        from modules import get_module_indexes
+        for module_name, module_indexes, module_probes in get_module_indexes():
+            register_indexes(module_name, module_indexes, module_probes)
+    except Exception as e:
+        print(f"Warning: Failed to load module index declarations: {e}")
+
+    _catalog_loaded = True
+
+
+def get_index_catalog() -> List[dict]:
+    """Get all registered index specs, deduplicated by (collection, name)"""
+    load_index_catalog()
+
+    catalog = []
+    seen = set()
+    for specs in _index_registry.values():
+        for spec in specs:
+            key = (spec['collection'], spec['name'])
+            if key in seen:
+                continue
+            seen.add(key)
+            catalog.append(spec)
+    return catalog
+
+
+def get_query_probes() -> List[dict]:
+    """Get all registered query probes"""
+    load_index_catalog()
+
+    probes = []
+    for owner_probes in _probe_registry.values():
+        probes.extend(owner_probes)
+    return probes
+
+
+def _normalize_spec(spec: dict, owner: str) -> dict:
+    if not spec.get('collection') or not spec.get('keys') or not spec.get('name'):
+        raise ValueError(f"Invalid index spec from {owner}: collection, name and keys are required")
+    normalized = dict(spec)
+    normalized['keys'] = [(str(field), direction) for field, direction in spec['keys']]
+    normalized['owner'] = owner
+    return normalized
+
+
+def _normalize_key(keys) -> tuple:
+    """Normalize an index key pattern so catalog and server specs compare equal"""
+    normalized = []
+    for field, direction in keys:
+        if isinstance(direction, float) and direction.is_integer():
+            direction = int(direction)
+        normalized.append((field, direction))
+    return tuple(normalized)
+
+
+def _to_index_model(spec: dict) -> IndexModel:
+    options = {'name': spec['name']}
+    if spec.get('unique'):
+        options['unique'] = True
+    if spec.get('sparse'):
+        options['sparse'] = True
+    if spec.get('partial'):
+        options['partialFilterExpression'] = spec['partial']
+    if spec.get('expire_after') is not None:
+        options['expireAfterSeconds'] = spec['expire_after']
+    return IndexModel(spec['keys'], **options)
+
+
+def _group_by_collection(catalog: List[dict]) -> Dict[str, List[dict]]:
+    grouped: Dict[str, List[dict]] = {}
+    for spec in catalog:
+        grouped.setdefault(spec['collection'], []).append(spec)
+    return grouped
+
+
+def ensure_indexes(db, catalog: Optional[List[dict]] = None) -> Dict[str, Any]:
+    """
+    Create missing catalog indexes (idempotent)
+
+    An index already present under the same key pattern (even with another
+    name) counts as existing. A name clash with a different key pattern is
+    reported as a conflict and left untouched - dropping is a manual decision.
+
+    Returns:
+        Dict with created, existing, conflicts and errors lists
+    """
+    catalog = catalog if catalog is not None else get_index_catalog()
+    report = {'created': [], 'existing': [], 'conflicts': [], 'errors': []}
+
+    for collection_name, specs in _group_by_collection(catalog).items():
+        collection = db[collection_name]
+        try:
+            existing = collection.index_information()
+        except Exception as e:
+            report['errors'].append({'collection': collection_name, 'error': str(e)})
+            continue
+
+        existing_keys = {_normalize_key(info['key']): name for name, info in existing.items()}
+
+        to_create = []
+        for spec in specs:
+            label = f"{collection_name}.{spec['name']}"
+            key = _normalize_key(spec['keys'])
+            if key in existing_keys:
+                report['existing'].append(label)
+                continue
+            if spec['name'] in existing:
+                report['conflicts'].append({
+                    'index': label,
+                    'expected': list(key),
+                    'found': list(_normalize_key(existing[spec['name']]['key']))
+                })
+                continue
+            to_create.append(spec)
+
+        # Create one by one so a single failure (e.g. duplicate keys on a
+        # unique index) does not block the rest of the collection
+        for spec in to_create:
+            label = f"{collection_name}.{spec['name']}"
+            try:
+                collection.create_indexes([_to_index_model(spec)])
+                report['created'].append(label)
+            except Exception as e:
+                report['errors'].append({'index': label, 'error': str(e)})
+
+    return report
+
+
+def get_index_drift(db, catalog: Optional[List[dict]] = None) -> Dict[str, Any]:
+    """
+    Compare the catalog with the indexes present on the server
+
+    Returns:
+        Dict with:
+        - missing: catalog indexes not present on the server
+        - extra: server indexes not declared in the catalog
+        - unused: server indexes with zero accesses since the last restart ($indexStats)
+    """
+    catalog = catalog if catalog is not None else get_index_catalog()
+    drift = {'missing': [], 'extra': [], 'unused': [], 'errors': []}
+
+    grouped = _group_by_collection(catalog)
+    try:
+        collection_names = set(db.list_collection_names())
+    except Exception as e:
+        drift['errors'].append({'error': str(e)})
+        return drift
+
+    for collection_name in sorted(collection_names.union(grouped.keys())):
+        specs = grouped.get(collection_name, [])
+        expected_keys = {_normalize_key(spec['keys']): spec for spec in specs}
+
+        existing = {}
+        if collection_name in collection_names:
+            try:
+                existing = db[collection_name].index_information()
+            except Exception as e:
+                drift['errors'].append({'collection': collection_name, 'error': str(e)})
+                continue
+
+        existing_keys = {_normalize_key(info['key']): name for name, info in existing.items()}
+
+        for key, spec in expected_keys.items():
+            if key not in existing_keys:
+                drift['missing'].append({
+                    'collection': collection_name,
+                    'name': spec['name'],
+                    'keys': list(key),
+                    'owner': spec.get('owner')
+                })
+
+        for key, name in existing_keys.items():
+            if name == '_id_' or key in expected_keys:
+                continue
+            drift['extra'].append({'collection': collection_name, 'name': name, 'keys': list(key)})
+
+        if not existing:
+            continue
+
+        try:
+            stats = list(db[collection_name].aggregate([{'$indexStats': {}}]))
+        except Exception as e:
+            # $indexStats needs clusterMonitor-like privileges on some deployments
+            drift['errors'].append({'collection': collection_name, 'error': f"$indexStats: {e}"})
+            continue
+
+        for stat in stats:
+            if stat.get('name') == '_id_':
+                continue
+            accesses = stat.get('accesses') or {}
+            if int(accesses.get('ops', 0) or 0) == 0:
+                drift['unused'].append({
+                    'collection': collection_name,
+                    'name': stat.get('name'),
+                    'since': accesses.get('since')
+                })
+
+    return drift
+
+
+def _collect_stages(plan: Any, stages: List[str]):
+    if isinstance(plan, dict):
+        stage = plan.get('stage')
+        if stage:
+            stages.append(stage)
+        for key, value in plan.items():
+            if key in ('inputStage', 'inputStages', 'queryPlan', 'winningPlan', 'shards'):
+                _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+
+
+def explain_probe(db, probe: dict) -> Dict[str, Any]:
+    """Run explain() for a query probe and return the winning plan stages"""
+    cursor = db[probe['collection']].find(probe.get('filter') or {}, probe.get('projection'))
+    if probe.get('sort'):
+        cursor = cursor.sort(probe['sort'])
+    cursor = cursor.limit(probe.get('limit', 100))
+
+    explain = cursor.explain()
+    planner = explain.get('queryPlanner', {})
+
+    stages: List[str] = []
+    _collect_stages(planner.get('winningPlan', {}), stages)
+
+    return {
+        'name': probe['name'],
+        'owner': probe.get('owner'),
+        'collection': probe['collection'],
+        'stages': stages,
+        'collscan': 'COLLSCAN' in stages
+    }
+
+
+def check_query_plans(db, probes: Optional[List[dict]] = None) -> Dict[str, Any]:
+    """
+    Explain every registered query probe
+
+    Returns:
+        Dict with ok flag, per-probe results and the list of probes doing a COLLSCAN
+    """
+    probes = probes if probes is not None else get_query_probes()
+    results = []
+    failures = []
+
+    for probe in probes:
+        try:
+            result = explain_probe(db, probe)
+        except Exception as e:
+            result = {
+                'name': probe.get('name'),
+                'owner': probe.get('owner'),
+                'collection': probe.get('collection'),
+                'stages': [],
+                'collscan': False,
+                'error': str(e)
+            }
+        results.append(result)
+        if result.get('collscan') or result.get('error'):
+            failures.append(result)
+
+    return {
+        'ok': not failures,
+        'results': results,
+        'failures': failures
+    }
@@ -12,6 +12,7 @@ import jwt
 
 from .db import get_db
 from .config import load_config
+from .principal_cache import get_principal, set_principal
 
 
 def _normalize_locations(locations):
@@ -162,7 +163,12 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
 def get_user_from_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Obține user din token
+    Rezultatul e cache-uit per token (vezi principal_cache)
     """
+    cached = get_principal(token)
+    if cached is not None:
+        return cached
+
     payload = verify_token(token)
     
     if not payload:
@@ -208,7 +214,7 @@ def get_user_from_token(token: str) -> Optional[Dict[str, Any]]:
     
     display_name = user.get('name') or f"{user.get('firstname', '')} {user.get('lastname', '')}".strip()
 
-    return {
+    principal = {
         '_id': str(user['_id']),
         'username': user['username'],
         'firstname': user.get('firstname', ''),
@@ -223,6 +229,8 @@ def get_user_from_token(token: str) -> Optional[Dict[str, Any]]:
         'role_menu_items': role_menu_items,
         'quick_actions': user.get('quick_actions') or []
     }
+    set_principal(token, principal, payload.get('exp'))
+    return principal
 
 
 def create_user(
@@ -0,0 +1,256 @@
+"""
+Keyset (cursor) pagination for list endpoints
+Paginare după (created_at, _id) în loc de skip/limit
+
+List endpoints accept an opt-in `cursor` query parameter:
+- absent: classic skip/limit (unchanged responses)
+- empty (`?cursor=`): first page in cursor mode
+- a value returned as `next_cursor`: the page after it
+
+In cursor mode results are sorted by (sort_field, _id) and each page seeks
+past the last document of the previous one, so the cost does not grow with
+page depth. Cursors are opaque (url-safe base64 of the last sort key).
+
+Totals are controlled by `total_mode`:
+- exact:     count_documents (the old behaviour)
+- estimated: collection metadata count; only without filters, otherwise capped
+- capped:    count up to `pagination.total_cap` (default 10000); `total_capped`
+             tells the client the real total is at least that
+- none:      no count at all
+
+Every page size is bounded by `pagination.max_page_size` (default 1000).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_MAX_PAGE_SIZE = 1000
+DEFAULT_TOTAL_CAP = 10000
+TOTAL_MODES = ('exact', 'estimated', 'capped', 'none')
+
+
+def _get_int_setting(key: str, default: int) -> int:
+    try:
+        value = int(get_config_value(f'pagination.{key}', default))
+    except (FileNotFoundError, TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def get_max_page_size() -> int:
+    return _get_int_setting('max_page_size', DEFAULT_MAX_PAGE_SIZE)
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Page size bounded by the server maximum (None = maximum)"""
+    max_size = get_max_page_size()
+    if limit is None or limit <= 0:
+        return max_size
+    return min(int(limit), max_size)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if '$date' in value:
+            return datetime.fromisoformat(value['$date'])
+        if '$oid' in value:
+            return ObjectId(value['$oid'])
+    return value
+
+
+def encode_cursor(doc: dict, sort_field: str = 'created_at') -> str:
+    """Opaque cursor pointing just after `doc`"""
+    payload = {
+        'f': sort_field,
+        'v': _encode_value(doc.get(sort_field)),
+        'id': _encode_value(doc.get('_id')),
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], sort_field: str = 'created_at') -> Optional[Tuple[Any, Any]]:
+    """
+    Decode a cursor into (sort value, _id)
+
+    Returns None for an empty cursor (first page).
+    Raises HTTPException(400) for malformed cursors or cursors of another list.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload.get('f') != sort_field:
+            raise ValueError('cursor belongs to another sort')
+        return _decode_value(payload.get('v')), _decode_value(payload['id'])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(sort_field: str, value: Any, doc_id: Any, direction: int = -1) -> dict:
+    """
+    Filter for documents after (value, doc_id) in (sort_field, _id) order
+
+    Missing/null sort values sort lowest in MongoDB: last when descending,
+    first when ascending.
+    """
+    op = '$lt' if direction < 0 else '$gt'
+    if value is None:
+        clauses = [{sort_field: None, '_id': {op: doc_id}}]
+        if direction > 0:
+            clauses.append({sort_field: {'$ne': None}})
+    else:
+        clauses = [
+            {sort_field: {op: value}},
+            {sort_field: value, '_id': {op: doc_id}},
+        ]
+        if direction < 0:
+            clauses.append({sort_field: None})
+    return {'$or': clauses}
+
+
+def apply_keyset(query: dict, cursor: Optional[str], sort_field: str = 'created_at', direction: int = -1) -> dict:
+    """Combine an existing filter with the seek condition of a cursor"""
+    position = decode_cursor(cursor, sort_field)
+    if position is None:
+        return query
+    seek = keyset_filter(sort_field, position[0], position[1], direction)
+    if not query:
+        return seek
+    return {'$and': [query, seek]}
+
+
+def keyset_sort(sort_field: str = 'created_at', direction: int = -1) -> List[Tuple[str, int]]:
+    return [(sort_field, direction), ('_id', direction)]
+
+
+def split_page(docs: List[dict], limit: int, sort_field: str = 'created_at') -> Tuple[List[dict], Optional[str]]:
+    """
+    Trim a `limit + 1` fetch to one page
+
+    Returns (page docs, next cursor or None when this is the last page).
+    """
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort_field)
+
+
+def count_total(collection, query: dict, total_mode: str = 'exact') -> Dict[str, Any]:
+    """
+    Count matching documents according to total_mode
+
+    Returns {'total': int or None, 'total_mode': mode used, 'total_capped': bool}
+    """
+    if total_mode not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid total_mode, expected one of {', '.join(TOTAL_MODES)}")
+
+    if total_mode == 'none':
+        return {'total': None, 'total_mode': 'none', 'total_capped': False}
+    if total_mode == 'estimated' and not query:
+        return {'total': collection.estimated_document_count(), 'total_mode': 'estimated', 'total_capped': False}
+    if total_mode in ('estimated', 'capped'):
+        cap = _get_int_setting('total_cap', DEFAULT_TOTAL_CAP)
+        total = collection.count_documents(query, limit=cap)
+        return {'total': total, 'total_mode': 'capped', 'total_capped': total >= cap}
+    return {'total': collection.count_documents(query), 'total_mode': 'exact', 'total_capped': False}
+
+
+def count_pipeline_total(collection, pipeline: List[dict], total_mode: str = 'exact') -> Dict[str, Any]:
+    """count_total for an aggregation pipeline (filter stages only, no sort/skip/limit)"""
+    if total_mode not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid total_mode, expected one of {', '.join(TOTAL_MODES)}")
+
+    if total_mode == 'none':
+        return {'total': None, 'total_mode': 'none', 'total_capped': False}
+    if total_mode == 'estimated' and not pipeline:
+        return {'total': collection.estimated_document_count(), 'total_mode': 'estimated', 'total_capped': False}
+
+    count_pipeline = list(pipeline)
+    cap = None
+    if total_mode in ('estimated', 'capped'):
+        cap = _get_int_setting('total_cap', DEFAULT_TOTAL_CAP)
+        count_pipeline.append({'$limit': cap})
+    count_pipeline.append({'$count': 'total'})
+    result = list(collection.aggregate(count_pipeline))
+    total = result[0]['total'] if result else 0
+    if cap is None:
+        return {'total': total, 'total_mode': 'exact', 'total_capped': False}
+    return {'total': total, 'total_mode': 'capped', 'total_capped': total >= cap}
+
+
+def keyset_page(
+    collection,
+    query: dict,
+    cursor: Optional[str],
+    limit: Optional[int],
+    sort_field: str = 'created_at',
+    direction: int = -1,
+    total_mode: str = 'exact',
+    projection: Optional[dict] = None,
+) -> Dict[str, Any]:
+    """
+    Fetch one page in cursor mode
+
+    Args:
+        collection: pymongo collection
+        query: Filter built by the endpoint (same as in skip/limit mode)
+        cursor: '' for the first page, else a previous `next_cursor`
+        limit: Requested page size (bounded by pagination.max_page_size)
+        sort_field: Seek field, ties broken by _id
+        direction: -1 newest first, 1 oldest first
+        total_mode: exact / estimated / capped / none (counted on `query`, not on the seek)
+        projection: Optional projection (sort_field and _id are always kept)
+
+    Returns:
+        {'docs', 'next_cursor', 'has_more', 'limit', 'total', 'total_mode', 'total_capped'}
+    """
+    limit = clamp_page_size(limit)
+    counts = count_total(collection, query, total_mode)
+
+    if projection:
+        projection = dict(projection)
+        projection.setdefault(sort_field, 1)
+    find_query = apply_keyset(query, cursor, sort_field, direction)
+    docs = list(
+        collection.find(find_query, projection)
+        .sort(keyset_sort(sort_field, direction))
+        .limit(limit + 1)
+    )
+    docs, next_cursor = split_page(docs, limit, sort_field)
+
+    return {
+        'docs': docs,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'limit': limit,
+        **counts,
+    }
+
+
+def cursor_response(results: Any, page: Dict[str, Any]) -> Dict[str, Any]:
+    """Standard list response body for cursor mode"""
+    return {
+        'results': results,
+        'total': page.get('total'),
+        'total_mode': page.get('total_mode'),
+        'total_capped': page.get('total_capped', False),
+        'limit': page.get('limit'),
+        'next_cursor': page.get('next_cursor'),
+        'has_more': page.get('has_more', False),
+    }
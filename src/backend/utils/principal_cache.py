@@ -0,0 +1,145 @@
+"""
+Token-to-principal cache
+Evită citirea users + roles din MongoDB la fiecare request autentificat
+
+Entries are keyed by the raw JWT and hold the user data built by
+local_auth.get_user_from_token (user fields, role, role_sections,
+role_menu_items). They expire after `auth.principal_cache_ttl` seconds
+(default 60) or at the token's own `exp`, whichever comes first; the cache is
+bounded to `auth.principal_cache_size` entries (default 1000, LRU eviction).
+
+Routes that change a user or role must call invalidate_user() /
+invalidate_role(). Invalidation is per process: with several uvicorn workers
+the other workers pick up the change when their entry expires.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_SIZE = 1000
+
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'invalidations': 0,
+}
+
+
+def _get_settings():
+    try:
+        ttl = float(get_config_value('auth.principal_cache_ttl', DEFAULT_TTL))
+        max_size = int(get_config_value('auth.principal_cache_size', DEFAULT_MAX_SIZE))
+    except (FileNotFoundError, TypeError, ValueError):
+        ttl, max_size = DEFAULT_TTL, DEFAULT_MAX_SIZE
+    return ttl, max_size
+
+
+def get_principal(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Get cached user data for a token
+
+    Returns a copy (callers may mutate it) or None on miss / expiry.
+    """
+    now = time.time()
+    with _lock:
+        entry = _cache.get(token)
+        if entry is None:
+            _stats['misses'] += 1
+            return None
+        if entry['expires_at'] <= now:
+            del _cache[token]
+            _stats['misses'] += 1
+            return None
+        _cache.move_to_end(token)
+        _stats['hits'] += 1
+        principal = entry['principal']
+    return copy.deepcopy(principal)
+
+
+def set_principal(token: str, principal: Dict[str, Any], token_exp: Optional[float] = None):
+    """
+    Cache user data for a token
+
+    Args:
+        token: Raw JWT
+        principal: User data as returned by get_user_from_token
+        token_exp: JWT `exp` claim (unix timestamp); the entry never outlives it
+    """
+    ttl, max_size = _get_settings()
+    if ttl <= 0 or max_size <= 0:
+        return
+
+    expires_at = time.time() + ttl
+    if token_exp:
+        expires_at = min(expires_at, float(token_exp))
+
+    role = principal.get('role')
+    role_id = role.get('_id') if isinstance(role, dict) else role
+
+    with _lock:
+        _cache[token] = {
+            'principal': copy.deepcopy(principal),
+            'user_id': str(principal.get('_id')) if principal.get('_id') else None,
+            'role_id': str(role_id) if role_id else None,
+            'expires_at': expires_at,
+        }
+        _cache.move_to_end(token)
+        while len(_cache) > max_size:
+            _cache.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def _invalidate(field: str, value: Any) -> int:
+    if value is None:
+        return 0
+    value = str(value)
+    with _lock:
+        tokens = [token for token, entry in _cache.items() if entry.get(field) == value]
+        for token in tokens:
+            del _cache[token]
+        _stats['invalidations'] += len(tokens)
+    return len(tokens)
+
+
+def invalidate_user(user_id: Any) -> int:
+    """Drop all cached tokens of a user. Returns number of entries removed."""
+    return _invalidate('user_id', user_id)
+
+
+def invalidate_role(role_id: Any) -> int:
+    """Drop all cached tokens of users having a role. Returns number of entries removed."""
+    return _invalidate('role_id', role_id)
+
+
+def clear_principal_cache():
+    """Drop all entries (stats are kept)"""
+    with _lock:
+        _stats['invalidations'] += len(_cache)
+        _cache.clear()
+
+
+def get_principal_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and current size"""
+    ttl, max_size = _get_settings()
+    with _lock:
+        hits = _stats['hits']
+        misses = _stats['misses']
+        total = hits + misses
+        return {
+            'size': len(_cache),
+            'max_size': max_size,
+            'ttl': ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            'evictions': _stats['evictions'],
+            'invalidations': _stats['invalidations'],
+        }
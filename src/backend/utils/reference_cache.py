@@ -0,0 +1,197 @@
+"""
+Reference-data cache
+Colecții mici de lookup (stări, UM-uri, locații, pași de producție, valute)
+citite o singură dată și servite din memorie
+
+Covered collections: every `depo_*_states` collection plus depo_ums,
+depo_locations, depo_production_steps and currencies. Each one is loaded
+whole on first use; lookups by `_id` (ObjectId or string) or by any other
+field (slug, name, code, ...) are then dictionary hits.
+
+A snapshot is reloaded when:
+- its version was bumped by invalidate_reference_data() (called by the
+  routes that write to these collections), or
+- it is older than `reference_cache.max_staleness` seconds (default 60), which
+  bounds staleness for edits made outside the API or in other workers.
+
+Lookups on any other collection go straight to MongoDB (no caching).
+Returned documents are copies, callers may modify them.
+"""
+import copy
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from src.backend.utils.config import get_config_value
+
+REFERENCE_COLLECTIONS = {
+    'depo_ums',
+    'depo_locations',
+    'depo_production_steps',
+    'currencies',
+}
+
+DEFAULT_MAX_STALENESS = 60
+
+_snapshots: Dict[tuple, Dict[str, Any]] = {}
+_versions: Dict[str, int] = {}
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'loads': 0,
+    'invalidations': 0,
+}
+
+
+def is_reference_collection(collection_name: str) -> bool:
+    """True if the collection is served from the reference cache"""
+    if collection_name in REFERENCE_COLLECTIONS:
+        return True
+    return collection_name.startswith('depo_') and collection_name.endswith('_states')
+
+
+def _get_max_staleness() -> float:
+    try:
+        return float(get_config_value('reference_cache.max_staleness', DEFAULT_MAX_STALENESS))
+    except (FileNotFoundError, TypeError, ValueError):
+        return DEFAULT_MAX_STALENESS
+
+
+def _key(value: Any) -> Any:
+    """Index key: ObjectIds and their string form map to the same entry"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict) and value.get('$oid'):
+        return str(value['$oid'])
+    return value
+
+
+def _get_snapshot(db, collection_name: str) -> Dict[str, Any]:
+    cache_key = (getattr(db, 'name', None), collection_name)
+    max_staleness = _get_max_staleness()
+    now = time.time()
+
+    with _lock:
+        version = _versions.get(collection_name, 0)
+        snapshot = _snapshots.get(cache_key)
+        if snapshot and snapshot['version'] == version and now - snapshot['loaded_at'] < max_staleness:
+            _stats['hits'] += 1
+            return snapshot
+        _stats['misses'] += 1
+
+    docs = list(db[collection_name].find())
+    snapshot = {
+        'version': version,
+        'loaded_at': now,
+        'docs': docs,
+        'fields': {'_id': {str(doc['_id']): doc for doc in docs if doc.get('_id') is not None}},
+    }
+
+    with _lock:
+        # Keep the snapshot only if nobody invalidated the collection meanwhile
+        if _versions.get(collection_name, 0) == version:
+            _snapshots[cache_key] = snapshot
+        _stats['loads'] += 1
+    return snapshot
+
+
+def _field_index(snapshot: Dict[str, Any], field: str) -> Dict[Any, dict]:
+    index = snapshot['fields'].get(field)
+    if index is None:
+        index = {}
+        for doc in snapshot['docs']:
+            value = doc.get(field)
+            if value is None:
+                continue
+            try:
+                # First document wins, same as find_one without sort
+                index.setdefault(_key(value), doc)
+            except TypeError:
+                # Unhashable values (lists, dicts) are not indexed
+                continue
+        snapshot['fields'][field] = index
+    return index
+
+
+def find_reference(db, collection_name: str, field: str, value: Any) -> Optional[dict]:
+    """
+    Find one reference document by field value
+
+    Args:
+        db: Database
+        collection_name: Collection name (e.g. depo_requests_states)
+        field: Field to match (_id, slug, name, code, ...)
+        value: Value; for _id both ObjectId and string are accepted
+
+    Returns:
+        Copy of the document or None
+    """
+    if value is None:
+        return None
+
+    if not is_reference_collection(collection_name):
+        if field == '_id' and isinstance(value, str) and ObjectId.is_valid(value):
+            value = ObjectId(value)
+        return db[collection_name].find_one({field: value})
+
+    snapshot = _get_snapshot(db, collection_name)
+    try:
+        doc = _field_index(snapshot, field).get(_key(value))
+    except TypeError:
+        return None
+    return copy.deepcopy(doc) if doc is not None else None
+
+
+def get_reference(db, collection_name: str, doc_id: Any) -> Optional[dict]:
+    """Get one reference document by _id (ObjectId or string)"""
+    return find_reference(db, collection_name, '_id', doc_id)
+
+
+def list_references(db, collection_name: str, sort_by: Optional[str] = None) -> List[dict]:
+    """Get all documents of a reference collection (copies), optionally sorted by a field"""
+    if not is_reference_collection(collection_name):
+        cursor = db[collection_name].find()
+        if sort_by:
+            cursor = cursor.sort(sort_by, 1)
+        return list(cursor)
+
+    docs = copy.deepcopy(_get_snapshot(db, collection_name)['docs'])
+    if sort_by:
+        docs.sort(key=lambda doc: (doc.get(sort_by) is None, str(doc.get(sort_by) or '')))
+    return docs
+
+
+def invalidate_reference_data(collection_name: Optional[str] = None):
+    """
+    Mark cached data stale after a write
+
+    Args:
+        collection_name: Collection that changed; None invalidates everything
+    """
+    with _lock:
+        if collection_name is None:
+            names = set(_versions) | {name for _, name in _snapshots}
+        else:
+            names = {collection_name}
+        for name in names:
+            _versions[name] = _versions.get(name, 0) + 1
+        _stats['invalidations'] += len(names)
+
+
+def get_reference_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/load counters and cached collections"""
+    with _lock:
+        hits = _stats['hits']
+        total = hits + _stats['misses']
+        return {
+            'collections': sorted({name for _, name in _snapshots}),
+            'max_staleness': _get_max_staleness(),
+            'hits': hits,
+            'misses': _stats['misses'],
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            'loads': _stats['loads'],
+            'invalidations': _stats['invalidations'],
+        }
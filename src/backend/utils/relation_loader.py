@@ -0,0 +1,131 @@
+"""
+Batched relation loader for list enrichment
+
+Collects foreign keys across a page of results and resolves each target
+collection with a single `$in` query, instead of one find_one per row and
+field. Keys may be ObjectIds, their string form or {'$oid': ...} dicts; both
+variants are queried so documents stored with either id type are found.
+Reference collections (see reference_cache) are served from memory.
+
+Usage:
+    loader = RelationLoader(db)
+    loader.add('depo_parts', [s.get('part_id') for s in stocks])
+    loader.add('depo_locations', [s.get('location_id') for s in stocks])
+
+    for stock in stocks:
+        part = loader.get('depo_parts', stock.get('part_id'))
+
+Keys added after a collection was loaded are fetched on the next get().
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from src.backend.utils.reference_cache import get_reference, is_reference_collection
+
+
+def _normalize_key(value: Any) -> Optional[str]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        if value.get('$oid'):
+            return str(value['$oid'])
+        if value.get('_id') is not None:
+            return _normalize_key(value['_id'])
+        return None
+    return str(value)
+
+
+def id_variants(keys: Iterable[str]) -> List[Any]:
+    """ObjectId + string variants of the given ids, for `$in` queries"""
+    variants: List[Any] = []
+    for key in keys:
+        variants.append(key)
+        if ObjectId.is_valid(key):
+            variants.append(ObjectId(key))
+    return variants
+
+
+class RelationLoader:
+    """Per-request cache of related documents, loaded in batches"""
+
+    def __init__(self, db):
+        self.db = db
+        self._docs: Dict[str, Dict[str, dict]] = {}
+        self._pending: Dict[str, set] = {}
+        self._projections: Dict[str, Optional[dict]] = {}
+        self.queries = 0
+
+    def add(self, collection_name: str, values: Any, projection: Optional[dict] = None) -> "RelationLoader":
+        """
+        Register ids to load from a collection
+
+        Args:
+            collection_name: Target collection
+            values: A single id or an iterable of ids (None/empty are ignored)
+            projection: Optional projection for this collection (first one wins)
+        """
+        if values is None:
+            return self
+        if isinstance(values, (str, ObjectId, dict)) or not isinstance(values, Iterable):
+            values = [values]
+
+        loaded = self._docs.setdefault(collection_name, {})
+        pending = self._pending.setdefault(collection_name, set())
+        for value in values:
+            key = _normalize_key(value)
+            if key is not None and key not in loaded:
+                pending.add(key)
+        if projection is not None:
+            self._projections.setdefault(collection_name, projection)
+        return self
+
+    def load(self, collection_name: Optional[str] = None):
+        """Resolve pending ids (one query per collection)"""
+        names = [collection_name] if collection_name else list(self._pending.keys())
+        for name in names:
+            pending = self._pending.get(name)
+            if not pending:
+                continue
+            loaded = self._docs.setdefault(name, {})
+            keys = list(pending)
+            pending.clear()
+
+            if is_reference_collection(name):
+                for key in keys:
+                    loaded[key] = get_reference(self.db, name, key)
+                continue
+
+            query = {'_id': {'$in': id_variants(keys)}}
+            projection = self._projections.get(name)
+            cursor = self.db[name].find(query, projection) if projection else self.db[name].find(query)
+            self.queries += 1
+            for key in keys:
+                loaded.setdefault(key, None)
+            for doc in cursor:
+                loaded[str(doc['_id'])] = doc
+
+    def get(self, collection_name: str, value: Any) -> Optional[dict]:
+        """Get a related document (None if missing); loads pending ids first"""
+        key = _normalize_key(value)
+        if key is None:
+            return None
+        loaded = self._docs.setdefault(collection_name, {})
+        if key not in loaded:
+            self.add(collection_name, key)
+            self.load(collection_name)
+        return loaded.get(key)
+
+    def get_many(self, collection_name: str, values: Iterable[Any]) -> List[dict]:
+        """Get several related documents, skipping missing ones"""
+        values = list(values or [])
+        self.add(collection_name, values)
+        self.load(collection_name)
+        docs = []
+        for value in values:
+            doc = self.get(collection_name, value)
+            if doc is not None:
+                docs.append(doc)
+        return docs
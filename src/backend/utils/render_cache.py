@@ -0,0 +1,317 @@
+"""
+Render cache for generated documents and labels
+Cache de randări: PDF-uri identificate după template, versiune și conținut
+
+An entry is keyed by render_key(): sha256 of (template code, template
+version, format, canonical JSON of the payload). The same payload rendered
+with the same template version is stored once and served again without
+calling Docu. Used by the document routes (src/backend/routes/documents.py)
+and, per distinct label, by the Docu label backend
+(modules/inventory/label_rendering.py); local label layouts are not cached,
+drawing them is cheaper than a lookup.
+
+Storage:
+- render_cache (MongoDB), shared by all workers: {_id: key, template_code,
+  version, data, size, hits, created_at, last_used_at}
+- an in-process LRU in front of it (`render_cache.memory_mb`)
+
+Limits: `render_cache.max_size_mb` for the collection and
+`render_cache.max_entry_mb` per PDF (larger outputs are not cached). The
+collection size is a running total (render_cache_stats, `$inc` on every
+insert and delete, seeded from the collection on first use), so a store only
+pays for eviction, least recently used entries first, once the total goes
+over the limit.
+
+Template versions (render_cache_templates, one counter per template code):
+- invalidate_template() bumps it and drops the template's entries
+  (POST /api/system/render-cache/invalidate, after a template is edited)
+- note_template_bundle() bumps it when the bundle Docu returns for a template
+  changed (checked by GET /api/documents/templates)
+
+The key covers the whole payload. Payload keys in VOLATILE_KEYS (render
+timestamps) would make every render unique, so cached documents are rendered
+without them (strip_volatile()): a PDF served again never carries a stale
+generation time, it carries none.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from bson import Binary
+from pymongo import ReturnDocument
+
+from src.backend.utils.config import get_config_value
+
+CACHE_COLLECTION = 'render_cache'
+VERSIONS_COLLECTION = 'render_cache_templates'
+STATS_COLLECTION = 'render_cache_stats'
+TOTALS_ID = 'totals'
+VOLATILE_KEYS = ('generated_at',)
+
+DEFAULT_MAX_SIZE_MB = 512
+DEFAULT_MAX_ENTRY_MB = 8
+DEFAULT_MEMORY_MB = 32
+_MB = 1024 * 1024
+
+_memory: 'OrderedDict[str, tuple]' = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'memory_hits': 0,
+    'misses': 0,
+    'stores': 0,
+    'evictions': 0,
+    'invalidations': 0,
+}
+
+
+def _setting(key: str, default: Any) -> Any:
+    try:
+        return type(default)(get_config_value(f'render_cache.{key}', default))
+    except (FileNotFoundError, TypeError, ValueError):
+        return default
+
+
+def render_cache_enabled() -> bool:
+    return _setting('enabled', True)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def strip_volatile(payload: Any) -> Any:
+    """Payload without the keys that change on every render (VOLATILE_KEYS)"""
+    if isinstance(payload, dict):
+        return {key: value for key, value in payload.items() if key not in VOLATILE_KEYS}
+    return payload
+
+
+def render_key(template_code: str, version: str, payload: Any, format: str = 'pdf') -> str:
+    """Cache key of a payload rendered with a template version"""
+    digest = hashlib.sha256()
+    for part in (template_code, str(version), format, _canonical(payload)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def template_version(db, template_code: str) -> str:
+    """Current version of a Docu template ('0' until it is first invalidated)"""
+    entry = db[VERSIONS_COLLECTION].find_one({'_id': template_code}, {'version': 1})
+    return str(entry.get('version', 0)) if entry else '0'
+
+
+def _remember(key: str, template_code: str, content: bytes):
+    global _memory_bytes
+    limit = _setting('memory_mb', DEFAULT_MEMORY_MB) * _MB
+    if len(content) > limit:
+        return
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return
+        _memory[key] = (template_code, content)
+        _memory_bytes += len(content)
+        while _memory_bytes > limit and _memory:
+            _, (_, dropped) = _memory.popitem(last=False)
+            _memory_bytes -= len(dropped)
+
+
+def _forget(template_code: Optional[str] = None):
+    global _memory_bytes
+    with _lock:
+        for key in [k for k, (code, _) in _memory.items() if template_code is None or code == template_code]:
+            _memory_bytes -= len(_memory.pop(key)[1])
+
+
+def _forget_key(key: str):
+    global _memory_bytes
+    entry = _memory.pop(key, None)
+    if entry:
+        _memory_bytes -= len(entry[1])
+
+
+def get_rendered(db, key: str) -> Optional[bytes]:
+    """Cached output for a key, or None"""
+    with _lock:
+        entry = _memory.get(key)
+        if entry:
+            _memory.move_to_end(key)
+            _stats['hits'] += 1
+            _stats['memory_hits'] += 1
+    if entry:
+        try:
+            db[CACHE_COLLECTION].update_one({'_id': key}, {'$set': {'last_used_at': datetime.utcnow()}, '$inc': {'hits': 1}})
+        except Exception as e:
+            print(f"[RENDER_CACHE] Warning: Failed to touch entry: {e}")
+        return entry[1]
+
+    doc = db[CACHE_COLLECTION].find_one_and_update(
+        {'_id': key},
+        {'$set': {'last_used_at': datetime.utcnow()}, '$inc': {'hits': 1}},
+        projection={'data': 1, 'template_code': 1},
+    )
+    with _lock:
+        _stats['hits' if doc else 'misses'] += 1
+    if not doc:
+        return None
+    content = bytes(doc['data'])
+    _remember(key, doc.get('template_code'), content)
+    return content
+
+
+def _totals(db) -> Dict[str, Any]:
+    """Running size / entry count of the cache collection (seeded with one $group on first use)"""
+    doc = db[STATS_COLLECTION].find_one({'_id': TOTALS_ID})
+    if doc is None:
+        totals = list(db[CACHE_COLLECTION].aggregate([{'$group': {'_id': None, 'entries': {'$sum': 1}, 'size': {'$sum': '$size'}}}]))
+        seed = {'size': totals[0]['size'], 'entries': totals[0]['entries']} if totals else {'size': 0, 'entries': 0}
+        db[STATS_COLLECTION].update_one({'_id': TOTALS_ID}, {'$setOnInsert': seed}, upsert=True)
+        doc = db[STATS_COLLECTION].find_one({'_id': TOTALS_ID})
+    return doc
+
+
+def _count(db, size: int, entries: int) -> int:
+    """Add inserted (or, negative, deleted) entries to the running totals; returns the total size"""
+    doc = db[STATS_COLLECTION].find_one_and_update(
+        {'_id': TOTALS_ID},
+        {'$inc': {'size': size, 'entries': entries}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        # First use: the seed is read from the collection, which already has this change
+        doc = _totals(db)
+    return doc.get('size', 0)
+
+
+def _delete(db, entries: list) -> int:
+    """Delete cache entries ({_id, size}) and take them off the totals; returns the number deleted"""
+    if not entries:
+        return 0
+    deleted = db[CACHE_COLLECTION].delete_many({'_id': {'$in': [entry['_id'] for entry in entries]}}).deleted_count
+    if deleted == len(entries):
+        _count(db, -sum(entry.get('size', 0) for entry in entries), -deleted)
+    elif deleted:
+        # Some were deleted by another worker, which counted them; seed again
+        db[STATS_COLLECTION].delete_one({'_id': TOTALS_ID})
+    with _lock:
+        for entry in entries:
+            _forget_key(entry['_id'])
+    return deleted
+
+
+def store_rendered(db, key: str, template_code: str, version: str, content: bytes) -> bool:
+    """Cache a rendered output (never raises); returns True if stored"""
+    if not content or len(content) > _setting('max_entry_mb', DEFAULT_MAX_ENTRY_MB) * _MB:
+        return False
+    try:
+        now = datetime.utcnow()
+        result = db[CACHE_COLLECTION].update_one(
+            {'_id': key},
+            {
+                '$setOnInsert': {
+                    'template_code': template_code,
+                    'version': str(version),
+                    'data': Binary(content),
+                    'size': len(content),
+                    'hits': 0,
+                    'created_at': now,
+                },
+                '$set': {'last_used_at': now},
+            },
+            upsert=True,
+        )
+        _remember(key, template_code, content)
+        with _lock:
+            _stats['stores'] += 1
+        if result.upserted_id is not None:
+            total = _count(db, len(content), 1)
+            if total > _setting('max_size_mb', DEFAULT_MAX_SIZE_MB) * _MB:
+                _evict(db, total)
+        return True
+    except Exception as e:
+        print(f"[RENDER_CACHE] Warning: Failed to store {template_code} render: {e}")
+        return False
+
+
+def _evict(db, total: int):
+    """Drop least recently used entries until the collection is back under max_size_mb"""
+    excess = total - _setting('max_size_mb', DEFAULT_MAX_SIZE_MB) * _MB
+    evicted = []
+    for entry in db[CACHE_COLLECTION].find({}, {'size': 1}).sort('last_used_at', 1):
+        if excess <= 0:
+            break
+        evicted.append(entry)
+        excess -= entry.get('size', 0)
+    deleted = _delete(db, evicted)
+    with _lock:
+        _stats['evictions'] += deleted
+
+
+def invalidate_template(db, template_code: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Drop cached renders after a template changed
+
+    Args:
+        template_code: Template that changed; None drops every entry
+    """
+    query = {'template_code': template_code} if template_code else {}
+    if template_code:
+        db[VERSIONS_COLLECTION].update_one(
+            {'_id': template_code},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True,
+        )
+    else:
+        db[VERSIONS_COLLECTION].update_many({}, {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}})
+    removed = _delete(db, list(db[CACHE_COLLECTION].find(query, {'size': 1})))
+    _forget(template_code)
+    with _lock:
+        _stats['invalidations'] += 1
+    return {'template_code': template_code, 'removed': removed}
+
+
+def note_template_bundle(db, template_code: str, bundle: Any) -> bool:
+    """
+    Invalidate a template when the bundle Docu returns for it changed
+
+    Returns True if it changed (the first bundle seen is only recorded).
+    """
+    if not bundle:
+        return False
+    fingerprint = hashlib.sha256(_canonical(bundle).encode('utf-8')).hexdigest()
+    try:
+        entry = db[VERSIONS_COLLECTION].find_one({'_id': template_code}, {'fingerprint': 1})
+        if entry and entry.get('fingerprint') == fingerprint:
+            return False
+        db[VERSIONS_COLLECTION].update_one({'_id': template_code}, {'$set': {'fingerprint': fingerprint}}, upsert=True)
+        if entry and entry.get('fingerprint'):
+            invalidate_template(db, template_code)
+            return True
+    except Exception as e:
+        print(f"[RENDER_CACHE] Warning: Failed to check template {template_code}: {e}")
+    return False
+
+
+def get_render_cache_stats(db=None) -> Dict[str, Any]:
+    """Hit/miss/store counters, memory tier size and (with db) stored entries"""
+    with _lock:
+        hits = _stats['hits']
+        total = hits + _stats['misses']
+        stats = {
+            **_stats,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+            'memory_entries': len(_memory),
+            'memory_bytes': _memory_bytes,
+        }
+    if db is not None:
+        totals = _totals(db)
+        stats['entries'] = totals.get('entries', 0)
+        stats['stored_bytes'] = totals.get('size', 0)
+        stats['max_size_mb'] = _setting('max_size_mb', DEFAULT_MAX_SIZE_MB)
+    return stats
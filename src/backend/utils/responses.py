@@ -0,0 +1,142 @@
+"""
+JSON responses for MongoDB data
+
+MongoJSONResponse renders content with orjson (when installed) and encodes
+BSON values natively through a `default` hook: ObjectId -> str,
+datetime/date -> ISO format, Decimal128/Decimal -> float. Anything else the
+hook does not know is handed to FastAPI's jsonable_encoder, so the output is
+the same as before, only produced in one pass.
+
+FastAPI runs jsonable_encoder over every returned value unless the endpoint
+returns a Response itself. use_mongo_json_responses(app) wraps the endpoints
+that have no response_model, no explicit response_class and no injected
+Response parameter, so their return value goes straight into
+MongoJSONResponse. Endpoints with a response_model keep FastAPI's validation
+path unchanged.
+"""
+import asyncio
+import functools
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi import FastAPI
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.dependencies.models import Dependant
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, request_response
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the json module
+    orjson = None
+
+
+def json_default(obj: Any) -> Any:
+    """Encode values json/orjson do not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return jsonable_encoder(obj, custom_encoder={ObjectId: str, Decimal128: lambda v: float(v.to_decimal())})
+
+
+def _json_dumps(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        default=json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes (orjson if available)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. integers over 64 bits; the json module handles them
+            pass
+    return _json_dumps(content)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse that encodes ObjectId, datetime and Decimal128 natively"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _uses_response_param(dependant: Dependant) -> bool:
+    if dependant.response_param_name:
+        return True
+    return any(_uses_response_param(sub) for sub in dependant.dependencies)
+
+
+def _is_eligible(route: APIRoute) -> bool:
+    if route.response_model is not None or route.response_field is not None:
+        return False
+    if not isinstance(route.response_class, DefaultPlaceholder):
+        return False
+    if route.status_code is not None and not is_body_allowed_for_status_code(route.status_code):
+        return False
+    return not _uses_response_param(route.dependant)
+
+
+def _wrap_endpoint(call, status_code: int):
+    def to_response(result):
+        if isinstance(result, Response):
+            return result
+        return MongoJSONResponse(result, status_code=status_code)
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            return to_response(await call(*args, **kwargs))
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            # Runs in the threadpool, so encoding stays off the event loop too
+            return to_response(call(*args, **kwargs))
+    wrapper.__mongo_json__ = True
+    return wrapper
+
+
+def use_mongo_json_responses(app: FastAPI) -> int:
+    """
+    Render plain return values of eligible routes with MongoJSONResponse
+
+    Call once, after all routers and modules are registered.
+
+    Returns:
+        Number of routes switched
+    """
+    switched = 0
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or not _is_eligible(route):
+            continue
+        call = route.dependant.call
+        if getattr(call, '__mongo_json__', False):
+            continue
+        route.dependant.call = _wrap_endpoint(call, route.status_code or 200)
+        route.app = request_response(route.get_route_handler())
+        switched += 1
+    return switched
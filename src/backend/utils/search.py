@@ -0,0 +1,257 @@
+"""
+Indexed text search
+Căutare indexată (cuvinte + trigrame) pentru listări și autocomplete
+
+Searchable collections keep two materialized, indexed fields, written next to
+the searched fields (SEARCH_SPECS) whenever a document is saved:
+
+- search_terms: unique lowercase words of the searched fields
+- search_grams: the trigrams of those words
+
+A query is split into words the same way. Each word must be:
+- a substring of one of the document's words (len >= 3): all its trigrams
+  are in search_grams (index), then the word is checked against the terms
+  of the few documents left
+- a prefix of one of the document's words (shorter words): `^word` on
+  search_terms, a range scan on the index
+
+instead of a case-insensitive `$regex` on every field, which reads the whole
+collection. Documents saved before the fields existed (`search_grams: None`,
+an indexed branch too) keep matching the old way until
+backfill_search_fields() has run (`invoke db-backfill-search`).
+
+autocomplete() matches word prefixes only and ranks the candidates: exact
+word > prefix > substring, weighted per field (name / IPN above notes).
+
+Benchmark: scripts/benchmarks/search_parts.py (100k synthetic parts by default).
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from src.backend.utils.config import get_config_value
+
+DEFAULT_RESULTS_LIMIT = 30
+MAX_TERMS = 200
+GRAM_SIZE = 3
+AUTOCOMPLETE_CANDIDATES = 20  # candidates read per requested result
+
+# Projection leaving the search fields out of API responses
+WITHOUT_SEARCH_FIELDS = {'search_terms': 0, 'search_grams': 0}
+
+# collection -> {searched field (dotted paths go through arrays): ranking weight}
+SEARCH_SPECS: Dict[str, Dict[str, int]] = {
+    'depo_parts': {'name': 3, 'ipn': 3, 'description': 1},
+    'depo_locations': {'name': 3, 'code': 3, 'description': 1},
+    'depo_companies': {'name': 3, 'code': 2, 'vatno': 1, 'regno': 1},
+    'depo_requests': {'reference': 3, 'items.batch_code': 2, 'notes': 1},
+    'depo_purchase_orders': {
+        'reference': 3,
+        'supplier_reference': 2,
+        'items.part_detail.name': 2,
+        'items.part_detail.ipn': 2,
+        'items.reference': 1,
+        'description': 1,
+    },
+    'audit_logs': {'action': 3, 'username': 3, 'ip_address': 1},
+}
+
+_WORD = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def get_search_results_limit() -> int:
+    try:
+        limit = get_config_value('api.search_results_limit', DEFAULT_RESULTS_LIMIT)
+    except FileNotFoundError:
+        return DEFAULT_RESULTS_LIMIT
+    return limit if isinstance(limit, int) and limit > 0 else DEFAULT_RESULTS_LIMIT
+
+
+def tokenize(*values: Any) -> List[str]:
+    """Unique lowercase words of the given values, in order"""
+    words: List[str] = []
+    seen = set()
+    for value in values:
+        for word in _WORD.findall(str(value or '').lower()):
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+    return words
+
+
+def trigrams(word: str) -> List[str]:
+    if len(word) < GRAM_SIZE:
+        return []
+    return [word[i:i + GRAM_SIZE] for i in range(len(word) - GRAM_SIZE + 1)]
+
+
+def _field_values(doc: Any, path: str) -> List[Any]:
+    """Values at a dotted path, descending through arrays"""
+    head, _, rest = path.partition('.')
+    values = doc if isinstance(doc, list) else [doc]
+    found = []
+    for value in values:
+        if not isinstance(value, dict):
+            continue
+        child = value.get(head)
+        if rest:
+            found.extend(_field_values(child, rest))
+        elif isinstance(child, list):
+            found.extend(child)
+        elif child is not None:
+            found.append(child)
+    return found
+
+
+def search_fields(collection_name: str, doc: dict) -> Dict[str, List[str]]:
+    """Materialized search fields of a document ($set them with the document)"""
+    values = []
+    for path in SEARCH_SPECS[collection_name]:
+        values.extend(_field_values(doc, path))
+    terms = tokenize(*values)[:MAX_TERMS]
+    grams: List[str] = []
+    seen = set()
+    for term in terms:
+        for gram in trigrams(term):
+            if gram not in seen:
+                seen.add(gram)
+                grams.append(gram)
+    return {'search_terms': terms, 'search_grams': grams}
+
+
+def _legacy_filter(collection_name: str, words: List[str]) -> dict:
+    # Same per-word semantics, as a regex over every searched field
+    return {'search_grams': None, '$and': [
+        {'$or': [{path: {'$regex': re.escape(word), '$options': 'i'}} for path in SEARCH_SPECS[collection_name]]}
+        for word in words
+    ]}
+
+
+def _word_clause(word: str, prefix_only: bool) -> dict:
+    if prefix_only or len(word) < GRAM_SIZE:
+        return {'search_terms': re.compile('^' + re.escape(word))}
+    return {'$and': [
+        {'search_grams': {'$all': trigrams(word)}},
+        {'search_terms': re.compile(re.escape(word))},
+    ]}
+
+
+def search_filter(collection_name: str, search: Optional[str], prefix_only: bool = False) -> dict:
+    """
+    Filter matching `search` in a searchable collection ({} for a blank search)
+
+    Args:
+        prefix_only: Words must start a document word (autocomplete)
+    """
+    words = tokenize(search)
+    if not words:
+        return {}
+    clauses = [_word_clause(word, prefix_only) for word in words]
+    indexed = clauses[0] if len(clauses) == 1 else {'$and': clauses}
+    return {'$or': [indexed, _legacy_filter(collection_name, words)]}
+
+
+def matching_ids(db, collection_name: str, search: str, limit: Optional[int] = None) -> List[Any]:
+    """_ids of the documents matching `search` (for `$in` filters on referencing collections)"""
+    query = search_filter(collection_name, search)
+    if not query:
+        return []
+    cursor = db[collection_name].find(query, {'_id': 1})
+    if limit:
+        cursor = cursor.limit(limit)
+    return [doc['_id'] for doc in cursor]
+
+
+def score(collection_name: str, doc: dict, words: List[str]) -> int:
+    """Ranking score: per query word, the best field match times the field weight"""
+    spec = SEARCH_SPECS[collection_name]
+    field_terms = {path: tokenize(*_field_values(doc, path)) for path in spec}
+    total = 0
+    for word in words:
+        best = 0
+        for path, weight in spec.items():
+            for term in field_terms[path]:
+                if term == word:
+                    best = max(best, 4 * weight)
+                elif term.startswith(word):
+                    best = max(best, 2 * weight)
+                elif word in term:
+                    best = max(best, weight)
+        total += best
+    return total
+
+
+def autocomplete(
+    db,
+    collection_name: str,
+    search: Optional[str],
+    limit: Optional[int] = None,
+    query: Optional[dict] = None,
+    projection: Optional[dict] = None,
+) -> List[dict]:
+    """
+    Best `limit` documents (default api.search_results_limit) whose words
+    start with the query words
+
+    Reads at most limit * AUTOCOMPLETE_CANDIDATES candidates through the index
+    and ranks them by score(), then by the shortest first field (name).
+    """
+    words = tokenize(search)
+    if not words:
+        return []
+    limit = limit or get_search_results_limit()
+    match = search_filter(collection_name, search, prefix_only=True)
+    if query:
+        match = {'$and': [query, match]}
+    if projection and all(projection.values()):
+        # Inclusion projection: ranking needs the searched fields
+        projection = {**projection, **{path: 1 for path in SEARCH_SPECS[collection_name]}}
+    candidates = list(db[collection_name].find(match, projection).limit(limit * AUTOCOMPLETE_CANDIDATES))
+
+    first_field = next(iter(SEARCH_SPECS[collection_name]))
+    candidates.sort(key=lambda doc: (
+        -score(collection_name, doc, words),
+        len(str(doc.get(first_field) or '')),
+        str(doc.get(first_field) or ''),
+    ))
+    return candidates[:limit]
+
+
+def touches_search_fields(collection_name: str, fields: Iterable[str]) -> bool:
+    """Whether an update of `fields` changes the searched fields"""
+    roots = {path.split('.')[0] for path in SEARCH_SPECS[collection_name]}
+    return any(field.split('.')[0] in roots for field in fields)
+
+
+def refresh_search_fields(db, collection_name: str, doc_id: Any) -> None:
+    """Recompute the search fields of one document after a partial update"""
+    projection = {path.split('.')[0]: 1 for path in SEARCH_SPECS[collection_name]}
+    doc = db[collection_name].find_one({'_id': doc_id}, projection)
+    if doc:
+        db[collection_name].update_one({'_id': doc_id}, {'$set': search_fields(collection_name, doc)})
+
+
+def backfill_search_fields(db, collection_names: Optional[Iterable[str]] = None, batch_size: int = 500, force: bool = False) -> Dict[str, int]:
+    """
+    Write search fields on documents saved before they were materialized (idempotent)
+
+    Returns:
+        {collection: documents updated}
+    """
+    report = {}
+    for collection_name in collection_names or SEARCH_SPECS:
+        query = {} if force else {'search_grams': {'$exists': False}}
+        projection = {path.split('.')[0]: 1 for path in SEARCH_SPECS[collection_name]}
+        collection = db[collection_name]
+        updated = 0
+        ops = []
+        for doc in collection.find(query, projection):
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': search_fields(collection_name, doc)}))
+            if len(ops) >= batch_size:
+                updated += collection.bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+        report[collection_name] = updated
+    return report
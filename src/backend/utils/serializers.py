@@ -1,67 +1,108 @@
 """
 Global serialization utilities
 Converts MongoDB documents to JSON-serializable format
+
+This is the only document serializer; the module-level serialize_doc helpers
+(inventory, procurement, sales, returns) delegate here. Values are converted
+in a single pass with a type dispatch table, so the result can be written by
+MongoJSONResponse (src/backend/utils/responses.py) without FastAPI's
+jsonable_encoder walking it a second time.
 """
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Any
+
 from bson import ObjectId
-from datetime import datetime
+from bson.decimal128 import Decimal128
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _decimal128_to_float(value: Decimal128) -> float:
+    return float(value.to_decimal())
+
+
+def _convert(value: Any, add_value: bool) -> Any:
+    """Convert one value (any depth)"""
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind is dict:
+        return _serialize_dict(value, add_value)
+    if kind is list or kind is tuple:
+        return [_convert(item, add_value) for item in value]
+    if kind is ObjectId:
+        return str(value)
+    if kind is datetime or kind is date:
+        return value.isoformat()
+    if kind is Decimal128:
+        return _decimal128_to_float(value)
+    if kind is Decimal:
+        return float(value)
+    # Subclasses (SON, OrderedDict, custom datetimes, ...)
+    if isinstance(value, dict):
+        return _serialize_dict(value, add_value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _serialize_dict(doc: dict, add_value: bool) -> dict:
+    result = {}
+    for key, value in doc.items():
+        # Handle _id and *_id fields
+        if key == '_id' or (type(key) is str and key.endswith('_id')):
+            result[key] = str(value) if value else None
+        else:
+            result[key] = _convert(value, add_value)
+
+    # Add 'value' field for Select components (value = _id)
+    # This makes all API responses compatible with Mantine Select
+    if add_value and result.get('_id'):
+        result['value'] = result['_id']
 
+    return result
 
-def serialize_doc(doc: Any) -> Any:
+
+def serialize_doc(doc: Any, add_value: bool = True) -> Any:
     """
     Convert MongoDB document to JSON-serializable format
-    
+
     Features:
-    - Converts ObjectId to string
-    - Converts datetime to ISO format
+    - Converts ObjectId to string (and every `_id` / `*_id` field to string or None)
+    - Converts datetime/date to ISO format, Decimal128 to float
     - Recursively handles nested dicts and lists
-    - Automatically adds 'value' field (value = _id) for Select components
-    
+    - Adds 'value' field (value = _id) for Select components, unless add_value=False
+
     Args:
         doc: MongoDB document (dict, list, or primitive)
-    
+        add_value: Add the 'value' field on every dict that has an _id
+
     Returns:
         JSON-serializable version of the document
     """
-    if doc is None:
-        return None
-    
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            # Handle _id and *_id fields
-            if key == '_id' or key.endswith('_id'):
-                result[key] = str(value) if value else None
-            # Handle ObjectId values
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            # Handle datetime values
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            # Recursively handle nested dicts
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            # Recursively handle lists
-            elif isinstance(value, list):
-                result[key] = [
-                    serialize_doc(item) if isinstance(item, (dict, list)) else item 
-                    for item in value
-                ]
-            # Keep other values as-is
-            else:
-                result[key] = value
-        
-        # Add 'value' field for Select components (value = _id)
-        # This makes all API responses compatible with Mantine Select
-        if '_id' in result and result['_id']:
-            result['value'] = result['_id']
-        
-        return result
-    
-    return doc
+    return _convert(doc, add_value)
+
+
+def serialize_values(value: Any) -> Any:
+    """
+    Convert BSON values only (ObjectId, Decimal128), keeping keys and datetimes
+
+    Replaces the ad-hoc fix_oid walkers: no `*_id` rule and no 'value' field;
+    datetimes are left for the response class to encode.
+    """
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind is ObjectId:
+        return str(value)
+    if isinstance(value, dict):
+        return {k: serialize_values(v) for k, v in value.items()}
+    if kind is list or kind is tuple:
+        return [serialize_values(item) for item in value]
+    if kind is Decimal128:
+        return _decimal128_to_float(value)
+    return value
 
 
 def serialize_object_id(obj_id: ObjectId) -> str:
@@ -0,0 +1,28 @@
+"""
+Migration script to materialize batch_prefixes / batch_codes_text
+on depo_requests and depo_build_orders (run once after upgrading)
+
+Usage:
+    python src/scripts/migrate_batch_prefixes.py          # only documents missing the fields
+    python src/scripts/migrate_batch_prefixes.py --force  # recompute everything
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.db import get_db
+from modules.requests.build_orders_helpers import backfill_batch_prefixes
+
+
+def migrate_batch_prefixes(force: bool = False):
+    print("Starting batch prefix migration...")
+    report = backfill_batch_prefixes(get_db(), force=force)
+    for collection_name, updated in report.items():
+        print(f"  {collection_name}: {updated} documents updated")
+    print("Migration completed.")
+
+
+if __name__ == "__main__":
+    migrate_batch_prefixes(force='--force' in sys.argv)
@@ -0,0 +1,34 @@
+"""
+Migration script to materialize search_terms / search_grams on the searchable
+collections (src/backend/utils/search.py SEARCH_SPECS)
+(run once after upgrading; documents saved through the API keep them up to date)
+
+Usage:
+    python src/scripts/migrate_search_fields.py                 # only documents missing the fields
+    python src/scripts/migrate_search_fields.py --force         # recompute everything
+    python src/scripts/migrate_search_fields.py depo_parts ...  # only these collections
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.db import get_db
+from src.backend.utils.search import backfill_search_fields
+
+
+def migrate_search_fields(collection_names=None, force: bool = False):
+    print("Starting search fields migration...")
+    report = backfill_search_fields(get_db(), collection_names, force=force)
+    for collection_name, updated in report.items():
+        print(f"  {collection_name}: {updated} documents updated")
+    print("Migration completed.")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    migrate_search_fields(
+        [arg for arg in args if not arg.startswith('--')] or None,
+        force='--force' in args
+    )
@@ -0,0 +1,28 @@
+"""
+Rebuild the approval inbox from the open approval flows (schedule as a job, e.g. nightly)
+
+Flow writes keep the inbox in sync; the rebuild also refreshes the cached
+object details (reference / description / supplier) of long-open flows.
+
+Usage:
+    python src/scripts/rebuild_approval_inbox.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.db import get_db
+from src.backend.utils.approval_inbox import rebuild_approval_inbox
+
+
+def rebuild():
+    print("Rebuilding approval inbox...")
+    report = rebuild_approval_inbox(get_db())
+    print(f"  open flows: {report['flows']}, closed entries removed: {report['removed']}")
+    print("Rebuild completed.")
+
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,28 @@
+"""
+Rebuild the depo_stocks_availability projection
+(run once after upgrading, and whenever depo_stocks was edited outside the API)
+
+Usage:
+    python src/scripts/rebuild_stock_availability.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.db import get_db
+from modules.inventory.stock_availability import rebuild_stock_availability
+
+
+def rebuild():
+    print("Rebuilding stock availability projection...")
+    report = rebuild_stock_availability(get_db())
+    print(f"  stocks read: {report['stocks']}")
+    print(f"  rows written: {report['rows']}")
+    print(f"  stale rows removed: {report['removed']}")
+    print("Rebuild completed.")
+
+
+if __name__ == "__main__":
+    rebuild()
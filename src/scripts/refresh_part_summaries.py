@@ -0,0 +1,49 @@
+"""
+Refresh the per-part demand/supply summaries (schedule as a job, e.g. "*/10 * * * *")
+
+Without arguments, refreshes the parts of orders and requests updated in the
+last `part_summary.sweep_minutes` (default 30; keep it above the job period),
+which picks up state changes made by approval flows. --full rebuilds every
+summary.
+
+Usage:
+    python src/scripts/refresh_part_summaries.py
+    python src/scripts/refresh_part_summaries.py --full
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.config import get_config_value
+from src.backend.utils.db import get_db
+from modules.inventory.part_summary import rebuild_part_summaries, refresh_changed_summaries
+
+DEFAULT_SWEEP_MINUTES = 30
+
+
+def _sweep_minutes() -> int:
+    try:
+        return int(get_config_value('part_summary.sweep_minutes', DEFAULT_SWEEP_MINUTES))
+    except (FileNotFoundError, TypeError, ValueError):
+        return DEFAULT_SWEEP_MINUTES
+
+
+def refresh(full: bool = False):
+    db = get_db()
+    if full:
+        print("Rebuilding part summaries...")
+        report = rebuild_part_summaries(db)
+        print(f"  parts: {report['parts']}, stale summaries removed: {report['removed']}")
+    else:
+        minutes = _sweep_minutes()
+        print(f"Refreshing part summaries changed in the last {minutes} minutes...")
+        report = refresh_changed_summaries(db, datetime.utcnow() - timedelta(minutes=minutes))
+        print(f"  documents: {report['documents']}, parts: {report['parts']}")
+    print("Refresh completed.")
+
+
+if __name__ == "__main__":
+    refresh(full='--full' in sys.argv)
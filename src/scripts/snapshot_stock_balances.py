@@ -0,0 +1,29 @@
+"""
+Take a stock balance snapshot (schedule as a job, e.g. "0 2 * * *")
+
+Snapshots keep rebuild_balances() and as-of-date stock queries from
+replaying the whole movement history.
+
+Usage:
+    python src/scripts/snapshot_stock_balances.py
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+
+from src.backend.utils.db import get_db
+from modules.inventory.balance_snapshots import create_balance_snapshot
+
+
+def snapshot():
+    print("Taking stock balance snapshot...")
+    header = create_balance_snapshot(get_db())
+    print(f"  snapshot: {header['_id']} as of {header['as_of'].isoformat()}")
+    print(f"  rows: {header.get('rows', 0)}, movements replayed: {header.get('movements_replayed', 0)}")
+    print("Snapshot completed.")
+
+
+if __name__ == "__main__":
+    snapshot()
@@ -293,12 +293,174 @@ def test_config(c):
 
 @task
 def db_init(c):
-    """Initialize database (create collections)"""
+    """Initialize database (apply missing indexes from the index catalog)"""
+    from src.backend.utils.db import get_db
+    from src.backend.utils.indexes import ensure_indexes
+
     print("Initializing database...")
     print("Note: Collections will be created automatically on first use")
+
+    print("\nApplying index catalog...")
+    report = ensure_indexes(get_db())
+    for label in report['created']:
+        print(f"  + {label}")
+    for conflict in report['conflicts']:
+        print(f"  ! {conflict['index']}: expected {conflict['expected']}, found {conflict['found']}")
+    for error in report['errors']:
+        print(f"  ✗ {error}")
+    print(f"\n  Created: {len(report['created'])}, existing: {len(report['existing'])}, "
+          f"conflicts: {len(report['conflicts'])}, errors: {len(report['errors'])}")
+
+    if report['conflicts'] or report['errors']:
+        print("\n✗ Database initialized with index problems (see above)")
+        sys.exit(1)
     print("✓ Database ready")
 
 
+@task
+def db_backfill_batch_prefixes(c, force=False):
+    """Materialize batch_prefixes / batch_codes_text on requests and build orders"""
+    from src.backend.utils.db import get_db
+    from modules.requests.build_orders_helpers import backfill_batch_prefixes
+
+    print("Backfilling batch prefixes...")
+    report = backfill_batch_prefixes(get_db(), force=force)
+    for collection_name, updated in report.items():
+        print(f"  {collection_name}: {updated} updated")
+    print("✓ Done")
+
+
+@task
+def db_backfill_search(c, force=False):
+    """Materialize search_terms / search_grams on the searchable collections (indexed search)"""
+    from src.backend.utils.db import get_db
+    from src.backend.utils.search import backfill_search_fields
+
+    print("Backfilling search fields...")
+    report = backfill_search_fields(get_db(), force=force)
+    for collection_name, updated in report.items():
+        print(f"  {collection_name}: {updated} updated")
+    print("✓ Done")
+
+
+@task
+def db_rebuild_stock_availability(c):
+    """Rebuild the per-batch stock availability projection from stocks and the ledger"""
+    from src.backend.utils.db import get_db
+    from modules.inventory.stock_availability import rebuild_stock_availability
+
+    print("Rebuilding stock availability...")
+    report = rebuild_stock_availability(get_db())
+    print(f"  stocks read: {report['stocks']}, rows written: {report['rows']}, stale rows removed: {report['removed']}")
+    print("✓ Done")
+
+
+@task
+def db_snapshot_stock_balances(c):
+    """Take a stock balance snapshot (base for incremental rebuilds and as-of-date queries)"""
+    from src.backend.utils.db import get_db
+    from modules.inventory.balance_snapshots import create_balance_snapshot
+
+    print("Taking stock balance snapshot...")
+    header = create_balance_snapshot(get_db())
+    print(f"  as of {header['as_of'].isoformat()}: {header.get('rows', 0)} rows, {header.get('movements_replayed', 0)} movements replayed")
+    print("✓ Done")
+
+
+@task
+def db_rebuild_balances(c, full=False):
+    """Rebuild depo_stocks_balances from the latest snapshot (--full: whole ledger) and swap it in"""
+    from src.backend.utils.db import get_db
+    from modules.inventory.balance_snapshots import rebuild_balances
+
+    print("Rebuilding stock balances...")
+    report = rebuild_balances(get_db(), full=full)
+    print(f"  rows: {report['rows']}, movements replayed: {report['movements_replayed']}, caught up: {report['caught_up']}")
+    print("✓ Done")
+
+
+@task
+def db_rebuild_part_summaries(c):
+    """Rebuild the per-part demand/supply summaries (article stock and allocations views)"""
+    from src.backend.utils.db import get_db
+    from modules.inventory.part_summary import rebuild_part_summaries
+
+    print("Rebuilding part summaries...")
+    report = rebuild_part_summaries(get_db())
+    print(f"  parts: {report['parts']}, stale summaries removed: {report['removed']}")
+    print("✓ Done")
+
+
+@task
+def db_rebuild_approval_inbox(c):
+    """Rebuild the approval inbox (pending approvals per user / role) from the open flows"""
+    from src.backend.utils.db import get_db
+    from src.backend.utils.approval_inbox import rebuild_approval_inbox
+
+    print("Rebuilding approval inbox...")
+    report = rebuild_approval_inbox(get_db())
+    print(f"  open flows: {report['flows']}, closed entries removed: {report['removed']}")
+    print("✓ Done")
+
+
+@task
+def db_index_report(c):
+    """Report index drift: missing, extra and unused indexes"""
+    from src.backend.utils.db import get_db
+    from src.backend.utils.indexes import get_index_drift
+
+    print("=" * 50)
+    print("Index Drift Report")
+    print("=" * 50)
+
+    drift = get_index_drift(get_db())
+
+    print(f"\nMissing ({len(drift['missing'])}):")
+    for item in drift['missing']:
+        print(f"  - {item['collection']}.{item['name']} {item['keys']} [{item['owner']}]")
+
+    print(f"\nExtra - not in catalog ({len(drift['extra'])}):")
+    for item in drift['extra']:
+        print(f"  - {item['collection']}.{item['name']} {item['keys']}")
+
+    print(f"\nUnused since last restart ({len(drift['unused'])}):")
+    for item in drift['unused']:
+        print(f"  - {item['collection']}.{item['name']} (since {item['since']})")
+
+    for error in drift['errors']:
+        print(f"\n  ✗ {error}")
+
+    if drift['missing']:
+        print("\nRun: invoke db-init")
+
+
+@task
+def db_explain_check(c):
+    """Explain the main list queries and fail if any of them does a COLLSCAN"""
+    from src.backend.utils.db import get_db
+    from src.backend.utils.indexes import check_query_plans
+
+    print("=" * 50)
+    print("Query Plan Check")
+    print("=" * 50)
+
+    result = check_query_plans(get_db())
+    for probe in result['results']:
+        if probe.get('error'):
+            status = "✗ ERROR"
+        elif probe['collscan']:
+            status = "✗ COLLSCAN"
+        else:
+            status = "✓"
+        detail = probe.get('error') or " > ".join(probe['stages'])
+        print(f"  {status} [{probe['owner']}] {probe['name']} ({probe['collection']}): {detail}")
+
+    if not result['ok']:
+        print(f"\n✗ {len(result['failures'])} queries without index support")
+        sys.exit(1)
+    print("\n✓ All queries use an index")
+
+
 @task
 def backup_db(c):
     """Backup MongoDB database to backups folder"""
@@ -719,7 +881,9 @@ def help(c):
     print("    invoke lint-frontend    - Lint frontend code")
     print("    invoke test-backend     - Run backend tests")
     print("\n  Database:")
-    print("    invoke db-init          - Initialize database")
+    print("    invoke db-init          - Initialize database (apply indexes)")
+    print("    invoke db-index-report  - Report missing/extra/unused indexes")
+    print("    invoke db-explain-check - Fail if a main list query does a COLLSCAN")
     print("    invoke backup-db        - Backup MongoDB database")
     print("    invoke test-config      - Test configuration and connections")
     print("\n  Email:")